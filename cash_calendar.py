@@ -0,0 +1,177 @@
+import numpy as np
+from datetime import date
+from typing import Dict, Any, List
+
+from cash_engine import INFLOW_KEYS
+from model_cache import memoize_by_content
+from payroll_engine import month_starts, pay_period_vector
+
+# How a monthly amount is turned into dated cash movements
+TIMING_OPTIONS = ["Payroll Calendar", "Day of Month", "Spread Daily"]
+
+# Default timing per liquidity row; rows not listed are paid on the 1st of the month
+DEFAULT_PAYMENT_SCHEDULES = {
+    "revenue": {"timing": "Day of Month", "day": 15, "lag_days": 0},
+    "other_cash_receipts": {"timing": "Day of Month", "day": 15, "lag_days": 0},
+    "investment": {"timing": "Day of Month", "day": 1, "lag_days": 0},
+    "Payroll": {"timing": "Payroll Calendar", "day": 1, "lag_days": 0},
+    "Contractors": {"timing": "Day of Month", "day": 28, "lag_days": 0},
+}
+DEFAULT_OUTFLOW_SCHEDULE = {"timing": "Day of Month", "day": 1, "lag_days": 0}
+
+# Display names for the inflow rows
+INFLOW_LABELS = {"revenue": "Revenue", "other_cash_receipts": "Other Cash Receipts", "investment": "Investment"}
+
+PAY_WEEKDAY = 4  # Friday (Monday = 0)
+
+
+def first_pay_date(months: List[str]) -> np.datetime64:
+    """First Friday on or after the start of the horizon, the default biweekly payroll anchor"""
+    start = month_starts(tuple(months))[0]
+    # 1970-01-01 was a Thursday, so day number + 3 gives a Monday = 0 weekday
+    weekday = (start.astype(int) + 3) % 7
+    return start + (PAY_WEEKDAY - weekday) % 7
+
+
+def payroll_dates(months: List[str], pay_periods: Dict[str, Any], anchor: np.datetime64 = None):
+    """Pay dates and the month each belongs to.
+
+    Biweekly Fridays from the anchor are used for every month where their count
+    matches the month's pay_periods; other months get that many evenly spaced
+    dates so the Headcount page's pay period counts are always honoured.
+    """
+    starts = month_starts(tuple(months))
+    ends = np.append(starts[1:], (starts[-1].astype("datetime64[M]") + 1).astype("datetime64[D]"))
+    anchor = first_pay_date(months) if anchor is None else np.datetime64(anchor, "D")
+    calendar = np.arange(anchor, ends[-1], np.timedelta64(14, "D"))
+    calendar_month = np.searchsorted(starts, calendar, side="right") - 1
+    periods = pay_period_vector(pay_periods, months).astype(int)
+
+    dates, owners = [], []
+    for month in range(len(months)):
+        scheduled = calendar[calendar_month == month]
+        count = max(periods[month], 1)
+        if len(scheduled) != count:
+            length = (ends[month] - starts[month]).astype(int)
+            scheduled = starts[month] + (np.arange(1, count + 1) * length // count - 1)
+        dates.append(scheduled)
+        owners.append(np.full(len(scheduled), month))
+    return np.concatenate(dates), np.concatenate(owners)
+
+
+@memoize_by_content(maxsize=8)
+def build_cash_ledger(liquidity_data: Dict[str, Any], pay_periods: Dict[str, Any], months: List[str], schedules: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Dated cash movements for the horizon in columnar form.
+
+    Returns parallel ``day`` (offset from the horizon start), ``row`` (index into
+    ``rows``) and ``amount`` arrays, one entry per scheduled payment or receipt,
+    plus the day grid needed to roll them up and the rows x months ``planned``
+    amounts they were scheduled from. Movements pushed past the end of the
+    horizon by a collection lag are dropped.
+    """
+    schedules = schedules or {}
+    starts = month_starts(tuple(months))
+    horizon_start = starts[0]
+    day_count = int(((starts[-1].astype("datetime64[M]") + 1).astype("datetime64[D]") - horizon_start).astype(int))
+    month_offsets = (starts - horizon_start).astype(int)
+    days_in_month = np.diff(np.append(month_offsets, day_count))
+
+    expenses = liquidity_data.get("expenses", {})
+    rows = [INFLOW_LABELS[key] for key in INFLOW_KEYS] + list(liquidity_data.get("category_order", []))
+    sources = [liquidity_data.get(key, {}) for key in INFLOW_KEYS] + [expenses.get(cat, {}) for cat in rows[len(INFLOW_KEYS):]]
+    keys = list(INFLOW_KEYS) + rows[len(INFLOW_KEYS):]
+
+    day_columns, row_columns, amount_columns, planned = [], [], [], []
+    for row, (key, series) in enumerate(zip(keys, sources)):
+        series = series if isinstance(series, dict) else {}
+        monthly = np.array([float(series.get(month, 0) or 0) for month in months])
+        planned.append(monthly)
+        schedule = {**DEFAULT_PAYMENT_SCHEDULES.get(key, DEFAULT_OUTFLOW_SCHEDULE), **schedules.get(key, {})}
+        lag = int(schedule.get("lag_days", 0) or 0)
+
+        if schedule["timing"] == "Payroll Calendar":
+            anchor = schedule.get("first_pay_date")
+            dates, owners = payroll_dates(months, pay_periods, np.datetime64(anchor, "D") if anchor else None)
+            counts = np.bincount(owners, minlength=len(months))
+            days = (dates - horizon_start).astype(int)
+            amounts = monthly[owners] / counts[owners]
+        elif schedule["timing"] == "Spread Daily":
+            days = np.arange(day_count)
+            amounts = np.repeat(monthly / days_in_month, days_in_month)
+        else:
+            day_of_month = np.minimum(max(int(schedule.get("day", 1) or 1), 1), days_in_month)
+            days = month_offsets + day_of_month - 1
+            amounts = monthly
+
+        days = days + lag
+        keep = (days < day_count) & (amounts != 0)
+        day_columns.append(days[keep])
+        row_columns.append(np.full(int(keep.sum()), row))
+        amount_columns.append(amounts[keep])
+
+    ledger = {
+        "months": list(months),
+        "rows": rows,
+        "row_sign": np.array([1.0] * len(INFLOW_KEYS) + [-1.0] * (len(rows) - len(INFLOW_KEYS))),
+        "start_date": horizon_start,
+        "day_count": day_count,
+        "month_offsets": month_offsets,
+        "starting_balance": float(liquidity_data.get("starting_balance", 0) or 0),
+        "planned": np.array(planned).reshape(len(rows), len(months)),
+        "day": np.concatenate(day_columns).astype(np.int32) if day_columns else np.zeros(0, dtype=np.int32),
+        "row": np.concatenate(row_columns).astype(np.int16) if row_columns else np.zeros(0, dtype=np.int16),
+        "amount": np.concatenate(amount_columns) if amount_columns else np.zeros(0),
+    }
+    for value in ledger.values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+    return ledger
+
+
+def daily_matrix(ledger: Dict[str, Any]) -> np.ndarray:
+    """Days x rows amounts (unsigned) scattered from the columnar ledger"""
+    row_count = len(ledger["rows"])
+    flat = ledger["day"].astype(np.int64) * row_count + ledger["row"]
+    return np.bincount(flat, weights=ledger["amount"], minlength=ledger["day_count"] * row_count).reshape(ledger["day_count"], row_count)
+
+
+def daily_balance(ledger: Dict[str, Any]) -> np.ndarray:
+    """Closing cash balance for every day of the horizon"""
+    return ledger["starting_balance"] + np.cumsum(daily_matrix(ledger) @ ledger["row_sign"])
+
+
+def monthly_rollup(ledger: Dict[str, Any]) -> np.ndarray:
+    """Rows x months totals by payment date, the shape of the existing monthly liquidity views.
+
+    They differ from ``ledger["planned"]`` only where a lag moves an amount into
+    a later month or past the horizon.
+    """
+    return np.add.reduceat(daily_matrix(ledger), ledger["month_offsets"], axis=0).T
+
+
+def weekly_view(ledger: Dict[str, Any], start: date, weeks: int = 13) -> Dict[str, Any]:
+    """Rows x weeks totals and closing balances for the weeks starting on the Monday on or before start"""
+    start_day = np.datetime64(start, "D")
+    start_day = start_day - (start_day.astype(int) + 3) % 7
+    first = int((start_day - ledger["start_date"]).astype(int))
+    week_index = (ledger["day"].astype(np.int64) - first) // 7
+    in_view = (week_index >= 0) & (week_index < weeks)
+
+    row_count = len(ledger["rows"])
+    totals = np.bincount(
+        week_index[in_view] * row_count + ledger["row"][in_view],
+        weights=ledger["amount"][in_view],
+        minlength=weeks * row_count,
+    ).reshape(weeks, row_count)
+
+    balance = daily_balance(ledger)
+    week_ends = np.clip(first + 7 * np.arange(1, weeks + 1) - 1, 0, ledger["day_count"] - 1)
+    opening = balance[first - 1] if 0 < first <= ledger["day_count"] else ledger["starting_balance"]
+    return {
+        "week_starts": start_day + 7 * np.arange(weeks),
+        "rows": ledger["rows"],
+        "totals": totals.T,
+        "net": totals @ ledger["row_sign"],
+        "opening_balance": float(opening),
+        "closing_balance": balance[week_ends],
+    }
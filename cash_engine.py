@@ -0,0 +1,144 @@
+import numpy as np
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
+
+from money import cents, cents_row, from_cents
+from planning_horizon import beyond_horizon_label
+from registry import EXPENSES, canonical_name, intern, register
+
+# Liquidity inflow rows that feed the cash balance alongside the expense categories
+INFLOW_KEYS = ["revenue", "other_cash_receipts", "investment"]
+
+# Default cash disbursement / SG&A categories, in the Liquidity page's default order
+DEFAULT_EXPENSE_CATEGORIES = [
+    "Payroll", "Contractors", "License Fees", "Travel", "Shows", "Associations", "Marketing",
+    "Company Vehicle", "Grant Writer", "Insurance", "Legal Professional Fees", "Permitting Fees Licensing",
+    "Shared Services", "Consultants Audit Tax", "Pritchard Amex", "Contingencies",
+]
+
+# Registered first, so these spellings are the display names whatever order rows arrive in
+register(EXPENSES, DEFAULT_EXPENSE_CATEGORIES)
+
+
+def _liquidity_key(liquidity_data: Dict[str, Any], months: List[str], categories: List[str] = None) -> Tuple:
+    """Hashable snapshot, in integer cents, of every liquidity value the cash balance depends on"""
+    expenses = liquidity_data.get("expenses", {})
+    categories = liquidity_data.get("category_order", []) if categories is None else categories
+    inflow_rows = tuple(tuple(cents_row(liquidity_data.get(key, {}), months).tolist()) for key in INFLOW_KEYS)
+    expense_rows = tuple(
+        tuple(cents_row(expenses.get(category, {}), months).tolist())
+        for category in categories
+    )
+    return (
+        tuple(months),
+        cents(liquidity_data.get("starting_balance", 0)),
+        inflow_rows,
+        expense_rows,
+    )
+
+
+def sga_from_liquidity(liquidity_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """SG&A expenses ({category: {month: value}} copies) from the cash disbursements, named and ordered by category_order.
+
+    Categories are joined by registry id, so order entries and expense rows
+    that differ only in spacing, case or a legacy spelling still match.
+    """
+    expenses_by_id = {intern(EXPENSES, category): series for category, series in (liquidity_data.get("expenses", {}) or {}).items()}
+    sga, seen = {}, set()
+    for category in liquidity_data.get("category_order", []):
+        category_id = intern(EXPENSES, category)
+        if category_id in expenses_by_id and category_id not in seen:
+            seen.add(category_id)
+            sga[canonical_name(category)] = dict(expenses_by_id[category_id])
+    return sga
+
+
+@lru_cache(maxsize=16)
+def _build_cash_flow_series(key: Tuple) -> Dict[str, Any]:
+    months, starting_cents, inflow_rows, expense_rows = key
+    month_count = len(months)
+
+    # Aggregate in int64 cents so totals and balances are exact
+    inflows = np.array(inflow_rows, dtype=np.int64).reshape(len(inflow_rows), month_count).sum(axis=0)
+    gross_burn = np.array(expense_rows, dtype=np.int64).reshape(len(expense_rows), month_count).sum(axis=0)
+    net_flow = inflows - gross_burn
+    # Prefix sum of net flow gives the closing balance of every month
+    balance = starting_cents + np.cumsum(net_flow)
+
+    series = {
+        "months": list(months),
+        "index": {month: i for i, month in enumerate(months)},
+        "starting_balance": float(from_cents(starting_cents)),
+        "inflows": from_cents(inflows),
+        "gross_burn": from_cents(gross_burn),
+        "net_flow": from_cents(net_flow),
+        # Positive burn means the month consumed cash
+        "burn": from_cents(-net_flow),
+        "balance": from_cents(balance),
+    }
+    for value in series.values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+    return series
+
+
+def get_cash_flow_series(liquidity_data: Dict[str, Any], months: List[str], categories: List[str] = None) -> Dict[str, Any]:
+    """Monthly inflows, burn and cumulative cash balance, cached per liquidity content.
+
+    Expenses are summed over ``categories`` (the category_order list by default).
+    """
+    return _build_cash_flow_series(_liquidity_key(liquidity_data, months, categories))
+
+
+def cash_balance_at(series: Dict[str, Any], month: str) -> float:
+    """Closing balance for a month; unknown months return the end-of-horizon balance"""
+    if not series["months"]:
+        return series["starting_balance"]
+    position = series["index"].get(month, len(series["months"]) - 1)
+    return float(series["balance"][position])
+
+
+def burn_at(series: Dict[str, Any], month: str) -> float:
+    """Net burn (expenses less inflows) for a month, zero outside the horizon"""
+    position = series["index"].get(month)
+    return float(series["burn"][position]) if position is not None else 0.0
+
+
+def gross_burn_at(series: Dict[str, Any], month: str) -> float:
+    """Total cash disbursements for a month, zero outside the horizon"""
+    position = series["index"].get(month)
+    return float(series["gross_burn"][position]) if position is not None else 0.0
+
+
+def find_runway_months(balance: np.ndarray, burn: np.ndarray, months: List[str], profitable_months: int = 3, lookback: int = 12) -> List[str]:
+    """Runway label for each row of stacked (scenarios x months) balance and burn arrays.
+
+    A row's label is the first month whose closing balance is at or below zero.
+    When cash never runs out, it is "Profitable" if at least ``profitable_months``
+    of the last ``lookback`` months generated cash, otherwise "Beyond <final year>".
+    """
+    balance = np.atleast_2d(balance)
+    burn = np.atleast_2d(burn)
+    beyond = beyond_horizon_label(months)
+    if balance.shape[1] == 0:
+        return [beyond] * balance.shape[0]
+
+    depleted = balance <= 0
+    first_depleted = depleted.argmax(axis=1)
+    ever_depleted = depleted.any(axis=1)
+    profitable = np.count_nonzero(burn[:, -lookback:] <= 0, axis=1) >= profitable_months
+
+    labels = []
+    for row in range(balance.shape[0]):
+        if ever_depleted[row]:
+            labels.append(months[first_depleted[row]])
+        elif profitable[row]:
+            labels.append("Profitable")
+        else:
+            labels.append(beyond)
+    return labels
+
+
+def find_runway_month(series: Dict[str, Any], profitable_months: int = 3, lookback: int = 12) -> str:
+    """Runway label for a single cash-flow series (see find_runway_months)"""
+    return find_runway_months(series["balance"], series["burn"], series["months"], profitable_months, lookback)[0]
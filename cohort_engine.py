@@ -0,0 +1,124 @@
+import numpy as np
+from typing import Dict, Any, List
+
+from model_cache import memoize_by_content
+from segment_store import sparse_from_nested, to_dense
+
+# Segments processed per block; keeps the (segments x cohorts x months) survival array small
+SEGMENTS_PER_BLOCK = 128
+
+# Trailing window (months) for net revenue and logo retention
+RETENTION_WINDOW = 12
+
+
+def survival_curves(retention: np.ndarray) -> np.ndarray:
+    """Segments x cohorts x months share of a cohort still active in each month.
+
+    ``retention`` is segments x months (1 - churn rate). Customers acquired in a
+    month do not churn that month, so cohort c keeps the product of retention
+    over months c+1..m; months before acquisition are zero.
+    """
+    month_count = retention.shape[-1]
+    later = np.triu(np.ones((month_count, month_count), dtype=bool), k=1)
+    factors = np.where(later, retention[:, None, :], 1.0)
+    curves = np.cumprod(factors, axis=-1)
+    curves[:, ~np.triu(np.ones((month_count, month_count), dtype=bool))] = 0.0
+    return curves
+
+
+@memoize_by_content(maxsize=8)
+def build_cohort_model(new_customers: Dict[str, Any], churn_rates: Dict[str, Any], pricing: Dict[str, Any], months: List[str], segments: List[str] = None) -> Dict[str, Any]:
+    """Cohort x month surviving customers and subscription revenue, per segment and summed.
+
+    Cohorts are acquisition months. Segments default to every segment with new
+    customers; they are evaluated in blocks so the intermediate arrays stay
+    bounded for large segment counts. ``by_segment`` is the segments x cohorts x
+    months surviving customers; ``customers`` and ``revenue`` are summed over
+    segments. Summing a column over cohorts reproduces the running subscriber
+    totals.
+    """
+    segments = list(new_customers or {}) if segments is None else list(segments)
+    month_count = len(months)
+    by_segment = np.zeros((len(segments), month_count, month_count))
+    revenue = np.zeros((month_count, month_count))
+
+    for start in range(0, len(segments), SEGMENTS_PER_BLOCK):
+        block = segments[start:start + SEGMENTS_PER_BLOCK]
+        acquired = to_dense(sparse_from_nested(new_customers, months, block))
+        retention = 1 - to_dense(sparse_from_nested(churn_rates, months, block)) / 100.0
+        price = to_dense(sparse_from_nested(pricing, months, block))
+
+        survivors = acquired[:, :, None] * survival_curves(retention)
+        by_segment[start:start + len(block)] = survivors
+        revenue += np.einsum("scm,sm->cm", survivors, price)
+
+    customers = by_segment.sum(axis=0)
+    model = {
+        "months": list(months),
+        "segments": segments,
+        "acquired": customers.diagonal().copy(),
+        "customers": customers,
+        "revenue": revenue,
+        "by_segment": by_segment,
+    }
+    for value in model.values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+    return model
+
+
+def by_age(matrix: np.ndarray) -> np.ndarray:
+    """Re-index a cohort x month matrix to cohort x months-since-acquisition (NaN past the horizon)"""
+    month_count = matrix.shape[1]
+    month = np.arange(month_count)[None, :] + np.arange(matrix.shape[0])[:, None]
+    return np.where(month < month_count, matrix[np.arange(matrix.shape[0])[:, None], np.minimum(month, month_count - 1)], np.nan)
+
+
+def logo_retention_curves(model: Dict[str, Any]) -> np.ndarray:
+    """Cohort x age share of each cohort's customers still active (NaN for empty cohorts)"""
+    acquired = model["acquired"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(acquired[:, None] > 0, by_age(model["customers"]) / acquired[:, None], np.nan)
+
+
+def trailing_retention(matrix: np.ndarray, window: int = RETENTION_WINDOW) -> np.ndarray:
+    """Per-month retention of the cohorts already active ``window`` months earlier.
+
+    Month m compares cohorts acquired up to m - window at m with the same cohorts
+    at m - window; months without such cohorts (or with nothing to compare) are NaN.
+    """
+    month_count = matrix.shape[1]
+    result = np.full(month_count, np.nan)
+    if month_count <= window:
+        return result
+    # Column prefix sums over cohorts give "cohorts acquired up to k" totals
+    prefix = np.cumsum(matrix, axis=0)
+    month = np.arange(window, month_count)
+    earlier = prefix[month - window, month - window]
+    current = prefix[month - window, month]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result[window:] = np.where(earlier > 0, current / earlier, np.nan)
+    return result
+
+
+def cohort_metrics(model: Dict[str, Any], window: int = RETENTION_WINDOW) -> Dict[str, np.ndarray]:
+    """Monthly net revenue retention and logo retention over the trailing window"""
+    return {
+        "nrr": trailing_retention(model["revenue"], window),
+        "logo_retention": trailing_retention(model["customers"], window),
+    }
+
+
+def segment_logo_retention(model: Dict[str, Any], window: int = RETENTION_WINDOW) -> np.ndarray:
+    """Segments x months trailing logo retention, from each segment's own cohort matrix"""
+    return np.array([trailing_retention(matrix, window) for matrix in model["by_segment"]]).reshape(len(model["segments"]), len(model["months"]))
+
+
+def yearly_cohort_table(matrix: np.ndarray, months: List[str]) -> Dict[str, Dict[str, float]]:
+    """{cohort year: {calendar year: total}} from a cohort x month matrix"""
+    years = [month.split(" ")[1] for month in months]
+    order = list(dict.fromkeys(years))
+    # months x years indicator, so totals = indicator' @ matrix @ indicator
+    indicator = (np.array(years)[:, None] == np.array(order)[None, :]).astype(float)
+    totals = indicator.T @ matrix @ indicator
+    return {order[c]: {order[y]: float(totals[c, y]) for y in range(len(order))} for c in range(len(order))}
@@ -0,0 +1,165 @@
+import numpy as np
+from typing import Dict, Any, List
+
+from cash_engine import INFLOW_KEYS
+from money import cents, cents_row, from_cents
+
+REVENUE_STREAMS = ["Subscription", "Transactional", "Implementation", "Maintenance"]
+
+# Model sections an entity publishes for consolidation
+SNAPSHOT_KEYS = ["revenue", "cogs", "sga_expenses", "liquidity_data"]
+
+# Statement sections summed across entities ({line: months array} each)
+SECTIONS = ["revenue", "cogs", "sga", "cash_inflows", "cash_outflows"]
+
+
+def entity_snapshot(model_data: Dict[str, Any]) -> Dict[str, Any]:
+    """The parts of a model that consolidation reads"""
+    return {key: model_data.get(key, {}) for key in SNAPSHOT_KEYS}
+
+
+def _series(source: Dict[str, Any], key: str, months: List[str]) -> np.ndarray:
+    """int64 cents months array for one line of a {line: {month: dollars}} dict"""
+    return cents_row(source.get(key, {}) if isinstance(source, dict) else {}, months)
+
+
+def entity_statements(snapshot: Dict[str, Any], months: List[str]) -> Dict[str, Any]:
+    """One entity's income statement and cash lines as int64 cents months arrays"""
+    liquidity = snapshot.get("liquidity_data", {}) or {}
+    sga_expenses = snapshot.get("sga_expenses", {}) or {}
+    expenses = liquidity.get("expenses", {}) or {}
+    sga_categories = liquidity.get("category_order") or list(sga_expenses.keys())
+    outflow_categories = liquidity.get("category_order") or list(expenses.keys())
+    return {
+        "revenue": {stream: _series(snapshot.get("revenue", {}), stream, months) for stream in REVENUE_STREAMS},
+        "cogs": {stream: _series(snapshot.get("cogs", {}), stream, months) for stream in REVENUE_STREAMS},
+        "sga": {category: _series(sga_expenses, category, months) for category in sga_categories},
+        "cash_inflows": {key: _series(liquidity, key, months) for key in INFLOW_KEYS},
+        "cash_outflows": {category: _series(expenses, category, months) for category in outflow_categories},
+        "starting_balance": cents(liquidity.get("starting_balance", 0)),
+    }
+
+
+def _sum_section(statements: List[Dict[str, Any]], section: str, month_count: int) -> Dict[str, np.ndarray]:
+    """Add one section across entities, keeping lines in first-seen order"""
+    total = {}
+    for statement in statements:
+        for line, values in statement[section].items():
+            total[line] = total.get(line, np.zeros(month_count, dtype=np.int64)) + values
+    return total
+
+
+def _elimination_amounts(rule: Dict[str, Any], by_entity: Dict[str, Any], remaining: Dict[str, Any], consolidated: Dict[str, Any], month_count: int) -> Dict[str, np.ndarray]:
+    """Monthly intercompany amounts a rule removes from the income statement and from cash.
+
+    The seller's share of a revenue stream is matched against the buyer's
+    expense line. Rules apply in order, so the amount is capped at what
+    earlier rules left of the seller's stream, the buyer's line and the
+    consolidated lines, and no line is eliminated below zero.
+    """
+    seller = by_entity.get(rule.get("seller"))
+    buyer = by_entity.get(rule.get("buyer"))
+    zeros = np.zeros(month_count, dtype=np.int64)
+    if seller is None or buyer is None or rule.get("seller") == rule.get("buyer"):
+        return {"income_statement": zeros, "cash": zeros}
+
+    share = float(rule.get("share_pct", 100.0) or 0) / 100.0
+    stream = rule.get("revenue_stream", "Subscription")
+    category = rule.get("expense_category", "")
+    left_seller, left_buyer = remaining[rule["seller"]], remaining[rule["buyer"]]
+    # The seller's share is rounded to whole cents so eliminations stay exact
+    income_statement = np.minimum.reduce([
+        np.rint(share * seller["revenue"].get(stream, zeros)).astype(np.int64),
+        left_seller["revenue"].get(stream, zeros),
+        left_buyer["sga"].get(category, zeros),
+        consolidated["revenue"].get(stream, zeros),
+        consolidated["sga"].get(category, zeros),
+    ])
+    cash = np.minimum.reduce([
+        np.rint(share * seller["cash_inflows"]["revenue"]).astype(np.int64),
+        left_seller["cash_inflows"]["revenue"],
+        left_buyer["cash_outflows"].get(category, zeros),
+        consolidated["cash_inflows"]["revenue"],
+        consolidated["cash_outflows"].get(category, zeros),
+    ])
+    return {"income_statement": np.maximum(income_statement, 0), "cash": np.maximum(cash, 0)}
+
+
+def _to_dollars(statement: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a statement with every cents array (and the starting balance) in dollars"""
+    converted = {}
+    for key, value in statement.items():
+        if isinstance(value, dict):
+            converted[key] = _to_dollars(value)
+        elif isinstance(value, np.ndarray):
+            converted[key] = from_cents(value)
+        elif key == "starting_balance":
+            converted[key] = float(from_cents(value))
+        else:
+            converted[key] = value
+    return converted
+
+
+def consolidate(entity_snapshots: Dict[str, Dict[str, Any]], months: List[str], eliminations: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Consolidated income statement and liquidity for several entities.
+
+    Consolidation runs in-process: entities publish finished statements, so
+    each one is only converted to cents arrays (a few thousand line-months,
+    far less than starting a worker costs) and the arrays are summed line by
+    line. Intercompany elimination rules
+    remove the matched revenue/expense (and the related cash receipt/payment)
+    from the totals. Lines are added in integer cents, so totals are exact;
+    amounts are returned in dollars.
+    """
+    names = list(entity_snapshots.keys())
+    statements = [entity_statements(entity_snapshots[name], months) for name in names]
+    by_entity = dict(zip(names, statements))
+    month_count = len(months)
+
+    consolidated = {section: _sum_section(statements, section, month_count) for section in SECTIONS}
+    consolidated["starting_balance"] = sum(statement["starting_balance"] for statement in statements)
+
+    # What earlier rules left of each entity's lines (only the sections rules touch)
+    remaining = {name: {section: dict(statement[section]) for section in SECTIONS} for name, statement in by_entity.items()}
+    applied = []
+    for rule in eliminations or []:
+        amounts = _elimination_amounts(rule, by_entity, remaining, consolidated, month_count)
+        stream = rule.get("revenue_stream", "Subscription")
+        category = rule.get("expense_category", "")
+        if amounts["income_statement"].any():
+            for section, line, owner in (("revenue", stream, rule["seller"]), ("sga", category, rule["buyer"])):
+                consolidated[section][line] = consolidated[section][line] - amounts["income_statement"]
+                remaining[owner][section][line] = remaining[owner][section][line] - amounts["income_statement"]
+        if amounts["cash"].any():
+            for section, line, owner in (("cash_inflows", "revenue", rule["seller"]), ("cash_outflows", category, rule["buyer"])):
+                consolidated[section][line] = consolidated[section][line] - amounts["cash"]
+                remaining[owner][section][line] = remaining[owner][section][line] - amounts["cash"]
+        applied.append({**rule, **amounts})
+
+    def totals(statement):
+        zeros = np.zeros(month_count, dtype=np.int64)
+        revenue = sum(statement["revenue"].values(), zeros)
+        cogs = sum(statement["cogs"].values(), zeros)
+        sga = sum(statement["sga"].values(), zeros)
+        net_flow = sum(statement["cash_inflows"].values(), zeros) - sum(statement["cash_outflows"].values(), zeros)
+        return {
+            "total_revenue": revenue,
+            "gross_profit": revenue - cogs,
+            "total_sga": sga,
+            # Same definition as the Income Statement page
+            "net_income": revenue - sga,
+            "net_cash_flow": net_flow,
+            "balance": statement["starting_balance"] + np.cumsum(net_flow),
+        }
+
+    consolidated.update(totals(consolidated))
+    for statement in statements:
+        statement.update(totals(statement))
+
+    return {
+        "months": list(months),
+        "entities": names,
+        "by_entity": {name: _to_dollars(statement) for name, statement in by_entity.items()},
+        "consolidated": _to_dollars(consolidated),
+        "eliminations": [_to_dollars(rule) for rule in applied],
+    }
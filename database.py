@@ -5,6 +5,11 @@ from typing import Dict, Any, List
 import json
 import time
 from datetime import datetime
+from payroll_engine import calculate_employee_cost_matrices, active_cells
+from planning_horizon import DEFAULT_PLANNING_HORIZON, normalize_horizon, horizon_months, horizon_date_range
+from segment_store import DEFAULT_SEGMENTS, TRANSACTIONAL_CATEGORIES, TRANSACTIONAL_PREFIX, SEGMENT_DATA_KEYS, TRANSACTIONAL_DATA_KEYS, transactional_category
+from money import round_to_cents
+from registry import SEGMENTS, canonical_name, intern, name_of
 
 # Helper functions for logging that work both in and out of Streamlit context
 def log_error(message: str):
@@ -166,6 +171,10 @@ def clear_data_caches():
         load_data_from_source.clear()
     except Exception:
         pass
+    try:
+        load_planning_horizon_from_database.clear()
+    except Exception:
+        pass
 
 @st.cache_resource
 def get_supabase_client() -> Client:
@@ -227,24 +236,21 @@ def clear_all_data_cache():
         st.error(f"❌ Error clearing data cache: {str(e)}")
         return False
 
+def select_all_rows(build_query, page_size: int = 10000) -> List[Dict[str, Any]]:
+    """All rows of a query, fetched page by page (build_query returns a fresh filtered query)"""
+    rows = []
+    while True:
+        page = build_query().range(len(rows), len(rows) + page_size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+
 # ===== COMPREHENSIVE SAVE FUNCTIONS MAPPED TO EXISTING TABLES =====
 
 def ensure_business_segments_exist(supabase) -> Dict[str, int]:
     """Ensure all required business segments exist in the database"""
-    # List of all required stakeholders/segments
-    required_segments = [
-        "Dealership", "End User", "Equipment Manufacturer", "Upfitter",
-        "Depot", "Fleet Management Company", "Logistics", "OEM",
-        "Traditional Finance Provider", "Channel Partner", "Charging OEM", "Insurance Provider",
-        "Maintenance Provider", "Charging as a Service", "EPC", "Government Agency",
-        "Grant Administrator", "Operating and Maintenance Provider", "Remarketing Specialists", "Technology Solutions",
-        "Utility Provider"
-    ]
-    
-    # Also add transactional segments
-    transactional_categories = ["Charging", "Vehicle", "Financing", "Other Revenue"]
-    for category in transactional_categories:
-        required_segments.append(f"Transactional-{category}")
+    # Default stakeholders/segments plus one segment per transactional category
+    required_segments = DEFAULT_SEGMENTS + [f"{TRANSACTIONAL_PREFIX}{category}" for category in TRANSACTIONAL_CATEGORIES]
     
     # Get existing segments
     segments_response = supabase.table('business_segments').select('id, segment_name').limit(10000).execute()
@@ -280,11 +286,17 @@ def save_revenue_assumptions_to_database(data: Dict[str, Any]) -> bool:
         # Ensure all business segments exist and get mapping
         segment_mapping = ensure_business_segments_exist(supabase)
         
+        # business_segments rows by registry id; when a legacy row and its current segment
+        # both exist, the current segment's row is used
+        segment_rows = {}
+        for segment_name, segment_id in segment_mapping.items():
+            registry_id = intern(SEGMENTS, segment_name)
+            if registry_id not in segment_rows or canonical_name(segment_name) == name_of(SEGMENTS, registry_id):
+                segment_rows[registry_id] = segment_id
+        
         def get_segment_id(stakeholder_name):
             """Get segment ID from mapping. Returns None if not found."""
-            if stakeholder_name in segment_mapping:
-                return segment_mapping[stakeholder_name]
-            return None
+            return segment_rows.get(intern(SEGMENTS, stakeholder_name))
         
         # Don't delete existing data - use upsert instead to preserve existing records
         
@@ -753,102 +765,49 @@ def save_calculated_payroll_costs_to_database(data: Dict[str, Any]) -> bool:
         
         payroll_data = data["payroll_data"]
         
-        # Generate months from 2025-2030 (matching payroll_model.py)
-        months = []
-        for year in range(2025, 2031):
-            for month in range(1, 13):
-                from datetime import date
-                months.append(f"{date(year, month, 1).strftime('%b %Y')}")
-        
-        # Helper function to check if employee is active for a month (matches payroll_model.py logic)
-        def is_employee_active_for_month(emp_data, month_str):
-            try:
-                month_date = datetime.strptime(month_str, "%b %Y")
-                
-                hire_date_str = emp_data.get("hire_date")
-                if hire_date_str:
-                    hire_date = datetime.strptime(hire_date_str, "%Y-%m-%d")
-                    if month_date < hire_date:
-                        return False
-                
-                termination_date_str = emp_data.get("termination_date")
-                if termination_date_str:
-                    termination_date = datetime.strptime(termination_date_str, "%Y-%m-%d")
-                    if month_date >= termination_date:
-                        return False
-                
-                return True
-            except (ValueError, TypeError):
-                return emp_data.get("active", True)
+        # Months of the planning horizon (matching payroll_model.py)
+        months = get_planning_months()
         
-        # Calculate monthly payroll costs (matches payroll_model.py logic)
-        employees = payroll_data.get("employees", {})
-        pay_periods = payroll_data.get("pay_periods", {})
         payroll_config = payroll_data.get("payroll_config", {})
-        employee_bonuses = payroll_data.get("employee_bonuses", {})
         
         # Get payroll tax rate
         payroll_tax_rate = payroll_config.get("payroll_tax_percentage", 10.0) / 100.0  # Changed from 23.0 to 10.0
         
+        # Employee x month base pay (zero when inactive) and bonuses indexed by (employee, month)
+        roster, base_pay_matrix, bonus_pay_matrix = calculate_employee_cost_matrices(payroll_data, months)
+        year_months = [datetime.strptime(month, "%b %Y").strftime("%Y-%m-%d") for month in months]
+        
+        # Only active employees with pay or a bonus produce a record
+        record_mask = roster["active"] & ((base_pay_matrix > 0) | (bonus_pay_matrix > 0))
+        base_values = base_pay_matrix.tolist()
+        bonus_values = bonus_pay_matrix.tolist()
+        
         # Prepare payroll cost records
         payroll_records = []
         
-        for month in months:
-            try:
-                year_month = datetime.strptime(month, "%b %Y").strftime("%Y-%m-%d")
-                
-                # Calculate costs for each individual employee
-                employee_records_for_month = []
-                
-                for emp_id, emp_data in employees.items():
-                    if not is_employee_active_for_month(emp_data, month):
-                        continue
-                    
-                    department = emp_data.get("department", "Opex")
-                    pay_type = emp_data.get("pay_type", "Salary")
-                    
-                    # Calculate base pay
-                    if pay_type == "Salary":
-                        annual_salary = emp_data.get("annual_salary", 0)
-                        pay_periods_count = pay_periods.get(month, 2)
-                        base_pay = (annual_salary / 26) * pay_periods_count
-                    else:  # Hourly
-                        hourly_rate = emp_data.get("hourly_rate", 0)
-                        weekly_hours = emp_data.get("weekly_hours", 40.0)
-                        monthly_hours = weekly_hours * 4.33  # Average weeks per month
-                        base_pay = hourly_rate * monthly_hours
-                    
-                    # Find bonuses for this employee in this month
-                    employee_name = emp_data.get("name", "")
-                    bonus_pay = 0
-                    for bonus_data in employee_bonuses.values():
-                        if (bonus_data.get("employee_name", "") == employee_name and 
-                            bonus_data.get("month", "") == month):
-                            bonus_pay += bonus_data.get("bonus_amount", 0)
-                    
-                    # Calculate taxes and benefits (applied to base + bonus)
-                    taxable_amount = base_pay + bonus_pay
-                    payroll_taxes = taxable_amount * payroll_tax_rate
-                    
-                    # For benefits_cost, we'll use half of payroll_taxes as an estimate
-                    # (you can adjust this logic based on your needs)
-                    benefits_cost = payroll_taxes * 0.5
-                    payroll_taxes = payroll_taxes * 0.5  # Remaining half for actual taxes
-                    
-                    if base_pay > 0 or bonus_pay > 0:
-                        payroll_records.append({
-                            'year_month': year_month,
-                            'employee_id': emp_id,
-                            'department': department,
-                            'base_pay': round(base_pay, 2),
-                            'overtime_pay': 0.0,  # No overtime in current model
-                            'bonus_pay': round(bonus_pay, 2),
-                            'payroll_taxes': round(payroll_taxes, 2),
-                            'benefits_cost': round(benefits_cost, 2)
-                        })
-                        
-            except Exception as e:
-                continue
+        for month_idx, emp_idx in active_cells(record_mask):
+            base_pay = base_values[emp_idx][month_idx]
+            bonus_pay = bonus_values[emp_idx][month_idx]
+            
+            # Calculate taxes and benefits (applied to base + bonus)
+            taxable_amount = base_pay + bonus_pay
+            payroll_taxes = taxable_amount * payroll_tax_rate
+            
+            # For benefits_cost, we'll use half of payroll_taxes as an estimate
+            # (you can adjust this logic based on your needs)
+            benefits_cost = payroll_taxes * 0.5
+            payroll_taxes = payroll_taxes * 0.5  # Remaining half for actual taxes
+            
+            payroll_records.append({
+                'year_month': year_months[month_idx],
+                'employee_id': roster["employee_ids"][emp_idx],
+                'department': roster["department_names"][roster["department_index"][emp_idx]],
+                'base_pay': round_to_cents(base_pay),
+                'overtime_pay': 0.0,  # No overtime in current model
+                'bonus_pay': round_to_cents(bonus_pay),
+                'payroll_taxes': round_to_cents(payroll_taxes),
+                'benefits_cost': round_to_cents(benefits_cost)
+            })
         
         if payroll_records:
             # Batch insert payroll records using upsert
@@ -871,11 +830,8 @@ def save_hosting_costs_to_database(data: Dict[str, Any]) -> bool:
         hosting_records = []
         cost_structure = data["hosting_costs_data"]["cost_structure"]
         
-        # Generate months from 2025-2030 for full coverage
-        months = []
-        for year in range(2025, 2031):
-            for month in range(1, 13):
-                months.append(f"{year}-{month:02d}-01")
+        # Months of the planning horizon for full coverage
+        months = [datetime.strptime(month, "%b %Y").strftime("%Y-%m-%d") for month in get_planning_months()]
         
         # Process each category and service
         for category, services in cost_structure.items():
@@ -1083,9 +1039,10 @@ def save_revenue_and_cogs_to_database(data: Dict[str, Any]) -> bool:
         
         # Get revenue categories
         categories_response = supabase.table('revenue_categories').select('id, category_name').limit(10000).execute()
-        category_mapping = {row['id']: row['category_name'] for row in categories_response.data}
+        category_mapping = {canonical_name(row['category_name']): row['id'] for row in categories_response.data}
         
         def get_or_create_revenue_category(category_name):
+            category_name = canonical_name(category_name)
             if category_name in category_mapping:
                 return category_mapping[category_name]
             
@@ -1166,56 +1123,37 @@ def load_revenue_assumptions_from_database() -> Dict[str, Any]:
         # Get business segments mapping
         segments_response = supabase.table('business_segments').select('id, segment_name').limit(10000).execute()
         segment_mapping = {row['id']: row['segment_name'] for row in segments_response.data}
+        # Rows joined to the segment registry once; legacy segment names resolve to their current segment
+        current_segment_names = {row_id: name_of(SEGMENTS, intern(SEGMENTS, name)) for row_id, name in segment_mapping.items()}
         
-        # Define all expected stakeholders (first 21 business segments)
-        all_stakeholders = [
-            "Dealership", "End User", "Equipment Manufacturer", "Upfitter",
-            "Depot", "Fleet Management Company", "Logistics", "OEM",
-            "Traditional Finance Provider", "Channel Partner", "Charging OEM", "Insurance Provider",
-            "Maintenance Provider", "Charging as a Service", "EPC", "Government Agency",
-            "Grant Administrator", "Operating and Maintenance Provider", "Remarketing Specialists", "Technology Solutions",
-            "Utility Provider"
-        ]
-        
-        # Segment mapping loaded successfully
-        
-        # Define all months from 2025-2030
-        months = []
-        for year in range(2025, 2031):
-            for month in range(1, 13):
-                months.append(datetime(year, month, 1).strftime("%b %Y"))
-        
-        revenue_data = {}
-        
-        # Initialize all data structures with all stakeholders and months
-        # IMPORTANT: Only initialize structure, don't set default values yet
-        data_keys = [
-            'subscription_new_customers', 'subscription_pricing', 'subscription_churn_rates',
-            'implementation_new_customers', 'implementation_pricing',
-            'maintenance_new_customers', 'maintenance_pricing'
-        ]
-        
-        for data_key in data_keys:
-            revenue_data[data_key] = {}
-            for stakeholder in all_stakeholders:
-                revenue_data[data_key][stakeholder] = {}
-                # Don't set default values here - will be set after loading from DB
+        # Every non-transactional business segment is a revenue segment (defaults first)
+        all_stakeholders = list(DEFAULT_SEGMENTS) + sorted(
+            name for name in set(current_segment_names.values())
+            if name not in DEFAULT_SEGMENTS and not name.startswith(TRANSACTIONAL_PREFIX)
+        )
+        known_stakeholders = set(all_stakeholders)
         
-        # Initialize transactional data structures
-        transactional_categories = ["Charging", "Vehicle", "Financing", "Other Revenue"]
-        transactional_keys = ['transactional_volume', 'transactional_price', 'transactional_referral_fee']
+        # Define all months of the planning horizon
+        months = get_planning_months()
+        horizon_start, horizon_end = horizon_date_range(months)
         
-        for data_key in transactional_keys:
-            revenue_data[data_key] = {}
-            for category in transactional_categories:
-                revenue_data[data_key][category] = {}
-                # Don't set default values here - will be set after loading from DB
+        # Assumptions are stored sparsely: only non-zero cells are kept and
+        # readers treat a missing segment or month as zero
+        revenue_data = {data_key: {} for data_key in SEGMENT_DATA_KEYS + TRANSACTIONAL_DATA_KEYS}
+        revenue_data["revenue_segments"] = all_stakeholders
+        transactional_categories = TRANSACTIONAL_CATEGORIES
         
-        # Load customer assumptions - explicitly set high limit and order by date to ensure we get all records
-        customer_response = supabase.table('customer_assumptions').select("*").order('year_month').limit(10000).execute()
+        # Load customer assumptions page by page so any number of segments is read completely
+        customer_rows = select_all_rows(
+            lambda: supabase.table('customer_assumptions')
+            .select("*")
+            .gte('year_month', horizon_start)
+            .lte('year_month', horizon_end)
+            .order('year_month')
+        )
         
-        for record in customer_response.data:
-            segment_name = segment_mapping.get(record['business_segment_id'], 'Unknown')
+        for record in customer_rows:
+            segment_name = current_segment_names.get(record['business_segment_id'], 'Unknown')
             service_type = record['service_type']
             metric_name = record['metric_name']
             month_str = datetime.strptime(record['year_month'], "%Y-%m-%d").strftime("%b %Y")
@@ -1225,110 +1163,69 @@ def load_revenue_assumptions_from_database() -> Dict[str, Any]:
             
             # Handle transactional data specially - it uses categories not stakeholders
             if service_type == 'transactional' and metric_name in ['volume', 'new_customers']:
-                # Extract category from the new "Transactional-" prefixed segment names
-                if segment_name.startswith("Transactional-"):
-                    category = segment_name.replace("Transactional-", "")
-                else:
-                    # Fallback to old mapping for backwards compatibility
-                    category_mapping = {
-                        "Charging as a Service": "Charging",
-                        "Charging Hardware": "Charging",
-                        "Equipment Manufacturer": "Vehicle",
-                        "Finance Partner": "Financing",
-                        "Dealership": "Vehicle",
-                        "Corporate": "Charging"
-                    }
-                    category = category_mapping.get(segment_name, "Other Revenue")
+                # "Transactional-" rows name their category; legacy segments resolve through the registry aliases
+                category = transactional_category(segment_mapping.get(record['business_segment_id'], 'Unknown'))
                 
                 # Use 'transactional_volume' as the key for consistency
                 volume_key = 'transactional_volume'
-                if volume_key in revenue_data and category in transactional_categories:
-                    revenue_data[volume_key][category][month_str] = record['value']
+                if category in transactional_categories and record['value']:
+                    revenue_data[volume_key].setdefault(category, {})[month_str] = record['value']
             else:
-                # Only update if the segment_name is in our expected stakeholders
-                if segment_name in all_stakeholders and data_key in revenue_data:
-                    revenue_data[data_key][segment_name][month_str] = record['value']
+                # Only update if the segment_name is a known revenue segment
+                if segment_name in known_stakeholders and data_key in revenue_data and record['value']:
+                    revenue_data[data_key].setdefault(segment_name, {})[month_str] = record['value']
         
-        # Load pricing data - explicitly set high limit and order by date
-        pricing_response = (
-            supabase.table('pricing_data')
+        # Load pricing data page by page so any number of segments is read completely
+        pricing_rows = select_all_rows(
+            lambda: supabase.table('pricing_data')
             .select("*")
+            .gte('year_month', horizon_start)
+            .lte('year_month', horizon_end)
             .order('year_month')
-            .limit(10000)
-            .execute()
         )
-        for record in pricing_response.data:
-            segment_name = segment_mapping.get(record['business_segment_id'], 'Unknown')
+        for record in pricing_rows:
+            segment_name = current_segment_names.get(record['business_segment_id'], 'Unknown')
             service_type = record['service_type']
             month_str = datetime.strptime(record['year_month'], "%Y-%m-%d").strftime("%b %Y")
             
             # Handle transactional pricing specially - uses categories not stakeholders
             if service_type == 'transactional':
-                # Extract category from the new "Transactional-" prefixed segment names
-                if segment_name.startswith("Transactional-"):
-                    category = segment_name.replace("Transactional-", "")
-                else:
-                    # Fallback to old mapping for backwards compatibility
-                    category_mapping = {
-                        "Charging as a Service": "Charging",
-                        "Charging Hardware": "Charging",
-                        "Equipment Manufacturer": "Vehicle",
-                        "Finance Partner": "Financing",
-                        "Dealership": "Vehicle",
-                        "Corporate": "Charging"
-                    }
-                    category = category_mapping.get(segment_name, "Other Revenue")
+                # "Transactional-" rows name their category; legacy segments resolve through the registry aliases
+                category = transactional_category(segment_mapping.get(record['business_segment_id'], 'Unknown'))
                 
                 # Transactional price data
                 if category in transactional_categories:
-                    revenue_data['transactional_price'][category][month_str] = record['price_per_unit']
+                    if record['price_per_unit']:
+                        revenue_data['transactional_price'].setdefault(category, {})[month_str] = record['price_per_unit']
                     
                     # Transactional referral fee data
                     if record['referral_fee_percent'] > 0:
-                        revenue_data['transactional_referral_fee'][category][month_str] = record['referral_fee_percent'] * 100
+                        revenue_data['transactional_referral_fee'].setdefault(category, {})[month_str] = record['referral_fee_percent'] * 100
             else:
                 # Non-transactional pricing data
                 price_key = f"{service_type}_pricing"
-                if segment_name in all_stakeholders and price_key in revenue_data:
-                    revenue_data[price_key][segment_name][month_str] = record['price_per_unit']
+                if segment_name in known_stakeholders and price_key in revenue_data and record['price_per_unit']:
+                    revenue_data[price_key].setdefault(segment_name, {})[month_str] = record['price_per_unit']
         
-        # Load churn rates - explicitly set high limit
-        churn_response = (
-            supabase.table('churn_rates')
+        # Load churn rates page by page so any number of segments is read completely
+        churn_rows = select_all_rows(
+            lambda: supabase.table('churn_rates')
             .select("*")
+            .gte('year_month', horizon_start)
+            .lte('year_month', horizon_end)
             .order('year_month')
-            .limit(10000)
-            .execute()
         )
-        for record in churn_response.data:
-            segment_name = segment_mapping.get(record['business_segment_id'], 'Unknown')
+        for record in churn_rows:
+            segment_name = current_segment_names.get(record['business_segment_id'], 'Unknown')
             service_type = record['service_type']
             month_str = datetime.strptime(record['year_month'], "%Y-%m-%d").strftime("%b %Y")
             
             churn_key = f"{service_type}_churn_rates"
             
-            if segment_name in all_stakeholders and churn_key in revenue_data:
+            if segment_name in known_stakeholders and churn_key in revenue_data and record['churn_rate']:
                 # Convert from decimal back to percentage for consistency with UI
-                revenue_data[churn_key][segment_name][month_str] = record['churn_rate'] * 100
-        
-        
-        # Now fill in zeros ONLY for months that don't have data
-        # This prevents overwriting existing data with defaults
-        for data_key in data_keys:
-            if data_key in revenue_data:
-                for stakeholder in all_stakeholders:
-                    if stakeholder in revenue_data[data_key]:
-                        for month in months:
-                            if month not in revenue_data[data_key][stakeholder]:
-                                revenue_data[data_key][stakeholder][month] = 0.0
-        
-        for data_key in transactional_keys:
-            if data_key in revenue_data:
-                for category in transactional_categories:
-                    if category in revenue_data[data_key]:
-                        for month in months:
-                            if month not in revenue_data[data_key][category]:
-                                revenue_data[data_key][category][month] = 0.0
+                revenue_data[churn_key].setdefault(segment_name, {})[month_str] = record['churn_rate'] * 100
+        
         
         # Revenue data loaded successfully
         
@@ -1420,7 +1317,8 @@ def load_payroll_data_from_database() -> Dict[str, Any]:
         
         # Load pay periods
         try:
-            periods_response = supabase.table('pay_periods').select("*").limit(10000).execute()
+            horizon_start, horizon_end = horizon_date_range(get_planning_months())
+            periods_response = supabase.table('pay_periods').select("*").gte('year_month', horizon_start).lte('year_month', horizon_end).limit(10000).execute()
             for period in periods_response.data:
                 month_str = datetime.strptime(period['year_month'], "%Y-%m-%d").strftime("%b %Y")
                 payroll_data["pay_periods"][month_str] = period['pay_periods_count']
@@ -1521,7 +1419,16 @@ def load_budget_data_from_database() -> Dict[str, Any]:
         budget_data = {"monthly_budgets": {}}
         
         # Load budget data
-        budget_response = supabase.table('budget_data').select("*").order('year_month').limit(10000).execute()
+        horizon_start, horizon_end = horizon_date_range(get_planning_months())
+        budget_response = (
+            supabase.table('budget_data')
+            .select("*")
+            .gte('year_month', horizon_start)
+            .lte('year_month', horizon_end)
+            .order('year_month')
+            .limit(10000)
+            .execute()
+        )
         
         for record in budget_response.data:
             month_str = datetime.strptime(record['year_month'], "%Y-%m-%d").strftime("%b %Y")
@@ -1671,7 +1578,7 @@ def save_liquidity_data_to_database(data: Dict[str, Any]) -> bool:
         
         for category_name, monthly_data in expenses_data.items():
             # Clean up category name - remove extra spaces and normalize
-            clean_category_name = ' '.join(category_name.split()).strip()
+            clean_category_name = canonical_name(category_name)
             
             for month_str, amount in monthly_data.items():
                 try:
@@ -1699,10 +1606,19 @@ def save_liquidity_data_to_database(data: Dict[str, Any]) -> bool:
                 all_liquidity_categories = ['Revenue', 'Investment', 'Other Cash Receipts']
                 # Add expense categories (cleaned)
                 if expenses_data:
-                    all_liquidity_categories.extend([' '.join(cat.split()).strip() for cat in expenses_data.keys()])
+                    all_liquidity_categories.extend([canonical_name(cat) for cat in expenses_data.keys()])
                 
-                # Delete existing records for ALL liquidity-related categories
-                delete_response = supabase.table('cash_flow').delete().in_('category', all_liquidity_categories).execute()
+                # Delete existing records for ALL liquidity-related categories inside the horizon
+                # (months outside the current horizon are kept for when it is extended)
+                horizon_start, horizon_end = horizon_date_range(get_planning_months())
+                delete_response = (
+                    supabase.table('cash_flow')
+                    .delete()
+                    .in_('category', all_liquidity_categories)
+                    .gte('year_month', horizon_start)
+                    .lte('year_month', horizon_end)
+                    .execute()
+                )
                 
             except Exception as delete_e:
                 # Continue anyway as upsert should handle updates
@@ -1742,7 +1658,7 @@ def cleanup_category_names_in_database():
             records_to_update = []
             for record in response.data:
                 original_category = record['category']
-                clean_category = ' '.join(original_category.split())
+                clean_category = canonical_name(original_category)
                 
                 if original_category != clean_category:
                     record['category'] = clean_category
@@ -1788,10 +1704,8 @@ def load_liquidity_data_from_database() -> Dict[str, Any]:
             liquidity_data["starting_balance"] = 1773162
         
         # Initialize monthly data structures
-        months = []
-        for year in range(2025, 2031):
-            for month_name in ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]:
-                months.append(f"{month_name} {year}")
+        months = get_planning_months()
+        horizon_start, horizon_end = horizon_date_range(months)
         
         liquidity_data["revenue"] = {month: 0 for month in months}
         liquidity_data["investment"] = {month: 0 for month in months}
@@ -1800,7 +1714,15 @@ def load_liquidity_data_from_database() -> Dict[str, Any]:
         
         # Load cash flow data using limit as specified in memory
         try:
-            cash_flow_response = supabase.table('cash_flow').select('*').order('year_month').limit(10000).execute()
+            cash_flow_response = (
+                supabase.table('cash_flow')
+                .select('*')
+                .gte('year_month', horizon_start)
+                .lte('year_month', horizon_end)
+                .order('year_month')
+                .limit(10000)
+                .execute()
+            )
             
             for record in cash_flow_response.data:
                 try:
@@ -1860,6 +1782,257 @@ def save_starting_balance_to_database(starting_balance: float) -> bool:
     except Exception as e:
         return False
 
+def load_scenarios_from_database() -> List[Dict[str, Any]]:
+    """Load scenario assumption overrides from model_settings table"""
+    try:
+        supabase = get_supabase_client()
+        settings_response = supabase.table('model_settings').select('setting_value').eq('setting_category', 'scenarios').eq('setting_name', 'scenario_overrides').execute()
+        if settings_response.data:
+            scenarios = json.loads(settings_response.data[0]['setting_value'])
+            return scenarios if isinstance(scenarios, list) else []
+        return []
+    except Exception as e:
+        return []
+
+def save_scenarios_to_database(scenarios: List[Dict[str, Any]]) -> bool:
+    """Save scenario assumption overrides to model_settings table"""
+    try:
+        supabase = get_supabase_client()
+        supabase.table('model_settings').upsert({
+            'setting_category': 'scenarios',
+            'setting_name': 'scenario_overrides',
+            'setting_value': json.dumps(scenarios),
+            'description': 'Scenario assumption overrides (growth, churn, pricing, hiring and investment timing)',
+            'data_type': 'json'
+        }, on_conflict='setting_category,setting_name').execute()
+        return True
+    except Exception as e:
+        return False
+
+def load_formula_lines_from_database() -> List[Dict[str, Any]]:
+    """Load user-defined formula line items from model_settings table"""
+    try:
+        supabase = get_supabase_client()
+        settings_response = supabase.table('model_settings').select('setting_value').eq('setting_category', 'reporting').eq('setting_name', 'formula_lines').execute()
+        if settings_response.data:
+            lines = json.loads(settings_response.data[0]['setting_value'])
+            return lines if isinstance(lines, list) else []
+        return []
+    except Exception as e:
+        return []
+
+def save_formula_lines_to_database(lines: List[Dict[str, Any]]) -> bool:
+    """Save user-defined formula line items to model_settings table"""
+    try:
+        supabase = get_supabase_client()
+        supabase.table('model_settings').upsert({
+            'setting_category': 'reporting',
+            'setting_name': 'formula_lines',
+            'setting_value': json.dumps(lines),
+            'description': 'Formula line items (name, expression, format, period total) shown on the Income Statement and KPI pages',
+            'data_type': 'json'
+        }, on_conflict='setting_category,setting_name').execute()
+        return True
+    except Exception as e:
+        return False
+
+def get_consolidation_client() -> Client:
+    """Client for the deployment that holds entity snapshots (CONSOLIDATION_SUPABASE_* secrets, else this one)"""
+    try:
+        url = st.secrets.get("CONSOLIDATION_SUPABASE_URL", None)
+        key = st.secrets.get("CONSOLIDATION_SUPABASE_KEY", None)
+        if url and key:
+            return create_client(url, key)
+    except Exception:
+        pass
+    return get_supabase_client()
+
+def get_entity_name() -> str:
+    """Name of the legal entity this deployment models (ENTITY_NAME secret)"""
+    try:
+        return st.secrets.get("ENTITY_NAME", None) or os.environ.get("ENTITY_NAME") or "Primary"
+    except Exception:
+        return os.environ.get("ENTITY_NAME") or "Primary"
+
+def load_entity_snapshots_from_database() -> Dict[str, Any]:
+    """Load published entity models ({entity: {"published_at", "snapshot"}}) from model_settings table"""
+    try:
+        supabase = get_consolidation_client()
+        settings_response = supabase.table('model_settings').select('setting_name, setting_value').eq('setting_category', 'entities').limit(10000).execute()
+        snapshots = {}
+        for setting in settings_response.data:
+            if setting['setting_name'].startswith('snapshot:'):
+                snapshots[setting['setting_name'][len('snapshot:'):]] = json.loads(setting['setting_value'])
+        return snapshots
+    except Exception as e:
+        return {}
+
+def save_entity_snapshot_to_database(entity_name: str, snapshot: Dict[str, Any]) -> bool:
+    """Publish an entity's model for consolidation to model_settings table"""
+    try:
+        supabase = get_consolidation_client()
+        supabase.table('model_settings').upsert({
+            'setting_category': 'entities',
+            'setting_name': f'snapshot:{entity_name}',
+            'setting_value': json.dumps({"published_at": datetime.now().isoformat(timespec="seconds"), "snapshot": snapshot}),
+            'description': f'Published model of {entity_name} for consolidation',
+            'data_type': 'json'
+        }, on_conflict='setting_category,setting_name').execute()
+        return True
+    except Exception as e:
+        return False
+
+def delete_entity_snapshot_from_database(entity_name: str) -> bool:
+    """Remove an entity from consolidation"""
+    try:
+        supabase = get_consolidation_client()
+        supabase.table('model_settings').delete().eq('setting_category', 'entities').eq('setting_name', f'snapshot:{entity_name}').execute()
+        return True
+    except Exception as e:
+        return False
+
+def load_intercompany_eliminations_from_database() -> List[Dict[str, Any]]:
+    """Load intercompany elimination rules from model_settings table"""
+    try:
+        supabase = get_consolidation_client()
+        settings_response = supabase.table('model_settings').select('setting_value').eq('setting_category', 'entities').eq('setting_name', 'intercompany_eliminations').execute()
+        if settings_response.data:
+            rules = json.loads(settings_response.data[0]['setting_value'])
+            return rules if isinstance(rules, list) else []
+        return []
+    except Exception as e:
+        return []
+
+def save_intercompany_eliminations_to_database(rules: List[Dict[str, Any]]) -> bool:
+    """Save intercompany elimination rules to model_settings table"""
+    try:
+        supabase = get_consolidation_client()
+        supabase.table('model_settings').upsert({
+            'setting_category': 'entities',
+            'setting_name': 'intercompany_eliminations',
+            'setting_value': json.dumps(rules),
+            'description': 'Intercompany revenue/expense elimination rules for consolidation',
+            'data_type': 'json'
+        }, on_conflict='setting_category,setting_name').execute()
+        return True
+    except Exception as e:
+        return False
+
+def load_payment_schedules_from_database() -> Dict[str, Any]:
+    """Load per-category payment and collection timing from model_settings table"""
+    try:
+        supabase = get_supabase_client()
+        settings_response = supabase.table('model_settings').select('setting_value').eq('setting_category', 'liquidity').eq('setting_name', 'payment_schedules').execute()
+        if settings_response.data:
+            schedules = json.loads(settings_response.data[0]['setting_value'])
+            return schedules if isinstance(schedules, dict) else {}
+        return {}
+    except Exception as e:
+        return {}
+
+def save_payment_schedules_to_database(schedules: Dict[str, Any]) -> bool:
+    """Save per-category payment and collection timing to model_settings table"""
+    try:
+        supabase = get_supabase_client()
+        supabase.table('model_settings').upsert({
+            'setting_category': 'liquidity',
+            'setting_name': 'payment_schedules',
+            'setting_value': json.dumps(schedules),
+            'description': 'Payment dates and collection lags used by the weekly and daily cash views',
+            'data_type': 'json'
+        }, on_conflict='setting_category,setting_name').execute()
+        return True
+    except Exception as e:
+        return False
+
+def load_expense_drivers_from_database() -> List[Dict[str, Any]]:
+    """Load driver-based expense category definitions from model_settings table"""
+    try:
+        supabase = get_supabase_client()
+        settings_response = supabase.table('model_settings').select('setting_value').eq('setting_category', 'liquidity').eq('setting_name', 'expense_drivers').execute()
+        if settings_response.data:
+            drivers = json.loads(settings_response.data[0]['setting_value'])
+            return drivers if isinstance(drivers, list) else []
+        return []
+    except Exception as e:
+        return []
+
+def save_expense_drivers_to_database(drivers: List[Dict[str, Any]]) -> bool:
+    """Save driver-based expense category definitions to model_settings table"""
+    try:
+        supabase = get_supabase_client()
+        supabase.table('model_settings').upsert({
+            'setting_category': 'liquidity',
+            'setting_name': 'expense_drivers',
+            'setting_value': json.dumps(drivers),
+            'description': 'Expense categories calculated from drivers (fixed, per employee, per customer, % of revenue)',
+            'data_type': 'json'
+        }, on_conflict='setting_category,setting_name').execute()
+        return True
+    except Exception as e:
+        return False
+
+def load_actuals_through_from_database() -> str:
+    """Load the last month with entered actuals from model_settings table"""
+    try:
+        supabase = get_supabase_client()
+        settings_response = supabase.table('model_settings').select('setting_value').eq('setting_category', 'liquidity').eq('setting_name', 'actuals_through').execute()
+        if settings_response.data:
+            month = json.loads(settings_response.data[0]['setting_value'])
+            return month if isinstance(month, str) else ""
+        return ""
+    except Exception as e:
+        return ""
+
+def save_actuals_through_to_database(month: str) -> bool:
+    """Save the last month with entered actuals to model_settings table"""
+    try:
+        supabase = get_supabase_client()
+        supabase.table('model_settings').upsert({
+            'setting_category': 'liquidity',
+            'setting_name': 'actuals_through',
+            'setting_value': json.dumps(month),
+            'description': 'Last month with entered actuals; later months are forecast from them',
+            'data_type': 'json'
+        }, on_conflict='setting_category,setting_name').execute()
+        return True
+    except Exception as e:
+        return False
+
+@st.cache_data(ttl=1800)  # Cache for 30 minutes
+def load_planning_horizon_from_database() -> Dict[str, Any]:
+    """Load the planning horizon (start month and length in years) from model_settings table"""
+    try:
+        supabase = get_supabase_client()
+        settings_response = supabase.table('model_settings').select('setting_value').eq('setting_category', 'planning').eq('setting_name', 'horizon').execute()
+        if settings_response.data:
+            raw_value = settings_response.data[0]['setting_value']
+            return normalize_horizon(json.loads(raw_value) if isinstance(raw_value, str) else raw_value)
+        return dict(DEFAULT_PLANNING_HORIZON)
+    except Exception as e:
+        return dict(DEFAULT_PLANNING_HORIZON)
+
+def save_planning_horizon_to_database(horizon: Dict[str, Any]) -> bool:
+    """Save the planning horizon to model_settings table and refresh cached loaders"""
+    try:
+        supabase = get_supabase_client()
+        supabase.table('model_settings').upsert({
+            'setting_category': 'planning',
+            'setting_name': 'horizon',
+            'setting_value': json.dumps(normalize_horizon(horizon)),
+            'description': 'Planning horizon start month and length in years',
+            'data_type': 'json'
+        }, on_conflict='setting_category,setting_name').execute()
+        # Every loader sizes its data to the horizon
+        clear_data_caches()
+        return True
+    except Exception as e:
+        return False
+
+def get_planning_months() -> List[str]:
+    """Month labels of the configured planning horizon"""
+    return horizon_months(load_planning_horizon_from_database())
+
 # ===== ENHANCED REVENUE ASSUMPTIONS SAVE/LOAD FUNCTIONS =====
 
 def save_revenue_calculations_to_database(data: Dict[str, Any]) -> bool:
@@ -1949,11 +2122,8 @@ def save_sga_expenses_to_database(data: Dict[str, Any]) -> bool:
         sga_records = []
         sga_expenses = data["sga_expenses"]
         
-        # Generate months from 2025-2030 (same as in other files)
-        months = []
-        for year in range(2025, 2031):
-            for month in range(1, 13):
-                months.append(f"{datetime(year, month, 1).strftime('%b %Y')}")
+        # Months of the planning horizon (same as in other files)
+        months = get_planning_months()
         
         for category_name, monthly_data in sga_expenses.items():
             # Skip if category doesn't exist in database
@@ -2049,6 +2219,9 @@ def load_data_from_source() -> Dict[str, Any]:
         # Initialize empty model data 
         model_data = {}
         
+        # Planning horizon every loader below is sized to
+        model_data["planning_horizon"] = load_planning_horizon_from_database()
+        
         # Load additional data from Supabase with individual error handling
         try:
             # Load payroll data
@@ -2097,12 +2270,8 @@ def load_data_from_source() -> Dict[str, Any]:
             if supabase is not None:
                 gross_profit_data = {}
                 
-                # Generate months from 2025-2030
-                months = []
-                for year in range(2025, 2031):
-                    for month in range(1, 13): 
-                        from datetime import date
-                        months.append(f"{date(year, month, 1).strftime('%b %Y')}")
+                # Months of the planning horizon
+                months = get_planning_months()
                 
                 gross_profit_data = {
                     "gross_profit_percentages": {},
@@ -2291,11 +2460,8 @@ def save_income_statement_to_database(data: Dict[str, Any]) -> bool:
             st.error("❌ No revenue or SGA data found to save!")
             return False
         
-        # Define time structure (months from 2025-2030)
-        months = []
-        for year in range(2025, 2031):
-            for month_name in ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]:
-                months.append(f"{month_name} {year}")
+        # Define time structure (months of the planning horizon)
+        months = get_planning_months()
         
         # Define categories
         revenue_categories = ["Subscription", "Transactional", "Implementation", "Maintenance"]
@@ -2480,11 +2646,8 @@ def clean_up_cash_disbursement_categories(data: Dict[str, Any]) -> bool:
         if "sga_expenses" not in data:
             data["sga_expenses"] = {}
         
-        # Create months list (2025-2030)
-        months = []
-        for year in range(2025, 2031):
-            for month_name in ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]:
-                months.append(f"{month_name} {year}")
+        # Create months list (planning horizon)
+        months = get_planning_months()
         
         # Ensure all categories exist in both expenses and sga_expenses with proper structure
         for category in correct_categories:
@@ -0,0 +1,95 @@
+import numpy as np
+from typing import Dict, Any, List
+
+from kpi_engine import headcount_series
+from model_cache import memoize_by_content
+from money import cents_row, from_cents, to_cents
+from segment_store import month_totals, sparse_from_nested
+
+# How a driven expense category is calculated each month
+DRIVER_TYPES = ["Fixed", "Per Employee", "Per Customer", "% of Revenue"]
+
+# Editor column labels for each driver field
+DRIVER_COLUMNS = {"category": "Category", "driver": "Driver", "rate": "Rate", "start_month": "Start Month"}
+
+
+def driver_inputs(model_data: Dict[str, Any], months: List[str]) -> Dict[str, np.ndarray]:
+    """Monthly active employees, active subscription customers and total revenue"""
+    employees, _ = headcount_series(model_data.get("payroll_data", {}), months)
+    customers = month_totals(sparse_from_nested(model_data.get("subscription_running_totals", {}) or {}, months))
+    revenue = np.zeros(len(months))
+    for series in (model_data.get("revenue", {}) or {}).values():
+        if isinstance(series, dict):
+            revenue += np.array([float(series.get(month, 0) or 0) for month in months])
+    return {"employees": employees, "customers": customers, "revenue": revenue}
+
+
+@memoize_by_content(maxsize=8)
+def evaluate_expense_drivers(drivers: List[Dict[str, Any]], inputs: Dict[str, np.ndarray], months: List[str]) -> Dict[str, Any]:
+    """Categories x months driven amounts in cents for the whole horizon.
+
+    Each driver's rate multiplies its base (1, employees, customers or revenue %)
+    from its start month on; earlier months are left to the entered values.
+    """
+    month_count = len(months)
+    # One base row per driver type, in DRIVER_TYPES order
+    bases = np.vstack([
+        np.ones(month_count),
+        inputs["employees"],
+        inputs["customers"],
+        inputs["revenue"] / 100.0,
+    ])
+    kind = np.array([DRIVER_TYPES.index(driver["driver"]) for driver in drivers], dtype=np.intp)
+    rate = np.array([float(driver.get("rate", 0) or 0) for driver in drivers])
+    start = np.array([months.index(driver["start_month"]) if driver.get("start_month") in months else 0 for driver in drivers], dtype=np.intp)
+
+    active = np.arange(month_count)[None, :] >= start[:, None]
+    amounts = to_cents(rate[:, None] * bases[kind]).reshape(len(drivers), month_count)
+    evaluated = {
+        "categories": [driver["category"] for driver in drivers],
+        "cents": np.where(active, amounts, 0),
+        "active": active,
+    }
+    for value in evaluated.values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+    return evaluated
+
+
+def apply_expense_drivers(expenses: Dict[str, Any], evaluated: Dict[str, Any], months: List[str]) -> List[str]:
+    """Write driven amounts into the liquidity expenses; returns the categories that changed"""
+    changed = []
+    for row, category in enumerate(evaluated["categories"]):
+        current = cents_row(expenses.get(category, {}), months)
+        target = np.where(evaluated["active"][row], evaluated["cents"][row], current)
+        differs = np.flatnonzero(target != current)
+        if differs.size:
+            series = expenses.setdefault(category, {})
+            for position, value in zip(differs.tolist(), from_cents(target[differs]).tolist()):
+                series[months[position]] = value
+            changed.append(category)
+    return changed
+
+
+def drivers_to_rows(drivers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Driver definitions as editor rows"""
+    return [{label: driver.get(field, "") for field, label in DRIVER_COLUMNS.items()} for driver in drivers]
+
+
+def rows_to_drivers(rows: List[Dict[str, Any]], categories: List[str]) -> List[Dict[str, Any]]:
+    """Editor rows back to driver definitions; one driver per known category (first row wins)"""
+    drivers, seen = [], set()
+    for row in rows:
+        category = row.get(DRIVER_COLUMNS["category"])
+        driver = row.get(DRIVER_COLUMNS["driver"])
+        if category not in categories or category in seen or driver not in DRIVER_TYPES:
+            continue
+        rate = row.get(DRIVER_COLUMNS["rate"])
+        seen.add(category)
+        drivers.append({
+            "category": category,
+            "driver": driver,
+            "rate": float(rate) if rate not in (None, "") and rate == rate else 0.0,
+            "start_month": row.get(DRIVER_COLUMNS["start_month"]) or "",
+        })
+    return drivers
@@ -0,0 +1,170 @@
+import numpy as np
+from typing import Dict, Any, List, Tuple
+
+from model_cache import memoize_by_content
+from money import amounts_differ, from_cents, to_cents
+
+# Candidate models, in the order their forecasts are stacked
+FORECAST_MODELS = ["Trailing Average", "Linear Trend", "Seasonal Smoothing"]
+
+# Last actual months held out to score each model
+HOLDOUT_MONTHS = 3
+
+# Months averaged by the trailing average model
+TRAILING_MONTHS = 3
+
+SEASON_LENGTH = 12
+
+# Smoothing weights for level, trend and seasonal components
+LEVEL_ALPHA = 0.4
+TREND_BETA = 0.1
+SEASON_GAMMA = 0.3
+
+# Series sources: liquidity disbursement categories and budget_data lines
+FORECAST_SOURCES = ["Cash Disbursements", "Budget"]
+
+
+def _trailing_average(history: np.ndarray, horizon: int) -> np.ndarray:
+    """Mean of the last few months, repeated"""
+    window = history[:, -TRAILING_MONTHS:]
+    return np.repeat(window.mean(axis=1, keepdims=True), horizon, axis=1)
+
+
+def _linear_trend(history: np.ndarray, horizon: int) -> np.ndarray:
+    """Least-squares line through every series at once, extended"""
+    count = history.shape[1]
+    x = np.arange(count, dtype=float)
+    x_centered = x - x.mean()
+    variance = (x_centered ** 2).sum()
+    slope = (history * x_centered).sum(axis=1) / variance if variance else np.zeros(history.shape[0])
+    intercept = history.mean(axis=1) - slope * x.mean()
+    future = np.arange(count, count + horizon, dtype=float)
+    return intercept[:, None] + slope[:, None] * future[None, :]
+
+
+def _seasonal_smoothing(history: np.ndarray, horizon: int) -> np.ndarray:
+    """Additive Holt-Winters, stepping through the months for all series together.
+
+    Seasonality needs two full seasons of history; shorter histories are
+    smoothed with level and trend only.
+    """
+    series_count, count = history.shape
+    seasonal = count >= 2 * SEASON_LENGTH
+    season = SEASON_LENGTH if seasonal else 1
+    first = history[:, :season].mean(axis=1)
+    level = first.copy()
+    trend = (history[:, season:2 * season].mean(axis=1) - first) / season if seasonal else np.zeros(series_count)
+    indices = history[:, :season] - first[:, None] if seasonal else np.zeros((series_count, 1))
+
+    for t in range(count):
+        position = t % season
+        previous = level
+        level = LEVEL_ALPHA * (history[:, t] - indices[:, position]) + (1 - LEVEL_ALPHA) * (previous + trend)
+        trend = TREND_BETA * (level - previous) + (1 - TREND_BETA) * trend
+        if seasonal:
+            indices[:, position] = SEASON_GAMMA * (history[:, t] - level) + (1 - SEASON_GAMMA) * indices[:, position]
+
+    steps = np.arange(1, horizon + 1)
+    return level[:, None] + trend[:, None] * steps[None, :] + indices[:, (count + steps - 1) % season]
+
+
+_MODELS = [_trailing_average, _linear_trend, _seasonal_smoothing]
+
+
+def _all_forecasts(history: np.ndarray, horizon: int) -> np.ndarray:
+    """models x series x horizon forecasts"""
+    return np.stack([model(history, horizon) for model in _MODELS])
+
+
+@memoize_by_content(maxsize=8)
+def fit_forecasts(history: np.ndarray, horizon: int) -> Dict[str, np.ndarray]:
+    """Fit every model to every series (rows of ``history``) and keep the best per series.
+
+    Each model forecasts the last HOLDOUT_MONTHS actuals from the months before
+    them; the model with the lowest mean absolute error is then refit on all
+    actuals to forecast ``horizon`` months. Series that are never negative get
+    non-negative forecasts. Returns read-only arrays.
+    """
+    history = np.asarray(history, dtype=float).reshape(-1, history.shape[-1])
+    series_count, count = history.shape
+    errors = np.full((len(_MODELS), series_count), np.inf)
+    if count > HOLDOUT_MONTHS and series_count:
+        held_out = _all_forecasts(history[:, :-HOLDOUT_MONTHS], HOLDOUT_MONTHS)
+        errors = np.abs(held_out - history[None, :, -HOLDOUT_MONTHS:]).mean(axis=2)
+    # Ties and too-short histories fall back to the simplest model
+    best = np.argmin(errors, axis=0) if series_count else np.zeros(0, dtype=np.intp)
+
+    if count and horizon and series_count:
+        forecasts = _all_forecasts(history, horizon)
+        forecast = np.take_along_axis(forecasts, best[None, :, None], axis=0)[0]
+        forecast = np.where(history.min(axis=1, keepdims=True) >= 0, np.maximum(forecast, 0), forecast)
+    else:
+        forecast = np.zeros((series_count, horizon))
+
+    fitted = {
+        "forecast": from_cents(to_cents(forecast)),
+        "model": best,
+        "errors": errors,
+    }
+    for value in fitted.values():
+        value.flags.writeable = False
+    return fitted
+
+
+def budget_lines(budget_data: Dict[str, Any], months: List[str]) -> Dict[str, Dict[str, float]]:
+    """budget_data's {"Mon YYYY_budget": {line: value}} pivoted to {line: {month: value}}"""
+    monthly_budgets = (budget_data or {}).get("monthly_budgets", {}) or {}
+    lines = {}
+    for month in months:
+        for line, value in (monthly_budgets.get(f"{month}_budget") or {}).items():
+            lines.setdefault(line, {})[month] = float(value or 0)
+    return lines
+
+
+def forecast_inputs(model_data: Dict[str, Any], months: List[str], skip_categories: List[str] = ()) -> Tuple[List[Tuple[str, str]], np.ndarray]:
+    """(source, key) labels and the stacked series x months array of every forecastable series"""
+    liquidity = model_data.get("liquidity_data", {}) or {}
+    expenses = liquidity.get("expenses", {}) or {}
+    sources = [
+        (FORECAST_SOURCES[0], {category: expenses.get(category, {}) for category in liquidity.get("category_order", []) if category not in skip_categories}),
+        (FORECAST_SOURCES[1], budget_lines(model_data.get("budget_data"), months)),
+    ]
+    labels, rows = [], []
+    for source, series in sources:
+        for key, values in series.items():
+            values = values if isinstance(values, dict) else {}
+            labels.append((source, key))
+            rows.append([float(values.get(month, 0) or 0) for month in months])
+    return labels, np.array(rows, dtype=float).reshape(len(labels), len(months))
+
+
+def forecast_from_actuals(model_data: Dict[str, Any], months: List[str], actuals_through: str, skip_categories: List[str] = ()) -> Dict[str, Any]:
+    """Best-model forecasts of the months after ``actuals_through`` for every series.
+
+    Without an actuals month in the horizon there is nothing to fit, and nothing is forecast.
+    """
+    actual_count = months.index(actuals_through) + 1 if actuals_through in months else len(months)
+    labels, stacked = forecast_inputs(model_data, months, skip_categories)
+    fitted = fit_forecasts(stacked[:, :actual_count], len(months) - actual_count)
+    return {"labels": labels, "months": months[actual_count:], **fitted}
+
+
+def apply_forecast(model_data: Dict[str, Any], forecast: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Write forecasts into the liquidity expenses and budget lines; returns the changed keys per source"""
+    expenses = model_data["liquidity_data"].setdefault("expenses", {})
+    monthly_budgets = model_data.setdefault("budget_data", {}).setdefault("monthly_budgets", {})
+    changed = {source: [] for source in FORECAST_SOURCES}
+    for (source, key), values in zip(forecast["labels"], forecast["forecast"].tolist()):
+        moved = False
+        for month, value in zip(forecast["months"], values):
+            # Expenses are {category: {month: value}}, budgets {month_budget: {line: value}}
+            if source == FORECAST_SOURCES[0]:
+                target, field = expenses.setdefault(key, {}), month
+            else:
+                target, field = monthly_budgets.setdefault(f"{month}_budget", {}), key
+            if amounts_differ(target.get(field, 0), value):
+                target[field] = value
+                moved = True
+        if moved:
+            changed[source].append(key)
+    return changed
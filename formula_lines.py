@@ -0,0 +1,290 @@
+import ast
+import numpy as np
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple, Callable
+
+from kpi_engine import headcount_series
+from model_cache import memoize_by_content
+
+# Model groups of {key: {month: value}} series a formula can use as group.Key or group["Key"]
+SERIES_GROUPS = ["revenue", "cogs", "gross_profit", "sga_expenses", "operating_expenses"]
+
+# Monthly employee and contractor counts, available as headcount.Employees / headcount.Contractors
+HEADCOUNT_GROUP = "headcount"
+
+# Other formula lines are referenced through this group, e.g. lines.EBITDA
+LINES_GROUP = "lines"
+
+FORMULA_FORMATS = ["Currency", "Percent", "Number"]
+
+# How a line totals over a period: add up its monthly values, or re-evaluate it on period totals (for ratios)
+PERIOD_MODES = ["Sum", "Ratio"]
+
+DEFAULT_FORMULA_LINES = [
+    {"name": "EBITDA", "expression": "sum(revenue) - sum(sga_expenses)", "format": "Currency", "period": "Sum"},
+    {"name": "Subscription Gross Profit", "expression": "revenue.Subscription - cogs.Subscription", "format": "Currency", "period": "Sum"},
+    {"name": "Opex % of Revenue", "expression": "sum(sga_expenses) / sum(revenue) * 100", "format": "Percent", "period": "Ratio"},
+    {"name": "Payroll per Head", "expression": "sga_expenses.Payroll / headcount.Employees", "format": "Currency", "period": "Sum"},
+]
+
+# Editor column labels for each formula line field
+FORMULA_COLUMNS = {"name": "Line Item", "expression": "Formula", "format": "Format", "period": "Period Total"}
+
+
+def _divide(numerator, denominator):
+    """Elementwise division that gives zero where the denominator is zero"""
+    numerator, denominator = np.broadcast_arrays(np.asarray(numerator, dtype=float), np.asarray(denominator, dtype=float))
+    return np.divide(numerator, denominator, out=np.zeros(numerator.shape), where=denominator != 0)
+
+
+_OPERATORS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: _divide,
+}
+
+# Elementwise functions; sum(group) is handled separately because it takes a whole group
+_FUNCTIONS = {
+    "abs": (1, np.abs),
+    "min": (2, np.minimum),
+    "max": (2, np.maximum),
+    "cumsum": (1, lambda values: np.cumsum(values, axis=-1)),
+}
+
+
+def _reference(node) -> Tuple[str, str]:
+    """(group, key) of a group.Key or group["Key"] node, or None"""
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+        return node.value.id, node.attr
+    if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name):
+        # Python 3.8 wraps subscripts in ast.Index
+        key = node.slice.value if isinstance(node.slice, getattr(ast, "Index", ())) else node.slice
+        if isinstance(key, ast.Constant) and isinstance(key.value, str):
+            return node.value.id, key.value
+    return None
+
+
+def _lookup(env: Dict[str, Dict[str, Any]], group: str, key: str):
+    values = env.get(group, {}).get(key)
+    if values is None and group == LINES_GROUP:
+        raise ValueError(f"Depends on failing line item '{key}'")
+    if values is None:
+        raise ValueError(f'Unknown series {group}["{key}"]')
+    return values
+
+
+def _compile(node, references: set) -> Callable:
+    """Turn an expression node into a function of the series environment"""
+    if isinstance(node, ast.Expression):
+        return _compile(node.body, references)
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        value = float(node.value)
+        return lambda env: value
+
+    reference = _reference(node)
+    if reference is not None:
+        group, key = reference
+        if group not in SERIES_GROUPS + [HEADCOUNT_GROUP, LINES_GROUP]:
+            raise ValueError(f"Unknown group '{group}'")
+        references.add(reference)
+        return lambda env: _lookup(env, group, key)
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        operator = _OPERATORS[type(node.op)]
+        left, right = _compile(node.left, references), _compile(node.right, references)
+        return lambda env: operator(left(env), right(env))
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        operand = _compile(node.operand, references)
+        sign = -1.0 if isinstance(node.op, ast.USub) else 1.0
+        return lambda env: sign * operand(env)
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        name = node.func.id
+        if name == "sum" and len(node.args) == 1 and isinstance(node.args[0], ast.Name):
+            group = node.args[0].id
+            if group not in SERIES_GROUPS + [HEADCOUNT_GROUP]:
+                raise ValueError(f"sum() takes a series group, not '{group}'")
+            references.add((group, None))
+            return lambda env: sum(env.get(group, {}).values(), 0.0)
+        if name in _FUNCTIONS and len(node.args) == _FUNCTIONS[name][0]:
+            function = _FUNCTIONS[name][1]
+            arguments = [_compile(argument, references) for argument in node.args]
+            return lambda env: function(*(argument(env) for argument in arguments))
+        raise ValueError(f"Unsupported function call '{name}'")
+
+    if isinstance(node, ast.Name):
+        raise ValueError(f"Refer to series as group.Key or group[\"Key\"], not '{node.id}'")
+    raise ValueError("Only numbers, series, + - * / and abs/min/max/sum/cumsum are allowed")
+
+
+@lru_cache(maxsize=256)
+def compile_formula(expression: str) -> Tuple[Callable, Tuple]:
+    """Parse a formula once into a NumPy function of the series environment plus the series it references.
+
+    Raises ValueError with a readable message for invalid formulas.
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+        references = set()
+        function = _compile(tree, references)
+    except SyntaxError as e:
+        raise ValueError(f"Syntax error at column {e.offset or 0}")
+    except (RecursionError, MemoryError):
+        raise ValueError("Formula is nested too deeply")
+    return function, tuple(sorted(references, key=str))
+
+
+def formula_order(lines: List[Dict[str, Any]]) -> Tuple[List[str], Dict[str, str], Dict[str, Callable]]:
+    """Compile every line and order them so each comes after the lines it references.
+
+    Returns (evaluation order, {name: error}, {name: compiled function}); lines with
+    invalid formulas, unknown or circular line references, or that depend on a
+    failing line get an error instead of a place in the order.
+    """
+    errors, functions, depends_on = {}, {}, {}
+    names = [line["name"] for line in lines]
+    for line in lines:
+        name = line["name"]
+        if names.count(name) > 1:
+            errors[name] = "Duplicate line item name"
+            continue
+        try:
+            functions[name], references = compile_formula(line.get("expression", ""))
+        except ValueError as e:
+            errors[name] = str(e)
+            continue
+        depends_on[name] = {key for group, key in references if group == LINES_GROUP}
+        unknown = depends_on[name] - set(names)
+        if unknown:
+            errors[name] = f"Unknown line item lines[\"{sorted(unknown)[0]}\"]"
+
+    # Kahn's algorithm over the lines that compiled
+    order, pending = [], {name: deps for name, deps in depends_on.items() if name not in errors}
+    while pending:
+        ready = [name for name, deps in pending.items() if not deps - set(order) - set(errors)]
+        if not ready:
+            for name in pending:
+                errors[name] = "Circular reference between line items"
+            break
+        for name in ready:
+            failed = [dep for dep in pending[name] if dep in errors]
+            if failed:
+                errors[name] = f"Depends on failing line item '{failed[0]}'"
+            else:
+                order.append(name)
+            del pending[name]
+    return order, errors, functions
+
+
+def evaluate_formula_lines(lines: List[Dict[str, Any]], series: Dict[str, Dict[str, np.ndarray]]) -> Dict[str, Any]:
+    """Evaluate all lines in dependency order over every month in one pass.
+
+    ``series`` is {group: {key: array}}; arrays can be monthly or already
+    aggregated (e.g. yearly), formulas work on any shape.
+    """
+    order, errors, functions = formula_order(lines)
+    values = {}
+    env = {**series, LINES_GROUP: values}
+    for name in order:
+        try:
+            values[name] = np.asarray(functions[name](env), dtype=float)
+        except ValueError as e:
+            errors[name] = str(e)
+        except RecursionError:
+            errors[name] = "Formula is nested too deeply"
+        except (TypeError, FloatingPointError):
+            errors[name] = "Formula could not be evaluated"
+    return {"order": [name for name in order if name in values], "values": values, "errors": errors}
+
+
+@memoize_by_content(maxsize=16)
+def build_formula_lines(lines: List[Dict[str, Any]], series: Dict[str, Dict[str, np.ndarray]], months: List[str]) -> Dict[str, Any]:
+    """Monthly values of every formula line (broadcast to the horizon), cached per definitions and data"""
+    result = evaluate_formula_lines(lines, series)
+    for name, values in result["values"].items():
+        # Constant formulas still give one value per month
+        values = np.broadcast_to(values, (len(months),)).copy()
+        values.flags.writeable = False
+        result["values"][name] = values
+    return result
+
+
+def aggregate_formula_lines(lines: List[Dict[str, Any]], series: Dict[str, Dict[str, np.ndarray]], monthly: Dict[str, Any], aggregate: Callable[[np.ndarray], np.ndarray]) -> Dict[str, np.ndarray]:
+    """Period values of each line: Sum lines aggregate their monthly values, Ratio lines are
+    re-evaluated on the aggregated series so percentages are of period totals"""
+    totals = {group: {key: aggregate(values) for key, values in rows.items()} for group, rows in series.items()}
+    ratios = evaluate_formula_lines(lines, totals)["values"]
+    periods = {}
+    for line in lines:
+        name = line["name"]
+        if name not in monthly["values"]:
+            continue
+        if line.get("period") == "Ratio" and name in ratios:
+            periods[name] = ratios[name]
+        else:
+            periods[name] = aggregate(monthly["values"][name])
+    return periods
+
+
+def _is_total(key: str) -> bool:
+    """Stored total rows (cogs["Total"], "Total Revenue", ...) that would double-count in sum(group)"""
+    return key == "Total" or key.startswith("Total ")
+
+
+def _rows(source: Dict[str, Any], months: List[str]) -> Dict[str, np.ndarray]:
+    source = source if isinstance(source, dict) else {}
+    return {
+        key: np.array([float(values.get(month, 0) or 0) for month in months])
+        for key, values in source.items() if isinstance(values, dict) and not _is_total(str(key))
+    }
+
+
+def formula_series(model_data: Dict[str, Any], months: List[str]) -> Dict[str, Dict[str, np.ndarray]]:
+    """{group: {key: months array}} environment formulas are evaluated against"""
+    series = {group: _rows(model_data.get(group, {}), months) for group in SERIES_GROUPS}
+    employees, contractors = headcount_series(model_data.get("payroll_data", {}), months)
+    series[HEADCOUNT_GROUP] = {"Employees": employees, "Contractors": contractors}
+    return series
+
+
+def model_formula_lines(model_data: Dict[str, Any], months: List[str]):
+    """(definitions, series, monthly results) of the model's formula lines"""
+    lines = model_data.get("formula_lines") or DEFAULT_FORMULA_LINES
+    series = formula_series(model_data, months)
+    return lines, series, build_formula_lines(lines, series, months)
+
+
+def format_formula_value(value: float, value_format: str) -> str:
+    """Display a formula value in its line's format"""
+    if value_format == "Percent":
+        return f"{value:,.1f}%"
+    if value_format == "Number":
+        return f"{value:,.1f}"
+    return f"${value:,.0f}"
+
+
+def formula_lines_to_rows(lines: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Formula line definitions as editor rows"""
+    return [{label: line.get(field, "") for field, label in FORMULA_COLUMNS.items()} for line in lines]
+
+
+def rows_to_formula_lines(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Editor rows back to formula line definitions, skipping rows without a name or formula"""
+    lines = []
+    for row in rows:
+        name = str(row.get(FORMULA_COLUMNS["name"]) or "").strip()
+        expression = str(row.get(FORMULA_COLUMNS["expression"]) or "").strip()
+        if not name or not expression:
+            continue
+        value_format = row.get(FORMULA_COLUMNS["format"])
+        period = row.get(FORMULA_COLUMNS["period"])
+        lines.append({
+            "name": name,
+            "expression": expression,
+            "format": value_format if value_format in FORMULA_FORMATS else "Currency",
+            "period": period if period in PERIOD_MODES else "Sum",
+        })
+    return lines
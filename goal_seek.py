@@ -0,0 +1,104 @@
+import numpy as np
+from typing import Dict, Any, List, Tuple
+
+from scenario_engine import SCENARIO_FIELDS, evaluate_overrides, model_inputs
+
+# Assumptions the solver can move (label -> override field, search range in % change)
+GOAL_SEEK_DRIVERS = {
+    "New Customers per Month": ("new_customers_pct", (-100.0, 1000.0)),
+    "Subscription Pricing": ("price_pct", (-100.0, 1000.0)),
+    "Churn Rates": ("churn_pct", (-100.0, 1000.0)),
+    "Other Expenses": ("expense_pct", (-100.0, 1000.0)),
+}
+
+# Outputs a goal can target
+GOAL_SEEK_TARGETS = ["Minimum Cash Through Month", "Cash Balance at Month", "Net Income for Year"]
+
+# Candidates evaluated per batched step; each step shrinks the bracket by this factor
+CANDIDATES_PER_STEP = 32
+
+
+def _target_values(results: Dict[str, np.ndarray], months: List[str], target: str, period: str) -> np.ndarray:
+    """Value of the targeted output for every evaluated row"""
+    if target == "Net Income for Year":
+        in_year = np.array([month.endswith(f" {period}") for month in months], dtype=bool)
+        return results["net_income"][:, in_year].sum(axis=1)
+    stop = months.index(period) + 1 if period in months else len(months)
+    if target == "Cash Balance at Month":
+        return results["balance"][:, stop - 1]
+    return results["balance"][:, :stop].min(axis=1)
+
+
+def _evaluate(inputs: Dict[str, Any], field: str, candidates: np.ndarray, target: str, period: str) -> np.ndarray:
+    overrides = {name: np.full(len(candidates), float(default)) for name, default in SCENARIO_FIELDS.items()}
+    overrides[field] = candidates
+    return _target_values(evaluate_overrides(inputs, overrides), inputs["months"], target, period)
+
+
+def driver_level(inputs: Dict[str, Any], field: str, change_pct: float) -> Tuple[str, float]:
+    """The solved % change expressed in the assumption's own units, where it has one"""
+    factor = 1 + change_pct / 100.0
+    if field == "new_customers_pct":
+        monthly = inputs["new_customers"].sum(axis=0)
+        return "Avg. new customers per month", float(monthly.mean() * factor) if monthly.size else 0.0
+    if field == "price_pct":
+        prices = inputs["price"][inputs["price"] > 0]
+        return "Avg. monthly subscription price", float(prices.mean() * factor) if prices.size else 0.0
+    return "Change vs. plan (%)", float(change_pct)
+
+
+def goal_seek(model_data: Dict[str, Any], months: List[str], driver: str, target: str, period: str, threshold: float = 0.0, tolerance: float = 0.01) -> Dict[str, Any]:
+    """The % change to one assumption at which the target output reaches threshold.
+
+    This is the break-even level of the driver: the least favourable change
+    that still meets the goal (the lowest price that keeps cash above the
+    threshold, the highest churn it can absorb). A batched bisection: every
+    step evaluates CANDIDATES_PER_STEP points across the current bracket in one
+    vectorized engine run and keeps the sub-interval where the goal starts
+    being met. The output is assumed to move monotonically with the driver;
+    the direction is detected from the bracket ends.
+
+    When the goal is met at both ends of the search range, or at neither,
+    there is no crossing to solve for: ``found`` is False, ``change_pct`` is
+    None and ``always_met`` says which case it was.
+    """
+    inputs = model_inputs(model_data, months)
+    field, (low, high) = GOAL_SEEK_DRIVERS[driver]
+
+    ends = _evaluate(inputs, field, np.array([low, high]), target, period)
+    evaluations = 2
+    if not min(ends) < threshold <= max(ends):
+        return {
+            "found": False,
+            "change_pct": None,
+            "value": float(max(ends)),
+            "always_met": bool(min(ends) >= threshold),
+            "evaluations": evaluations,
+        }
+    # Increasing: raising the driver helps (new customers, price); otherwise lowering it helps
+    increasing = ends[1] > ends[0]
+
+    # Bracket [lo, hi] with the goal failing at the "bad" end and met at the "good" end
+    lo, hi = low, high
+    while hi - lo > tolerance:
+        candidates = np.linspace(lo, hi, CANDIDATES_PER_STEP)
+        met = _evaluate(inputs, field, candidates, target, period) >= threshold
+        evaluations += len(candidates)
+        if increasing:
+            first = int(np.argmax(met))
+            lo, hi = (candidates[first - 1], candidates[first]) if first > 0 else (lo, lo)
+        else:
+            last = len(met) - 1 - int(np.argmax(met[::-1]))
+            lo, hi = (candidates[last], candidates[last + 1]) if last < len(met) - 1 else (hi, hi)
+
+    change_pct = float(hi if increasing else lo)
+    value = float(_evaluate(inputs, field, np.array([change_pct]), target, period)[0])
+    unit_label, level = driver_level(inputs, field, change_pct)
+    return {
+        "found": True,
+        "change_pct": change_pct,
+        "value": value,
+        "unit_label": unit_label,
+        "level": level,
+        "evaluations": evaluations + 1,
+    }
@@ -0,0 +1,98 @@
+import numpy as np
+from typing import Dict, Any, List, Tuple
+
+from model_cache import memoize_by_content
+from segment_store import month_totals, sparse_from_nested
+from viewport import prefix_window
+
+REVENUE_STREAMS = ["Subscription", "Transactional", "Implementation", "Maintenance"]
+
+# Gross profit % assumed for non-subscription streams when none is entered
+DEFAULT_GP_PERCENTAGE = 70.0
+
+
+def _row(series: Dict[str, Any], months: List[str], default: float = 0.0) -> np.ndarray:
+    series = series if isinstance(series, dict) else {}
+    return np.array([float(series.get(month, default) or 0) for month in months])
+
+
+def _gross_profit_arrays(revenue: Dict[str, Any], gp_data: Dict[str, Any], running_totals: Dict[str, Any], months: List[str], start: int, stop: int):
+    """Subscribers, expensed and capitalized hosting, revenue and COGS for months[start:stop].
+
+    Every month depends only on its own inputs (running totals are passed in), so
+    any window can be evaluated on its own.
+    """
+    hosting = gp_data.get("saas_hosting_structure", {})
+    go_live_month = hosting.get("go_live_month", "Jan 2025")
+    go_live_index = months.index(go_live_month) if go_live_month in months else 0
+    window = months[start:stop]
+
+    subscribers = month_totals(sparse_from_nested(running_totals, window))
+    fixed = _row(hosting.get("monthly_fixed_costs", {}), window, hosting.get("fixed_monthly_cost", 15400.0))
+    variable = _row(hosting.get("monthly_variable_costs", {}), window, hosting.get("cost_per_customer", 5.0))
+    hosting_cost = fixed + variable * subscribers
+
+    # Costs before go-live are capitalized instead of expensed
+    capitalize = np.zeros(len(window), dtype=bool)
+    if hosting.get("capitalize_before_go_live", True):
+        capitalize = np.arange(start, stop) < go_live_index
+    expensed = np.where(capitalize, 0.0, hosting_cost)
+    capitalized = np.where(capitalize, hosting_cost, 0.0)
+
+    revenue_matrix = np.array([_row(revenue.get(stream, {}), window) for stream in REVENUE_STREAMS]).reshape(len(REVENUE_STREAMS), len(window))
+    cogs = np.empty_like(revenue_matrix)
+    cogs[0] = expensed + _row(gp_data.get("direct_costs", {}).get("Subscription", {}), window)
+    for i, stream in enumerate(REVENUE_STREAMS[1:], start=1):
+        gp_percentage = _row(gp_data.get("gross_profit_percentages", {}).get(stream, {}), window, DEFAULT_GP_PERCENTAGE)
+        cogs[i] = revenue_matrix[i] * (1 - gp_percentage / 100)
+    return subscribers, expensed, capitalized, revenue_matrix, cogs
+
+
+@memoize_by_content(maxsize=8)
+def build_gross_profit_series(revenue: Dict[str, Any], gp_data: Dict[str, Any], running_totals: Dict[str, Any], months: List[str]) -> Dict[str, Any]:
+    """Active subscribers, hosting and COGS for every month, computed once per input version.
+
+    Subscription COGS is expensed hosting (fixed + variable x active subscribers,
+    capitalized before go-live when configured) plus other direct costs; the
+    other streams use their gross profit percentage. Both months arrays and the
+    {month: value} dicts the page tables use are returned; treat them as read-only.
+    """
+    subscribers, expensed, capitalized, revenue_matrix, cogs = _gross_profit_arrays(revenue, gp_data, running_totals, months, 0, len(months))
+
+    series = {
+        "months": list(months),
+        "active_subscribers": subscribers,
+        "hosting": expensed,
+        "capitalized_hosting": capitalized,
+        "revenue": revenue_matrix,
+        "cogs": cogs,
+        "hosting_costs_by_month": dict(zip(months, expensed.tolist())),
+        "capitalized_by_month": dict(zip(months, capitalized.tolist())),
+        "cogs_by_stream": {stream: dict(zip(months, cogs[i].tolist())) for i, stream in enumerate(REVENUE_STREAMS)},
+    }
+    for value in series.values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+    return series
+
+
+def gross_profit_window(revenue: Dict[str, Any], gp_data: Dict[str, Any], running_totals: Dict[str, Any], months: List[str], span: Tuple[int, int]) -> Dict[str, np.ndarray]:
+    """The gross profit arrays for just the months in ``span``, evaluated only up to its end.
+
+    Months already evaluated for the same inputs are reused, so a wider span
+    only evaluates the months past them (see viewport.prefix_window).
+    """
+    count = len(REVENUE_STREAMS)
+
+    def extend(prefix, start, stop):
+        subscribers, expensed, capitalized, revenue_matrix, cogs = _gross_profit_arrays(revenue, gp_data, running_totals, months, start, stop)
+        return np.vstack([revenue_matrix, cogs, expensed, capitalized, subscribers])
+
+    rows = prefix_window("gross_profit", (revenue, gp_data, running_totals), months, span, extend)
+    return {
+        "revenue": rows[:count],
+        "cogs": rows[count:2 * count],
+        "hosting": rows[2 * count],
+        "capitalized_hosting": rows[2 * count + 1],
+        "active_subscribers": rows[2 * count + 2],
+    }
@@ -1,5 +1,7 @@
 import streamlit as st
 from datetime import datetime
+from database import load_planning_horizon_from_database, save_planning_horizon_to_database
+from planning_horizon import MAX_HORIZON_YEARS, horizon_months
 
 # Configure page
 st.set_page_config(
@@ -456,7 +458,44 @@ with col6:
     if st.button("Open Gross Profit Dashboard", key="gross_profit_btn"):
         st.switch_page("pages/6__Gross_Profit_Analysis.py")
 
-# Third row removed - hosting costs section deleted
+# Third row: group views
+col7, col8, col9 = st.columns(3)
+
+with col7:
+    st.markdown("""
+    <div class="nav-card">
+        <h3>🏢 Consolidation</h3>
+        <p>Group income statement and liquidity across legal entities</p>
+    </div>
+    """, unsafe_allow_html=True)
+    if st.button("Open Consolidation", key="consolidation_btn"):
+        st.switch_page("pages/7__Consolidation.py")
+
+# Planning Horizon Section
+st.markdown('<div class="section-header">📅 Planning Horizon</div>', unsafe_allow_html=True)
+
+current_horizon = load_planning_horizon_from_database()
+start_options = [f"Jan {year}" for year in range(datetime.now().year - 5, datetime.now().year + 6)]
+if current_horizon["start_month"] not in start_options:
+    start_options.insert(0, current_horizon["start_month"])
+
+horizon_col1, horizon_col2, horizon_col3 = st.columns([1, 1, 2])
+with horizon_col1:
+    horizon_start = st.selectbox("Start Month", start_options, index=start_options.index(current_horizon["start_month"]))
+with horizon_col2:
+    horizon_length = st.number_input("Length (years)", min_value=1, max_value=MAX_HORIZON_YEARS, value=current_horizon["years"], step=1)
+with horizon_col3:
+    new_horizon_months = horizon_months({"start_month": horizon_start, "years": horizon_length})
+    st.markdown(f"<br>Plan covers **{new_horizon_months[0]} – {new_horizon_months[-1]}** ({len(new_horizon_months)} months)", unsafe_allow_html=True)
+
+if {"start_month": horizon_start, "years": int(horizon_length)} != current_horizon:
+    if st.button("💾 Save Planning Horizon", type="primary"):
+        if save_planning_horizon_to_database({"start_month": horizon_start, "years": int(horizon_length)}):
+            # Reload model data sized to the new horizon on the next page visit
+            st.session_state.pop("model_data", None)
+            st.rerun()
+        else:
+            st.error("❌ Failed to save planning horizon")
 
 # Features Section
 st.markdown('<div class="section-header">✨ Platform Features</div>', unsafe_allow_html=True)
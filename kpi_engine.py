@@ -0,0 +1,191 @@
+import numpy as np
+from typing import Dict, Any, List, Tuple
+
+from cash_engine import get_cash_flow_series
+from model_cache import memoize_by_content
+from payroll_engine import build_activity_matrix
+from segment_store import sparse_from_nested, to_dense
+
+REVENUE_STREAMS = ["Subscription", "Transactional", "Implementation", "Maintenance"]
+
+# Metrics that are summed over a period (everything else is read at a month or averaged)
+ADDITIVE_METRICS = [
+    "Subscription", "Transactional", "Implementation", "Maintenance", "total_revenue",
+    "cogs", "gross_margin", "burn", "gross_burn", "payroll",
+]
+SEGMENT_ADDITIVE_METRICS = ["new_customers", "churn", "positive_price_total", "positive_price_count", "active_months"]
+
+
+def _matrix(source: Dict[str, Any], keys: List[str], months: List[str]) -> np.ndarray:
+    """keys x months array from a {key: {month: value}} dict, missing cells as zero"""
+    rows = []
+    for key in keys:
+        series = source.get(key, {}) if isinstance(source, dict) else {}
+        if not isinstance(series, dict):
+            series = {}
+        rows.append([float(series.get(month, 0) or 0) for month in months])
+    return np.array(rows, dtype=float).reshape(len(keys), len(months))
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    """Cumulative sum along months with a leading zero, so [a, b) totals are prefix[b] - prefix[a]"""
+    pad = [(0, 0)] * (values.ndim - 1) + [(1, 0)]
+    return np.pad(np.cumsum(values, axis=-1), pad)
+
+
+def headcount_series(payroll_data: Dict[str, Any], months: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Active employee count and active contractor resources per month"""
+    employees = list(payroll_data.get("employees", {}).values())
+    employee_active = build_activity_matrix(
+        [(emp.get("hire_date"), emp.get("termination_date")) for emp in employees],
+        tuple(months),
+        [emp.get("active", True) for emp in employees],
+        through_end_of_month=True,
+    )
+
+    contractors = list(payroll_data.get("contractors", {}).values())
+    contractor_active = build_activity_matrix(
+        [(con.get("start_date"), con.get("end_date")) for con in contractors],
+        tuple(months),
+        [True] * len(contractors),
+        through_end_of_month=True,
+    )
+    resources = np.array([float(con.get("resources", 0) or 0) for con in contractors], dtype=float)
+
+    return employee_active.sum(axis=0).astype(float), resources @ contractor_active
+
+
+@memoize_by_content(maxsize=8)
+def build_kpi_cube(
+    revenue: Dict[str, Any],
+    direct_costs: Dict[str, Any],
+    hosting_monthly_expensed: Dict[str, Any],
+    subscription_data: Dict[str, Any],
+    liquidity_data: Dict[str, Any],
+    payroll_data: Dict[str, Any],
+    months: List[str],
+    stakeholders: List[str],
+) -> Dict[str, Any]:
+    """Metric x month series plus stakeholder x month slices for the KPI page"""
+    revenue_matrix = _matrix(revenue, REVENUE_STREAMS, months)
+    total_revenue = revenue_matrix.sum(axis=0)
+
+    hosting_categories = list(hosting_monthly_expensed.keys()) if hosting_monthly_expensed else []
+    cogs = (
+        _matrix(direct_costs, REVENUE_STREAMS, months).sum(axis=0)
+        + _matrix(hosting_monthly_expensed or {}, hosting_categories, months).sum(axis=0)
+    )
+    gross_margin = np.divide(
+        (total_revenue - cogs) * 100, total_revenue,
+        out=np.zeros_like(total_revenue), where=total_revenue > 0,
+    )
+
+    cash = get_cash_flow_series(liquidity_data, months)
+    employees, contractors = headcount_series(payroll_data, months)
+
+    series = {stream: revenue_matrix[i] for i, stream in enumerate(REVENUE_STREAMS)}
+    series.update({
+        "total_revenue": total_revenue,
+        "arr": revenue_matrix[0] * 12,
+        "cogs": cogs,
+        "gross_margin": gross_margin,
+        "burn": cash["burn"],
+        "gross_burn": cash["gross_burn"],
+        "cash_balance": cash["balance"],
+        "payroll": _matrix(liquidity_data.get("expenses", {}), ["Payroll"], months)[0],
+        "employees": employees,
+        "contractors": contractors,
+    })
+
+    # Segment assumptions are sparse, so build the segment matrices from stored cells only
+    def segment_matrix(data_key):
+        return to_dense(sparse_from_nested(subscription_data.get(data_key, {}), months, stakeholders))
+
+    customers = segment_matrix("subscription_running_totals")
+    pricing = segment_matrix("subscription_pricing")
+    segments = {
+        "customers": customers,
+        "new_customers": segment_matrix("subscription_new_customers"),
+        "pricing": pricing,
+        "churn": segment_matrix("subscription_churn_rates"),
+        "positive_price_total": np.where(pricing > 0, pricing, 0.0),
+        "positive_price_count": (pricing > 0).astype(float),
+        "active_months": (customers > 0).astype(float),
+    }
+
+    cube = {
+        "months": list(months),
+        "index": {month: i for i, month in enumerate(months)},
+        "stakeholders": list(stakeholders),
+        "stakeholder_index": {name: i for i, name in enumerate(stakeholders)},
+        "series": series,
+        "prefix": {metric: _prefix(series[metric]) for metric in ADDITIVE_METRICS},
+        "segments": segments,
+        "segment_prefix": {metric: _prefix(segments[metric]) for metric in SEGMENT_ADDITIVE_METRICS},
+    }
+    for group in ("series", "prefix", "segments", "segment_prefix"):
+        for values in cube[group].values():
+            values.flags.writeable = False
+    return cube
+
+
+def get_kpi_cube(model_data: Dict[str, Any], months: List[str], stakeholders: List[str]) -> Dict[str, Any]:
+    """KPI cube for the current model, rebuilt only when its inputs change"""
+    subscription_keys = [
+        "subscription_running_totals", "subscription_new_customers",
+        "subscription_pricing", "subscription_churn_rates",
+    ]
+    return build_kpi_cube(
+        model_data.get("revenue", {}),
+        model_data.get("direct_costs", {}),
+        model_data.get("hosting_monthly_expensed", {}),
+        {key: model_data.get(key, {}) for key in subscription_keys},
+        model_data.get("liquidity_data", {}),
+        model_data.get("payroll_data", {}),
+        months,
+        stakeholders,
+    )
+
+
+def window(cube: Dict[str, Any], months: List[str]) -> Tuple[int, int]:
+    """[start, stop) positions of a contiguous run of months; months outside the horizon are ignored"""
+    positions = [cube["index"][month] for month in months if month in cube["index"]]
+    if not positions:
+        return 0, 0
+    return min(positions), max(positions) + 1
+
+
+def period_total(cube: Dict[str, Any], metric: str, span: Tuple[int, int]) -> float:
+    """Sum of an additive metric over a window"""
+    prefix = cube["prefix"][metric]
+    return float(prefix[span[1]] - prefix[span[0]])
+
+
+def period_mean(cube: Dict[str, Any], metric: str, span: Tuple[int, int]) -> float:
+    """Average monthly value of an additive metric over a window"""
+    length = span[1] - span[0]
+    return period_total(cube, metric, span) / length if length else 0.0
+
+
+def value_at(cube: Dict[str, Any], metric: str, month: str, default: float = 0.0) -> float:
+    """Metric value for a single month"""
+    position = cube["index"].get(month)
+    return float(cube["series"][metric][position]) if position is not None else default
+
+
+def _segment_rows(cube: Dict[str, Any], stakeholders: List[str]) -> List[int]:
+    return [cube["stakeholder_index"][name] for name in stakeholders if name in cube["stakeholder_index"]]
+
+
+def segment_totals(cube: Dict[str, Any], metric: str, stakeholders: List[str], span: Tuple[int, int]) -> np.ndarray:
+    """Per-stakeholder window totals of an additive segment metric"""
+    prefix = cube["segment_prefix"][metric][_segment_rows(cube, stakeholders)]
+    return prefix[:, span[1]] - prefix[:, span[0]]
+
+
+def segment_value_at(cube: Dict[str, Any], metric: str, stakeholders: List[str], month: str) -> float:
+    """Sum of a segment metric across stakeholders for one month"""
+    position = cube["index"].get(month)
+    if position is None:
+        return 0.0
+    return float(cube["segments"][metric][_segment_rows(cube, stakeholders), position].sum())
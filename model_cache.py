@@ -0,0 +1,53 @@
+import hashlib
+import pickle
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+
+def content_fingerprint(*values) -> bytes:
+    """Fast digest of plain model data (dicts, lists, numbers, strings, NumPy arrays)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for value in values:
+        digest.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    return digest.digest()
+
+
+def memoize_by_content(maxsize: int = 16):
+    """Cache a function's result per content fingerprint of its arguments (LRU bounded).
+
+    Cached results are shared between callers, so they must be treated as read-only.
+    The cache is shared by every session thread, so lookups and evictions hold a
+    lock; the function itself runs outside it.
+    """
+    def decorator(func):
+        cache = OrderedDict()
+        lock = threading.Lock()
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                key = content_fingerprint(args, sorted(kwargs.items()))
+            except (pickle.PicklingError, TypeError, AttributeError):
+                # Inputs that cannot be fingerprinted are simply not cached
+                return func(*args, **kwargs)
+            with lock:
+                if key in cache:
+                    cache.move_to_end(key)
+                    return cache[key]
+
+            result = func(*args, **kwargs)
+            with lock:
+                cache[key] = result
+                if len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return result
+
+        def cache_clear():
+            with lock:
+                cache.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
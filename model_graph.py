@@ -0,0 +1,118 @@
+import time
+from typing import Dict, Any, List
+
+from cash_engine import get_cash_flow_series
+from gross_profit_engine import build_gross_profit_series
+from parallel import thread_map
+from payroll_engine import build_employee_roster, calculate_department_shares, calculate_personnel_costs
+from segment_store import build_revenue_model, revenue_inputs, segment_names
+
+# Models this large (employees + contractors + segments + expense categories) are evaluated concurrently
+PARALLEL_MIN_SIZE = 150
+
+
+def _revenue(model_data, months, upstream, options):
+    return build_revenue_model(revenue_inputs(model_data), months)
+
+
+def _hosting(model_data, months, upstream, options):
+    # Hosting and COGS from the freshly built revenue, not the revenue last stored in the model
+    revenue_model = upstream["revenue"]
+    revenue = {stream: dict(zip(months, values.tolist())) for stream, values in revenue_model["streams"].items()}
+    return build_gross_profit_series(revenue, model_data.get("gross_profit_data", {}) or {}, revenue_model["subscription_running_totals"], months)
+
+
+def _roster(model_data, months, upstream, options):
+    # Built once up front so personnel costs and department shares both reuse it
+    return build_employee_roster((model_data.get("payroll_data", {}) or {}).get("employees", {}), months)
+
+
+def _personnel(model_data, months, upstream, options):
+    return calculate_personnel_costs(model_data.get("payroll_data", {}) or {}, months, options.get("default_tax_percentage", 10.0))
+
+
+def _department_shares(model_data, months, upstream, options):
+    return calculate_department_shares(model_data.get("payroll_data", {}) or {}, months)
+
+
+def _expenses(model_data, months, upstream, options):
+    return get_cash_flow_series(model_data.get("liquidity_data", {}) or {}, months, options.get("categories"))
+
+
+# Sub-model nodes: name -> (nodes it needs, function of (model_data, months, upstream results, options))
+SUB_MODELS = {
+    "revenue": ([], _revenue),
+    "hosting": (["revenue"], _hosting),
+    "roster": ([], _roster),
+    "personnel": (["roster"], _personnel),
+    "department_shares": (["roster"], _department_shares),
+    "expenses": ([], _expenses),
+}
+
+
+def model_size(model_data: Dict[str, Any]) -> int:
+    """Rough size of the independent inputs, used to decide whether a thread pool pays off"""
+    payroll = model_data.get("payroll_data", {}) or {}
+    liquidity = model_data.get("liquidity_data", {}) or {}
+    return (
+        len(payroll.get("employees", {}) or {})
+        + len(payroll.get("contractors", {}) or {})
+        + len(segment_names(model_data))
+        + len(liquidity.get("category_order", []) or [])
+    )
+
+
+def _waves(names: List[str]) -> List[List[str]]:
+    """The requested nodes plus everything they need, grouped into waves of mutually independent nodes"""
+    needed, stack = [], list(names)
+    while stack:
+        name = stack.pop()
+        if name not in needed:
+            needed.append(name)
+            stack.extend(SUB_MODELS[name][0])
+    waves, done = [], set()
+    pending = [name for name in SUB_MODELS if name in needed]
+    while pending:
+        wave = [name for name in pending if set(SUB_MODELS[name][0]) <= done]
+        waves.append(wave)
+        done.update(wave)
+        pending = [name for name in pending if name not in done]
+    return waves
+
+
+def evaluate_sub_models(model_data: Dict[str, Any], months: List[str], names: List[str] = None, options: Dict[str, Any] = None, parallel: bool = None) -> Dict[str, Any]:
+    """Evaluate sub-model nodes, running independent nodes of each wave concurrently.
+
+    Nodes run on a thread pool (the engines are NumPy-bound and share this
+    process's content caches) when ``parallel`` is set or, by default, when the
+    model reaches PARALLEL_MIN_SIZE; otherwise one after another. Returns the
+    results, per-node wall-clock seconds and whether any nodes actually ran
+    concurrently; results are the engines' shared cached values, so treat them
+    as read-only.
+    """
+    options = options or {}
+    if parallel is None:
+        parallel = model_size(model_data) >= PARALLEL_MIN_SIZE
+    results, timings = {}, {}
+    started = time.perf_counter()
+
+    def run(name: str):
+        node_started = time.perf_counter()
+        result = SUB_MODELS[name][1](model_data, months, results, options)
+        return result, time.perf_counter() - node_started
+
+    waves = _waves(names or list(SUB_MODELS))
+    for wave in waves:
+        outcomes = thread_map(run, wave) if parallel else [run(name) for name in wave]
+        for name, (result, seconds) in zip(wave, outcomes):
+            results[name] = result
+            timings[name] = seconds
+    # A chain of dependent nodes runs one after another even on the thread pool
+    concurrent = parallel and any(len(wave) > 1 for wave in waves)
+    return {"results": results, "timings": timings, "parallel": concurrent, "total": time.perf_counter() - started}
+
+
+def timing_rows(evaluation: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Per-node timings as table rows, slowest first"""
+    rows = [{"Sub-Model": name.replace("_", " ").title(), "Time (ms)": round(seconds * 1000, 1)} for name, seconds in evaluation["timings"].items()]
+    return sorted(rows, key=lambda row: -row["Time (ms)"])
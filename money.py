@@ -0,0 +1,48 @@
+import numpy as np
+from typing import Dict, Any, List
+
+# Money is held as whole cents in int64 arrays, matching the numeric(15,2) columns
+# in the database; sums and differences of cents are exact
+CENTS_PER_DOLLAR = 100
+
+
+def to_cents(values) -> np.ndarray:
+    """Dollar amounts (scalar or array) as int64 cents, rounded half to even"""
+    return np.rint(np.asarray(values, dtype=float) * CENTS_PER_DOLLAR).astype(np.int64)
+
+
+def from_cents(cents) -> np.ndarray:
+    """int64 cents back to float dollars for display and the dict-of-months model data"""
+    return np.asarray(cents, dtype=np.int64) / CENTS_PER_DOLLAR
+
+
+def cents(value: Any) -> int:
+    """A single dollar amount as integer cents (empty values are zero)"""
+    try:
+        return int(round(float(value or 0) * CENTS_PER_DOLLAR))
+    except (TypeError, ValueError):
+        return 0
+
+
+def round_to_cents(value: Any) -> float:
+    """A single dollar amount rounded to whole cents, for numeric(15,2) columns"""
+    return cents(value) / CENTS_PER_DOLLAR
+
+
+def amounts_differ(old: Any, new: Any) -> bool:
+    """True when two dollar amounts differ by at least one cent"""
+    return cents(old) != cents(new)
+
+
+def cents_row(series: Dict[str, Any], months: List[str]) -> np.ndarray:
+    """A {month: dollars} dict as an int64 cents months array"""
+    series = series if isinstance(series, dict) else {}
+    return to_cents([series.get(month, 0) or 0 for month in months]).reshape(len(months))
+
+
+def cents_matrix(source: Dict[str, Any], keys: List[str], months: List[str]) -> np.ndarray:
+    """keys x months int64 cents array from a {key: {month: dollars}} dict"""
+    source = source if isinstance(source, dict) else {}
+    rows = [cents_row(source.get(key, {}), months) for key in keys]
+    return np.array(rows, dtype=np.int64).reshape(len(keys), len(months))
+
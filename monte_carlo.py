@@ -0,0 +1,99 @@
+import numpy as np
+from typing import Dict, Any, List
+
+from parallel import process_map
+from planning_horizon import beyond_horizon_label
+from scenario_engine import SCENARIO_FIELDS, evaluate_overrides, model_inputs
+
+# Sampling assumptions; all values are percentages relative to the base plan
+DEFAULT_SIMULATION_SETTINGS = {
+    "paths": 20000,
+    "new_customers_sd_pct": 20.0,      # Std. deviation of new-customer volume
+    "churn_sd_pct": 25.0,              # Std. deviation of churn rates
+    "price_sd_pct": 5.0,               # Std. deviation of subscription pricing
+    "expense_overrun_mean_pct": 3.0,   # Average overrun on non-personnel expenses
+    "expense_overrun_sd_pct": 5.0,     # Std. deviation of the overrun
+    "seed": 42,
+}
+
+# Balance percentiles drawn in the fan chart
+FAN_PERCENTILES = [5, 25, 50, 75, 95]
+
+# Runway percentiles reported (P10 is the pessimistic case: 10% of paths run out earlier)
+RUNWAY_PERCENTILES = [10, 50, 90]
+
+# Paths evaluated per worker task; keeps the (paths x segments x months) arrays small
+PATHS_PER_CHUNK = 2500
+
+
+def sample_overrides(settings: Dict[str, Any], count: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """Draw one set of scenario overrides per path"""
+    overrides = {field: np.full(count, float(default)) for field, default in SCENARIO_FIELDS.items()}
+    # Volumes and rates cannot fall below zero, so cap the downside at -100%
+    overrides["new_customers_pct"] = np.maximum(rng.normal(0.0, settings["new_customers_sd_pct"], count), -100.0)
+    overrides["churn_pct"] = np.maximum(rng.normal(0.0, settings["churn_sd_pct"], count), -100.0)
+    overrides["price_pct"] = np.maximum(rng.normal(0.0, settings["price_sd_pct"], count), -100.0)
+    overrides["expense_pct"] = rng.normal(settings["expense_overrun_mean_pct"], settings["expense_overrun_sd_pct"], count)
+    return overrides
+
+
+def _simulate_chunk(inputs: Dict[str, Any], settings: Dict[str, Any], count: int, seed_sequence) -> Dict[str, np.ndarray]:
+    """Worker: sample and evaluate a block of paths, returning balances and depletion months"""
+    rng = np.random.default_rng(seed_sequence)
+    results = evaluate_overrides(inputs, sample_overrides(settings, count, rng))
+    balance = results["balance"]
+
+    # First month at or below zero; paths that never run out get the horizon length
+    depleted = balance <= 0
+    depletion_index = np.where(depleted.any(axis=1), depleted.argmax(axis=1), balance.shape[1])
+    return {"balance": balance.astype(np.float32), "depletion_index": depletion_index}
+
+
+def _chunk_sizes(paths: int) -> List[int]:
+    full, remainder = divmod(paths, PATHS_PER_CHUNK)
+    return [PATHS_PER_CHUNK] * full + ([remainder] if remainder else [])
+
+
+def _runway_label(index: float, months: List[str]) -> str:
+    position = int(np.floor(index))
+    return months[position] if position < len(months) else beyond_horizon_label(months)
+
+
+def run_monte_carlo(model_data: Dict[str, Any], months: List[str], settings: Dict[str, Any] = None, max_workers: int = None) -> Dict[str, Any]:
+    """Simulate many cash-flow paths around the current plan, split across worker processes.
+
+    Every path samples its own new-customer, churn, price and expense changes and
+    is evaluated with the scenario engine. Returns balance percentiles per month
+    (for a fan chart), percentile runway months and the probability of running
+    out of cash within the horizon.
+    """
+    settings = {**DEFAULT_SIMULATION_SETTINGS, **(settings or {})}
+    inputs = model_inputs(model_data, months)
+    chunk_sizes = _chunk_sizes(max(int(settings["paths"]), 1))
+    seeds = np.random.SeedSequence(int(settings["seed"])).spawn(len(chunk_sizes))
+
+    chunks = process_map(
+        _simulate_chunk,
+        [inputs] * len(chunk_sizes), [settings] * len(chunk_sizes), chunk_sizes, seeds,
+        max_workers=max_workers,
+    )
+
+    balance = np.concatenate([chunk["balance"] for chunk in chunks])
+    depletion_index = np.concatenate([chunk["depletion_index"] for chunk in chunks])
+    month_count = len(months)
+
+    return {
+        "months": list(months),
+        "paths": int(balance.shape[0]),
+        "balance_percentiles": {
+            p: values for p, values in zip(FAN_PERCENTILES, np.percentile(balance, FAN_PERCENTILES, axis=0).astype(float))
+        },
+        # Lower percentiles are the earlier (worse) depletion months
+        "runway_percentiles": {
+            p: _runway_label(value, months)
+            for p, value in zip(RUNWAY_PERCENTILES, np.percentile(depletion_index, RUNWAY_PERCENTILES, method="lower"))
+        },
+        "depletion_probability": float(np.mean(depletion_index < month_count)),
+        # Share of paths that have run out of cash by each month
+        "cumulative_depletion": np.bincount(np.minimum(depletion_index, month_count), minlength=month_count + 1)[:month_count].cumsum() / balance.shape[0],
+    }
@@ -2,15 +2,24 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, date
 import calendar
+import html
 import plotly.graph_objects as go
 import plotly.express as px
 from typing import Any
-from database import load_data, save_data, load_data_from_source, save_data_to_source, enable_autosave, auto_save_data
+from database import load_data, save_data, load_data_from_source, save_data_to_source, enable_autosave, auto_save_data, load_scenarios_from_database, get_planning_months, load_formula_lines_from_database
+from planning_horizon import horizon_years
+from segment_store import segment_names
+from cash_engine import get_cash_flow_series, cash_balance_at, burn_at, gross_burn_at, find_runway_month
+from scenario_engine import DEFAULT_SCENARIOS, run_scenarios, scenario_summary
+from kpi_engine import get_kpi_cube, window, period_total, period_mean, value_at, segment_totals, segment_value_at
+from formula_lines import DEFAULT_FORMULA_LINES, aggregate_formula_lines, format_formula_value, model_formula_lines
+from money import from_cents
+from variance_engine import BUDGET_PERIODS, budget_line_key, build_variance, comparison_rows, variance_inputs
 
 # Utility function for consistent category key transformation
 def get_category_key(category_name):
     """Convert category name to consistent key format"""
-    return category_name.lower().replace(" ", "_").replace("&", "and").replace("/", "_")
+    return budget_line_key(category_name)
 
 # Configure page
 st.set_page_config(
@@ -277,21 +286,19 @@ else:
 month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
 prev_month_name = month_names[prev_month - 1]
 
+# Full planning horizon, independent of the selected filters
+all_horizon_months = get_planning_months()
+horizon_year_list = horizon_years(all_horizon_months)
+
 # Set default year index
-year_options = ["2025", "2026", "2027", "2028", "2029", "2030", "All Years"]
+year_options = horizon_year_list + ["All Years"]
 try:
     default_year_index = year_options.index(str(prev_year))
 except ValueError:
-    default_year_index = 0  # Default to 2025 if previous year not in options
-
-# Define all stakeholders from revenue assumptions (exact match)
-all_stakeholders = [
-    "Equipment Manufacturer", "Dealership", "Corporate", "Charging as a Service",
-    "Charging Hardware", "Depot", "End User", "Infrastructure Partner",
-    "Finance Partner", "Fleet Management Company", "Grants", "Logistics",
-    "Non Customer", "OEM", "Service", "Technology Partner",
-    "Upfitter/Distributor", "Utility/Energy Company", "Insurance Company", "Consultant"
-]
+    default_year_index = 0  # Default to the first plan year if previous year not in options
+
+# All revenue segments, as on the Revenue Assumptions page
+all_stakeholders = segment_names(st.session_state.model_data)
 
 col1, col2, col3, col4, col5 = st.columns([0.75, 0.75, 0.75, 0.75, 2.0])
 with col1:
@@ -350,10 +357,7 @@ with col4:
 
 # Generate months list based on selection and calculation type
 if selected_year == "All Years":
-    months = []
-    for year in range(2025, 2031):
-        for month in ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]:
-            months.append(f"{month} {year}")
+    months = list(all_horizon_months)
 else:
     year = selected_year
     if selected_month == "All Months":
@@ -374,170 +378,59 @@ else:
 
 
 
-# Helper functions
+# Helper functions (all read from the KPI cube, built once per model version)
 def calculate_total_revenue(month):
     """Calculate total revenue for a given month"""
-    revenue_streams = ["Subscription", "Transactional", "Implementation", "Maintenance"]
-    total = 0
-    revenue_data = st.session_state.model_data.get("revenue", {})
-    for stream in revenue_streams:
-        total += revenue_data.get(stream, {}).get(month, 0)
-    return total
+    return value_at(kpi_cube, "total_revenue", month)
 
 def calculate_arr(month):
     """Calculate Annual Recurring Revenue based on subscription revenue"""
-    subscription_revenue = st.session_state.model_data.get("revenue", {}).get("Subscription", {}).get(month, 0)
-    return subscription_revenue * 12
+    return value_at(kpi_cube, "arr", month)
 
 def calculate_gross_margin(month):
     """Calculate gross margin percentage"""
-    revenue = calculate_total_revenue(month)
-    cogs = calculate_total_cogs(month)
-    if revenue > 0:
-        return ((revenue - cogs) / revenue) * 100
-    return 0
+    return value_at(kpi_cube, "gross_margin", month)
 
 def calculate_total_cogs(month):
     """Calculate total cost of goods sold"""
-    cogs_streams = ["Subscription", "Transactional", "Implementation", "Maintenance"]
-    total_direct_costs = 0
-    total_hosting_costs = 0
-    
-    # Get direct costs
-    for stream in cogs_streams:
-        total_direct_costs += st.session_state.model_data.get("direct_costs", {}).get(stream, {}).get(month, 0)
-    
-    # Get hosting costs (if available)
-    hosting_data = st.session_state.model_data.get("hosting_monthly_expensed", {})
-    if hosting_data:
-        # Sum all hosting cost categories for the month
-        for category in hosting_data:
-            total_hosting_costs += hosting_data.get(category, {}).get(month, 0)
-    
-    return total_direct_costs + total_hosting_costs
+    return value_at(kpi_cube, "cogs", month)
+
+def get_cash_series():
+    """Cumulative cash-flow series for the full horizon, cached per liquidity content"""
+    return get_cash_flow_series(st.session_state.model_data.get("liquidity_data", {}), all_horizon_months)
 
 def calculate_burn_rate(month):
     """Calculate monthly burn rate (negative cash flow)"""
-    # Get cash flow data from liquidity model
-    liquidity_data = st.session_state.model_data.get("liquidity_data", {})
-    
-    # Cash inflows
-    revenue = liquidity_data.get("revenue", {}).get(month, 0)
-    other_cash_receipts = liquidity_data.get("other_cash_receipts", {}).get(month, 0)
-    investment = liquidity_data.get("investment", {}).get(month, 0)
-    
-    # Cash outflows - get all expense categories
-    expense_categories = liquidity_data.get("category_order", [])
-    expenses = liquidity_data.get("expenses", {})
-    total_expenses = sum(expenses.get(cat, {}).get(month, 0) for cat in expense_categories)
-    
     # Net cash flow (positive means burning cash)
-    net_flow = total_expenses - (revenue + other_cash_receipts + investment)
-    
-    return net_flow
+    return burn_at(cash_series, month)
 
 def calculate_gross_burn(month):
     """Calculate gross burn rate (total expenses)"""
-    # Get cash flow data from liquidity model
-    liquidity_data = st.session_state.model_data.get("liquidity_data", {})
-    
-    # Cash outflows - get all expense categories
-    expense_categories = liquidity_data.get("category_order", [])
-    expenses = liquidity_data.get("expenses", {})
-    total_expenses = sum(expenses.get(cat, {}).get(month, 0) for cat in expense_categories)
-    
-    return total_expenses
+    return gross_burn_at(cash_series, month)
 
 def calculate_cash_balance(month):
     """Calculate cumulative cash balance up to a month"""
-    liquidity_data = st.session_state.model_data.get("liquidity_data", {})
-    
-    # Get initial cash balance
-    initial_cash = liquidity_data.get("starting_balance", 0)
-    
-    # Calculate cumulative cash flow
-    cumulative_flow = initial_cash
-    
-    # Get all months up to the specified month
-    all_months = []
-    for year in range(2025, 2031):
-        for m in ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]:
-            all_months.append(f"{m} {year}")
-    
-    for m in all_months:
-        # Cash inflows
-        revenue = liquidity_data.get("revenue", {}).get(m, 0)
-        other_cash_receipts = liquidity_data.get("other_cash_receipts", {}).get(m, 0)
-        investment = liquidity_data.get("investment", {}).get(m, 0)
-        
-        # Cash outflows
-        expense_categories = liquidity_data.get("category_order", [])
-        expenses = liquidity_data.get("expenses", {})
-        total_expenses = sum(expenses.get(cat, {}).get(m, 0) for cat in expense_categories)
-        
-        cumulative_flow += revenue + other_cash_receipts + investment - total_expenses
-        
-        if m == month:
-            break
-    
-    return cumulative_flow
+    return cash_balance_at(cash_series, month)
 
 def calculate_customer_metrics(month):
     """Calculate customer-related metrics for selected stakeholders"""
-    # Get subscription running totals (active customers after churn)
-    subscription_totals = st.session_state.model_data.get("subscription_running_totals", {})
-    
-    total_customers = 0
-    for stakeholder in selected_stakeholders:  # Use selected stakeholders instead of all
-        total_customers += subscription_totals.get(stakeholder, {}).get(month, 0)
+    # Subscription running totals (active customers after churn) for selected stakeholders
+    total_customers = segment_value_at(kpi_cube, "customers", selected_stakeholders, month)
     
     # Calculate average revenue per customer
-    subscription_revenue = st.session_state.model_data.get("revenue", {}).get("Subscription", {}).get(month, 0)
+    subscription_revenue = value_at(kpi_cube, "Subscription", month)
     arpc = subscription_revenue / total_customers if total_customers > 0 else 0
     
     return total_customers, arpc
 
 def calculate_new_customers_in_period(months_list):
     """Calculate total new customers added during a period"""
-    new_customers_data = st.session_state.model_data.get("subscription_new_customers", {})
-    
-    total_new = 0
-    for stakeholder in selected_stakeholders:
-        for month in months_list:
-            total_new += new_customers_data.get(stakeholder, {}).get(month, 0)
-    
-    return total_new
+    return float(segment_totals(kpi_cube, "new_customers", selected_stakeholders, window(kpi_cube, months_list)).sum())
 
 def calculate_runway_month():
     """Calculate the month when cash runs out based on liquidity data - consistent across all filters"""
-    # Always check all months to find when cash goes negative
-    all_months = []
-    for year in range(2025, 2031):
-        for month in ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]:
-            all_months.append(f"{month} {year}")
-    
-    # Find the first month where cash balance goes negative
-    for month in all_months:
-        balance = calculate_cash_balance(month)
-        if balance <= 0:
-            return month
-    
-    # If we never go negative, check if we're profitable (positive cash flow in recent months)
-    # Check the last few months with data to see if we're generating positive cash flow
-    recent_months = all_months[-12:]  # Last 12 months
-    positive_flow_count = 0
-    
-    for month in reversed(recent_months):
-        burn_rate = calculate_burn_rate(month)
-        if burn_rate <= 0:  # Negative burn rate means generating cash
-            positive_flow_count += 1
-        
-        # If we have 3+ months of positive cash flow, consider it profitable
-        if positive_flow_count >= 3:
-            return "Profitable"
-    
-    # If we never go negative and don't have consistent positive flow, return far future
-    return "Beyond 2030"
+    # Always checks all months, reading the prefix-summed balance series
+    return find_runway_month(cash_series)
 
 def calculate_headcount_metrics(target_month=None):
     """Calculate total headcount from payroll data using date-based activation"""
@@ -553,6 +446,10 @@ def calculate_headcount_metrics(target_month=None):
     else:
         check_month = datetime.now().strftime("%b %Y")
     
+    # Months inside the horizon are precomputed in the KPI cube
+    if check_month in kpi_cube["index"]:
+        return int(value_at(kpi_cube, "employees", check_month)), int(value_at(kpi_cube, "contractors", check_month))
+    
     # Count active employees using date-based logic
     employees = payroll_data.get("employees", {})
     total_employees = 0
@@ -638,27 +535,23 @@ def is_contractor_active_for_month(contractor_data, month_str):
         # If there's any error parsing dates, assume active
         return True
 
+# Full horizon for cash balance and runway, independent of the selected filters
+cash_series = get_cash_series()
+
+# KPI cube: metric x month and stakeholder x month arrays, so filter changes only slice
+kpi_cube = get_kpi_cube(st.session_state.model_data, all_horizon_months, all_stakeholders)
+period_span = window(kpi_cube, months)
+
 # EXECUTIVE SUMMARY
 st.markdown('<div class="section-header">🎯 Executive Summary</div>', unsafe_allow_html=True)
 
-# Calculate key metrics for the selected period
-if selected_year == "All Years":
-    # Calculate totals for all years
-    # Use months list for "All Years" calculation
-    total_revenue = sum(calculate_total_revenue(month) for month in months)
-    avg_gross_margin = sum(calculate_gross_margin(month) for month in months) / len(months) if months else 0
-    latest_arr = calculate_arr(months[-1]) if months else 0
-    latest_cash_balance = calculate_cash_balance(months[-1]) if months else 0
-    avg_burn_rate = sum(calculate_burn_rate(month) for month in months) / len(months) if months else 0
-    total_customers, avg_arpc = calculate_customer_metrics(months[-1]) if months else (0, 0)
-else:
-    # Calculate for specific year using the months list (already handles MTD/YTD logic)
-    total_revenue = sum(calculate_total_revenue(month) for month in months)
-    avg_gross_margin = sum(calculate_gross_margin(month) for month in months) / len(months) if months else 0
-    latest_arr = calculate_arr(months[-1]) if months else 0
-    latest_cash_balance = calculate_cash_balance(months[-1]) if months else 0
-    avg_burn_rate = sum(calculate_burn_rate(month) for month in months) / len(months) if months else 0
-    total_customers, avg_arpc = calculate_customer_metrics(months[-1]) if months else (0, 0)
+# Calculate key metrics for the selected period (MTD, YTD, year or all years) from prefix sums
+total_revenue = period_total(kpi_cube, "total_revenue", period_span)
+avg_gross_margin = period_mean(kpi_cube, "gross_margin", period_span)
+latest_arr = calculate_arr(months[-1]) if months else 0
+latest_cash_balance = calculate_cash_balance(months[-1]) if months else 0
+avg_burn_rate = period_mean(kpi_cube, "burn", period_span)
+total_customers, avg_arpc = calculate_customer_metrics(months[-1]) if months else (0, 0)
 
 # Display executive metrics
 exec_col1, exec_col2, exec_col3, exec_col4 = st.columns(4)
@@ -706,14 +599,14 @@ with exec_col3:
 with exec_col4:
     runway_month = calculate_runway_month()
     # Color based on how far out the runway month is
-    if runway_month in ["Profitable", "Beyond 2030"]:
+    if runway_month == "Profitable" or runway_month.startswith("Beyond"):
         runway_color = "#00D084"  # Green
-    elif "2025" in runway_month:
-        runway_color = "#dc3545"  # Red for 2025 (critical)
-    elif "2026" in runway_month:
-        runway_color = "#FFA500"  # Orange for 2026 (concerning)
+    elif runway_month.endswith(horizon_year_list[0]):
+        runway_color = "#dc3545"  # Red for the first plan year (critical)
+    elif len(horizon_year_list) > 1 and runway_month.endswith(horizon_year_list[1]):
+        runway_color = "#FFA500"  # Orange for the second plan year (concerning)
     else:
-        # 2027+ or other cases
+        # Later years or other cases
         runway_color = "#00D084"  # Green for far out
     
     st.markdown(f"""
@@ -730,7 +623,7 @@ st.markdown('<div class="section-header">💰 Revenue Metrics</div>', unsafe_all
 rev_col1, rev_col2, rev_col3, rev_col4 = st.columns(4)
 
 with rev_col1:
-    subscription_total = sum(st.session_state.model_data.get("revenue", {}).get("Subscription", {}).get(month, 0) for month in months)
+    subscription_total = period_total(kpi_cube, "Subscription", period_span)
     if selected_year == "All Years":
         period_label = "All Years"
     elif selected_month == "All Months":
@@ -752,7 +645,7 @@ with rev_col1:
     """, unsafe_allow_html=True)
 
 with rev_col2:
-    transactional_total = sum(st.session_state.model_data.get("revenue", {}).get("Transactional", {}).get(month, 0) for month in months)
+    transactional_total = period_total(kpi_cube, "Transactional", period_span)
     st.markdown(f"""
     <div class="metric-container">
         <h4>Transactional Revenue</h4>
@@ -762,7 +655,7 @@ with rev_col2:
     """, unsafe_allow_html=True)
 
 with rev_col3:
-    implementation_total = sum(st.session_state.model_data.get("revenue", {}).get("Implementation", {}).get(month, 0) for month in months)
+    implementation_total = period_total(kpi_cube, "Implementation", period_span)
     st.markdown(f"""
     <div class="metric-container">
         <h4>Implementation Revenue</h4>
@@ -772,7 +665,7 @@ with rev_col3:
     """, unsafe_allow_html=True)
 
 with rev_col4:
-    maintenance_total = sum(st.session_state.model_data.get("revenue", {}).get("Maintenance", {}).get(month, 0) for month in months)
+    maintenance_total = period_total(kpi_cube, "Maintenance", period_span)
     st.markdown(f"""
     <div class="metric-container">
         <h4>Maintenance Revenue</h4>
@@ -810,16 +703,11 @@ with cust_col2:
     """, unsafe_allow_html=True)
 
 with cust_col3:
-    # Get average subscription price for selected stakeholders only
-    subscription_prices = []
-    for stakeholder in selected_stakeholders:  # Use selected stakeholders
-        prices = st.session_state.model_data.get("subscription_pricing", {}).get(stakeholder, {})
-        for month in months:
-            price = prices.get(month, 0)
-            if price > 0:
-                subscription_prices.append(price)
+    # Get average subscription price (of months with a price) for selected stakeholders only
+    price_total = segment_totals(kpi_cube, "positive_price_total", selected_stakeholders, period_span).sum()
+    price_count = segment_totals(kpi_cube, "positive_price_count", selected_stakeholders, period_span).sum()
     
-    avg_subscription_price = sum(subscription_prices) / len(subscription_prices) if subscription_prices else 0
+    avg_subscription_price = price_total / price_count if price_count > 0 else 0
     
     st.markdown(f"""
     <div class="metric-container">
@@ -831,47 +719,36 @@ with cust_col3:
 
 with cust_col4:
     # Calculate simple average churn rate for selected stakeholders with subscription revenue
-    total_churn_rates = 0
-    total_months = 0
-    
-    for stakeholder in selected_stakeholders:
-        # Check if this stakeholder has active subscribers based on calculation type
-        customers = st.session_state.model_data.get("subscription_running_totals", {}).get(stakeholder, {})
-        
-        # Determine which months to check for active subscribers
-        if calculation_type == "YTD" and selected_year != "All Years":
-            # For YTD, check if there were subscribers in any month from January through the period
-            if selected_month != "All Months":
-                # YTD for specific month: Jan through selected month
-                month_list = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-                selected_month_index = month_list.index(selected_month)
-                ytd_months = [f"{month} {selected_year}" for month in month_list[:selected_month_index + 1]]
-            else:
-                # YTD for "All Months": Jan through current month or all months
-                current_month = datetime.now().strftime("%b")
-                month_list = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-                try:
-                    current_month_index = month_list.index(current_month)
-                    if selected_year == str(datetime.now().year):
-                        ytd_months = [f"{month} {selected_year}" for month in month_list[:current_month_index + 1]]
-                    else:
-                        ytd_months = [f"{month} {selected_year}" for month in month_list]
-                except ValueError:
-                    ytd_months = [f"{month} {selected_year}" for month in month_list]
-            
-            has_active_subscribers = any(customers.get(month, 0) > 0 for month in ytd_months)
+    # Determine which months to check for active subscribers
+    if calculation_type == "YTD" and selected_year != "All Years":
+        # For YTD, check if there were subscribers in any month from January through the period
+        if selected_month != "All Months":
+            # YTD for specific month: Jan through selected month
+            month_list = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+            selected_month_index = month_list.index(selected_month)
+            ytd_months = [f"{month} {selected_year}" for month in month_list[:selected_month_index + 1]]
         else:
-            # For MTD, Full Year, or All Years, check the actual analysis period
-            has_active_subscribers = any(customers.get(month, 0) > 0 for month in months)
-        
-        # Only include stakeholders with active subscribers in churn calculation
-        if has_active_subscribers:
-            churns = st.session_state.model_data.get("subscription_churn_rates", {}).get(stakeholder, {})
-            
-            for month in months:
-                churn_rate = churns.get(month, 0)
-                total_churn_rates += churn_rate
-                total_months += 1
+            # YTD for "All Months": Jan through current month or all months
+            current_month = datetime.now().strftime("%b")
+            month_list = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+            try:
+                current_month_index = month_list.index(current_month)
+                if selected_year == str(datetime.now().year):
+                    ytd_months = [f"{month} {selected_year}" for month in month_list[:current_month_index + 1]]
+                else:
+                    ytd_months = [f"{month} {selected_year}" for month in month_list]
+            except ValueError:
+                ytd_months = [f"{month} {selected_year}" for month in month_list]
+        activity_span = window(kpi_cube, ytd_months)
+    else:
+        # For MTD, Full Year, or All Years, check the actual analysis period
+        activity_span = period_span
+    
+    # Only include stakeholders with active subscribers in churn calculation
+    has_active_subscribers = segment_totals(kpi_cube, "active_months", selected_stakeholders, activity_span) > 0
+    churn_totals = segment_totals(kpi_cube, "churn", selected_stakeholders, period_span)
+    total_churn_rates = float(churn_totals[has_active_subscribers].sum())
+    total_months = int(has_active_subscribers.sum()) * len(months)
     
     # Calculate simple average churn
     if total_months > 0:
@@ -915,16 +792,7 @@ with ops_col1:
 
 with ops_col2:
     # Calculate average gross burn (total expenses without revenue offset)
-    liquidity_data = st.session_state.model_data.get("liquidity_data", {})
-    expense_categories = liquidity_data.get("category_order", [])
-    expenses = liquidity_data.get("expenses", {})
-    
-    total_gross_burn = 0
-    for month in months:
-        monthly_expenses = sum(expenses.get(cat, {}).get(month, 0) for cat in expense_categories)
-        total_gross_burn += monthly_expenses
-    
-    avg_gross_burn = total_gross_burn / len(months) if months else 0
+    avg_gross_burn = period_mean(kpi_cube, "gross_burn", period_span)
     
     st.markdown(f"""
     <div class="metric-container">
@@ -962,7 +830,7 @@ with ops_col4:
 
 with ops_col5:
     # Calculate payroll as % of revenue
-    payroll_total = sum(st.session_state.model_data.get("liquidity_data", {}).get("expenses", {}).get("Payroll", {}).get(month, 0) for month in months)
+    payroll_total = period_total(kpi_cube, "payroll", period_span)
     payroll_percentage = (payroll_total / total_revenue * 100) if total_revenue > 0 else 0
     
     st.markdown(f"""
@@ -973,6 +841,32 @@ with ops_col5:
     </div>
     """, unsafe_allow_html=True)
 
+# FORMULA LINE ITEMS (defined on the Income Statement page)
+if "formula_lines" not in st.session_state.model_data:
+    st.session_state.model_data["formula_lines"] = load_formula_lines_from_database() or [dict(line) for line in DEFAULT_FORMULA_LINES]
+
+formula_lines, formula_input_series, formula_results = model_formula_lines(st.session_state.model_data, all_horizon_months)
+if formula_results["order"]:
+    st.markdown('<div class="section-header">🧮 Formula Line Items</div>', unsafe_allow_html=True)
+    
+    # Sum lines add up their months in the selected period; Ratio lines are recalculated on period totals
+    period_formula_values = aggregate_formula_lines(
+        formula_lines, formula_input_series, formula_results,
+        lambda values: values[..., period_span[0]:period_span[1]].sum(axis=-1)
+    )
+    formula_line_items = [line for line in formula_lines if line["name"] in period_formula_values]
+    for row_start in range(0, len(formula_line_items), 4):
+        formula_cols = st.columns(4)
+        for formula_col, line in zip(formula_cols, formula_line_items[row_start:row_start + 4]):
+            with formula_col:
+                st.markdown(f"""
+                <div class="metric-container">
+                    <h4>{html.escape(line["name"])}</h4>
+                    <h2>{format_formula_value(float(period_formula_values[line["name"]]), line["format"])}</h2>
+                    <p>{html.escape(line["expression"])}</p>
+                </div>
+                """, unsafe_allow_html=True)
+
 # CUSTOMER BREAKDOWN
 if selected_customer_filter == "All Customer Types":
     # Show breakdown by type when viewing all
@@ -981,7 +875,7 @@ if selected_customer_filter == "All Customer Types":
     # Create breakdown data
     customer_breakdown_data = []
     for stakeholder in all_stakeholders:
-        count = st.session_state.model_data.get("subscription_running_totals", {}).get(stakeholder, {}).get(months[-1] if months else "", 0)
+        count = segment_value_at(kpi_cube, "customers", [stakeholder], months[-1] if months else "")
         if count > 0:
             customer_breakdown_data.append({
                 'Customer Type': stakeholder,
@@ -1089,6 +983,35 @@ else:
         </div>
         """, unsafe_allow_html=True)
 
+# SCENARIO COMPARISON
+st.markdown('<div class="section-header">🧪 Scenario Comparison</div>', unsafe_allow_html=True)
+
+# Scenarios are defined on the Liquidity page; all of them are evaluated in one batch
+if "scenarios" not in st.session_state.model_data:
+    st.session_state.model_data["scenarios"] = load_scenarios_from_database() or [dict(scenario) for scenario in DEFAULT_SCENARIOS]
+kpi_scenarios = st.session_state.model_data["scenarios"] or DEFAULT_SCENARIOS
+kpi_scenario_results = run_scenarios(st.session_state.model_data, all_horizon_months, kpi_scenarios)
+scenario_start, scenario_stop = period_span
+
+scenario_cols = st.columns(min(4, len(kpi_scenario_results["names"])) or 1)
+for i, name in enumerate(kpi_scenario_results["names"][:4]):
+    scenario_runway = kpi_scenario_results["runway"][i]
+    scenario_net_income = float(kpi_scenario_results["net_income"][i][scenario_start:scenario_stop].sum())
+    runway_color = "#00D084" if scenario_runway == "Profitable" or scenario_runway.startswith("Beyond") else "#dc3545"
+    income_color = "#00D084" if scenario_net_income >= 0 else "#dc3545"
+    with scenario_cols[i]:
+        st.markdown(f"""
+        <div class="metric-container">
+            <h4>{name}</h4>
+            <h2 style="color: {runway_color};">{scenario_runway}</h2>
+            <p>Cash runway<br>Net income: <span style="color: {income_color};">${scenario_net_income:,.0f}</span><br><small>Period: {period_label}</small></p>
+        </div>
+        """, unsafe_allow_html=True)
+
+if len(kpi_scenario_results["names"]) > 4:
+    with st.expander("View all scenarios"):
+        st.dataframe(pd.DataFrame(scenario_summary(kpi_scenario_results)), use_container_width=True, hide_index=True)
+
 # TREND ANALYSIS
 st.markdown('<div class="section-header">📈 Trend Analysis</div>', unsafe_allow_html=True)
 
@@ -1109,10 +1032,10 @@ with chart_tab1:
     for month in trend_months:
         revenue_data.append({
             'Month': month,
-            'Subscription': st.session_state.model_data.get("revenue", {}).get("Subscription", {}).get(month, 0),
-            'Implementation': st.session_state.model_data.get("revenue", {}).get("Implementation", {}).get(month, 0),
-            'Transactional': st.session_state.model_data.get("revenue", {}).get("Transactional", {}).get(month, 0),
-            'Maintenance': st.session_state.model_data.get("revenue", {}).get("Maintenance", {}).get(month, 0)
+            'Subscription': value_at(kpi_cube, "Subscription", month),
+            'Implementation': value_at(kpi_cube, "Implementation", month),
+            'Transactional': value_at(kpi_cube, "Transactional", month),
+            'Maintenance': value_at(kpi_cube, "Maintenance", month)
         })
     
     if revenue_data:
@@ -1347,15 +1270,15 @@ elif st.session_state.model_data["budget_data"] is None:
 budget_col1, budget_col2, budget_col3, budget_col4 = st.columns([1.2, 1.2, 1.2, 1.2])
 
 with budget_col1:
-    # All years from 2025-2030 (independent of main dashboard filters)
-    all_budget_years = ["2025", "2026", "2027", "2028", "2029", "2030"]
+    # All years of the planning horizon (independent of main dashboard filters)
+    all_budget_years = list(horizon_year_list)
     
-    # Default to current year or 2025
+    # Default to current year or the first plan year
     current_year = datetime.now().year
     try:
         default_year_index = all_budget_years.index(str(current_year))
     except ValueError:
-        default_year_index = 0  # Default to 2025
+        default_year_index = 0  # Default to the first plan year
     
     budget_selected_year = st.selectbox(
         "Budget Year",
@@ -1395,9 +1318,9 @@ with budget_col2:
 with budget_col3:
     budget_calculation_type = st.selectbox(
         "Budget Analysis Type",
-        ["MTD", "YTD"],
-        index=1,  # Default to YTD
-        help="MTD = Month-to-Date, YTD = Year-to-Date",
+        BUDGET_PERIODS,
+        index=BUDGET_PERIODS.index("YTD"),
+        help="MTD = Month-to-Date, QTD = Quarter-to-Date, YTD = Year-to-Date, FY = Full Year",
         key="budget_calculation_filter"
     )
 
@@ -1415,7 +1338,7 @@ budget_period = budget_calculation_type
 if budget_period == "MTD":
     budget_month = budget_selected_month
 else:
-    budget_month = "YTD"
+    budget_month = budget_period
 
 # Helper function to save budget data to Supabase
 def save_budget_to_supabase():
@@ -1451,16 +1374,19 @@ def initialize_liquidity_data_for_budget():
         st.session_state.model_data["liquidity_data"]["expenses"] = {}
         
         # Create default months
-        months = []
-        for year in range(2025, 2031):
-            for month in ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]:
-                months.append(f"{month} {year}")
+        months = list(all_horizon_months)
         
         # Initialize each category with zero values for all months
         for category in st.session_state.model_data["liquidity_data"]["category_order"]:
             if category not in st.session_state.model_data["liquidity_data"]["expenses"]:
                 st.session_state.model_data["liquidity_data"]["expenses"][category] = {month: 0 for month in months}
 
+def get_budget_variance():
+    """Budget vs actual for every line, period and month (cached until budgets or actuals change)"""
+    expense_categories = st.session_state.model_data.get("liquidity_data", {}).get("category_order", [])
+    lines, budget, actual = variance_inputs(st.session_state.model_data, all_horizon_months, expense_categories)
+    return build_variance(lines, budget, actual, all_horizon_months), lines, actual
+
 # Function to get actual values from cash disbursements (liquidity tab)
 def get_actual_values(period_type, month_or_period):
     """Get actual values for budget comparison from cash disbursements in liquidity tab"""
@@ -1468,112 +1394,29 @@ def get_actual_values(period_type, month_or_period):
     # Initialize liquidity data structure if not exists
     initialize_liquidity_data_for_budget()
     
-    # Get dynamic expense categories from liquidity tab
-    expense_categories = st.session_state.model_data.get("liquidity_data", {}).get("category_order", [])
-    
-    if period_type == "MTD":
-        # MTD actuals (single month)
-        month = month_or_period
-        actuals = {
-            # Revenue - get from main revenue data
-            "subscription_revenue": st.session_state.model_data.get("revenue", {}).get("Subscription", {}).get(month, 0),
-            "transactional_revenue": st.session_state.model_data.get("revenue", {}).get("Transactional", {}).get(month, 0),
-            "implementation_revenue": st.session_state.model_data.get("revenue", {}).get("Implementation", {}).get(month, 0),
-            "maintenance_revenue": st.session_state.model_data.get("revenue", {}).get("Maintenance", {}).get(month, 0),
-        }
-        
-        # Add dynamic expenses from cash disbursements (liquidity data)
-        for category in expense_categories:
-            category_key = get_category_key(category)
-            # Pull from liquidity_data.expenses which mirrors the cash disbursements table
-            actual_amount = st.session_state.model_data.get("liquidity_data", {}).get("expenses", {}).get(category, {}).get(month, 0)
-            actuals[category_key] = actual_amount
-        
-        return actuals
-    else:
-        # YTD actuals - sum across ytd_months
-        actuals = {
-            "subscription_revenue": 0,
-            "transactional_revenue": 0,
-            "implementation_revenue": 0,
-            "maintenance_revenue": 0,
-        }
-        
-        # Initialize dynamic expense categories
-        for category in expense_categories:
-            category_key = get_category_key(category)
-            actuals[category_key] = 0
-        
-        # Sum across all months in the period
-        for month in month_or_period:
-            # Sum revenue
-            actuals["subscription_revenue"] += st.session_state.model_data.get("revenue", {}).get("Subscription", {}).get(month, 0)
-            actuals["transactional_revenue"] += st.session_state.model_data.get("revenue", {}).get("Transactional", {}).get(month, 0)
-            actuals["implementation_revenue"] += st.session_state.model_data.get("revenue", {}).get("Implementation", {}).get(month, 0)
-            actuals["maintenance_revenue"] += st.session_state.model_data.get("revenue", {}).get("Maintenance", {}).get(month, 0)
-            
-            # Sum expenses from cash disbursements
-            for category in expense_categories:
-                category_key = get_category_key(category)
-                actual_amount = st.session_state.model_data.get("liquidity_data", {}).get("expenses", {}).get(category, {}).get(month, 0)
-                actuals[category_key] += actual_amount
-        
-        return actuals
+    # Sum the aligned line x month actuals over the period's horizon months
+    period_months = [month_or_period] if period_type == "MTD" else month_or_period
+    positions = [i for i, month in enumerate(all_horizon_months) if month in period_months]
+    _, lines, actual = get_budget_variance()
+    totals = from_cents(actual[:, positions].sum(axis=1))
+    return {line["key"]: value for line, value in zip(lines, totals.tolist())}
 
-# Get actual values using budget filters (independent of main dashboard filters)
-if budget_period == "MTD":
-    budget_months = [budget_selected_month]
-else:
-    # Get YTD months for the selected year (independent of main filters)
-    budget_month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-    selected_month_name = budget_selected_month.split(" ")[0]
-    try:
-        selected_month_index = budget_month_names.index(selected_month_name)
-        budget_months = [f"{month} {budget_selected_year}" for month in budget_month_names[:selected_month_index + 1]]
-    except ValueError:
-        budget_months = [f"{month} {budget_selected_year}" for month in budget_month_names]
-
-actuals = get_actual_values(budget_period, budget_selected_month if budget_period == "MTD" else budget_months)
+# Line x month budgets and actuals, sliced to the period ending at the budget month (independent of main dashboard filters)
+initialize_liquidity_data_for_budget()
+budget_variance, _, _ = get_budget_variance()
+budget_month_index = all_horizon_months.index(budget_selected_month) if budget_selected_month in all_horizon_months else None
+period_rows = comparison_rows(budget_variance, budget_period, budget_month_index)
 
-# Get budget key based on period and handle YTD aggregation
+# Get budget key based on period; multi-month periods show the aggregated monthly budgets
 if budget_period == "MTD":
     budget_key = f"{budget_selected_month}_budget"
 else:
-    # For YTD, we need to aggregate monthly data
-    budget_key = f"{budget_selected_year}_ytd_budget"
-    
-    # Create YTD budget by aggregating monthly budgets
-    budget_month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-    selected_month_name = budget_selected_month.split(" ")[0]
-    
-    try:
-        selected_month_index = budget_month_names.index(selected_month_name)
-        ytd_months = [f"{month} {budget_selected_year}_budget" for month in budget_month_names[:selected_month_index + 1]]
-        
-        # Initialize YTD budget if it doesn't exist
-        if budget_key not in st.session_state.model_data["budget_data"]["monthly_budgets"]:
-            st.session_state.model_data["budget_data"]["monthly_budgets"][budget_key] = {}
-        
-        # Aggregate monthly budgets into YTD
-        ytd_budget = {}
-        for month_key in ytd_months:
-            if month_key in st.session_state.model_data["budget_data"]["monthly_budgets"]:
-                monthly_budget = st.session_state.model_data["budget_data"]["monthly_budgets"][month_key]
-                for category, amount in monthly_budget.items():
-                    if category not in ytd_budget:
-                        ytd_budget[category] = 0
-                    ytd_budget[category] += float(amount or 0)
-        
-        # Update the YTD budget with aggregated values
-        st.session_state.model_data["budget_data"]["monthly_budgets"][budget_key] = ytd_budget
-        
-    except ValueError:
-        # If month parsing fails, use current YTD budget or initialize empty
-        if budget_key not in st.session_state.model_data["budget_data"]["monthly_budgets"]:
-            st.session_state.model_data["budget_data"]["monthly_budgets"][budget_key] = {}
+    budget_key = f"{budget_selected_year}_{budget_period.lower()}_budget"
+    st.session_state.model_data["budget_data"]["monthly_budgets"][budget_key] = {
+        line["key"]: row["Budget"] for line, row in zip(budget_variance["lines"], period_rows) if line["key"]
+    }
 
-# Initialize liquidity data structure to ensure cash disbursements data is available
-initialize_liquidity_data_for_budget()
+cash_series = get_cash_series()  # Cache hit unless default categories were just created
 
 # Get dynamic expense categories from liquidity tab (now guaranteed to exist)
 expense_categories = st.session_state.model_data.get("liquidity_data", {}).get("category_order", [])
@@ -1626,10 +1469,7 @@ elif budget_input_method == "Sync with Model":
     
     with sync_col1:
         # Effective month picker
-        all_months = []
-        for year in range(2025, 2031):
-            for month in ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]:
-                all_months.append(f"{month} {year}")
+        all_months = list(all_horizon_months)
         
         # Default to current month or closest available
         current_month = datetime.now().strftime("%b %Y")
@@ -1652,10 +1492,7 @@ elif budget_input_method == "Sync with Model":
                 # Sync budget data from selected month forward
                 
                 # Get all months from the model
-                all_months = []
-                for year in range(2025, 2031):
-                    for month in ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]:
-                        all_months.append(f"{month} {year}")
+                all_months = list(all_horizon_months)
                 
                 # Find the effective month index
                 effective_month_idx = all_months.index(effective_month) if effective_month in all_months else 0
@@ -1783,7 +1620,7 @@ budget_values = st.session_state.model_data["budget_data"]["monthly_budgets"][bu
 
 if budget_input_method == "Manual Entry":
     # Show budget inputs for both MTD and YTD (YTD will be read-only)
-    is_readonly = (budget_period == "YTD")
+    is_readonly = (budget_period != "MTD")
     
     # Revenue Inputs (Collapsible)
     with st.expander("💰 Revenue Inputs", expanded=False):
@@ -1898,107 +1735,17 @@ st.markdown("Budget vs Actual Analysis:")
 
 # Budget values are already defined above
 
-# Ensure we have consistent expense categories for comparison
-default_categories = [
-    "Payroll", "Contractors", "License Fees", "Travel", "Shows", "Associations", 
-    "Marketing", "Company Vehicle", "Grant Writer", "Insurance", "Legal / Professional Fees",
-    "Permitting/Fees/Licensing", "Shared Services", "Consultants/Audit/Tax", "Pritchard Amex", "Contingencies"
-]
-expense_categories = st.session_state.model_data.get("liquidity_data", {}).get("category_order", default_categories)
-
-# Ensure categories are unique to prevent duplicates
-expense_categories = list(dict.fromkeys(expense_categories)) if expense_categories else default_categories
-
-# Create comparison data
-comparison_data = []
-
-# Cash Receipts (Revenue)
-comparison_data.append({
-    "Category": "Cash Receipts",
-    "Item": "Subscription Revenue",
-    "Budget": budget_values["subscription_revenue"],
-    "Actual": actuals["subscription_revenue"],
-    "Variance": actuals["subscription_revenue"] - budget_values["subscription_revenue"],
-    "Variance %": ((actuals["subscription_revenue"] - budget_values["subscription_revenue"]) / budget_values["subscription_revenue"] * 100) if budget_values["subscription_revenue"] != 0 else 0
-})
-
-comparison_data.append({
-    "Category": "Cash Receipts",
-    "Item": "Transactional Revenue",
-    "Budget": budget_values["transactional_revenue"],
-    "Actual": actuals["transactional_revenue"],
-    "Variance": actuals["transactional_revenue"] - budget_values["transactional_revenue"],
-    "Variance %": ((actuals["transactional_revenue"] - budget_values["transactional_revenue"]) / budget_values["transactional_revenue"] * 100) if budget_values["transactional_revenue"] != 0 else 0
-})
-
-comparison_data.append({
-    "Category": "Cash Receipts",
-    "Item": "Implementation Revenue",
-    "Budget": budget_values["implementation_revenue"],
-    "Actual": actuals["implementation_revenue"],
-    "Variance": actuals["implementation_revenue"] - budget_values["implementation_revenue"],
-    "Variance %": ((actuals["implementation_revenue"] - budget_values["implementation_revenue"]) / budget_values["implementation_revenue"] * 100) if budget_values["implementation_revenue"] != 0 else 0
-})
-
-comparison_data.append({
-    "Category": "Cash Receipts",
-    "Item": "Maintenance Revenue",
-    "Budget": budget_values["maintenance_revenue"],
-    "Actual": actuals["maintenance_revenue"],
-    "Variance": actuals["maintenance_revenue"] - budget_values["maintenance_revenue"],
-    "Variance %": ((actuals["maintenance_revenue"] - budget_values["maintenance_revenue"]) / budget_values["maintenance_revenue"] * 100) if budget_values["maintenance_revenue"] != 0 else 0
-})
-
-# Total Receipts
-total_budget_receipts = sum([budget_values["subscription_revenue"], budget_values["transactional_revenue"], budget_values["implementation_revenue"], budget_values["maintenance_revenue"]])
-total_actual_receipts = sum([actuals["subscription_revenue"], actuals["transactional_revenue"], actuals["implementation_revenue"], actuals["maintenance_revenue"]])
-
-comparison_data.append({
-    "Category": "Cash Receipts",
-    "Item": "Total Receipts",
-    "Budget": total_budget_receipts,
-    "Actual": total_actual_receipts,
-    "Variance": total_actual_receipts - total_budget_receipts,
-    "Variance %": ((total_actual_receipts - total_budget_receipts) / total_budget_receipts * 100) if total_budget_receipts != 0 else 0
-})
-
-# Cash Payments (Expenses) - Dynamic from Liquidity Tab Cash Disbursements
-for category in expense_categories:
-    category_key = get_category_key(category)
-    comparison_data.append({
-        "Category": "Cash Payments",
-        "Item": category,  # Expense category name from cash disbursements
-        "Budget": budget_values.get(category_key, 0),  # Budget amount you entered
-        "Actual": actuals.get(category_key, 0),  # Actual amount from liquidity tab cash disbursements
-        "Variance": actuals.get(category_key, 0) - budget_values.get(category_key, 0),
-        "Variance %": ((actuals.get(category_key, 0) - budget_values.get(category_key, 0)) / budget_values.get(category_key, 0) * 100) if budget_values.get(category_key, 0) != 0 else 0
-    })
+# Budget, actual and variance of every line for the selected period, sliced from the variance arrays
+budget_variance, _, _ = get_budget_variance()
+comparison_data = comparison_rows(budget_variance, budget_period, budget_month_index)
+totals = {item["Item"]: item for item in comparison_data if item["Item"] in ("Total Receipts", "Total Payments", "Net Cash Flow")}
 
-# Total Payments
-total_budget_payments = sum([budget_values.get(get_category_key(category), 0) for category in expense_categories])
-total_actual_payments = sum([actuals.get(get_category_key(category), 0) for category in expense_categories])
-
-comparison_data.append({
-    "Category": "Cash Payments",
-    "Item": "Total Payments",
-    "Budget": total_budget_payments,
-    "Actual": total_actual_payments,
-    "Variance": total_actual_payments - total_budget_payments,
-    "Variance %": ((total_actual_payments - total_budget_payments) / total_budget_payments * 100) if total_budget_payments != 0 else 0
-})
-
-# Net Position
-net_budget = total_budget_receipts - total_budget_payments
-net_actual = total_actual_receipts - total_actual_payments
-
-comparison_data.append({
-    "Category": "Net Position",
-    "Item": "Net Cash Flow",
-    "Budget": net_budget,
-    "Actual": net_actual,
-    "Variance": net_actual - net_budget,
-    "Variance %": ((net_actual - net_budget) / abs(net_budget) * 100) if net_budget != 0 else 0
-})
+total_budget_receipts = totals["Total Receipts"]["Budget"]
+total_actual_receipts = totals["Total Receipts"]["Actual"]
+total_budget_payments = totals["Total Payments"]["Budget"]
+total_actual_payments = totals["Total Payments"]["Actual"]
+net_budget = totals["Net Cash Flow"]["Budget"]
+net_actual = totals["Net Cash Flow"]["Actual"]
 
 # Create DataFrame
 df_comparison = pd.DataFrame(comparison_data)
@@ -2224,18 +1971,18 @@ with insights_col1:
     if total_customers > 100:
         st.success(f"✓ Achieved {int(total_customers)} dealer milestone")
     
-    if runway_month in ["Profitable", "Beyond 2030"]:
+    if runway_month == "Profitable" or runway_month.startswith("Beyond"):
         st.success("✓ Healthy cash flow - excellent runway")
-    elif "2027" in runway_month or "2028" in runway_month or "2029" in runway_month or "2030" in runway_month:
+    elif runway_month.split(" ")[-1] in horizon_year_list[2:]:
         st.success(f"✓ Healthy cash runway until {runway_month}")
 
 with insights_col2:
     st.markdown("### 🔴 Areas of Attention")
     
     # Check for areas needing attention
-    if "2025" in runway_month:
+    if runway_month.endswith(horizon_year_list[0]):
         st.error(f"⚠️ Critical: Cash runs out in {runway_month}")
-    elif "2026" in runway_month:
+    elif len(horizon_year_list) > 1 and runway_month.endswith(horizon_year_list[1]):
         st.warning(f"⚠️ Concerning: Cash runs out in {runway_month}")
     
     if avg_burn_rate > 500000:
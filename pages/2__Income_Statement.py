@@ -2,7 +2,13 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, date
 import plotly.graph_objects as go
-from database import load_data, save_data, load_data_from_source, save_data_to_source, show_supabase_access_info, save_all_to_supabase_enhanced, save_income_statement_to_database, clean_up_cash_disbursement_categories, save_revenue_calculations_to_database
+from planning_horizon import horizon_years
+from rollups import group_months_by_year, rollup, yearly_by_label
+from formula_lines import DEFAULT_FORMULA_LINES, FORMULA_COLUMNS, FORMULA_FORMATS, PERIOD_MODES, aggregate_formula_lines, format_formula_value, formula_lines_to_rows, model_formula_lines, rows_to_formula_lines
+from model_graph import evaluate_sub_models, timing_rows
+from cash_engine import sga_from_liquidity
+from segment_store import build_revenue_model, revenue_inputs
+from database import load_data, save_data, load_data_from_source, save_data_to_source, show_supabase_access_info, save_all_to_supabase_enhanced, save_income_statement_to_database, clean_up_cash_disbursement_categories, save_revenue_calculations_to_database, get_planning_months, load_formula_lines_from_database, save_formula_lines_to_database
 
 # Configure page
 st.set_page_config(
@@ -474,15 +480,8 @@ st.markdown("""
 if 'model_data' not in st.session_state:
     st.session_state.model_data = load_data_from_source()
 
-# Generate months from 2025-2030
-def get_months_2025_2030():
-    months = []
-    for year in range(2025, 2031):
-        for month in range(1, 13):
-            months.append(f"{date(year, month, 1).strftime('%b %Y')}")
-    return months
-
-months = get_months_2025_2030()
+# Months of the configured planning horizon
+months = get_planning_months()
 
 # Helper function to format numbers with commas
 def format_number(num):
@@ -516,80 +515,10 @@ def get_year_from_month(month_str):
     """Extract year from month string like 'Jan 2025'"""
     return month_str.split(' ')[1]
 
-# Helper function to group months by year
-def group_months_by_year(months):
-    """Group months by year and return dict"""
-    years = {}
-    for month in months:
-        year = get_year_from_month(month)
-        if year not in years:
-            years[year] = []
-        years[year].append(month)
-    return years
+# Revenue and hosting sub-models, evaluated up front (hosting needs revenue, so one after the other)
+sub_models = evaluate_sub_models(st.session_state.model_data, months, ["revenue", "hosting"])
 
 # Auto-load COGS from Gross Profit model
-def get_active_subscribers(month):
-    """Get total active subscribers for a given month from revenue assumptions"""
-    if "subscription_running_totals" not in st.session_state.model_data:
-        return 0
-    
-    total_subscribers = 0
-    for stakeholder, monthly_data in st.session_state.model_data["subscription_running_totals"].items():
-        total_subscribers += monthly_data.get(month, 0)
-    
-    return total_subscribers
-
-def calculate_hosting_costs_from_gross_profit_model():
-    """Calculate hosting costs based on gross profit model monthly structure"""
-    # Get hosting costs from model_settings data (loaded via load_data)
-    gp_data = st.session_state.model_data.get("gross_profit_data", {})
-    
-    # Get hosting structure
-    hosting_structure = gp_data.get("saas_hosting_structure", {
-        "fixed_monthly_cost": 15400.0,  # Legacy fallback
-        "cost_per_customer": 5.0,       # Legacy fallback
-        "go_live_month": "Jan 2025",
-        "capitalize_before_go_live": True
-    })
-    
-    # Get monthly data (new structure)
-    monthly_fixed_costs = hosting_structure.get("monthly_fixed_costs", {})
-    monthly_variable_costs = hosting_structure.get("monthly_variable_costs", {})
-    go_live_month = hosting_structure.get("go_live_month", "Jan 2025")
-    capitalize_before_go_live = hosting_structure.get("capitalize_before_go_live", True)
-    
-    # Fallback to legacy structure if monthly data not available
-    legacy_fixed = hosting_structure.get("fixed_monthly_cost", 15400.0)
-    legacy_variable = hosting_structure.get("cost_per_customer", 5.0)
-    
-    hosting_costs = {}
-    capitalized_hosting = {}
-    
-    # Find go-live month index
-    try:
-        go_live_index = months.index(go_live_month)
-    except ValueError:
-        go_live_index = 0  # Default to first month if invalid
-    
-    for i, month in enumerate(months):
-        active_subscribers = get_active_subscribers(month)
-        
-        # Use monthly data if available, otherwise use legacy values
-        fixed_cost = monthly_fixed_costs.get(month, legacy_fixed)
-        variable_cost = monthly_variable_costs.get(month, legacy_variable)
-        
-        calculated_cost = fixed_cost + (variable_cost * active_subscribers)
-        
-        # Determine if costs should be capitalized or expensed
-        if capitalize_before_go_live and i < go_live_index:
-            hosting_costs[month] = 0  # No COGS before go-live
-            capitalized_hosting[month] = calculated_cost
-        else:
-            hosting_costs[month] = calculated_cost
-            capitalized_hosting[month] = 0
-    
-    return hosting_costs, capitalized_hosting
-
 def auto_calculate_cogs_from_gross_profit_model():
     """Auto-calculate COGS from gross profit model data every time"""
     if "revenue" not in st.session_state.model_data:
@@ -599,147 +528,42 @@ def auto_calculate_cogs_from_gross_profit_model():
     if "gross_profit_data" not in st.session_state.model_data:
         return
     
-    revenue_data = st.session_state.model_data.get("revenue", {})
-    gp_data = st.session_state.model_data.get("gross_profit_data", {})
-    
-    # Calculate hosting costs for subscription
-    hosting_costs, capitalized_hosting = calculate_hosting_costs_from_gross_profit_model()
+    # Same cached hosting/COGS series as the Gross Profit Analysis page, built from the current revenue model
+    series = sub_models["results"]["hosting"]
     
     # Initialize COGS if not exists
     if "cogs" not in st.session_state.model_data:
         st.session_state.model_data["cogs"] = {}
     
-    # Calculate COGS for each stream
-    for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]:
-        if stream not in st.session_state.model_data["cogs"]:
-            st.session_state.model_data["cogs"][stream] = {}
-        
-        for month in months:
-            revenue = revenue_data.get(stream, {}).get(month, 0)
-            
-            if stream == "Subscription":
-                # For subscription, COGS = hosting costs + other direct costs
-                direct_costs = gp_data.get("direct_costs", {}).get(stream, {}).get(month, 0)
-                st.session_state.model_data["cogs"][stream][month] = hosting_costs.get(month, 0) + direct_costs
-            else:
-                # For other streams, use gross profit percentage
-                gp_percentage = gp_data.get("gross_profit_percentages", {}).get(stream, {}).get(month, 70.0)
-                st.session_state.model_data["cogs"][stream][month] = revenue * (1 - gp_percentage / 100)
+    # COGS for each stream (copies, the cached series is shared)
+    for stream, monthly_cogs in series["cogs_by_stream"].items():
+        st.session_state.model_data["cogs"][stream] = dict(monthly_cogs)
     
     # Calculate total COGS
-    total_cogs = {}
-    for month in months:
-        total_cogs[month] = sum(
-            st.session_state.model_data["cogs"][stream].get(month, 0)
-            for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]
-        )
-    st.session_state.model_data["cogs"]["Total"] = total_cogs
+    st.session_state.model_data["cogs"]["Total"] = dict(zip(months, series["cogs"].sum(axis=0).tolist()))
 
 # Auto-calculate COGS from Gross Profit model every time the page loads
 auto_calculate_cogs_from_gross_profit_model()
 
-# Revenue calculation functions from revenue_assumptions.py
+# Revenue calculation functions (same as the Revenue Assumptions page)
 def calculate_subscription_running_totals():
-    """Calculate subscription running totals (from revenue_assumptions.py)"""
-    # Stakeholder list (all 20 stakeholders)
-    stakeholders = [
-        "Equipment Manufacturer", "Dealership", "Corporate", "Charging as a Service",
-        "Charging Hardware", "Depot", "End User", "Infrastructure Partner",
-        "Finance Partner", "Fleet Management Company", "Grants", "Logistics",
-        "Non Customer", "OEM", "Service", "Technology Partner",
-        "Upfitter/Distributor", "Utility/Energy Company", "Insurance Company", "Consultant"
-    ]
-    
-    # Initialize running totals data
-    if "subscription_running_totals" not in st.session_state.model_data:
-        st.session_state.model_data["subscription_running_totals"] = {}
-    
-    # Ensure all stakeholders are initialized
-    for stakeholder in stakeholders:
-        if stakeholder not in st.session_state.model_data["subscription_running_totals"]:
-            st.session_state.model_data["subscription_running_totals"][stakeholder] = {month: 0 for month in months}
-    
-    # Calculate running totals for subscriptions
-    for stakeholder in stakeholders:
-        running_total = 0
-        for month in months:
-            # Get new subscriptions for this month
-            new_subscriptions = st.session_state.model_data.get("subscription_new_customers", {}).get(stakeholder, {}).get(month, 0)
-            
-            # Get churn rate for this month (as percentage, so divide by 100)
-            churn_rate = st.session_state.model_data.get("subscription_churn_rates", {}).get(stakeholder, {}).get(month, 0)
-            churn_decimal = churn_rate / 100.0
-            
-            # Apply churn to existing customers, then add new customers
-            # Formula: Previous * (1 - churn_rate) + New
-            running_total = running_total * (1 - churn_decimal) + new_subscriptions
-            
-            # Store the result (round to avoid floating point precision issues)
-            st.session_state.model_data["subscription_running_totals"][stakeholder][month] = round(running_total, 2)
+    """Calculate subscription running totals for every segment with new subscriptions"""
+    revenue_model = build_revenue_model(revenue_inputs(st.session_state.model_data), months)
+    # Copies, the cached revenue model is shared
+    st.session_state.model_data["subscription_running_totals"] = {segment: dict(series) for segment, series in revenue_model["subscription_running_totals"].items()}
+    return revenue_model
 
 def calculate_all_revenue():
-    """Calculate all revenue streams (from revenue_assumptions.py)"""
-    # Stakeholder list and transactional categories
-    stakeholders = [
-        "Equipment Manufacturer", "Dealership", "Corporate", "Charging as a Service",
-        "Charging Hardware", "Depot", "End User", "Infrastructure Partner",
-        "Finance Partner", "Fleet Management Company", "Grants", "Logistics",
-        "Non Customer", "OEM", "Service", "Technology Partner",
-        "Upfitter/Distributor", "Utility/Energy Company", "Insurance Company", "Consultant"
-    ]
-    
-    transactional_categories = ["Charging", "Vehicle", "Financing", "Other Revenue"]
-    
-    # Calculate subscription running totals first
-    calculate_subscription_running_totals()
-    
-    # Initialize revenue streams
-    revenue_streams = {
-        "Subscription": {month: 0 for month in months},
-        "Transactional": {month: 0 for month in months},
-        "Implementation": {month: 0 for month in months},
-        "Maintenance": {month: 0 for month in months}
-    }
-    
-    # Subscription Revenue (cumulative customers * monthly pricing)
-    for stakeholder in stakeholders:
-        for month in months:
-            active_customers = st.session_state.model_data.get("subscription_running_totals", {}).get(stakeholder, {}).get(month, 0)
-            monthly_price = st.session_state.model_data.get("subscription_pricing", {}).get(stakeholder, {}).get(month, 0)
-            revenue = active_customers * monthly_price
-            revenue_streams["Subscription"][month] += revenue
-    
-    # Implementation Revenue (one-time fees)
-    for stakeholder in stakeholders:
-        for month in months:
-            new_implementations = st.session_state.model_data.get("implementation_new_customers", {}).get(stakeholder, {}).get(month, 0)
-            implementation_fee = st.session_state.model_data.get("implementation_pricing", {}).get(stakeholder, {}).get(month, 0)
-            revenue = new_implementations * implementation_fee
-            revenue_streams["Implementation"][month] += revenue
-    
-    # Maintenance Revenue (one-time fees)
-    for stakeholder in stakeholders:
-        for month in months:
-            new_maintenance = st.session_state.model_data.get("maintenance_new_customers", {}).get(stakeholder, {}).get(month, 0)
-            maintenance_fee = st.session_state.model_data.get("maintenance_pricing", {}).get(stakeholder, {}).get(month, 0)
-            revenue = new_maintenance * maintenance_fee
-            revenue_streams["Maintenance"][month] += revenue
-    
-    # Transactional Revenue (volume * price * referral fee)
-    for category in transactional_categories:
-        for month in months:
-            volume = st.session_state.model_data.get("transactional_volume", {}).get(category, {}).get(month, 0)
-            price = st.session_state.model_data.get("transactional_price", {}).get(category, {}).get(month, 0)
-            referral_fee = st.session_state.model_data.get("transactional_referral_fee", {}).get(category, {}).get(month, 0)
-            revenue = volume * price * (referral_fee / 100)
-            revenue_streams["Transactional"][month] += revenue
+    """Calculate all revenue streams from the sparse segment assumptions"""
+    # Recomputed only when the revenue assumptions change
+    streams = calculate_subscription_running_totals()["streams"]
     
     # Update the main revenue data for Income Statement
     if "revenue" not in st.session_state.model_data:
         st.session_state.model_data["revenue"] = {}
     
-    for stream, monthly_data in revenue_streams.items():
-        st.session_state.model_data["revenue"][stream] = monthly_data
+    for stream, values in streams.items():
+        st.session_state.model_data["revenue"][stream] = dict(zip(months, values.tolist()))
 
 
 
@@ -758,39 +582,8 @@ def update_sga_expenses_from_liquidity():
     if "liquidity_data" not in st.session_state.model_data:
         return
         
-    # Map liquidity categories to SG&A categories
-    liquidity_to_sga_mapping = {
-        "Payroll": "Payroll",
-        "Contractors": "Contractors", 
-        "License Fees": "License Fees",
-        "Travel": "Travel",
-        "Shows": "Shows",
-        "Associations": "Associations",
-        "Marketing": "Marketing",
-        "Company Vehicle": "Company Vehicle",
-        "Grant Writer": "Grant Writer",
-        "Insurance": "Insurance",
-        "Legal / Professional Fees": "Legal / Professional Fees",
-        "Permitting/Fees/Licensing": "Permitting/Fees/Licensing",
-        "Shared Services": "Shared Services",
-        "Consultants/Audit/Tax": "Consultants/Audit/Tax",
-        "Pritchard Amex": "Pritchard Amex",
-        "Contingencies": "Contingencies",
-    }
-    
-    # Get the category order from liquidity data (maintains add/remove functionality)
-    ordered_categories = st.session_state.model_data["liquidity_data"].get("category_order", list(liquidity_to_sga_mapping.keys()))
-    
-    # Clear existing SG&A data to rebuild in correct order
-    st.session_state.model_data["sga_expenses"] = {}
-    
-    # Copy data from liquidity cash disbursements to SG&A expenses
-    for liquidity_cat in ordered_categories:
-        if (liquidity_cat in liquidity_to_sga_mapping and 
-            "expenses" in st.session_state.model_data["liquidity_data"] and
-            liquidity_cat in st.session_state.model_data["liquidity_data"]["expenses"]):
-            sga_cat = liquidity_to_sga_mapping[liquidity_cat]
-            st.session_state.model_data["sga_expenses"][sga_cat] = st.session_state.model_data["liquidity_data"]["expenses"][liquidity_cat].copy()
+    # Every disbursement category, matched to its expenses through the category registry
+    st.session_state.model_data["sga_expenses"] = sga_from_liquidity(st.session_state.model_data["liquidity_data"])
 
 # Auto-sync SG&A expenses from liquidity cash disbursements every time the page loads
 update_sga_expenses_from_liquidity()
@@ -854,9 +647,10 @@ def create_custom_table_with_years(categories, data_key, show_monthly=True):
     for category in categories:
         html_content += '<tr style="height: 43px !important;">'
         
+        yearly_totals = yearly_by_label(st.session_state.model_data[data_key].get(category, {}), months)
         if show_monthly:
             for year in sorted(years_dict.keys()):
-                yearly_total = 0
+                yearly_total = yearly_totals[year]
                 for month in years_dict[year]:
                     value = st.session_state.model_data[data_key].get(category, {}).get(month, 0)
                     if data_key == "gross_margin":
@@ -864,7 +658,6 @@ def create_custom_table_with_years(categories, data_key, show_monthly=True):
                     else:
                         formatted_value = format_number(value)
                     html_content += f'<td class="data-cell" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;">{formatted_value}</td>'
-                    yearly_total += value
                 
                 if data_key == "gross_margin":
                     # For gross margin, calculate correct percentage: Total Gross Profit / Total Revenue for the year
@@ -896,10 +689,7 @@ def create_custom_table_with_years(categories, data_key, show_monthly=True):
                     yearly_percentage = (yearly_gross_profit / yearly_revenue * 100) if yearly_revenue > 0 else 0
                     formatted_yearly_total = format_percentage(yearly_percentage)
                 else:
-                    yearly_total = sum(
-                        st.session_state.model_data[data_key].get(category, {}).get(month, 0)
-                        for month in years_dict[year]
-                    )
+                    yearly_total = yearly_totals[year]
                     formatted_yearly_total = format_number(yearly_total)
                 html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{formatted_yearly_total}</strong></td>'
         
@@ -1035,9 +825,11 @@ def create_custom_total_row(total_dict, row_label, show_monthly=True):
     # Check if this is a percentage row
     is_percentage = "%" in row_label
     
+    yearly_totals = yearly_by_label(total_dict, months)
+    yearly_averages = yearly_by_label(total_dict, months, "yearly_mean")
     if show_monthly:
         for year in sorted(years_dict.keys()):
-            yearly_total = 0
+            yearly_total = yearly_totals[year]
             for month in years_dict[year]:
                 value = total_dict.get(month, 0)
                 if is_percentage:
@@ -1045,11 +837,10 @@ def create_custom_total_row(total_dict, row_label, show_monthly=True):
                 else:
                     formatted_value = format_number_with_color(value, apply_red_for_negative=is_net_income)
                 html_content += f'<td class="data-cell" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;">{formatted_value}</td>'
-                yearly_total += value
             
             if is_percentage:
                 # For percentage rows, calculate average percentage for the year
-                yearly_avg = yearly_total / len(years_dict[year])
+                yearly_avg = yearly_averages[year]
                 formatted_yearly_total = format_percentage(yearly_avg)
             else:
                 formatted_yearly_total = format_number_with_color(yearly_total, apply_red_for_negative=is_net_income)
@@ -1058,10 +849,10 @@ def create_custom_total_row(total_dict, row_label, show_monthly=True):
         for year in sorted(years_dict.keys()):
             if is_percentage:
                 # For percentage rows, calculate average percentage for the year
-                yearly_avg = sum(total_dict.get(month, 0) for month in years_dict[year]) / len(years_dict[year])
+                yearly_avg = yearly_averages[year]
                 formatted_yearly_total = format_percentage(yearly_avg)
             else:
-                yearly_total = sum(total_dict.get(month, 0) for month in years_dict[year])
+                yearly_total = yearly_totals[year]
                 formatted_yearly_total = format_number_with_color(yearly_total, apply_red_for_negative=is_net_income)
             html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{formatted_yearly_total}</strong></td>'
     
@@ -1163,6 +954,7 @@ def create_comprehensive_income_statement(show_monthly=True, include_gross_margi
     for category in revenue_categories:
         html_content += '<tr>'
         html_content += f'<td>  {category}</td>'
+        yearly_totals = yearly_by_label(st.session_state.model_data.get("revenue", {}).get(category, {}), months)
         if show_monthly:
             for year in sorted(years_dict.keys()):
                 for month in years_dict[year]:
@@ -1170,12 +962,12 @@ def create_comprehensive_income_statement(show_monthly=True, include_gross_margi
                     formatted_value = format_number(value)
                     html_content += f'<td>{formatted_value}</td>'
                 
-                yearly_total = sum(st.session_state.model_data.get("revenue", {}).get(category, {}).get(month, 0) for month in years_dict[year])
+                yearly_total = yearly_totals[year]
                 formatted_yearly_total = format_number(yearly_total)
                 html_content += f'<td class="year-total">{formatted_yearly_total}</td>'
         else:
             for year in sorted(years_dict.keys()):
-                yearly_total = sum(st.session_state.model_data.get("revenue", {}).get(category, {}).get(month, 0) for month in years_dict[year])
+                yearly_total = yearly_totals[year]
                 formatted_yearly_total = format_number(yearly_total)
                 html_content += f'<td class="year-total">{formatted_yearly_total}</td>'
         html_content += '</tr>'
@@ -1183,18 +975,19 @@ def create_comprehensive_income_statement(show_monthly=True, include_gross_margi
     # Total Revenue row
     html_content += '<tr class="total-row">'
     html_content += '<td>Total Revenue</td>'
+    yearly_totals = yearly_by_label(total_revenue, months)
     if show_monthly:
         for year in sorted(years_dict.keys()):
             for month in years_dict[year]:
                 value = total_revenue.get(month, 0)
                 formatted_value = format_number(value)
                 html_content += f'<td>{formatted_value}</td>'
-            yearly_total = sum(total_revenue.get(month, 0) for month in years_dict[year])
+            yearly_total = yearly_totals[year]
             formatted_yearly_total = format_number(yearly_total)
             html_content += f'<td class="year-total">{formatted_yearly_total}</td>'
     else:
         for year in sorted(years_dict.keys()):
-            yearly_total = sum(total_revenue.get(month, 0) for month in years_dict[year])
+            yearly_total = yearly_totals[year]
             formatted_yearly_total = format_number(yearly_total)
             html_content += f'<td class="year-total">{formatted_yearly_total}</td>'
     html_content += '</tr>'
@@ -1211,6 +1004,7 @@ def create_comprehensive_income_statement(show_monthly=True, include_gross_margi
         for category in cost_of_sales_categories:
             html_content += '<tr class="supplemental-data">'
             html_content += f'<td>  {category}</td>'
+            yearly_totals = yearly_by_label(st.session_state.model_data.get("cogs", {}).get(category, {}), months)
             if show_monthly:
                 for year in sorted(years_dict.keys()):
                     for month in years_dict[year]:
@@ -1218,12 +1012,12 @@ def create_comprehensive_income_statement(show_monthly=True, include_gross_margi
                         formatted_value = format_number(value)
                         html_content += f'<td>{formatted_value}</td>'
                     
-                    yearly_total = sum(st.session_state.model_data.get("cogs", {}).get(category, {}).get(month, 0) for month in years_dict[year])
+                    yearly_total = yearly_totals[year]
                     formatted_yearly_total = format_number(yearly_total)
                     html_content += f'<td class="year-total">{formatted_yearly_total}</td>'
             else:
                 for year in sorted(years_dict.keys()):
-                    yearly_total = sum(st.session_state.model_data.get("cogs", {}).get(category, {}).get(month, 0) for month in years_dict[year])
+                    yearly_total = yearly_totals[year]
                     formatted_yearly_total = format_number(yearly_total)
                     html_content += f'<td class="year-total">{formatted_yearly_total}</td>'
             html_content += '</tr>'
@@ -1232,18 +1026,19 @@ def create_comprehensive_income_statement(show_monthly=True, include_gross_margi
     if include_gross_margin:
         html_content += '<tr class="total-row supplemental-data">'
         html_content += '<td style="color: #666666; font-style: italic;">Total Cost of Sales (Memo)*</td>'
+        yearly_totals = yearly_by_label(total_cost_of_sales, months)
         if show_monthly:
             for year in sorted(years_dict.keys()):
                 for month in years_dict[year]:
                     value = total_cost_of_sales.get(month, 0)
                     formatted_value = format_number(value)
                     html_content += f'<td style="color: #666666; font-style: italic;">{formatted_value}</td>'
-                yearly_total = sum(total_cost_of_sales.get(month, 0) for month in years_dict[year])
+                yearly_total = yearly_totals[year]
                 formatted_yearly_total = format_number(yearly_total)
                 html_content += f'<td class="year-total" style="color: #666666; font-style: italic;">{formatted_yearly_total}</td>'
         else:
             for year in sorted(years_dict.keys()):
-                yearly_total = sum(total_cost_of_sales.get(month, 0) for month in years_dict[year])
+                yearly_total = yearly_totals[year]
                 formatted_yearly_total = format_number(yearly_total)
                 html_content += f'<td class="year-total" style="color: #666666; font-style: italic;">{formatted_yearly_total}</td>'
         html_content += '</tr>'
@@ -1287,18 +1082,19 @@ def create_comprehensive_income_statement(show_monthly=True, include_gross_margi
     if include_gross_margin:
         html_content += '<tr class="total-row supplemental-data">'
         html_content += '<td style="color: #666666; font-style: italic;">Total Gross Profit (Memo)*</td>'
+        yearly_totals = yearly_by_label(total_gross_profit, months)
         if show_monthly:
             for year in sorted(years_dict.keys()):
                 for month in years_dict[year]:
                     value = total_gross_profit.get(month, 0)
                     formatted_value = format_number(value)
                     html_content += f'<td style="color: #666666; font-style: italic;">{formatted_value}</td>'
-                yearly_total = sum(total_gross_profit.get(month, 0) for month in years_dict[year])
+                yearly_total = yearly_totals[year]
                 formatted_yearly_total = format_number(yearly_total)
                 html_content += f'<td class="year-total" style="color: #666666; font-style: italic;">{formatted_yearly_total}</td>'
         else:
             for year in sorted(years_dict.keys()):
-                yearly_total = sum(total_gross_profit.get(month, 0) for month in years_dict[year])
+                yearly_total = yearly_totals[year]
                 formatted_yearly_total = format_number(yearly_total)
                 html_content += f'<td class="year-total" style="color: #666666; font-style: italic;">{formatted_yearly_total}</td>'
         html_content += '</tr>'
@@ -1374,6 +1170,7 @@ def create_comprehensive_income_statement(show_monthly=True, include_gross_margi
     for category in sga_categories:
         html_content += '<tr>'
         html_content += f'<td>  {category}</td>'
+        yearly_totals = yearly_by_label(st.session_state.model_data.get("sga_expenses", {}).get(category, {}), months)
         if show_monthly:
             for year in sorted(years_dict.keys()):
                 for month in years_dict[year]:
@@ -1381,12 +1178,12 @@ def create_comprehensive_income_statement(show_monthly=True, include_gross_margi
                     formatted_value = format_number(value)
                     html_content += f'<td>{formatted_value}</td>'
                 
-                yearly_total = sum(st.session_state.model_data.get("sga_expenses", {}).get(category, {}).get(month, 0) for month in years_dict[year])
+                yearly_total = yearly_totals[year]
                 formatted_yearly_total = format_number(yearly_total)
                 html_content += f'<td class="year-total">{formatted_yearly_total}</td>'
         else:
             for year in sorted(years_dict.keys()):
-                yearly_total = sum(st.session_state.model_data.get("sga_expenses", {}).get(category, {}).get(month, 0) for month in years_dict[year])
+                yearly_total = yearly_totals[year]
                 formatted_yearly_total = format_number(yearly_total)
                 html_content += f'<td class="year-total">{formatted_yearly_total}</td>'
         html_content += '</tr>'
@@ -1394,18 +1191,19 @@ def create_comprehensive_income_statement(show_monthly=True, include_gross_margi
     # Total SG&A row
     html_content += '<tr class="total-row">'
     html_content += '<td>Total Operating Expenses</td>'
+    yearly_totals = yearly_by_label(total_sga, months)
     if show_monthly:
         for year in sorted(years_dict.keys()):
             for month in years_dict[year]:
                 value = total_sga.get(month, 0)
                 formatted_value = format_number(value)
                 html_content += f'<td>{formatted_value}</td>'
-            yearly_total = sum(total_sga.get(month, 0) for month in years_dict[year])
+            yearly_total = yearly_totals[year]
             formatted_yearly_total = format_number(yearly_total)
             html_content += f'<td class="year-total">{formatted_yearly_total}</td>'
     else:
         for year in sorted(years_dict.keys()):
-            yearly_total = sum(total_sga.get(month, 0) for month in years_dict[year])
+            yearly_total = yearly_totals[year]
             formatted_yearly_total = format_number(yearly_total)
             html_content += f'<td class="year-total">{formatted_yearly_total}</td>'
     html_content += '</tr>'
@@ -1413,18 +1211,19 @@ def create_comprehensive_income_statement(show_monthly=True, include_gross_margi
     # Net Income row
     html_content += '<tr class="total-row">'
     html_content += '<td>Net Income</td>'
+    yearly_totals = yearly_by_label(net_income, months)
     if show_monthly:
         for year in sorted(years_dict.keys()):
             for month in years_dict[year]:
                 value = net_income.get(month, 0)
                 formatted_value = format_number_with_color(value, apply_red_for_negative=True)
                 html_content += f'<td>{formatted_value}</td>'
-            yearly_total = sum(net_income.get(month, 0) for month in years_dict[year])
+            yearly_total = yearly_totals[year]
             formatted_yearly_total = format_number_with_color(yearly_total, apply_red_for_negative=True)
             html_content += f'<td class="year-total">{formatted_yearly_total}</td>'
     else:
         for year in sorted(years_dict.keys()):
-            yearly_total = sum(net_income.get(month, 0) for month in years_dict[year])
+            yearly_total = yearly_totals[year]
             formatted_yearly_total = format_number_with_color(yearly_total, apply_red_for_negative=True)
             html_content += f'<td class="year-total">{formatted_yearly_total}</td>'
     html_content += '</tr>'
@@ -1495,9 +1294,10 @@ def create_custom_table_with_total(categories, data_key, total_data, total_label
     for category in categories:
         html_content += '<tr style="height: 43px !important;">'
         
+        yearly_totals = yearly_by_label(st.session_state.model_data[data_key].get(category, {}), months)
         if show_monthly:
             for year in sorted(years_dict.keys()):
-                yearly_total = 0
+                yearly_total = yearly_totals[year]
                 for month in years_dict[year]:
                     value = st.session_state.model_data[data_key].get(category, {}).get(month, 0)
                     if data_key == "gross_margin":
@@ -1505,7 +1305,6 @@ def create_custom_table_with_total(categories, data_key, total_data, total_label
                     else:
                         formatted_value = format_number(value)
                     html_content += f'<td class="data-cell" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;">{formatted_value}</td>'
-                    yearly_total += value
                 
                 if data_key == "gross_margin":
                     # For gross margin, calculate correct percentage: Total Gross Profit / Total Revenue for the year
@@ -1537,10 +1336,7 @@ def create_custom_table_with_total(categories, data_key, total_data, total_label
                     yearly_percentage = (yearly_gross_profit / yearly_revenue * 100) if yearly_revenue > 0 else 0
                     formatted_yearly_total = format_percentage(yearly_percentage)
                 else:
-                    yearly_total = sum(
-                        st.session_state.model_data[data_key].get(category, {}).get(month, 0)
-                        for month in years_dict[year]
-                    )
+                    yearly_total = yearly_totals[year]
                     formatted_yearly_total = format_number(yearly_total)
                 html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{formatted_yearly_total}</strong></td>'
         
@@ -1554,9 +1350,11 @@ def create_custom_table_with_total(categories, data_key, total_data, total_label
     # Check if this is a percentage row
     is_percentage = "%" in total_label
     
+    yearly_totals = yearly_by_label(total_data, months)
+    yearly_averages = yearly_by_label(total_data, months, "yearly_mean")
     if show_monthly:
         for year in sorted(years_dict.keys()):
-            yearly_total = 0
+            yearly_total = yearly_totals[year]
             for month in years_dict[year]:
                 value = total_data.get(month, 0)
                 if is_percentage:
@@ -1564,11 +1362,10 @@ def create_custom_table_with_total(categories, data_key, total_data, total_label
                 else:
                     formatted_value = format_number_with_color(value, apply_red_for_negative=is_net_income)
                 html_content += f'<td class="data-cell" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;">{formatted_value}</td>'
-                yearly_total += value
             
             if is_percentage:
                 # For percentage rows, calculate average percentage for the year
-                yearly_avg = yearly_total / len(years_dict[year])
+                yearly_avg = yearly_averages[year]
                 formatted_yearly_total = format_percentage(yearly_avg)
             else:
                 formatted_yearly_total = format_number_with_color(yearly_total, apply_red_for_negative=is_net_income)
@@ -1577,10 +1374,10 @@ def create_custom_table_with_total(categories, data_key, total_data, total_label
         for year in sorted(years_dict.keys()):
             if is_percentage:
                 # For percentage rows, calculate average percentage for the year
-                yearly_avg = sum(total_data.get(month, 0) for month in years_dict[year]) / len(years_dict[year])
+                yearly_avg = yearly_averages[year]
                 formatted_yearly_total = format_percentage(yearly_avg)
             else:
-                yearly_total = sum(total_data.get(month, 0) for month in years_dict[year])
+                yearly_total = yearly_totals[year]
                 formatted_yearly_total = format_number_with_color(yearly_total, apply_red_for_negative=is_net_income)
             html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{formatted_yearly_total}</strong></td>'
     
@@ -1652,13 +1449,13 @@ def create_custom_percentage_table_with_total(categories, data_key, monthly_dict
         html_content += '<tr style="height: 43px !important;">'
         
         if show_monthly:
+            yearly_totals = yearly_by_label(st.session_state.model_data[data_key].get(category, {}), months)
             for year in sorted(years_dict.keys()):
-                yearly_total = 0
+                yearly_total = yearly_totals[year]
                 for month in years_dict[year]:
                     value = st.session_state.model_data[data_key].get(category, {}).get(month, 0)
                     formatted_value = format_percentage(value)
                     html_content += f'<td class="data-cell" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;">{formatted_value}</td>'
-                    yearly_total += value
                 
                 # For gross margin, calculate correct percentage: Total Gross Profit / Total Revenue for the year
                 yearly_revenue = 0
@@ -1844,7 +1641,7 @@ summary_col1, summary_col2 = st.columns([0.75, 3.25])
 with summary_col1:
     # Calculate default index based on current year
     current_year = str(datetime.now().year)
-    summary_options = ["2025", "2026", "2027", "2028", "2029", "2030", "All Years"]
+    summary_options = horizon_years(months) + ["All Years"]
     try:
         default_summary_index = summary_options.index(current_year)
     except ValueError:
@@ -2166,6 +1963,64 @@ if not chart_df.empty:
     # Display the chart
     st.plotly_chart(fig, use_container_width=True)
 
+# FORMULA LINE ITEMS
+st.markdown("---")
+st.markdown('<div class="section-header">🧮 Formula Line Items</div>', unsafe_allow_html=True)
+st.info('📝 Define derived rows as formulas over existing series, e.g. `revenue.Subscription - cogs.Subscription` or `sum(sga_expenses) / sum(revenue) * 100`. '
+        'Groups: revenue, cogs, gross_profit, sga_expenses, operating_expenses, headcount (Employees, Contractors) and lines (other formula lines). '
+        'Use `group["Name with spaces"]` for names that are not single words. "Ratio" lines are recalculated on period totals instead of summed.')
+
+if "formula_lines" not in st.session_state.model_data:
+    st.session_state.model_data["formula_lines"] = load_formula_lines_from_database() or [dict(line) for line in DEFAULT_FORMULA_LINES]
+
+edited_formula_df = st.data_editor(
+    pd.DataFrame(formula_lines_to_rows(st.session_state.model_data["formula_lines"]), columns=list(FORMULA_COLUMNS.values())),
+    num_rows="dynamic",
+    use_container_width=True,
+    hide_index=True,
+    key="formula_lines_editor",
+    column_config={
+        "Line Item": st.column_config.TextColumn("Line Item", required=True),
+        "Formula": st.column_config.TextColumn("Formula", width="large", required=True),
+        "Format": st.column_config.SelectboxColumn("Format", options=FORMULA_FORMATS, default="Currency"),
+        "Period Total": st.column_config.SelectboxColumn("Period Total", options=PERIOD_MODES, default="Sum"),
+    }
+)
+
+edited_formula_lines = rows_to_formula_lines(edited_formula_df.to_dict("records"))
+if edited_formula_lines != st.session_state.model_data["formula_lines"]:
+    st.session_state.model_data["formula_lines"] = edited_formula_lines
+    save_formula_lines_to_database(edited_formula_lines)
+
+# Parsed once per formula and evaluated for every month in a single pass
+formula_lines, formula_input_series, formula_results = model_formula_lines(st.session_state.model_data, months)
+for name, error in formula_results["errors"].items():
+    st.warning(f"⚠️ {name}: {error}")
+
+if formula_results["order"]:
+    years_dict = group_months_by_year(months)
+    yearly_formula_values = aggregate_formula_lines(
+        formula_lines, formula_input_series, formula_results, lambda values: rollup(values, months)["yearly"]
+    )
+    formula_rows = []
+    for line in formula_lines:
+        name = line["name"]
+        if name not in formula_results["values"]:
+            continue
+        row = {"Line Item": name}
+        for year_index, year in enumerate(sorted(years_dict.keys())):
+            if show_monthly:
+                for month in years_dict[year]:
+                    row[month] = format_formula_value(formula_results["values"][name][months.index(month)], line["format"])
+            row[f"{year} Total"] = format_formula_value(yearly_formula_values[name][year_index], line["format"])
+        formula_rows.append(row)
+    st.dataframe(pd.DataFrame(formula_rows), use_container_width=True, hide_index=True)
+
+# Sub-model timings (Collapsible)
+with st.expander("⏱️ Sub-Model Timings", expanded=False):
+    st.caption(f"{'Concurrent' if sub_models['parallel'] else 'Sequential'} evaluation took {sub_models['total'] * 1000:,.1f} ms; sub-models whose inputs did not change are served from cache")
+    st.dataframe(pd.DataFrame(timing_rows(sub_models)), use_container_width=True, hide_index=True)
+
 # DATA MANAGEMENT
 st.markdown("---")
 st.markdown('<div class="section-header">💾 Data Management</div>', unsafe_allow_html=True)
@@ -1,8 +1,23 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import datetime, date
 import plotly.graph_objects as go
-from database import load_data, save_data, load_data_from_source, save_data_to_source, init_supabase, save_liquidity_data_to_database, load_liquidity_data_from_database, load_starting_balance_from_database, save_starting_balance_to_database, cleanup_category_names_in_database, enable_autosave, auto_save_data
+from planning_horizon import horizon_years
+from rollups import group_months_by_year, yearly_by_label
+from database import load_data, save_data, load_data_from_source, save_data_to_source, init_supabase, save_liquidity_data_to_database, load_liquidity_data_from_database, load_starting_balance_from_database, save_starting_balance_to_database, cleanup_category_names_in_database, enable_autosave, auto_save_data, load_scenarios_from_database, save_scenarios_to_database, get_planning_months, load_payment_schedules_from_database, save_payment_schedules_to_database, load_expense_drivers_from_database, save_expense_drivers_to_database, load_actuals_through_from_database, save_actuals_through_to_database, save_budget_data_to_database
+from money import amounts_differ, round_to_cents
+from payroll_engine import DEFAULT_DEPARTMENTS, calculate_department_shares, calculate_personnel_costs, series_to_dict
+from cash_engine import get_cash_flow_series, sga_from_liquidity
+from registry import EXPENSES, canonical_name, intern, lookup, resolve, unique_names
+from model_graph import evaluate_sub_models, timing_rows
+from forecasting import FORECAST_MODELS, FORECAST_SOURCES, apply_forecast, forecast_from_actuals
+from expense_drivers import DRIVER_COLUMNS, DRIVER_TYPES, apply_expense_drivers, driver_inputs, drivers_to_rows, evaluate_expense_drivers, rows_to_drivers
+from cash_calendar import DEFAULT_PAYMENT_SCHEDULES, DEFAULT_OUTFLOW_SCHEDULE, INFLOW_LABELS, TIMING_OPTIONS, build_cash_ledger, daily_balance, monthly_rollup, weekly_view
+from scenario_engine import DEFAULT_SCENARIOS, normalize_scenarios, run_scenarios, scenario_summary, scenarios_to_rows, rows_to_scenarios
+from monte_carlo import DEFAULT_SIMULATION_SETTINGS, run_monte_carlo
+from sensitivity import SENSITIVITY_METRICS, run_sensitivity
+from goal_seek import GOAL_SEEK_DRIVERS, GOAL_SEEK_TARGETS, goal_seek
 
 # Payroll integration functions
 
@@ -100,139 +115,14 @@ def is_employee_active_for_month(emp_data, month_str):
         # If there's any error parsing dates, fall back to active field
         return emp_data.get("active", True)
 
-def is_contractor_active_for_month(contractor_data, month_str):
-    """Check if contractor is active for a specific month"""
-    try:
-        # Convert month string (e.g., "Jan 2025") to date (first day of month)
-        month_date = datetime.strptime(month_str, "%b %Y")
-        
-        # Check start date
-        start_date_str = contractor_data.get("start_date")
-        if start_date_str:
-            start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
-            if month_date < start_date:
-                return False
-        
-        # Check end date
-        end_date_str = contractor_data.get("end_date")
-        if end_date_str:
-            end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
-            if month_date >= end_date:
-                return False
-        
-        return True
-    except (ValueError, TypeError):
-        # If there's any error parsing dates, assume active
-        return True
-
-def get_calculated_payroll_from_headcount():
-    """Get calculated payroll totals from the headcount tab"""
-    if "payroll_data" not in st.session_state.model_data:
-        return {}, {month: 0 for month in months}
-    
-    payroll_data = st.session_state.model_data["payroll_data"]
-    employees = payroll_data.get("employees", {})
-    
-    # Calculate payroll by department and total using the same logic as payroll_model.py
-    payroll_by_dept = {
-        "Product Development": {month: 0 for month in months},
-        "Sales and Marketing": {month: 0 for month in months}, 
-        "Opex": {month: 0 for month in months}
-    }
-    
-    total_payroll = {month: 0 for month in months}
-    
-    for emp_id, emp_data in employees.items():
-        department = emp_data.get("department", "Opex")
-        pay_type = emp_data.get("pay_type", "Salary")
-        
-        for month in months:
-            # Check if employee is active for this specific month
-            if not is_employee_active_for_month(emp_data, month):
-                continue
-                
-            if pay_type == "Salary":
-                # Salary: Annual salary / 26 pay periods * pay periods in month
-                annual_salary = emp_data.get("annual_salary", 0)
-                pay_periods = payroll_data.get("pay_periods", {}).get(month, 2)
-                monthly_pay = (annual_salary / 26) * pay_periods
-            else:  # Hourly
-                # Hourly: Hourly rate * weekly hours * weeks in month (4.33 average)
-                hourly_rate = emp_data.get("hourly_rate", 0)
-                weekly_hours = emp_data.get("weekly_hours", 40.0)
-                monthly_hours = weekly_hours * 4.33  # Average weeks per month
-                monthly_pay = hourly_rate * monthly_hours
-            
-            payroll_by_dept[department][month] += monthly_pay
-            total_payroll[month] += monthly_pay
-    
-    return payroll_by_dept, total_payroll
-
-def calculate_monthly_contractor_costs():
-    """Calculate monthly contractor costs from headcount data"""
-    if "payroll_data" not in st.session_state.model_data:
-        return {month: 0 for month in months}
-    
-    payroll_data = st.session_state.model_data["payroll_data"]
-    contractors = payroll_data.get("contractors", {})
-    
-    contractor_costs = {month: 0 for month in months}
-    
-    for contractor_id, contractor_data in contractors.items():
-        resources = contractor_data.get("resources", 0)
-        hourly_rate = contractor_data.get("hourly_rate", 0)
-        
-        # Calculate monthly cost: resources * hourly rate * 40 hours * 4 weeks
-        monthly_cost = resources * hourly_rate * 40 * 4
-        
-        for month in months:
-            # Check if contractor is active for this specific month
-            if not is_contractor_active_for_month(contractor_data, month):
-                continue
-                
-            contractor_costs[month] += monthly_cost
-    
-    return contractor_costs
-
 def calculate_total_personnel_costs():
     """Calculate total personnel costs using the same logic as the payroll model"""
-    
-    # Use the same calculation logic as the payroll model
-    payroll_by_dept, base_payroll = get_calculated_payroll_from_headcount()
-    contractor_costs = calculate_monthly_contractor_costs()
-    
-    # Get configuration for payroll tax rate - load from database first
-    payroll_tax_rate = 0.10  # Default 10% instead of 23%
-    if "payroll_data" in st.session_state.model_data:
-        config = st.session_state.model_data["payroll_data"].get("payroll_config", {})
-        payroll_tax_rate = config.get("payroll_tax_percentage", 10.0) / 100.0  # Changed default from 23.0 to 10.0
-    
-    # Calculate bonuses from employee bonus data (same as payroll model)
-    bonuses = {month: 0 for month in months}
-    if "payroll_data" in st.session_state.model_data:
-        employee_bonuses = st.session_state.model_data["payroll_data"].get("employee_bonuses", {})
-        
-        for bonus_data in employee_bonuses.values():
-            bonus_month = bonus_data.get("month", "")
-            bonus_amount = bonus_data.get("bonus_amount", 0)
-            
-            if bonus_month in bonuses:
-                bonuses[bonus_month] += bonus_amount
-    
-    # Calculate payroll taxes and total payroll cost (same as payroll model)
-    payroll_taxes = {}
-    total_payroll_cost = {}
-    
-    for month in months:
-        monthly_base = base_payroll[month]
-        monthly_bonus = bonuses[month]
-        # Apply payroll taxes to both base payroll and bonuses
-        monthly_taxes = (monthly_base + monthly_bonus) * payroll_tax_rate
-        
-        payroll_taxes[month] = monthly_taxes
-        total_payroll_cost[month] = monthly_base + monthly_bonus + monthly_taxes
-    
-    return base_payroll, payroll_taxes, bonuses, contractor_costs, total_payroll_cost
+    # Cached per payroll content, so reruns that do not touch headcount reuse it
+    costs = calculate_personnel_costs(st.session_state.model_data.get("payroll_data", {}), months, 10.0)
+    return tuple(
+        series_to_dict(costs[key], months)
+        for key in ["base_payroll", "payroll_taxes", "bonuses", "contractors", "total_payroll_cost"]
+    )
 
 def update_liquidity_with_payroll(effective_month=None):
     """Update liquidity model with total payroll and contractor costs from headcount tab"""
@@ -895,15 +785,8 @@ if 'model_data' not in st.session_state:
 # Auto-save data if changes detected (after model_data is initialized)
 auto_save_data(st.session_state.model_data, "Liquidity Forecast")
 
-# Generate months from 2025-2030
-def get_months_2025_2030():
-    months = []
-    for year in range(2025, 2031):
-        for month in range(1, 13):
-            months.append(f"{date(year, month, 1).strftime('%b %Y')}")
-    return months
-
-months = get_months_2025_2030()
+# Months of the configured planning horizon
+months = get_planning_months()
 
 # Helper function to format numbers with commas
 def format_number(num):
@@ -929,17 +812,6 @@ def get_year_from_month(month_str):
     """Extract year from month string like 'Jan 2025'"""
     return month_str.split(' ')[1]
 
-# Helper function to group months by year
-def group_months_by_year(months):
-    """Group months by year and return dict"""
-    years = {}
-    for month in months:
-        year = get_year_from_month(month)
-        if year not in years:
-            years[year] = []
-        years[year].append(month)
-    return years
-
 # Clean up duplicate expense categories in session state
 def cleanup_duplicate_categories():
     """Remove duplicate expense categories with extra spaces"""
@@ -949,18 +821,12 @@ def cleanup_duplicate_categories():
             seen_categories = set()
             
             for category, data in st.session_state.model_data["liquidity_data"]["expenses"].items():
-                # Clean category name - remove extra spaces and normalize
-                clean_category = ' '.join(category.split()).strip()
-                
-                # Check for case-insensitive duplicates
-                category_lower = clean_category.lower()
-                
-                # Special handling for known problematic categories
-                if "legal" in category_lower and "professional" in category_lower:
-                    clean_category = "Legal Professional Fees"
+                # Spacing, case and legacy spellings all resolve to one registered category
+                category_id = intern(EXPENSES, category)
+                clean_category = resolve(EXPENSES, category)
                 
-                if category_lower not in seen_categories:
-                    seen_categories.add(category_lower)
+                if category_id not in seen_categories:
+                    seen_categories.add(category_id)
                     cleaned_expenses[clean_category] = data
                 else:
                     # Merge duplicate entries - keep non-zero values
@@ -976,16 +842,11 @@ def cleanup_duplicate_categories():
             seen_categories = set()
             
             for category, info in st.session_state.model_data["liquidity_data"]["expense_categories"].items():
-                clean_category = ' '.join(category.split()).strip()
+                category_id = intern(EXPENSES, category)
                 
-                # Special handling for known problematic categories
-                category_lower = clean_category.lower()
-                if "legal" in category_lower and "professional" in category_lower:
-                    clean_category = "Legal Professional Fees"
-                
-                if category_lower not in seen_categories:
-                    seen_categories.add(category_lower)
-                    cleaned_categories[clean_category] = info
+                if category_id not in seen_categories:
+                    seen_categories.add(category_id)
+                    cleaned_categories[resolve(EXPENSES, category)] = info
                     
             st.session_state.model_data["liquidity_data"]["expense_categories"] = cleaned_categories
 
@@ -1249,23 +1110,20 @@ def create_expense_table_with_years(categories, show_monthly=True):
     for category in categories:
         row = {"Expense Category": category}
         
+        yearly_totals = yearly_by_label(st.session_state.model_data["liquidity_data"]["expenses"].get(category, {}), months)
         if show_monthly:
             # Add monthly data and yearly totals
             for year in sorted(years_dict.keys()):
-                yearly_total = 0
+                yearly_total = yearly_totals[year]
                 for month in years_dict[year]:
                     value = st.session_state.model_data["liquidity_data"]["expenses"].get(category, {}).get(month, 0)
                     # Display negative values in parentheses
                     row[month] = -abs(value) if value != 0 else 0  # Expenses are negative
-                    yearly_total += value
                 row[f"{year} Total"] = f"**({abs(yearly_total):,.0f})**" if yearly_total != 0 else "**0**"
         else:
             # Add only yearly totals
             for year in sorted(years_dict.keys()):
-                yearly_total = sum(
-                    st.session_state.model_data["liquidity_data"]["expenses"].get(category, {}).get(month, 0)
-                    for month in years_dict[year]
-                )
+                yearly_total = yearly_totals[year]
                 row[f"{year} Total"] = f"**({abs(yearly_total):,.0f})**" if yearly_total != 0 else "**0**"
         
         # Add classification
@@ -1335,9 +1193,9 @@ def create_expense_table_with_years(categories, show_monthly=True):
                         
                         # Check if value changed
                         old_value = st.session_state.model_data["liquidity_data"]["expenses"][category].get(month, 0)
-                        if abs(old_value - new_value) > 0.01:  # Use small epsilon for float comparison
+                        if amounts_differ(old_value, new_value):  # Compare whole cents, no float epsilon
                             changes_made = True
-                            st.session_state.model_data["liquidity_data"]["expenses"][category][month] = new_value
+                            st.session_state.model_data["liquidity_data"]["expenses"][category][month] = round_to_cents(new_value)
                             
 
     
@@ -1356,119 +1214,46 @@ def create_expense_table_with_years(categories, show_monthly=True):
     return edited_df
 
 # Function to calculate departmental breakdown for charts
+# Departments shown on the departmental charts, in DEFAULT_DEPARTMENTS order ("Opex" is shown as "Operations")
+DEPARTMENT_LABELS = ["Product Development", "Sales and Marketing", "Operations"]
+
+def expense_rows(expenses, categories):
+    """Categories x months array of liquidity expense amounts"""
+    rows = [[float(expenses.get(category, {}).get(month, 0) or 0) for month in months] for category in categories]
+    return np.array(rows, dtype=float).reshape(len(categories), len(months))
+
 def calculate_departmental_breakdown():
     """Calculate spending by department using actual cash disbursements allocated by department percentages from headcount data"""
-    
-    # Initialize department totals
-    department_totals = {
-        "Product Development": {month: 0 for month in months},
-        "Sales and Marketing": {month: 0 for month in months},
-        "Operations": {month: 0 for month in months}  # Renamed from "Opex" for display
-    }
-    
-    # Get actual cash disbursements from liquidity expenses
     expenses = st.session_state.model_data["liquidity_data"].get("expenses", {})
-    actual_payroll_disbursements = expenses.get("Payroll", {month: 0 for month in months})
-    actual_contractor_disbursements = expenses.get("Contractors", {month: 0 for month in months})
+    department_spend = np.zeros((len(DEPARTMENT_LABELS), len(months)))
     
-    # Calculate departmental allocation percentages from headcount data
+    # Allocate actual payroll and contractor disbursements by the headcount model's department shares
     if "payroll_data" in st.session_state.model_data:
-        # Get theoretical departmental payroll breakdown to calculate percentages
-        payroll_by_dept, total_theoretical_payroll = get_calculated_payroll_from_headcount()
-        
-        # Get theoretical departmental contractor breakdown to calculate percentages
-        payroll_data = st.session_state.model_data["payroll_data"]
-        contractors = payroll_data.get("contractors", {})
-        
-        contractor_costs_by_dept = {
-            "Product Development": {month: 0 for month in months},
-            "Sales and Marketing": {month: 0 for month in months},
-            "Opex": {month: 0 for month in months}
-        }
-        total_theoretical_contractors = {month: 0 for month in months}
-        
-        for contractor_data in contractors.values():
-            resources = contractor_data.get("resources", 0)
-            hourly_rate = contractor_data.get("hourly_rate", 0)
-            department = contractor_data.get("department", "Product Development")
-            monthly_cost = resources * hourly_rate * 40 * 4
-            
-            for month in months:
-                if is_contractor_active_for_month(contractor_data, month):
-                    contractor_costs_by_dept[department][month] += monthly_cost
-                    total_theoretical_contractors[month] += monthly_cost
-        
-        # Apply departmental percentages to actual cash disbursements
-        for month in months:
-            # Allocate payroll disbursements by department percentage
-            total_payroll = total_theoretical_payroll.get(month, 0)
-            actual_payroll = actual_payroll_disbursements.get(month, 0)
-            
-            if total_payroll > 0:
-                # Calculate department percentages and apply to actual disbursements
-                pd_payroll_pct = payroll_by_dept["Product Development"].get(month, 0) / total_payroll
-                sm_payroll_pct = payroll_by_dept["Sales and Marketing"].get(month, 0) / total_payroll
-                ops_payroll_pct = payroll_by_dept["Opex"].get(month, 0) / total_payroll
-                
-                department_totals["Product Development"][month] += actual_payroll * pd_payroll_pct
-                department_totals["Sales and Marketing"][month] += actual_payroll * sm_payroll_pct
-                department_totals["Operations"][month] += actual_payroll * ops_payroll_pct
-            
-            # Allocate contractor disbursements by department percentage
-            total_contractors = total_theoretical_contractors.get(month, 0)
-            actual_contractors = actual_contractor_disbursements.get(month, 0)
-            
-            if total_contractors > 0:
-                # Calculate department percentages and apply to actual disbursements
-                pd_contractor_pct = contractor_costs_by_dept["Product Development"].get(month, 0) / total_contractors
-                sm_contractor_pct = contractor_costs_by_dept["Sales and Marketing"].get(month, 0) / total_contractors
-                ops_contractor_pct = contractor_costs_by_dept["Opex"].get(month, 0) / total_contractors
-                
-                department_totals["Product Development"][month] += actual_contractors * pd_contractor_pct
-                department_totals["Sales and Marketing"][month] += actual_contractors * sm_contractor_pct
-                department_totals["Operations"][month] += actual_contractors * ops_contractor_pct
+        shares = calculate_department_shares(st.session_state.model_data["payroll_data"], months)
+        payroll, contractors = expense_rows(expenses, ["Payroll", "Contractors"])
+        department_spend += shares["payroll"] * payroll + shares["contractors"] * contractors
     
-    # Add other expense categories based on their classification
+    # Other expense categories go to the department of their classification (Operations by default)
     expense_categories = st.session_state.model_data["liquidity_data"].get("expense_categories", {})
+    categories = [category for category in expense_categories if category not in ["Payroll", "Contractors"] and category in expenses]
+    if categories:
+        department_index = [
+            DEFAULT_DEPARTMENTS.index(classification) if classification in DEFAULT_DEPARTMENTS else DEPARTMENT_LABELS.index("Operations")
+            for classification in (expense_categories[category].get("classification", "Operations") for category in categories)
+        ]
+        membership = np.zeros((len(DEPARTMENT_LABELS), len(categories)))
+        membership[department_index, np.arange(len(categories))] = 1.0
+        department_spend += membership @ expense_rows(expenses, categories)
     
-    # Classification to department mapping
-    classification_to_dept = {
-        "Product Development": "Product Development",
-        "Sales and Marketing": "Sales and Marketing", 
-        "Opex": "Operations"
-    }
-    
-    for category, category_info in expense_categories.items():
-        # Skip Payroll and Contractors as they're already handled above
-        if category in ["Payroll", "Contractors"]:
-            continue
-            
-        classification = category_info.get("classification", "Operations")
-        department = classification_to_dept.get(classification, "Operations")
-        
-        if category in expenses:
-            for month in months:
-                expense_amount = expenses[category].get(month, 0)
-                department_totals[department][month] += expense_amount
-    
-    return department_totals
+    return {dept: dict(zip(months, department_spend[i].tolist())) for i, dept in enumerate(DEPARTMENT_LABELS)}
 
 def calculate_departmental_percentages(department_totals):
     """Calculate percentage breakdown by department for each month"""
-    department_percentages = {
-        "Product Development": {month: 0 for month in months},
-        "Sales and Marketing": {month: 0 for month in months},
-        "Operations": {month: 0 for month in months}
-    }
-    
-    for month in months:
-        total_spend = sum(dept_data[month] for dept_data in department_totals.values())
-        
-        if total_spend > 0:
-            for dept in department_percentages:
-                department_percentages[dept][month] = (department_totals[dept][month] / total_spend) * 100
-    
-    return department_percentages
+    spend = np.array([[department_totals[dept][month] for month in months] for dept in DEPARTMENT_LABELS])
+    total_spend = spend.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percentages = np.where(total_spend > 0, spend / total_spend * 100, 0.0)
+    return {dept: dict(zip(months, percentages[i].tolist())) for i, dept in enumerate(DEPARTMENT_LABELS)}
 
 # Function to calculate and update SG&A expenses in main model
 def update_sga_expenses():
@@ -1478,36 +1263,8 @@ def update_sga_expenses():
     if "sga_expenses" not in st.session_state.model_data:
         st.session_state.model_data["sga_expenses"] = {}
     
-    # Map liquidity categories to SG&A categories
-    liquidity_to_sga_mapping = {
-        "Payroll": "Payroll",
-        "Contractors": "Contractors",
-        "License Fees": "License Fees",
-        "Travel": "Travel",
-        "Shows": "Shows",
-        "Associations": "Associations",
-        "Marketing": "Marketing",
-        "Company Vehicle": "Company Vehicle",
-        "Grant Writer": "Grant Writer",
-        "Insurance": "Insurance",
-        "Legal Professional Fees": "Legal Professional Fees",
-        "Permitting Fees Licensing": "Permitting Fees Licensing",
-        "Shared Services": "Shared Services",
-        "Consultants Audit Tax": "Consultants Audit Tax",
-        "Pritchard Amex": "Pritchard Amex",
-        "Contingencies": "Contingencies",
-    }
-    
-    # Update each SG&A category in the correct order
-    ordered_categories = st.session_state.model_data["liquidity_data"].get("category_order", list(liquidity_to_sga_mapping.keys()))
-    
-    # Clear existing SG&A data to rebuild in correct order
-    st.session_state.model_data["sga_expenses"] = {}
-    
-    for liquidity_cat in ordered_categories:
-        if liquidity_cat in liquidity_to_sga_mapping and liquidity_cat in st.session_state.model_data["liquidity_data"]["expenses"]:
-            sga_cat = liquidity_to_sga_mapping[liquidity_cat]
-            st.session_state.model_data["sga_expenses"][sga_cat] = st.session_state.model_data["liquidity_data"]["expenses"][liquidity_cat].copy()
+    # Every disbursement category in order, matched to its expenses through the category registry
+    st.session_state.model_data["sga_expenses"] = sga_from_liquidity(st.session_state.model_data["liquidity_data"])
     
     # Save updated SG&A expenses to database to maintain sync
     try:
@@ -1521,33 +1278,10 @@ def update_sga_expenses():
 # Function to calculate cash flow and cumulative balance
 def calculate_cash_flow():
     """Calculate monthly cash flow and cumulative balance"""
-    
-    cash_flow = {}
-    cumulative_balance = {}
-    starting_balance = st.session_state.model_data["liquidity_data"]["starting_balance"]
-    running_balance = starting_balance
-    
-    for month in months:
-        # Cash inflows
-        revenue = st.session_state.model_data["liquidity_data"]["revenue"].get(month, 0)
-        other_cash_receipts = st.session_state.model_data["liquidity_data"]["other_cash_receipts"].get(month, 0)
-        investment = st.session_state.model_data["liquidity_data"]["investment"].get(month, 0)
-        
-        # Cash outflows (sum of all expenses)
-        total_expenses = sum(
-            st.session_state.model_data["liquidity_data"]["expenses"].get(category, {}).get(month, 0)
-            for category in st.session_state.model_data["liquidity_data"]["expense_categories"].keys()
-        )
-        
-        # Monthly cash flow
-        monthly_flow = revenue + other_cash_receipts + investment - total_expenses
-        cash_flow[month] = monthly_flow
-        
-        # Cumulative balance
-        running_balance += monthly_flow
-        cumulative_balance[month] = running_balance
-    
-    return cash_flow, cumulative_balance
+    liquidity_data = st.session_state.model_data["liquidity_data"]
+    # Cached per liquidity content (in cents), so unrelated widget changes reuse it
+    series = get_cash_flow_series(liquidity_data, months, list(liquidity_data["expense_categories"].keys()))
+    return series_to_dict(series["net_flow"], months), series_to_dict(series["balance"], months)
 
 # Function to create summary tables
 def create_summary_table_with_years(data_dict, row_label, show_monthly=True, is_balance=False, use_color=False):
@@ -1595,19 +1329,19 @@ def create_summary_table_with_years(data_dict, row_label, show_monthly=True, is_
     html_content += '<tbody>'
     html_content += '<tr style="height: 43px !important;">'
     
+    yearly_totals = yearly_by_label(data_dict, months)
+    year_end_values = yearly_by_label(data_dict, months, "year_end")
     if show_monthly:
         for year in sorted(years_dict.keys()):
-            yearly_total = 0
+            yearly_total = yearly_totals[year]
             for month in years_dict[year]:
                 value = data_dict.get(month, 0)
                 formatted_value = format_number_with_color(value) if use_color else format_number(value)
                 html_content += f'<td class="data-cell" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;">{formatted_value}</td>'
-                yearly_total += value
             
             if is_balance:
                 # For balance, show end-of-year value
-                last_month = years_dict[year][-1]
-                eoy_value = data_dict.get(last_month, 0)
+                eoy_value = year_end_values[year]
                 formatted_eoy = format_number_with_color(eoy_value) if use_color else format_number(eoy_value)
                 html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{formatted_eoy}</strong></td>'
             else:
@@ -1618,13 +1352,12 @@ def create_summary_table_with_years(data_dict, row_label, show_monthly=True, is_
         for year in sorted(years_dict.keys()):
             if is_balance:
                 # For balance, show end-of-year value
-                last_month = years_dict[year][-1]
-                eoy_value = data_dict.get(last_month, 0)
+                eoy_value = year_end_values[year]
                 formatted_eoy = format_number_with_color(eoy_value) if use_color else format_number(eoy_value)
                 html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{formatted_eoy}</strong></td>'
             else:
                 # For flows, show total
-                yearly_total = sum(data_dict.get(month, 0) for month in years_dict[year])
+                yearly_total = yearly_totals[year]
                 formatted_total = format_number_with_color(yearly_total) if use_color else format_number(yearly_total)
                 html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{formatted_total}</strong></td>'
     
@@ -1687,19 +1420,19 @@ def create_combined_cash_flow_summary(data_list, show_monthly=True):
         is_balance = data_config.get("is_balance", False)
         use_color = data_config.get("use_color", False)
         
+        yearly_totals = yearly_by_label(data_dict, months)
+        year_end_values = yearly_by_label(data_dict, months, "year_end")
         if show_monthly:
             for year in sorted(years_dict.keys()):
-                yearly_total = 0
+                yearly_total = yearly_totals[year]
                 for month in years_dict[year]:
                     value = data_dict.get(month, 0)
                     formatted_value = format_number_with_color(value) if use_color else format_number(value)
                     html_content += f'<td class="data-cell" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;">{formatted_value}</td>'
-                    yearly_total += value
                 
                 if is_balance:
                     # For balance, show end-of-year value
-                    last_month = years_dict[year][-1]
-                    eoy_value = data_dict.get(last_month, 0)
+                    eoy_value = year_end_values[year]
                     formatted_eoy = format_number_with_color(eoy_value) if use_color else format_number(eoy_value)
                     html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{formatted_eoy}</strong></td>'
                 else:
@@ -1710,13 +1443,12 @@ def create_combined_cash_flow_summary(data_list, show_monthly=True):
             for year in sorted(years_dict.keys()):
                 if is_balance:
                     # For balance, show end-of-year value
-                    last_month = years_dict[year][-1]
-                    eoy_value = data_dict.get(last_month, 0)
+                    eoy_value = year_end_values[year]
                     formatted_eoy = format_number_with_color(eoy_value) if use_color else format_number(eoy_value)
                     html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{formatted_eoy}</strong></td>'
                 else:
                     # For flows, show total
-                    yearly_total = sum(data_dict.get(month, 0) for month in years_dict[year])
+                    yearly_total = yearly_totals[year]
                     formatted_total = format_number_with_color(yearly_total) if use_color else format_number(yearly_total)
                     html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{formatted_total}</strong></td>'
         
@@ -1823,6 +1555,16 @@ except Exception as e:
 # Auto-populate payroll and contractor data from headcount tab
 # update_liquidity_with_payroll()
 
+# Personnel costs, department shares and the cash flow series are independent once the roster is
+# built; evaluate them together up front (concurrently for large models) after the revenue sync, so
+# the payroll sync, departmental breakdown and cash flow tables below are cache hits
+sub_models = evaluate_sub_models(
+    st.session_state.model_data,
+    months,
+    ["personnel", "department_shares", "expenses"],
+    {"default_tax_percentage": 10.0, "categories": list(st.session_state.model_data["liquidity_data"].get("expense_categories", {}).keys())},
+)
+
 # View toggle
 view_col1, view_col2 = st.columns([0.75, 3.25])
 with view_col1:
@@ -1882,20 +1624,17 @@ with st.expander("💵 Cash Receipts", expanded=False):
         data_key = cash_data_keys[i]
         row = {"Cash Flow Item": category}
         
+        yearly_totals = yearly_by_label(st.session_state.model_data["liquidity_data"][data_key], months)
         if show_monthly:
             for year in sorted(years_dict.keys()):
-                yearly_total = 0
+                yearly_total = yearly_totals[year]
                 for month in years_dict[year]:
                     value = st.session_state.model_data["liquidity_data"][data_key].get(month, 0)
                     row[month] = value
-                    yearly_total += value
                 row[f"{year} Total"] = f"**{format_number(yearly_total)}**"
         else:
             for year in sorted(years_dict.keys()):
-                yearly_total = sum(
-                    st.session_state.model_data["liquidity_data"][data_key].get(month, 0)
-                    for month in years_dict[year]
-                )
+                yearly_total = yearly_totals[year]
                 row[f"{year} Total"] = f"**{format_number(yearly_total)}**"
         
         # Add type column
@@ -1951,8 +1690,9 @@ with st.expander("💵 Cash Receipts", expanded=False):
                         new_value = float(value) if value != '' else 0
                         old_value = st.session_state.cash_receipts_original[data_key].get(month, 0)
                         
-                        if old_value != new_value:
+                        if amounts_differ(old_value, new_value):
                             changes_made = True
+                            new_value = round_to_cents(new_value)
                             st.session_state.model_data["liquidity_data"][data_key][month] = new_value
                             st.session_state.cash_receipts_original[data_key][month] = new_value
     
@@ -1968,6 +1708,91 @@ with st.expander("💵 Cash Receipts", expanded=False):
         except Exception as e:
             st.error(f"Save failed: {e}")
 
+# EXPENSE DRIVERS SECTION - COLLAPSIBLE
+if "expense_drivers" not in st.session_state.model_data:
+    st.session_state.model_data["expense_drivers"] = load_expense_drivers_from_database()
+
+with st.expander("🧭 Expense Drivers", expanded=False):
+    st.info("🎯 Calculate a disbursement category from a driver instead of typing it month by month: a fixed monthly amount, an amount per active employee, per active subscription customer, or a % of revenue. Driven months start at the Start Month and replace the entered values; earlier months are kept.")
+    
+    driver_categories = list(st.session_state.model_data["liquidity_data"].get("category_order", []))
+    edited_drivers_df = st.data_editor(
+        pd.DataFrame(drivers_to_rows(st.session_state.model_data["expense_drivers"]), columns=list(DRIVER_COLUMNS.values())),
+        num_rows="dynamic",
+        use_container_width=True,
+        hide_index=True,
+        key="expense_drivers_editor",
+        column_config={
+            "Category": st.column_config.SelectboxColumn("Category", options=driver_categories, required=True),
+            "Driver": st.column_config.SelectboxColumn("Driver", options=DRIVER_TYPES, default="Fixed", required=True),
+            "Rate": st.column_config.NumberColumn("Rate", help="Monthly amount ($), $ per employee, $ per customer, or % of revenue", step=1.0, format="%.2f"),
+            "Start Month": st.column_config.SelectboxColumn("Start Month", options=months),
+        }
+    )
+    
+    edited_drivers = rows_to_drivers(edited_drivers_df.to_dict("records"), driver_categories)
+    if edited_drivers != st.session_state.model_data["expense_drivers"]:
+        st.session_state.model_data["expense_drivers"] = edited_drivers
+        save_expense_drivers_to_database(edited_drivers)
+
+# Evaluate every driver for the whole horizon in one pass (cached until a driver or its inputs change)
+# and write the results into the disbursements; the liquidity data is saved only when a value moved
+if st.session_state.model_data["expense_drivers"]:
+    driven_expenses = evaluate_expense_drivers(
+        st.session_state.model_data["expense_drivers"], driver_inputs(st.session_state.model_data, months), months
+    )
+    liquidity_expenses = st.session_state.model_data["liquidity_data"].setdefault("expenses", {})
+    if apply_expense_drivers(liquidity_expenses, driven_expenses, months):
+        save_liquidity_data_to_database(st.session_state.model_data)
+
+# FORECAST FROM ACTUALS SECTION - COLLAPSIBLE
+if "actuals_through" not in st.session_state.model_data:
+    st.session_state.model_data["actuals_through"] = load_actuals_through_from_database()
+
+with st.expander("🔮 Forecast from Actuals", expanded=False):
+    st.info("📈 Once actuals are entered, forecast the remaining months of every disbursement category and budget line. Each series is fitted with a trailing average, a linear trend and seasonal exponential smoothing; the model with the lowest error on the last 3 actual months is used. Driver-based categories are left to their drivers.")
+    
+    actuals_options = ["None"] + months
+    saved_actuals_through = st.session_state.model_data["actuals_through"]
+    actuals_through = st.selectbox(
+        "Actuals Through:",
+        actuals_options,
+        index=actuals_options.index(saved_actuals_through) if saved_actuals_through in actuals_options else 0,
+        key="actuals_through_select"
+    )
+    actuals_through = "" if actuals_through == "None" else actuals_through
+    if actuals_through != saved_actuals_through:
+        st.session_state.model_data["actuals_through"] = actuals_through
+        save_actuals_through_to_database(actuals_through)
+    
+    if not actuals_through:
+        st.caption("Select the last month with actuals to see proposals.")
+    else:
+        # All series are fitted together on one stacked array (cached until the actuals change)
+        driven_categories = [driver["category"] for driver in st.session_state.model_data["expense_drivers"]]
+        forecast = forecast_from_actuals(st.session_state.model_data, months, actuals_through, driven_categories)
+        
+        if not forecast["months"] or not forecast["labels"]:
+            st.caption("Nothing left to forecast after the selected month.")
+        else:
+            st.dataframe(pd.DataFrame({
+                "Source": [source for source, _ in forecast["labels"]],
+                "Series": [key for _, key in forecast["labels"]],
+                "Model": [FORECAST_MODELS[model] for model in forecast["model"].tolist()],
+                "Holdout Error": [format_number(error) if np.isfinite(error) else "-" for error in forecast["errors"].min(axis=0).tolist()],
+                forecast["months"][0]: [format_number(values[0]) for values in forecast["forecast"].tolist()],
+                "Proposed Total": [format_number(total) for total in forecast["forecast"].sum(axis=1).tolist()],
+            }), use_container_width=True, hide_index=True)
+            
+            if st.button(f"✅ Apply Forecast ({forecast['months'][0]} - {forecast['months'][-1]})", key="apply_forecast"):
+                changed = apply_forecast(st.session_state.model_data, forecast)
+                if changed[FORECAST_SOURCES[0]]:
+                    save_liquidity_data_to_database(st.session_state.model_data)
+                if changed[FORECAST_SOURCES[1]]:
+                    save_budget_data_to_database(st.session_state.model_data)
+                st.success(f"Forecast applied to {len(changed[FORECAST_SOURCES[0]])} disbursement categories and {len(changed[FORECAST_SOURCES[1]])} budget lines")
+                st.rerun()
+
 # CASH DISBURSEMENTS SECTION - COLLAPSIBLE
 with st.expander("💸 Cash Disbursements", expanded=False):
     
@@ -1997,16 +1822,16 @@ with st.expander("💸 Cash Disbursements", expanded=False):
             st.markdown("<br>", unsafe_allow_html=True)  # Add spacing
             if st.button("➕ Add Category", type="primary"):
                 # Clean the category name
-                clean_new_category = ' '.join(new_category.split()).strip()
+                clean_new_category = canonical_name(new_category)
                 
                 if not clean_new_category:
                     st.error("Please enter a category name!")
                 else:
-                    # Check for duplicates (case-insensitive)
-                    existing_categories_lower = {cat.lower(): cat for cat in st.session_state.model_data["liquidity_data"]["expense_categories"].keys()}
+                    # Check for duplicates (same registry id: case, spacing and legacy spellings match)
+                    existing_category_ids = {intern(EXPENSES, cat): cat for cat in st.session_state.model_data["liquidity_data"]["expense_categories"].keys()}
                     
-                    if clean_new_category.lower() in existing_categories_lower:
-                        st.error(f"Category '{existing_categories_lower[clean_new_category.lower()]}' already exists!")
+                    if lookup(EXPENSES, clean_new_category) in existing_category_ids:
+                        st.error(f"Category '{existing_category_ids[lookup(EXPENSES, clean_new_category)]}' already exists!")
                     else:
                         # Sync to database first
                         if sync_category_to_database(clean_new_category, action="add", classification=classification):
@@ -2176,14 +2001,8 @@ with st.expander("💸 Cash Disbursements", expanded=False):
     
     # Get categories from category_order but ensure no duplicates
     raw_categories = st.session_state.model_data["liquidity_data"].get("category_order", [])
-    # Remove duplicates while preserving order
-    seen = set()
-    expense_categories = []
-    for cat in raw_categories:
-        clean_cat = ' '.join(cat.split()).strip()
-        if clean_cat.lower() not in seen:
-            seen.add(clean_cat.lower())
-            expense_categories.append(clean_cat)
+    # Remove duplicates (by registry id) while preserving order
+    expense_categories = unique_names(EXPENSES, raw_categories)
     
     # Update the cleaned category order
     st.session_state.model_data["liquidity_data"]["category_order"] = expense_categories
@@ -2613,7 +2432,7 @@ metrics_col1, metrics_col2 = st.columns([0.75, 3.25])
 with metrics_col1:
     # Calculate default index based on current year
     current_year = str(datetime.now().year)
-    metrics_options = ["2025", "2026", "2027", "2028", "2029", "2030", "All Years"]
+    metrics_options = horizon_years(months) + ["All Years"]
     try:
         default_metrics_index = metrics_options.index(current_year)
     except ValueError:
@@ -2847,24 +2666,19 @@ if chart_type in ["dept_gross", "dept_percent"]:
         years_dict = group_months_by_year(months)
         year_labels = []
         dept_chart_data = {dept: [] for dept in department_totals.keys()}
+        # Cached yearly rollups of each department's monthly spend
+        dept_yearly_totals = {dept: yearly_by_label(department_totals[dept], months) for dept in department_totals.keys()}
         
         for year in sorted(years_dict.keys()):
             year_labels.append(str(year))
-            year_months = years_dict[year]
             
+            yearly_totals = {dept: dept_yearly_totals[dept][year] for dept in department_totals.keys()}
             if chart_type == "dept_gross":
-                # Calculate yearly totals for each department
                 for dept in department_totals.keys():
-                    yearly_total = sum(department_totals[dept].get(month, 0) for month in year_months)
-                    dept_chart_data[dept].append(yearly_total)
+                    dept_chart_data[dept].append(yearly_totals[dept])
             else:  # dept_percent
                 # Calculate yearly percentages for each department
-                yearly_totals = {}
-                total_yearly_spend = 0
-                for dept in department_totals.keys():
-                    yearly_total = sum(department_totals[dept].get(month, 0) for month in year_months)
-                    yearly_totals[dept] = yearly_total
-                    total_yearly_spend += yearly_total
+                total_yearly_spend = sum(yearly_totals.values())
                 
                 for dept in department_percentages.keys():
                     if total_yearly_spend > 0:
@@ -3024,10 +2838,360 @@ elif not chart_df.empty:
     # Display the chart
     st.plotly_chart(fig, use_container_width=True)
 
+st.markdown("---")
+
+# 13-WEEK AND DAILY CASH SECTION
+st.markdown('<div class="section-header">📆 13-Week & Daily Cash</div>', unsafe_allow_html=True)
+st.info("🎯 Monthly amounts are placed on their payment dates: payroll follows the biweekly pay calendar and the pay periods from Headcount Planning, inflows can be collected with a lag. The monthly roll-up below totals them by payment month; it differs from the tables above only where a lag moves an amount into a later month.")
+
+if "payment_schedules" not in st.session_state.model_data:
+    st.session_state.model_data["payment_schedules"] = load_payment_schedules_from_database()
+payment_schedules = st.session_state.model_data["payment_schedules"]
+
+with st.expander("⚙️ Payment & Collection Timing", expanded=False):
+    schedule_keys = list(INFLOW_LABELS.keys()) + st.session_state.model_data["liquidity_data"].get("category_order", [])
+    schedule_rows = []
+    for key in schedule_keys:
+        schedule = {**DEFAULT_PAYMENT_SCHEDULES.get(key, DEFAULT_OUTFLOW_SCHEDULE), **payment_schedules.get(key, {})}
+        schedule_rows.append({
+            "Row": INFLOW_LABELS.get(key, key),
+            "Timing": schedule["timing"],
+            "Day of Month": int(schedule.get("day", 1)),
+            "Lag (days)": int(schedule.get("lag_days", 0)),
+        })
+    edited_schedule_df = st.data_editor(
+        pd.DataFrame(schedule_rows),
+        use_container_width=True,
+        hide_index=True,
+        disabled=["Row"],
+        key="payment_schedule_editor",
+        column_config={
+            "Timing": st.column_config.SelectboxColumn("Timing", options=TIMING_OPTIONS, required=True),
+            "Day of Month": st.column_config.NumberColumn("Day of Month", min_value=1, max_value=31, step=1),
+            "Lag (days)": st.column_config.NumberColumn("Lag (days)", min_value=0, max_value=365, step=1),
+        }
+    )
+    edited_schedules = {
+        key: {
+            "timing": row["Timing"] or DEFAULT_OUTFLOW_SCHEDULE["timing"],
+            "day": int(row["Day of Month"]) if pd.notna(row["Day of Month"]) else 1,
+            "lag_days": int(row["Lag (days)"]) if pd.notna(row["Lag (days)"]) else 0,
+        }
+        for key, row in zip(schedule_keys, edited_schedule_df.to_dict("records"))
+    }
+    if edited_schedules != {key: {**DEFAULT_PAYMENT_SCHEDULES.get(key, DEFAULT_OUTFLOW_SCHEDULE), **payment_schedules.get(key, {})} for key in schedule_keys}:
+        st.session_state.model_data["payment_schedules"] = edited_schedules
+        payment_schedules = edited_schedules
+        save_payment_schedules_to_database(edited_schedules)
+
+cash_ledger = build_cash_ledger(
+    st.session_state.model_data["liquidity_data"],
+    st.session_state.model_data.get("payroll_data", {}).get("pay_periods", {}),
+    months,
+    payment_schedules,
+)
 
+# Weekly view starts at the current week, kept inside the planning horizon
+view_start = min(max(date.today(), datetime.strptime(months[0], "%b %Y").date()), datetime.strptime(months[-1], "%b %Y").date())
+week_view = weekly_view(cash_ledger, view_start, 13)
+week_labels = [str(week_start)[5:].replace("-", "/") for week_start in week_view["week_starts"]]
+
+weekly_rows = []
+for i, row_name in enumerate(week_view["rows"]):
+    signed = week_view["totals"][i] * cash_ledger["row_sign"][i]
+    if signed.any():
+        weekly_rows.append({"Item": row_name, **dict(zip(week_labels, signed))})
+weekly_rows.append({"Item": "Net Cash Flow", **dict(zip(week_labels, week_view["net"]))})
+weekly_rows.append({"Item": "Closing Balance", **dict(zip(week_labels, week_view["closing_balance"]))})
+
+st.markdown(f"**13-Week Cash Forecast** (weeks starting Monday, opening balance ${week_view['opening_balance']:,.0f})")
+st.dataframe(
+    pd.DataFrame(weekly_rows).style.format({label: "${:,.0f}" for label in week_labels}),
+    use_container_width=True,
+    hide_index=True
+)
+
+# Ledger rolled up to months by payment date, for the twelve months from the current one
+day_balance = daily_balance(cash_ledger)
+month_rollup = monthly_rollup(cash_ledger)
+rollup_start = months.index(view_start.strftime("%b %Y"))
+rollup_months = months[rollup_start:rollup_start + 12]
+rollup_columns = slice(rollup_start, rollup_start + len(rollup_months))
+rollup_net = cash_ledger["row_sign"] @ month_rollup[:, rollup_columns]
+planned_net = cash_ledger["row_sign"] @ cash_ledger["planned"][:, rollup_columns]
+month_end_days = np.append(cash_ledger["month_offsets"][1:], cash_ledger["day_count"])[rollup_columns] - 1
+
+monthly_ledger_rows = []
+for i, row_name in enumerate(cash_ledger["rows"]):
+    signed = month_rollup[i, rollup_columns] * cash_ledger["row_sign"][i]
+    if signed.any():
+        monthly_ledger_rows.append({"Item": row_name, **dict(zip(rollup_months, signed))})
+monthly_ledger_rows.append({"Item": "Net Cash Flow", **dict(zip(rollup_months, rollup_net))})
+monthly_ledger_rows.append({"Item": "Timing Difference vs Plan", **dict(zip(rollup_months, rollup_net - planned_net))})
+monthly_ledger_rows.append({"Item": "Closing Balance", **dict(zip(rollup_months, day_balance[month_end_days]))})
+
+st.markdown("**Monthly Cash by Payment Date** (timing difference is the net cash a collection or payment lag moves out of, or into, each month)")
+st.dataframe(
+    pd.DataFrame(monthly_ledger_rows).style.format({month: "${:,.0f}" for month in rollup_months}),
+    use_container_width=True,
+    hide_index=True
+)
+
+# Daily closing balance for the next 90 days
+first_day = int((np.datetime64(view_start, "D") - cash_ledger["start_date"]).astype(int))
+daily_slice = slice(first_day, min(first_day + 90, cash_ledger["day_count"]))
+fig = go.Figure()
+fig.add_trace(go.Scatter(
+    x=np.arange(cash_ledger["start_date"], cash_ledger["start_date"] + cash_ledger["day_count"])[daily_slice].astype(str),
+    y=day_balance[daily_slice],
+    mode='lines',
+    name='Daily Balance',
+    line=dict(color='#00D084', width=2, shape='hv'),
+    hovertemplate='<b>%{x}</b><br>$%{y:,.0f}<extra></extra>'
+))
+fig.add_hline(y=0, line_dash="dash", line_color="#dc3545")
+fig.update_layout(
+    title=dict(text='Daily Cash Balance (next 90 days)', font=dict(size=18, color='#262730')),
+    yaxis=dict(title='Amount ($)', showgrid=True, gridcolor='rgba(128,128,128,0.2)', tickformat='$,.0f'),
+    hovermode='x unified',
+    plot_bgcolor='white',
+    paper_bgcolor='white',
+    font=dict(family="Arial, sans-serif", size=12),
+    height=350,
+    margin=dict(l=50, r=50, t=80, b=50)
+)
+st.plotly_chart(fig, use_container_width=True)
 
 st.markdown("---")
 
+# SCENARIO COMPARISON
+st.markdown('<div class="section-header">🧪 Scenario Comparison</div>', unsafe_allow_html=True)
+st.info("🎯 Define assumption overrides per scenario. All scenarios are evaluated together against the current plan, so the Base row matches the tables above.")
+
+if "scenarios" not in st.session_state.model_data:
+    st.session_state.model_data["scenarios"] = load_scenarios_from_database() or [dict(scenario) for scenario in DEFAULT_SCENARIOS]
+
+scenario_editor_df = pd.DataFrame(scenarios_to_rows(st.session_state.model_data["scenarios"]))
+edited_scenarios_df = st.data_editor(
+    scenario_editor_df,
+    num_rows="dynamic",
+    use_container_width=True,
+    hide_index=True,
+    key="scenario_overrides_editor",
+    column_config={
+        "Scenario": st.column_config.TextColumn("Scenario", required=True),
+        "New Customers %": st.column_config.NumberColumn("New Customers %", step=5.0, format="%.0f%%"),
+        "Churn %": st.column_config.NumberColumn("Churn %", step=5.0, format="%.0f%%"),
+        "Price %": st.column_config.NumberColumn("Price %", step=5.0, format="%.0f%%"),
+        "Hiring Delay (months)": st.column_config.NumberColumn("Hiring Delay (months)", step=1, format="%d"),
+        "Investment Delay (months)": st.column_config.NumberColumn("Investment Delay (months)", step=1, format="%d"),
+        "Other Expenses %": st.column_config.NumberColumn("Other Expenses %", step=5.0, format="%.0f%%"),
+    }
+)
+
+edited_scenarios = rows_to_scenarios(edited_scenarios_df.to_dict("records"))
+if edited_scenarios != normalize_scenarios(st.session_state.model_data["scenarios"]):
+    st.session_state.model_data["scenarios"] = edited_scenarios
+    save_scenarios_to_database(edited_scenarios)
+
+if edited_scenarios:
+    scenario_results = run_scenarios(st.session_state.model_data, months, edited_scenarios)
+    scenario_df = pd.DataFrame(scenario_summary(scenario_results))
+    money_columns = [col for col in scenario_df.columns if col not in ["Scenario", "Cash Runway"]]
+    st.dataframe(
+        scenario_df.style.format({col: "${:,.0f}" for col in money_columns}),
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    # Cumulative cash balance for every scenario
+    fig = go.Figure()
+    for i, name in enumerate(scenario_results["names"]):
+        fig.add_trace(go.Scatter(
+            x=months,
+            y=scenario_results["balance"][i],
+            mode='lines',
+            name=name,
+            hovertemplate='<b>%{fullData.name}</b><br>$%{y:,.0f}<extra></extra>'
+        ))
+    fig.update_layout(
+        title=dict(text='Cumulative Cash Balance by Scenario', font=dict(size=18, color='#262730')),
+        yaxis=dict(title='Amount ($)', showgrid=True, gridcolor='rgba(128,128,128,0.2)', tickformat='$,.0f'),
+        hovermode='x unified',
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(family="Arial, sans-serif", size=12),
+        height=350,
+        margin=dict(l=50, r=50, t=80, b=50)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+st.markdown("---")
+
+# SENSITIVITY ANALYSIS SECTION
+st.markdown('<div class="section-header">🌪️ Sensitivity Analysis</div>', unsafe_allow_html=True)
+st.info("🎯 Each assumption family is moved down and up by the same percentage; all cases are evaluated in one batch against the current plan.")
+
+sens_col1, sens_col2, sens_col3 = st.columns(3)
+with sens_col1:
+    sensitivity_change = st.number_input("Change (+/- %)", min_value=1.0, max_value=100.0, value=10.0, step=5.0)
+with sens_col2:
+    sensitivity_year = st.selectbox("Net Income / Gross Profit Year", sorted({month.split(" ")[1] for month in months}, reverse=True))
+with sens_col3:
+    sensitivity_metric = st.selectbox("Metric", SENSITIVITY_METRICS)
+
+sensitivity = run_sensitivity(st.session_state.model_data, months, sensitivity_change, sensitivity_year)
+metric_label = f"{sensitivity_year} {sensitivity_metric}" if sensitivity_metric != "Minimum Cash" else sensitivity_metric
+tornado_rows = sorted(
+    sensitivity["rows"],
+    key=lambda row: abs(row[f"{sensitivity_metric} High"] - row[f"{sensitivity_metric} Low"])
+)
+
+# Tornado chart: bars show the change from the base value, widest swing on top
+fig = go.Figure()
+fig.add_trace(go.Bar(
+    y=[row["Driver"] for row in tornado_rows],
+    x=[row[f"{sensitivity_metric} Low"] for row in tornado_rows],
+    orientation='h',
+    name=f'-{sensitivity_change:.0f}%',
+    marker_color='#dc3545',
+    hovertemplate='<b>%{y}</b><br>-' + f'{sensitivity_change:.0f}' + '%: $%{x:,.0f}<extra></extra>'
+))
+fig.add_trace(go.Bar(
+    y=[row["Driver"] for row in tornado_rows],
+    x=[row[f"{sensitivity_metric} High"] for row in tornado_rows],
+    orientation='h',
+    name=f'+{sensitivity_change:.0f}%',
+    marker_color='#00D084',
+    hovertemplate='<b>%{y}</b><br>+' + f'{sensitivity_change:.0f}' + '%: $%{x:,.0f}<extra></extra>'
+))
+fig.update_layout(
+    title=dict(text=f'Change in {metric_label} (base ${sensitivity["base"][sensitivity_metric]:,.0f})', font=dict(size=18, color='#262730')),
+    barmode='overlay',
+    xaxis=dict(title='Change ($)', showgrid=True, gridcolor='rgba(128,128,128,0.2)', tickformat='$,.0f', zeroline=True, zerolinecolor='#262730'),
+    plot_bgcolor='white',
+    paper_bgcolor='white',
+    font=dict(family="Arial, sans-serif", size=12),
+    height=400,
+    margin=dict(l=50, r=50, t=80, b=50)
+)
+st.plotly_chart(fig, use_container_width=True)
+
+if sensitivity_metric != "Gross Profit":
+    st.caption("Hosting costs are reported in Cost of Sales only, so they move Gross Profit but not Net Income or cash.")
+
+st.markdown("---")
+
+# GOAL SEEK SECTION
+st.markdown('<div class="section-header">🎯 Goal Seek</div>', unsafe_allow_html=True)
+st.info("🎯 Finds the break-even change to one assumption: the least favourable level that still keeps the chosen cash or income target at or above a threshold.")
+
+seek_col1, seek_col2, seek_col3, seek_col4 = st.columns(4)
+with seek_col1:
+    seek_driver = st.selectbox("Assumption to Change", list(GOAL_SEEK_DRIVERS.keys()))
+with seek_col2:
+    seek_target = st.selectbox("Target", GOAL_SEEK_TARGETS)
+with seek_col3:
+    if seek_target == "Net Income for Year":
+        seek_period = st.selectbox("Year", sorted({month.split(" ")[1] for month in months}))
+    else:
+        seek_period = st.selectbox("Through Month", months, index=len(months) - 1)
+with seek_col4:
+    seek_threshold = st.number_input("At Least ($)", value=0.0, step=10000.0)
+
+if st.button("🎯 Solve", type="primary"):
+    seek_result = goal_seek(st.session_state.model_data, months, seek_driver, seek_target, seek_period, seek_threshold)
+    if seek_result["found"]:
+        result_col1, result_col2, result_col3 = st.columns(3)
+        with result_col1:
+            st.metric(f"{seek_driver} Change", f"{seek_result['change_pct']:+.2f}%")
+        with result_col2:
+            st.metric(seek_result["unit_label"], f"{seek_result['level']:,.2f}")
+        with result_col3:
+            st.metric(f"{seek_target} ({seek_period})", f"${seek_result['value']:,.0f}")
+        st.caption(f"Solved with {seek_result['evaluations']} model evaluations.")
+    elif seek_result["always_met"]:
+        st.info(f"ℹ️ The target is met across the whole search range of {seek_driver.lower()}, so there is no break-even change to solve for.")
+    else:
+        st.warning(f"⚠️ The target cannot be reached by changing {seek_driver.lower()} alone (best case: ${seek_result['value']:,.0f}).")
+
+st.markdown("---")
+
+# MONTE CARLO RUNWAY SECTION
+st.markdown('<div class="section-header">🎲 Monte Carlo Cash Runway</div>', unsafe_allow_html=True)
+st.info("🎯 Samples thousands of plans around the current forecast (new customers, churn, price and expense overruns) to show the range of possible cash outcomes.")
+
+with st.expander("⚙️ Simulation Assumptions", expanded=False):
+    sim_col1, sim_col2, sim_col3 = st.columns(3)
+    with sim_col1:
+        sim_paths = st.number_input("Simulated Paths", min_value=1000, max_value=100000, value=DEFAULT_SIMULATION_SETTINGS["paths"], step=1000)
+        sim_seed = st.number_input("Random Seed", min_value=0, value=DEFAULT_SIMULATION_SETTINGS["seed"], step=1)
+    with sim_col2:
+        sim_new_customers_sd = st.number_input("New Customers Std. Dev. (%)", min_value=0.0, value=DEFAULT_SIMULATION_SETTINGS["new_customers_sd_pct"], step=5.0)
+        sim_churn_sd = st.number_input("Churn Std. Dev. (%)", min_value=0.0, value=DEFAULT_SIMULATION_SETTINGS["churn_sd_pct"], step=5.0)
+        sim_price_sd = st.number_input("Price Std. Dev. (%)", min_value=0.0, value=DEFAULT_SIMULATION_SETTINGS["price_sd_pct"], step=1.0)
+    with sim_col3:
+        sim_overrun_mean = st.number_input("Expense Overrun Mean (%)", value=DEFAULT_SIMULATION_SETTINGS["expense_overrun_mean_pct"], step=1.0)
+        sim_overrun_sd = st.number_input("Expense Overrun Std. Dev. (%)", min_value=0.0, value=DEFAULT_SIMULATION_SETTINGS["expense_overrun_sd_pct"], step=1.0)
+
+if st.button("🎲 Run Simulation", type="primary"):
+    with st.spinner("Simulating cash paths..."):
+        st.session_state.monte_carlo_results = run_monte_carlo(st.session_state.model_data, months, {
+            "paths": int(sim_paths),
+            "seed": int(sim_seed),
+            "new_customers_sd_pct": sim_new_customers_sd,
+            "churn_sd_pct": sim_churn_sd,
+            "price_sd_pct": sim_price_sd,
+            "expense_overrun_mean_pct": sim_overrun_mean,
+            "expense_overrun_sd_pct": sim_overrun_sd,
+        })
+
+simulation = st.session_state.get("monte_carlo_results")
+if simulation and simulation["months"] == months:
+    runway_col1, runway_col2, runway_col3, runway_col4 = st.columns(4)
+    with runway_col1:
+        st.metric("P10 Runway (pessimistic)", simulation["runway_percentiles"][10])
+    with runway_col2:
+        st.metric("P50 Runway (median)", simulation["runway_percentiles"][50])
+    with runway_col3:
+        st.metric("P90 Runway (optimistic)", simulation["runway_percentiles"][90])
+    with runway_col4:
+        st.metric("Probability of Running Out", f"{simulation['depletion_probability']:.1%}")
+    
+    # Fan chart: shaded 5-95 and 25-75 percentile bands around the median balance
+    bands = simulation["balance_percentiles"]
+    fig = go.Figure()
+    for lower, upper, fill_color, label in [(5, 95, 'rgba(0, 208, 132, 0.15)', '5th-95th percentile'), (25, 75, 'rgba(0, 208, 132, 0.35)', '25th-75th percentile')]:
+        fig.add_trace(go.Scatter(x=months, y=bands[upper], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scatter(
+            x=months, y=bands[lower], mode='lines', line=dict(width=0),
+            fill='tonexty', fillcolor=fill_color, name=label, hoverinfo='skip'
+        ))
+    fig.add_trace(go.Scatter(
+        x=months, y=bands[50], mode='lines', name='Median',
+        line=dict(color='#00D084', width=3),
+        hovertemplate='<b>Median</b><br>$%{y:,.0f}<extra></extra>'
+    ))
+    fig.add_hline(y=0, line_dash="dash", line_color="#dc3545")
+    fig.update_layout(
+        title=dict(text=f'Simulated Cash Balance ({simulation["paths"]:,} paths)', font=dict(size=18, color='#262730')),
+        yaxis=dict(title='Amount ($)', showgrid=True, gridcolor='rgba(128,128,128,0.2)', tickformat='$,.0f'),
+        hovermode='x unified',
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(family="Arial, sans-serif", size=12),
+        height=400,
+        margin=dict(l=50, r=50, t=80, b=50)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+st.markdown("---")
+
+# Sub-model timings (Collapsible)
+with st.expander("⏱️ Sub-Model Timings", expanded=False):
+    st.caption(f"{'Concurrent' if sub_models['parallel'] else 'Sequential'} evaluation took {sub_models['total'] * 1000:,.1f} ms; sub-models whose inputs did not change are served from cache")
+    st.dataframe(pd.DataFrame(timing_rows(sub_models)), use_container_width=True, hide_index=True)
+
 # DATA MANAGEMENT SECTION
 st.markdown('<div class="section-header">💾 Data Management</div>', unsafe_allow_html=True)
 
@@ -3057,8 +3221,8 @@ with data_col1:
             if "expenses" in st.session_state.model_data["liquidity_data"]:
                 cleaned_expenses = {}
                 for category, data in st.session_state.model_data["liquidity_data"]["expenses"].items():
-                    # Clean category name - remove extra spaces
-                    clean_category = ' '.join(category.split())
+                    # Registered category name (spacing, case and legacy spellings resolved)
+                    clean_category = resolve(EXPENSES, category)
                     if clean_category in cleaned_expenses:
                         # Merge duplicate entries (shouldn't happen but just in case)
                         for month, value in data.items():
@@ -1,8 +1,12 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import datetime, date
 import time
 import plotly.graph_objects as go
+from rollups import group_months_by_year, yearly_by_label
+from viewport import period_span, prefix_window
+from money import amounts_differ
 from database import (
     load_data,
     save_data,
@@ -12,7 +16,10 @@ from database import (
     load_revenue_assumptions_from_database,
     load_comprehensive_revenue_data_from_database,
     get_supabase_connection_info,
+    get_planning_months,
 )
+from cohort_engine import build_cohort_model, cohort_metrics, logo_retention_curves, segment_logo_retention, yearly_cohort_table
+from segment_store import TRANSACTIONAL_CATEGORIES, build_revenue_model, revenue_inputs, segment_names
 
 # Configure page
 st.set_page_config(
@@ -57,7 +64,8 @@ if not st.session_state.get("revenue_data_initialized", False):
                 'subscription_new_customers', 'subscription_pricing', 'subscription_churn_rates',
                 'implementation_new_customers', 'implementation_pricing',
                 'maintenance_new_customers', 'maintenance_pricing',
-                'transactional_volume', 'transactional_price', 'transactional_referral_fee'
+                'transactional_volume', 'transactional_price', 'transactional_referral_fee',
+                'revenue_segments'
             ]
             for k in keys_to_merge:
                 if k in db_revenue:
@@ -576,46 +584,23 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Generate months from 2025-2030
-def get_months_2025_2030():
-    months = []
-    for year in range(2025, 2031):
-        for month in range(1, 13):
-            months.append(f"{date(year, month, 1).strftime('%b %Y')}")
-    return months
-
-months = get_months_2025_2030()
+# Months of the configured planning horizon
+months = get_planning_months()
 
 # Helper functions
 def get_year_from_month(month_str):
     return month_str.split(' ')[1]
 
-def group_months_by_year(months):
-    years = {}
-    for month in months:
-        year = get_year_from_month(month)
-        if year not in years:
-            years[year] = []
-        years[year].append(month)
-    return years
-
 def format_number(num):
     if num == 0:
         return "0"
     return f"{num:,.0f}"
 
-# Stakeholder list (first 21 business segments from Supabase)
-stakeholders = [
-    "Dealership", "End User", "Equipment Manufacturer", "Upfitter",
-    "Depot", "Fleet Management Company", "Logistics", "OEM",
-    "Traditional Finance Provider", "Channel Partner", "Charging OEM", "Insurance Provider",
-    "Maintenance Provider", "Charging as a Service", "EPC", "Government Agency",
-    "Grant Administrator", "Operating and Maintenance Provider", "Remarketing Specialists", "Technology Solutions",
-    "Utility Provider"
-]
+# Stakeholder list (every revenue segment registered in business_segments)
+stakeholders = segment_names(st.session_state.model_data)
 
 # Transactional revenue categories
-transactional_categories = ["Charging", "Vehicle", "Financing", "Other Revenue"]
+transactional_categories = TRANSACTIONAL_CATEGORIES
 
 # Helper function to create custom cumulative subscribers table with fixed category column
 def create_custom_cumulative_subscribers_table(stakeholders, show_monthly=True):
@@ -669,26 +654,23 @@ def create_custom_cumulative_subscribers_table(stakeholders, show_monthly=True):
     html_content += '<tbody>'
     for stakeholder in stakeholders:
         html_content += '<tr style="height: 43px !important;">'
+        running_totals = st.session_state.model_data.get("subscription_running_totals", {}).get(stakeholder, {})
+        year_end_values = yearly_by_label(running_totals, months, "year_end")
         
         if show_monthly:
             for year in sorted(years_dict.keys()):
-                year_end_value = 0
                 for month in years_dict[year]:
-                    value = st.session_state.model_data.get("subscription_running_totals", {}).get(stakeholder, {}).get(month, 0)
+                    value = running_totals.get(month, 0)
                     # Format as whole number without decimals
                     formatted_value = str(int(round(value)))
                     html_content += f'<td class="data-cell" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;">{formatted_value}</td>'
-                    year_end_value = value  # Keep the last value of the year
                 
                 # Year total shows end-of-year value
-                year_total_formatted = f"<strong>{int(round(year_end_value))} (EOY)</strong>"
+                year_total_formatted = f"<strong>{int(round(year_end_values[year]))} (EOY)</strong>"
                 html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;">{year_total_formatted}</td>'
         else:
             for year in sorted(years_dict.keys()):
-                # Get the last month of the year for end-of-year value
-                last_month = years_dict[year][-1]
-                year_end_value = st.session_state.model_data.get("subscription_running_totals", {}).get(stakeholder, {}).get(last_month, 0)
-                year_total_formatted = f"<strong>{int(round(year_end_value))} (EOY)</strong>"
+                year_total_formatted = f"<strong>{int(round(year_end_values[year]))} (EOY)</strong>"
                 html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;">{year_total_formatted}</td>'
         
         html_content += '</tr>'
@@ -757,22 +739,18 @@ def create_custom_table_with_years(categories, data_key, show_monthly=True):
     html_content += '<tbody>'
     for category in categories:
         html_content += '<tr style="height: 43px !important;">'
+        series = st.session_state.model_data[data_key].get(category, {})
+        yearly_totals = yearly_by_label(series, months)
         
         if show_monthly:
             for year in sorted(years_dict.keys()):
-                yearly_total = 0
                 for month in years_dict[year]:
-                    value = st.session_state.model_data[data_key].get(category, {}).get(month, 0)
+                    value = series.get(month, 0)
                     html_content += f'<td class="data-cell" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;">{format_number(value)}</td>'
-                    yearly_total += value
-                html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{format_number(yearly_total)}</strong></td>'
+                html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{format_number(yearly_totals[year])}</strong></td>'
         else:
             for year in sorted(years_dict.keys()):
-                yearly_total = sum(
-                    st.session_state.model_data[data_key].get(category, {}).get(month, 0)
-                    for month in years_dict[year]
-                )
-                html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{format_number(yearly_total)}</strong></td>'
+                html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{format_number(yearly_totals[year])}</strong></td>'
         
         html_content += '</tr>'
     
@@ -827,17 +805,17 @@ def create_custom_total_row(total_dict, row_label, show_monthly=True):
     # Data row
     html_content += '<tbody><tr class="total-row" style="height: 43px !important;">'
     
+    yearly_totals = yearly_by_label(total_dict, months)
     if show_monthly:
         for year in sorted(years_dict.keys()):
-            yearly_total = 0
+            yearly_total = yearly_totals[year]
             for month in years_dict[year]:
                 value = total_dict.get(month, 0)
                 html_content += f'<td class="data-cell" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;">{format_number(value)}</td>'
-                yearly_total += value
             html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{format_number(yearly_total)}</strong></td>'
     else:
         for year in sorted(years_dict.keys()):
-            yearly_total = sum(total_dict.get(month, 0) for month in years_dict[year])
+            yearly_total = yearly_totals[year]
             html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{format_number(yearly_total)}</strong></td>'
     
     html_content += '</tr></tbody></table>'
@@ -918,6 +896,7 @@ def create_custom_table_with_totals(categories, data_key, show_monthly=True):
                     yearly_total += value
                 html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{format_number(yearly_total)}</strong></td>'
         else:
+            yearly_totals = yearly_by_label(st.session_state.model_data.get(data_key, {}).get(category, {}), months)
             for year in sorted(years_dict.keys()):
                 if category == "Total Revenue":
                     # Calculate total revenue for this year
@@ -928,10 +907,7 @@ def create_custom_table_with_totals(categories, data_key, show_monthly=True):
                         for month in years_dict[year]
                     )
                 else:
-                    yearly_total = sum(
-                        st.session_state.model_data.get(data_key, {}).get(category, {}).get(month, 0)
-                        for month in years_dict[year]
-                    )
+                    yearly_total = yearly_totals[year]
                 html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{format_number(yearly_total)}</strong></td>'
         
         html_content += '</tr>'
@@ -948,15 +924,8 @@ def create_stakeholder_table_with_years(metric_name, data_key, filtered_stakehol
     if data_key not in st.session_state.model_data:
         st.session_state.model_data[data_key] = {}
     
-    # Ensure all stakeholders are initialized (preserve existing data)
-    for stakeholder in filtered_stakeholders:
-        if stakeholder not in st.session_state.model_data[data_key]:
-            st.session_state.model_data[data_key][stakeholder] = {}
-        
-        # Only add missing months, don't overwrite existing data
-        for month in months:
-            if month not in st.session_state.model_data[data_key][stakeholder]:
-                st.session_state.model_data[data_key][stakeholder][month] = default_value
+    # Assumptions are sparse: missing stakeholders and months read as default_value,
+    # so nothing is filled in here (cells are only stored once they are edited)
     
     # Group months by year
     years_dict = group_months_by_year(months)
@@ -975,13 +944,13 @@ def create_stakeholder_table_with_years(metric_name, data_key, filtered_stakehol
     for stakeholder in filtered_stakeholders:
         row = {"Stakeholder": stakeholder}
         
+        yearly_totals = yearly_by_label(st.session_state.model_data[data_key].get(stakeholder, {}), months)
         if show_monthly:
             for year in sorted(years_dict.keys()):
-                yearly_total = 0
+                yearly_total = yearly_totals[year]
                 for month in years_dict[year]:
                     value = st.session_state.model_data[data_key].get(stakeholder, {}).get(month, default_value)
                     row[month] = value
-                    yearly_total += value
                 # Format yearly total - use average for pricing and percentages
                 if format_type == "currency":
                     yearly_avg = yearly_total / len(years_dict[year])
@@ -993,10 +962,7 @@ def create_stakeholder_table_with_years(metric_name, data_key, filtered_stakehol
                     row[f"{year} Total"] = f"**{yearly_total:,.0f}**"
         else:
             for year in sorted(years_dict.keys()):
-                yearly_total = sum(
-                    st.session_state.model_data[data_key].get(stakeholder, {}).get(month, default_value)
-                    for month in years_dict[year]
-                )
+                yearly_total = yearly_totals[year]
                 # Format yearly total - use average for pricing and percentages
                 if format_type == "currency":
                     yearly_avg = yearly_total / len(years_dict[year])
@@ -1057,20 +1023,21 @@ def create_stakeholder_table_with_years(metric_name, data_key, filtered_stakehol
     # Update session state and check for changes
     changes_made = False
     for i, stakeholder in enumerate(filtered_stakeholders):
-        if stakeholder not in st.session_state.model_data[data_key]:
-            st.session_state.model_data[data_key][stakeholder] = {}
-        
+        # Rows are only stored once one of their cells is edited
+        stored = st.session_state.model_data[data_key].get(stakeholder, {})
         if show_monthly:
             for year in sorted(years_dict.keys()):
                 for month in years_dict[year]:
                     if month in edited_df.columns:
                         value = edited_df.iloc[i][month]
                         new_value = float(value) if value != '' else default_value
-                        old_value = st.session_state.model_data[data_key][stakeholder].get(month, default_value)
+                        old_value = stored.get(month, default_value)
                         
-                        if old_value != new_value:
+                        # Money compares in whole cents (no float noise); rates and counts keep full precision
+                        changed = amounts_differ(old_value, new_value) if format_type == "currency" else old_value != new_value
+                        if changed:
                             changes_made = True
-                            st.session_state.model_data[data_key][stakeholder][month] = new_value
+                            st.session_state.model_data[data_key].setdefault(stakeholder, {})[month] = new_value
     
     # Save to database immediately if changes were made
     if changes_made:
@@ -1100,15 +1067,8 @@ def create_transactional_table_with_years(metric_name, data_key, default_value=0
     if data_key not in st.session_state.model_data:
         st.session_state.model_data[data_key] = {}
     
-    # Ensure all categories are initialized (preserve existing data)
-    for category in transactional_categories:
-        if category not in st.session_state.model_data[data_key]:
-            st.session_state.model_data[data_key][category] = {}
-        
-        # Only add missing months, don't overwrite existing data
-        for month in months:
-            if month not in st.session_state.model_data[data_key][category]:
-                st.session_state.model_data[data_key][category][month] = default_value
+    # Assumptions are sparse: missing categories and months read as default_value,
+    # so nothing is filled in here (cells are only stored once they are edited)
     
     # Group months by year
     years_dict = group_months_by_year(months)
@@ -1127,13 +1087,13 @@ def create_transactional_table_with_years(metric_name, data_key, default_value=0
     for category in transactional_categories:
         row = {"Category": category}
         
+        yearly_totals = yearly_by_label(st.session_state.model_data[data_key].get(category, {}), months)
         if show_monthly:
             for year in sorted(years_dict.keys()):
-                yearly_total = 0
+                yearly_total = yearly_totals[year]
                 for month in years_dict[year]:
                     value = st.session_state.model_data[data_key].get(category, {}).get(month, default_value)
                     row[month] = value
-                    yearly_total += value
                 # Format yearly total - use average for pricing and percentages
                 if format_type == "currency":
                     yearly_avg = yearly_total / len(years_dict[year])
@@ -1145,10 +1105,7 @@ def create_transactional_table_with_years(metric_name, data_key, default_value=0
                     row[f"{year} Total"] = f"**{yearly_total:,.0f}**"
         else:
             for year in sorted(years_dict.keys()):
-                yearly_total = sum(
-                    st.session_state.model_data[data_key].get(category, {}).get(month, default_value)
-                    for month in years_dict[year]
-                )
+                yearly_total = yearly_totals[year]
                 # Format yearly total - use average for pricing and percentages
                 if format_type == "currency":
                     yearly_avg = yearly_total / len(years_dict[year])
@@ -1194,20 +1151,21 @@ def create_transactional_table_with_years(metric_name, data_key, default_value=0
     # Update session state and check for changes
     changes_made = False
     for i, category in enumerate(transactional_categories):
-        if category not in st.session_state.model_data[data_key]:
-            st.session_state.model_data[data_key][category] = {}
-        
+        # Rows are only stored once one of their cells is edited
+        stored = st.session_state.model_data[data_key].get(category, {})
         if show_monthly:
             for year in sorted(years_dict.keys()):
                 for month in years_dict[year]:
                     if month in edited_df.columns:
                         value = edited_df.iloc[i][month]
                         new_value = float(value) if value != '' else default_value
-                        old_value = st.session_state.model_data[data_key][category].get(month, default_value)
+                        old_value = stored.get(month, default_value)
                         
-                        if old_value != new_value:
+                        # Money compares in whole cents (no float noise); rates and counts keep full precision
+                        changed = amounts_differ(old_value, new_value) if format_type == "currency" else old_value != new_value
+                        if changed:
                             changes_made = True
-                            st.session_state.model_data[data_key][category][month] = new_value
+                            st.session_state.model_data[data_key].setdefault(category, {})[month] = new_value
     
     # Save to database immediately if changes were made
     if changes_made:
@@ -1254,85 +1212,107 @@ def create_transactional_table_with_years(metric_name, data_key, default_value=0
 
 # Calculate subscription running totals
 def calculate_subscription_running_totals():
-    # Initialize running totals data
-    if "subscription_running_totals" not in st.session_state.model_data:
-        st.session_state.model_data["subscription_running_totals"] = {}
-    
-    # Ensure all stakeholders are initialized
-    for stakeholder in stakeholders:
-        if stakeholder not in st.session_state.model_data["subscription_running_totals"]:
-            st.session_state.model_data["subscription_running_totals"][stakeholder] = {month: 0 for month in months}
-    
-    # Calculate running totals for subscriptions
-    for stakeholder in stakeholders:
-        running_total = 0
-        for month in months:
-            # Get new subscriptions for this month
-            new_subscriptions = st.session_state.model_data.get("subscription_new_customers", {}).get(stakeholder, {}).get(month, 0)
-            
-            # Get churn rate for this month (as percentage, so divide by 100)
-            churn_rate = st.session_state.model_data.get("subscription_churn_rates", {}).get(stakeholder, {}).get(month, 0)
-            churn_decimal = churn_rate / 100.0
-            
-            # Apply churn to existing customers, then add new customers
-            # Formula: Previous * (1 - churn_rate) + New
-            running_total = running_total * (1 - churn_decimal) + new_subscriptions
-            
-            # Store the result (round to avoid floating point precision issues)
-            st.session_state.model_data["subscription_running_totals"][stakeholder][month] = round(running_total, 2)
+    # Segments without subscribers are left out and read as zero; copies, the cached revenue model is shared
+    revenue_model = build_revenue_model(revenue_inputs(st.session_state.model_data), months)
+    st.session_state.model_data["subscription_running_totals"] = {segment: dict(series) for segment, series in revenue_model["subscription_running_totals"].items()}
+    return revenue_model
 
 # Calculate all revenue streams
 def calculate_all_revenue():
-    # Calculate subscription running totals first
-    calculate_subscription_running_totals()
-    
-    # Initialize revenue streams
-    revenue_streams = {
-        "Subscription": {month: 0 for month in months},
-        "Transactional": {month: 0 for month in months},
-        "Implementation": {month: 0 for month in months},
-        "Maintenance": {month: 0 for month in months}
-    }
-    
-    # Subscription Revenue (cumulative customers * monthly pricing)
-    for stakeholder in stakeholders:
-        for month in months:
-            active_customers = st.session_state.model_data.get("subscription_running_totals", {}).get(stakeholder, {}).get(month, 0)
-            monthly_price = st.session_state.model_data.get("subscription_pricing", {}).get(stakeholder, {}).get(month, 0)
-            revenue = active_customers * monthly_price
-            revenue_streams["Subscription"][month] += revenue
-    
-    # Implementation Revenue (one-time fees)
-    for stakeholder in stakeholders:
-        for month in months:
-            new_implementations = st.session_state.model_data.get("implementation_new_customers", {}).get(stakeholder, {}).get(month, 0)
-            implementation_fee = st.session_state.model_data.get("implementation_pricing", {}).get(stakeholder, {}).get(month, 0)
-            revenue = new_implementations * implementation_fee
-            revenue_streams["Implementation"][month] += revenue
-    
-    # Maintenance Revenue (one-time fees)
-    for stakeholder in stakeholders:
-        for month in months:
-            new_maintenance = st.session_state.model_data.get("maintenance_new_customers", {}).get(stakeholder, {}).get(month, 0)
-            maintenance_fee = st.session_state.model_data.get("maintenance_pricing", {}).get(stakeholder, {}).get(month, 0)
-            revenue = new_maintenance * maintenance_fee
-            revenue_streams["Maintenance"][month] += revenue
-    
-    # Transactional Revenue (volume * price * referral fee)
-    for category in transactional_categories:
-        for month in months:
-            volume = st.session_state.model_data.get("transactional_volume", {}).get(category, {}).get(month, 0)
-            price = st.session_state.model_data.get("transactional_price", {}).get(category, {}).get(month, 0)
-            referral_fee = st.session_state.model_data.get("transactional_referral_fee", {}).get(category, {}).get(month, 0)
-            revenue = volume * price * (referral_fee / 100)
-            revenue_streams["Transactional"][month] += revenue
+    # Revenue per stream, recomputed only when the revenue assumptions change
+    streams = calculate_subscription_running_totals()["streams"]
     
     # Update the main revenue data for Income Statement
     if "revenue" not in st.session_state.model_data:
         st.session_state.model_data["revenue"] = {}
     
-    for stream, monthly_data in revenue_streams.items():
-        st.session_state.model_data["revenue"][stream] = monthly_data
+    for stream, values in streams.items():
+        st.session_state.model_data["revenue"][stream] = dict(zip(months, values.tolist()))
+
+# Cohort retention view for the selected stakeholders
+def create_cohort_retention_view(filtered_stakeholders):
+    model_data = st.session_state.model_data
+    new_customers = model_data.get("subscription_new_customers", {}) or {}
+    segments = [stakeholder for stakeholder in filtered_stakeholders if stakeholder in new_customers]
+    if not segments:
+        st.info("No new subscription customers entered for the selected stakeholders.")
+        return
+    
+    cohorts = build_cohort_model(
+        new_customers, model_data.get("subscription_churn_rates", {}), model_data.get("subscription_pricing", {}), months, segments
+    )
+    metrics = cohort_metrics(cohorts)
+    
+    # Latest month with a 12-month comparison
+    latest = np.flatnonzero(~np.isnan(metrics["nrr"]))
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Cohorts", int((cohorts["acquired"] > 0).sum()))
+    with col2:
+        st.metric("Net Revenue Retention", f"{metrics['nrr'][latest[-1]] * 100:.1f}%" if len(latest) else "N/A",
+                  help=f"As of {months[latest[-1]]}" if len(latest) else None)
+    with col3:
+        logo = metrics["logo_retention"]
+        st.metric("Logo Retention", f"{logo[latest[-1]] * 100:.1f}%" if len(latest) and not np.isnan(logo[latest[-1]]) else "N/A")
+    
+    # Trailing 12-month retention over time
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=months, y=metrics["nrr"] * 100, mode='lines', name='Net Revenue Retention', line=dict(color='#00D084', width=2)))
+    fig.add_trace(go.Scatter(x=months, y=metrics["logo_retention"] * 100, mode='lines', name='Logo Retention', line=dict(color='#1f77b4', width=2)))
+    fig.update_layout(
+        title=dict(text='Trailing 12-Month Retention', font=dict(size=18, color='#262730')),
+        xaxis=dict(title='', showgrid=False, tickangle=-45),
+        yaxis=dict(title='Retention (%)', showgrid=True, gridcolor='rgba(128,128,128,0.2)', ticksuffix='%'),
+        hovermode='x unified',
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(family="Arial, sans-serif", size=12),
+        height=350,
+        margin=dict(l=50, r=50, t=80, b=50)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Share of each cohort still active by months since acquisition
+    active = cohorts["acquired"] > 0
+    curves = logo_retention_curves(cohorts)[active] * 100
+    heatmap = go.Figure(go.Heatmap(
+        z=curves,
+        x=list(range(len(months))),
+        y=[month for month, keep in zip(months, active) if keep],
+        colorscale='Greens',
+        zmin=0,
+        zmax=100,
+        hovertemplate='Cohort %{y}<br>Month %{x}: %{z:.1f}%<extra></extra>'
+    ))
+    heatmap.update_layout(
+        title=dict(text='Logo Retention by Cohort', font=dict(size=18, color='#262730')),
+        xaxis=dict(title='Months Since Acquisition'),
+        yaxis=dict(title='', autorange='reversed'),
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(family="Arial, sans-serif", size=12),
+        height=max(350, 12 * len(curves) + 120),
+        margin=dict(l=50, r=50, t=80, b=50)
+    )
+    st.plotly_chart(heatmap, use_container_width=True)
+    
+    # Each segment's own trailing logo retention, from its cohort matrix
+    if len(segments) > 1 and len(latest):
+        st.markdown("**Logo Retention by Segment**")
+        segment_retention = segment_logo_retention(cohorts)[:, latest[-1]]
+        segment_df = pd.DataFrame({
+            "Segment": segments,
+            "Active Customers": cohorts["by_segment"][:, :, latest[-1]].sum(axis=1).round(1),
+            "Logo Retention": [f"{value * 100:.1f}%" if not np.isnan(value) else "N/A" for value in segment_retention],
+        })
+        st.dataframe(segment_df, use_container_width=True, hide_index=True)
+    
+    # Subscription revenue by acquisition year (rows) and calendar year (columns)
+    st.markdown("**Cohort Revenue by Year**")
+    revenue_table = yearly_cohort_table(cohorts["revenue"], months)
+    revenue_df = pd.DataFrame.from_dict(revenue_table, orient="index")
+    revenue_df.index.name = "Cohort Year"
+    st.dataframe(revenue_df.style.format("${:,.0f}"), use_container_width=True)
 
 # Header with SHAED branding
 st.markdown("""
@@ -1393,6 +1373,10 @@ with tab1:
             if "subscription_running_totals" in st.session_state.model_data:
                 create_custom_cumulative_subscribers_table(filtered_stakeholders, show_monthly)
         
+        with st.expander("🧬 Cohort Retention", expanded=False):
+            st.info("💡 Customers are grouped by acquisition month. Net revenue retention and logo retention compare the cohorts active 12 months earlier with what is left of them today.")
+            create_cohort_retention_view(filtered_stakeholders)
+        
     else:
         st.warning("⚠️ No stakeholders selected. Please choose stakeholders from the filter above.")
 
@@ -1735,11 +1719,13 @@ if metrics_period == "All Years":
 else:
     filtered_months = [month for month in months if metrics_period in month]
 
-# Calculate summary metrics for selected period
-subscription_revenue_period = sum(st.session_state.model_data.get("revenue", {}).get("Subscription", {}).get(month, 0) for month in filtered_months)
-transactional_revenue_period = sum(st.session_state.model_data.get("revenue", {}).get("Transactional", {}).get(month, 0) for month in filtered_months)
-implementation_revenue_period = sum(st.session_state.model_data.get("revenue", {}).get("Implementation", {}).get(month, 0) for month in filtered_months)
-maintenance_revenue_period = sum(st.session_state.model_data.get("revenue", {}).get("Maintenance", {}).get(month, 0) for month in filtered_months)
+# Calculate summary metrics for selected period (only the displayed months are read)
+revenue_data = st.session_state.model_data.get("revenue", {})
+period_revenue = prefix_window(
+    "revenue_by_stream", revenue_data, months, period_span(months, metrics_period),
+    lambda prefix, start, stop: [[float(revenue_data.get(stream, {}).get(month, 0) or 0) for month in months[start:stop]] for stream in stream_options[1:]],
+).sum(axis=1)
+subscription_revenue_period, transactional_revenue_period, implementation_revenue_period, maintenance_revenue_period = period_revenue.tolist()
 total_revenue_period = subscription_revenue_period + transactional_revenue_period + implementation_revenue_period + maintenance_revenue_period
 
 # Add KPI cards for All Streams view
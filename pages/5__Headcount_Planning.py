@@ -2,6 +2,9 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, date
 import uuid
+from money import round_to_cents
+from planning_horizon import horizon_years
+from rollups import group_months_by_year, yearly_by_label
 from database import (
     load_data,
     save_data,
@@ -10,7 +13,9 @@ from database import (
     save_payroll_data_to_database,
     get_supabase_connection_info,
     clear_all_data_cache,
+    get_planning_months,
 )
+from payroll_engine import calculate_payroll_by_department, calculate_employee_cost_matrices, calculate_personnel_costs, active_cells, series_to_dict
 
 # Ensure model data is present and connection info available
 if 'model_data' not in st.session_state or not isinstance(st.session_state.model_data, dict):
@@ -426,29 +431,13 @@ except Exception:
     if "payroll_data" not in st.session_state.model_data:
         st.session_state.model_data["payroll_data"] = {}
 
-# Generate months from 2025-2030
-def get_months_2025_2030():
-    months = []
-    for year in range(2025, 2031):
-        for month in range(1, 13):
-            months.append(f"{date(year, month, 1).strftime('%b %Y')}")
-    return months
-
-months = get_months_2025_2030()
+# Months of the configured planning horizon
+months = get_planning_months()
 
 # Helper functions
 def get_year_from_month(month_str):
     return month_str.split(' ')[1]
 
-def group_months_by_year(months):
-    years = {}
-    for month in months:
-        year = get_year_from_month(month)
-        if year not in years:
-            years[year] = []
-        years[year].append(month)
-    return years
-
 def format_number(num):
     if num == 0:
         return "0"
@@ -507,97 +496,21 @@ def get_employee_status(emp_data):
         # Fall back to active field if dates are invalid
         return "🟢 Current" if emp_data.get("active", True) else "🔴 Inactive"
 
-def is_contractor_active_for_month(contractor_data, month_str):
-    """Check if contractor is active for a specific month"""
-    try:
-        # Convert month string (e.g., "Jan 2025") to date (first day of month)
-        month_date = datetime.strptime(month_str, "%b %Y")
-        
-        # Check start date
-        start_date_str = contractor_data.get("start_date")
-        if start_date_str:
-            start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
-            if month_date < start_date:
-                return False
-        
-        # Check end date
-        end_date_str = contractor_data.get("end_date")
-        if end_date_str:
-            end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
-            if month_date >= end_date:
-                return False
-        
-        return True
-    except (ValueError, TypeError):
-        # If there's any error parsing dates, assume active
-        return True
-
-
-
 # Calculate monthly payroll expenses
 def calculate_monthly_payroll():
     """Calculate monthly payroll expenses by department"""
-    
-    payroll_by_dept = {
-        "Product Development": {month: 0 for month in months},
-        "Sales and Marketing": {month: 0 for month in months}, 
-        "Opex": {month: 0 for month in months}
-    }
-    
-    total_payroll = {month: 0 for month in months}
-    
-    for emp_id, emp_data in st.session_state.model_data["payroll_data"]["employees"].items():
-        department = emp_data.get("department", "Opex")
-        pay_type = emp_data.get("pay_type", "Salary")
-        
-        for month in months:
-            # Check if employee is active for this specific month
-            if not is_employee_active_for_month(emp_data, month):
-                continue
-                
-            if pay_type == "Salary":
-                # Salary: Annual salary / 26 pay periods * pay periods in month
-                annual_salary = emp_data.get("annual_salary", 0)
-                pay_periods = st.session_state.model_data["payroll_data"]["pay_periods"].get(month, 2)
-                monthly_pay = (annual_salary / 26) * pay_periods
-            else:  # Hourly
-                # Hourly: Hourly rate * weekly hours * weeks in month (4.33 average)
-                hourly_rate = emp_data.get("hourly_rate", 0)
-                weekly_hours = emp_data.get("weekly_hours", 40.0)
-                monthly_hours = weekly_hours * 4.33  # Average weeks per month
-                monthly_pay = hourly_rate * monthly_hours
-            
-            payroll_by_dept[department][month] += monthly_pay
-            total_payroll[month] += monthly_pay
-    
-    return payroll_by_dept, total_payroll
+    # Single masked matrix product over the cached employee activity matrix
+    return calculate_payroll_by_department(st.session_state.model_data["payroll_data"], months)
 
 # Calculate monthly contractor expenses
 def calculate_monthly_contractor_costs():
     """Calculate monthly contractor costs by department"""
-    
-    total_contractor_costs = {month: 0 for month in months}
+    costs = personnel_costs()
     contractor_costs_by_dept = {
-        "Product Development": {month: 0 for month in months},
-        "Sales and Marketing": {month: 0 for month in months}, 
-        "Opex": {month: 0 for month in months}
+        department: series_to_dict(costs["contractors_by_department"][i], months)
+        for i, department in enumerate(costs["contractor_departments"])
     }
-    
-    for contractor_data in st.session_state.model_data["payroll_data"]["contractors"].values():
-        resources = contractor_data.get("resources", 0)
-        hourly_rate = contractor_data.get("hourly_rate", 0)
-        department = contractor_data.get("department", "Product Development")
-        
-        # Calculate monthly cost: resources * hourly rate * 40 hours * 4 weeks
-        monthly_cost = resources * hourly_rate * 40 * 4
-        
-        # Apply to months where contractor is active
-        for month in months:
-            if is_contractor_active_for_month(contractor_data, month):
-                total_contractor_costs[month] += monthly_cost
-                contractor_costs_by_dept[department][month] += monthly_cost
-    
-    return total_contractor_costs, contractor_costs_by_dept
+    return series_to_dict(costs["contractors"], months), contractor_costs_by_dept
 
 # Initialize payroll configuration
 def initialize_payroll_config():
@@ -654,40 +567,19 @@ def initialize_payroll_config():
         }
 
 # Calculate total personnel costs (payroll + taxes/benefits + bonuses + contractors)
+def personnel_costs():
+    """Cached payroll, bonus, tax and contractor arrays for the current headcount plan"""
+    return calculate_personnel_costs(st.session_state.model_data["payroll_data"], months, 23.0)
+
 def calculate_total_personnel_costs():
     """Calculate total personnel costs including payroll, taxes/benefits, bonuses, and contractors"""
-    
-    payroll_by_dept, total_payroll = calculate_monthly_payroll()
+    # Recomputed only when the payroll data changes, not on every widget interaction
+    costs = personnel_costs()
+    total_payroll, payroll_taxes, bonuses, total_payroll_cost = (
+        series_to_dict(costs[key], months) for key in ["base_payroll", "payroll_taxes", "bonuses", "total_payroll_cost"]
+    )
     contractor_costs, contractor_costs_by_dept = calculate_monthly_contractor_costs()
     
-    # Get configuration
-    config = st.session_state.model_data["payroll_data"]["payroll_config"]
-    payroll_tax_rate = config.get("payroll_tax_percentage", 23.0) / 100.0
-    
-    # Calculate bonuses from table instead of percentage
-    bonuses = {month: 0 for month in months}
-    employee_bonuses = st.session_state.model_data["payroll_data"]["employee_bonuses"]
-    
-    for bonus_data in employee_bonuses.values():
-        bonus_month = bonus_data.get("month", "")
-        bonus_amount = bonus_data.get("bonus_amount", 0)
-        
-        if bonus_month in bonuses:
-            bonuses[bonus_month] += bonus_amount
-    
-    # Calculate payroll taxes and total payroll cost
-    payroll_taxes = {}
-    total_payroll_cost = {}
-    
-    for month in months:
-        base_payroll = total_payroll[month]
-        monthly_bonus = bonuses[month]
-        # Apply payroll taxes to both base payroll and bonuses
-        monthly_taxes = (base_payroll + monthly_bonus) * payroll_tax_rate
-        
-        payroll_taxes[month] = monthly_taxes
-        total_payroll_cost[month] = base_payroll + monthly_bonus + monthly_taxes
-    
     return total_payroll, payroll_taxes, bonuses, contractor_costs, total_payroll_cost, contractor_costs_by_dept
 
 # Update liquidity model with separate payroll and contractor costs
@@ -1631,20 +1523,17 @@ def create_custom_payroll_table(categories, payroll_data, show_monthly=True):
     for category in categories:
         html_content += '<tr style="height: 43px !important;">'
         
+        yearly_totals = yearly_by_label(payroll_data.get(category, {}), months)
         if show_monthly:
             for year in sorted(years_dict.keys()):
-                yearly_total = 0
+                yearly_total = yearly_totals[year]
                 for month in years_dict[year]:
                     value = payroll_data.get(category, {}).get(month, 0)
                     html_content += f'<td class="data-cell" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;">{format_number(value)}</td>'
-                    yearly_total += value
                 html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{format_number(yearly_total)}</strong></td>'
         else:
             for year in sorted(years_dict.keys()):
-                yearly_total = sum(
-                    payroll_data.get(category, {}).get(month, 0)
-                    for month in years_dict[year]
-                )
+                yearly_total = yearly_totals[year]
                 html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{format_number(yearly_total)}</strong></td>'
         
         html_content += '</tr>'
@@ -1720,20 +1609,17 @@ def create_custom_payroll_table_with_totals(categories, payroll_data, show_month
                 for year in sorted(years_dict.keys()):
                     html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"></td>'
         else:
+            yearly_totals = yearly_by_label(payroll_data.get(category, {}), months)
             if show_monthly:
                 for year in sorted(years_dict.keys()):
-                    yearly_total = 0
+                    yearly_total = yearly_totals[year]
                     for month in years_dict[year]:
                         value = payroll_data.get(category, {}).get(month, 0)
                         html_content += f'<td class="data-cell" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;">{format_number(value)}</td>'
-                        yearly_total += value
                     html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{format_number(yearly_total)}</strong></td>'
             else:
                 for year in sorted(years_dict.keys()):
-                    yearly_total = sum(
-                        payroll_data.get(category, {}).get(month, 0)
-                        for month in years_dict[year]
-                    )
+                    yearly_total = yearly_totals[year]
                     html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{format_number(yearly_total)}</strong></td>'
         
         html_content += '</tr>'
@@ -1789,17 +1675,17 @@ def create_custom_payroll_total_row(total_dict, row_label, show_monthly=True):
     # Data row
     html_content += '<tbody><tr class="total-row" style="height: 43px !important;">'
     
+    yearly_totals = yearly_by_label(total_dict, months)
     if show_monthly:
         for year in sorted(years_dict.keys()):
-            yearly_total = 0
+            yearly_total = yearly_totals[year]
             for month in years_dict[year]:
                 value = total_dict.get(month, 0)
                 html_content += f'<td class="data-cell" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;">{format_number(value)}</td>'
-                yearly_total += value
             html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{format_number(yearly_total)}</strong></td>'
     else:
         for year in sorted(years_dict.keys()):
-            yearly_total = sum(total_dict.get(month, 0) for month in years_dict[year])
+            yearly_total = yearly_totals[year]
             html_content += f'<td class="data-cell year-total" style="height: 43px !important; line-height: 43px !important; padding: 0 4px !important;"><strong>{format_number(yearly_total)}</strong></td>'
     
     html_content += '</tr></tbody></table>'
@@ -1820,69 +1706,49 @@ def save_calculated_payroll_costs_to_database():
             return False
         
         # Get payroll data
-        employees = st.session_state.model_data["payroll_data"]["employees"]
-        employee_bonuses = st.session_state.model_data["payroll_data"]["employee_bonuses"]
-        pay_periods = st.session_state.model_data["payroll_data"]["pay_periods"]
-        payroll_config = st.session_state.model_data["payroll_data"]["payroll_config"]
+        payroll_data = st.session_state.model_data["payroll_data"]
+        pay_periods = payroll_data["pay_periods"]
+        payroll_config = payroll_data["payroll_config"]
         
         # Get payroll tax rate
         payroll_tax_rate = payroll_config.get("payroll_tax_percentage", 10.0) / 100.0
         
+        # Employee x month base pay and bonuses, aligned with the activity matrix
+        roster, base_pay_matrix, bonus_pay_matrix = calculate_employee_cost_matrices(payroll_data, months)
+        year_months = [datetime.strptime(month, "%b %Y").strftime("%Y-%m-%d") for month in months]
+        base_values = base_pay_matrix.tolist()
+        bonus_values = bonus_pay_matrix.tolist()
+        
         # Prepare payroll cost records
         payroll_records = []
         
-        for month in months:
-            try:
-                year_month = datetime.strptime(month, "%b %Y").strftime("%Y-%m-%d")
-                
-                # Calculate costs for each individual employee
-                for emp_id, emp_data in employees.items():
-                    if not is_employee_active_for_month(emp_data, month):
-                        continue
-                    
-                    department = emp_data.get("department", "Opex")
-                    pay_type = emp_data.get("pay_type", "Salary")
-                    
-                    # Calculate base pay
-                    if pay_type == "Salary":
-                        annual_salary = emp_data.get("annual_salary", 0)
-                        pay_periods_count = pay_periods.get(month, 2)
-                        base_pay = (annual_salary / 26) * pay_periods_count
-                        hours_worked = emp_data.get("weekly_hours", 40.0) * pay_periods_count
-                    else:  # Hourly
-                        hourly_rate = emp_data.get("hourly_rate", 0)
-                        weekly_hours = emp_data.get("weekly_hours", 40.0)
-                        monthly_hours = weekly_hours * 4.33  # Average weeks per month
-                        base_pay = hourly_rate * monthly_hours
-                        hours_worked = monthly_hours
-                    
-                    # Find bonuses for this employee in this month
-                    employee_name = emp_data.get("name", "")
-                    bonus_pay = 0
-                    for bonus_data in employee_bonuses.values():
-                        if (bonus_data.get("employee_name", "") == employee_name and 
-                            bonus_data.get("month", "") == month):
-                            bonus_pay += bonus_data.get("bonus_amount", 0)
-                    
-                    # Calculate taxes and benefits (applied to base + bonus)
-                    taxable_amount = base_pay + bonus_pay
-                    payroll_taxes = taxable_amount * payroll_tax_rate
-                    
-                    payroll_records.append({
-                        'year_month': year_month,
-                        'employee_id': emp_id,
-                        'department': department,
-                        'base_pay': round(base_pay, 2),
-                        'overtime_pay': 0.0,  # Not currently tracked separately
-                        'bonus_pay': round(bonus_pay, 2),
-                        'payroll_taxes': round(payroll_taxes, 2),
-                        'benefits_cost': 0.0,  # Included in payroll_taxes
-                        'hours_worked': round(hours_worked, 2),
-                        'pay_periods_in_month': pay_periods.get(month, 2)
-                    })
-                    
-            except Exception as e:
-                continue  # Skip problematic months
+        for month_idx, emp_idx in active_cells(roster["active"]):
+            month = months[month_idx]
+            base_pay = base_values[emp_idx][month_idx]
+            bonus_pay = bonus_values[emp_idx][month_idx]
+            weekly_hours = float(roster["weekly_hours"][emp_idx])
+            
+            if roster["is_salary"][emp_idx]:
+                hours_worked = weekly_hours * pay_periods.get(month, 2)
+            else:  # Hourly
+                hours_worked = weekly_hours * 4.33  # Average weeks per month
+            
+            # Calculate taxes and benefits (applied to base + bonus)
+            taxable_amount = base_pay + bonus_pay
+            payroll_taxes = taxable_amount * payroll_tax_rate
+            
+            payroll_records.append({
+                'year_month': year_months[month_idx],
+                'employee_id': roster["employee_ids"][emp_idx],
+                'department': roster["department_names"][roster["department_index"][emp_idx]],
+                'base_pay': round_to_cents(base_pay),
+                'overtime_pay': 0.0,  # Not currently tracked separately
+                'bonus_pay': round_to_cents(bonus_pay),
+                'payroll_taxes': round_to_cents(payroll_taxes),
+                'benefits_cost': 0.0,  # Included in payroll_taxes
+                'hours_worked': round(hours_worked, 2),
+                'pay_periods_in_month': pay_periods.get(month, 2)
+            })
         
         if payroll_records:
             # Use upsert to safely update/insert payroll costs
@@ -1932,7 +1798,7 @@ metric_col1, metric_col2, metric_col3 = st.columns([0.75, 0.75, 2.5])
 
 with metric_col1:
     # Add dropdown for time period selection
-    summary_options = ["Current", "2025", "2026", "2027", "2028", "2029", "2030", "All Years"]
+    summary_options = ["Current"] + horizon_years(months) + ["All Years"]
     try:
         current_year = str(datetime.now().year)
         default_index = summary_options.index(current_year) if current_year in summary_options else 0
@@ -2223,9 +2089,9 @@ if selected_period == "All Years":
 else:
     # For specific year or current, show monthly data
     if selected_period == "Current":
-        # Show all months from 2025-2030
-        chart_months = months[:12]  # Show first year as sample
-        chart_title = f"{selected_chart} - 2025 Sample"
+        # Show the first plan year as a sample
+        chart_months = months[:12]
+        chart_title = f"{selected_chart} - {months[0].split(' ')[1]} Sample"
     else:
         # Show specific year
         chart_months = [f"{month_name} {selected_period}" for month_name in 
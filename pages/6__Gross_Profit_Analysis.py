@@ -1,8 +1,13 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import datetime, date
 import plotly.graph_objects as go
-from database import load_data, save_data, load_data_from_source, save_data_to_source, save_gross_profit_data_to_database, save_revenue_and_cogs_to_database
+from gross_profit_engine import build_gross_profit_series, gross_profit_window
+from planning_horizon import horizon_years
+from rollups import group_months_by_year, rollup
+from viewport import period_span
+from database import load_data, save_data, load_data_from_source, save_data_to_source, save_gross_profit_data_to_database, save_revenue_and_cogs_to_database, get_planning_months
 # load_gross_profit_data_from_database removed - using load_data instead
 
 # Configure page
@@ -349,15 +354,9 @@ st.markdown("""
 if 'model_data' not in st.session_state:
     st.session_state.model_data = load_data_from_source()
 
-# Generate months from 2025-2030
-def get_months_2025_2030():
-    months = []
-    for year in range(2025, 2031):
-        for month in range(1, 13):
-            months.append(f"{date(year, month, 1).strftime('%b %Y')}")
-    return months
-
-months = get_months_2025_2030()
+# Months of the configured planning horizon
+months = get_planning_months()
+month_index = {month: i for i, month in enumerate(months)}
 
 # Helper functions
 def format_number(num):
@@ -376,16 +375,6 @@ def get_year_from_month(month_str):
     """Extract year from month string like 'Jan 2025'"""
     return month_str.split(' ')[1]
 
-def group_months_by_year(months):
-    """Group months by year and return dict"""
-    years = {}
-    for month in months:
-        year = get_year_from_month(month)
-        if year not in years:
-            years[year] = []
-        years[year].append(month)
-    return years
-
 # Initialize gross profit data structure
 def initialize_gross_profit_data():
     """Initialize the gross profit data structure"""
@@ -437,87 +426,50 @@ def initialize_gross_profit_data():
             for stream in revenue_streams
         }
 
+# Hosting and COGS series, rebuilt only when revenue, subscribers or gross profit inputs change
+def gross_profit_series():
+    """Cached active subscribers, hosting and COGS series for the current model"""
+    model_data = st.session_state.model_data
+    return build_gross_profit_series(
+        model_data.get("revenue", {}),
+        model_data.get("gross_profit_data", {}),
+        model_data.get("subscription_running_totals", {}),
+        months,
+    )
+
+def gross_profit_span(span):
+    """Gross profit arrays for the months in span, evaluated only up to its end"""
+    model_data = st.session_state.model_data
+    return gross_profit_window(
+        model_data.get("revenue", {}),
+        model_data.get("gross_profit_data", {}),
+        model_data.get("subscription_running_totals", {}),
+        months,
+        span,
+    )
+
+def gross_profit_period(selected_period):
+    """Gross profit arrays for the months of the selected period"""
+    return gross_profit_span(period_span(months, selected_period))
+
 # Get active subscribers from revenue assumptions
 def get_active_subscribers(month):
     """Get total active subscribers for a given month"""
-    if "subscription_running_totals" not in st.session_state.model_data:
-        return 0
-    
-    total_subscribers = 0
-    for stakeholder, monthly_data in st.session_state.model_data["subscription_running_totals"].items():
-        total_subscribers += monthly_data.get(month, 0)
-    
-    return total_subscribers
+    position = month_index.get(month)
+    return float(gross_profit_series()["active_subscribers"][position]) if position is not None else 0
 
 # Calculate hosting costs based on structure
 def calculate_hosting_costs():
-    """Calculate monthly hosting costs based on monthly fixed + variable structure"""
-    hosting_structure = st.session_state.model_data["gross_profit_data"]["saas_hosting_structure"]
-    monthly_fixed_costs = hosting_structure.get("monthly_fixed_costs", {})
-    monthly_variable_costs = hosting_structure.get("monthly_variable_costs", {})
-    go_live_month = hosting_structure.get("go_live_month", "Jan 2025")
-    capitalize_before_go_live = hosting_structure.get("capitalize_before_go_live", True)
-    
-    # Fallback to legacy structure if monthly data not available
-    legacy_fixed = hosting_structure.get("fixed_monthly_cost", 15400.0)
-    legacy_variable = hosting_structure.get("cost_per_customer", 5.0)
-    
-    hosting_costs = {}
-    capitalized_hosting = {}
-    
-    # Find go-live month index
-    try:
-        go_live_index = months.index(go_live_month)
-    except ValueError:
-        go_live_index = 0  # Default to first month if invalid
-    
-    for i, month in enumerate(months):
-        active_subscribers = get_active_subscribers(month)
-        
-        # Use monthly data if available, otherwise use legacy values
-        fixed_cost = monthly_fixed_costs.get(month, legacy_fixed)
-        variable_cost = monthly_variable_costs.get(month, legacy_variable)
-        
-        calculated_cost = fixed_cost + (variable_cost * active_subscribers)
-        
-        # Determine if costs should be capitalized or expensed
-        if capitalize_before_go_live and i < go_live_index:
-            hosting_costs[month] = 0  # No COGS before go-live
-            capitalized_hosting[month] = calculated_cost
-        else:
-            hosting_costs[month] = calculated_cost
-            capitalized_hosting[month] = 0
-    
-    return hosting_costs, capitalized_hosting
+    """Monthly expensed and capitalized hosting costs (monthly fixed + variable structure)"""
+    series = gross_profit_series()
+    return series["hosting_costs_by_month"], series["capitalized_by_month"]
 
 # Calculate COGS and update income statement
 def calculate_cogs():
     """Calculate COGS based on revenue and gross profit percentages"""
     if "revenue" not in st.session_state.model_data:
         return {stream: {month: 0 for month in months} for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]}
-    
-    cogs_by_stream = {}
-    revenue_data = st.session_state.model_data.get("revenue", {})
-    gp_data = st.session_state.model_data.get("gross_profit_data", {})
-    
-    # Calculate hosting costs for subscription
-    hosting_costs, capitalized_hosting = calculate_hosting_costs()
-    
-    for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]:
-        cogs_by_stream[stream] = {}
-        
-        for month in months:
-            revenue = revenue_data.get(stream, {}).get(month, 0)
-            
-            if stream == "Subscription":
-                # For subscription, COGS = hosting costs + other direct costs
-                cogs_by_stream[stream][month] = hosting_costs.get(month, 0) + gp_data.get("direct_costs", {}).get(stream, {}).get(month, 0)
-            else:
-                # For other streams, use gross profit percentage
-                gp_percentage = gp_data.get("gross_profit_percentages", {}).get(stream, {}).get(month, 70.0)
-                cogs_by_stream[stream][month] = revenue * (1 - gp_percentage / 100)
-    
-    return cogs_by_stream
+    return gross_profit_series()["cogs_by_stream"]
 
 def update_income_statement_cogs():
     """Update COGS in the income statement"""
@@ -527,18 +479,13 @@ def update_income_statement_cogs():
     if "cogs" not in st.session_state.model_data:
         st.session_state.model_data["cogs"] = {}
     
-    # Update COGS for each stream
+    # Update COGS for each stream (copies, the cached series is shared)
     for stream, monthly_cogs in cogs_by_stream.items():
-        st.session_state.model_data["cogs"][stream] = monthly_cogs
+        st.session_state.model_data["cogs"][stream] = dict(monthly_cogs)
     
     # Calculate total COGS
-    total_cogs = {}
-    for month in months:
-        total_cogs[month] = sum(
-            cogs_by_stream[stream].get(month, 0) 
-            for stream in cogs_by_stream
-        )
-    st.session_state.model_data["cogs"]["Total"] = total_cogs
+    total_cogs = gross_profit_series()["cogs"].sum(axis=0) if "revenue" in st.session_state.model_data else np.zeros(len(months))
+    st.session_state.model_data["cogs"]["Total"] = dict(zip(months, total_cogs.tolist()))
 
 # Create hosting cost preview chart
 def create_hosting_cost_chart():
@@ -1133,7 +1080,7 @@ metric_col1, metric_col2, metric_col3 = st.columns([0.75, 0.75, 2.5])
 
 with metric_col1:
     # Add dropdown for time period selection
-    summary_options = ["Current", "2025", "2026", "2027", "2028", "2029", "2030", "All Years"]
+    summary_options = ["Current"] + horizon_years(months) + ["All Years"]
     try:
         current_year = str(datetime.now().year)
         default_index = summary_options.index(current_year) if current_year in summary_options else 0
@@ -1160,9 +1107,6 @@ with metric_col2:
 # Calculate totals based on selected period
 def calculate_period_totals(selected_period):
     """Calculate gross profit totals for the selected period"""
-    revenue_data = st.session_state.model_data.get("revenue", {})
-    cogs_data = calculate_cogs()
-    
     stream_mapping = {
         "Subscription": "Subscription",
         "Transactional": "Transactional", 
@@ -1171,18 +1115,14 @@ def calculate_period_totals(selected_period):
     }
     
     period_data = {}
-    
-    for stream_key in stream_mapping.keys():
-        if selected_period == "Current" or selected_period == "All Years":
-            # Show 6-year totals
-            stream_revenue = sum(revenue_data.get(stream_key, {}).get(month, 0) for month in months)
-            stream_cogs = sum(cogs_data.get(stream_key, {}).get(month, 0) for month in months)
-        else:
-            # Show specific year totals
-            year_months = [f"{month_name} {selected_period}" for month_name in 
-                          ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]]
-            stream_revenue = sum(revenue_data.get(stream_key, {}).get(month, 0) for month in year_months)
-            stream_cogs = sum(cogs_data.get(stream_key, {}).get(month, 0) for month in year_months)
+    # Whole horizon for "Current" / "All Years", otherwise just the selected year's months
+    series = gross_profit_period(selected_period)
+    revenue_totals = series["revenue"].sum(axis=1)
+    cogs_totals = series["cogs"].sum(axis=1) if "revenue" in st.session_state.model_data else np.zeros(len(stream_mapping))
+    
+    for i, stream_key in enumerate(stream_mapping.keys()):
+        stream_revenue = float(revenue_totals[i])
+        stream_cogs = float(cogs_totals[i])
         
         stream_gross_profit = stream_revenue - stream_cogs
         stream_gp_margin = (stream_gross_profit / stream_revenue * 100) if stream_revenue > 0 else 0
@@ -1206,15 +1146,9 @@ total_gross_profit = total_revenue - total_cogs
 overall_gp_margin = (total_gross_profit / total_revenue * 100) if total_revenue > 0 else 0
 
 # Get hosting costs data
-hosting_costs, capitalized_hosting = calculate_hosting_costs()
-if selected_period == "Current" or selected_period == "All Years":
-    total_hosting = sum(hosting_costs.values())
-    total_capitalized = sum(capitalized_hosting.values())
-else:
-    year_months = [f"{month_name} {selected_period}" for month_name in 
-                  ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]]
-    total_hosting = sum(hosting_costs.get(month, 0) for month in year_months)
-    total_capitalized = sum(capitalized_hosting.get(month, 0) for month in year_months)
+period_series = gross_profit_period(selected_period)
+total_hosting = float(period_series["hosting"].sum())
+total_capitalized = float(period_series["capitalized_hosting"].sum())
 
 # Period label for display
 period_label = "6-Year Total" if selected_period in ["Current", "All Years"] else f"{selected_period} Total"
@@ -1316,15 +1250,8 @@ elif selected_metrics == "Hosting Costs":
     variable_cost = hosting_structure.get("cost_per_customer", 0)
     
     # Get average subscribers for the period
-    if selected_period == "Current" or selected_period == "All Years":
-        # Average across all months
-        total_subscribers = sum(get_active_subscribers(month) for month in months)
-        avg_subscribers = total_subscribers / len(months) if months else 0
-    else:
-        year_months = [f"{month_name} {selected_period}" for month_name in 
-                      ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]]
-        total_subscribers = sum(get_active_subscribers(month) for month in year_months)
-        avg_subscribers = total_subscribers / len(year_months) if year_months else 0
+    active_subscribers = period_series["active_subscribers"]
+    avg_subscribers = float(active_subscribers.mean()) if active_subscribers.size else 0
 
     with hosting_col1:
         st.markdown(f"""
@@ -1377,78 +1304,17 @@ with chart_type_col1:
         key="gp_chart_type_select"
     )
 
-# Prepare chart data based on selected period and chart type
-revenue_data = st.session_state.model_data.get("revenue", {})
-cogs_data = calculate_cogs()
-
+# Prepare chart data from the windowed gross profit arrays: yearly rollups, or just the displayed months
 if selected_period == "All Years" or selected_chart == "GP Margin by Year":
     # For All Years or GP Margin by Year (always show all years), show yearly totals
-    chart_data = {}
-    years_dict = group_months_by_year(months)
-    
-    for year in sorted(years_dict.keys()):
-        year_months = years_dict[year]
-        if selected_chart == "Total Revenue":
-            chart_data[str(year)] = sum(
-                revenue_data.get(stream, {}).get(month, 0)
-                for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]
-                for month in year_months
-            )
-        elif selected_chart == "Total COGS":
-            chart_data[str(year)] = sum(
-                cogs_data.get(stream, {}).get(month, 0)
-                for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]
-                for month in year_months
-            )
-        elif selected_chart == "Gross Profit":
-            year_revenue = sum(
-                revenue_data.get(stream, {}).get(month, 0)
-                for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]
-                for month in year_months
-            )
-            year_cogs = sum(
-                cogs_data.get(stream, {}).get(month, 0)
-                for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]
-                for month in year_months
-            )
-            chart_data[str(year)] = year_revenue - year_cogs
-        elif selected_chart == "GP Margin":
-            year_revenue = sum(
-                revenue_data.get(stream, {}).get(month, 0)
-                for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]
-                for month in year_months
-            )
-            year_cogs = sum(
-                cogs_data.get(stream, {}).get(month, 0)
-                for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]
-                for month in year_months
-            )
-            year_gp = year_revenue - year_cogs
-            chart_data[str(year)] = (year_gp / year_revenue * 100) if year_revenue > 0 else 0
-        elif selected_chart == "Stream Breakdown":
-            if str(year) not in chart_data:
-                chart_data[str(year)] = {}
-            for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]:
-                year_revenue = sum(revenue_data.get(stream, {}).get(month, 0) for month in year_months)
-                chart_data[str(year)][stream] = year_revenue
-        elif selected_chart == "Hosting Costs":
-            chart_data[str(year)] = sum(hosting_costs.get(month, 0) for month in year_months)
-        elif selected_chart == "GP Margin by Year":
-            year_revenue = sum(
-                revenue_data.get(stream, {}).get(month, 0)
-                for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]
-                for month in year_months
-            )
-            year_cogs = sum(
-                cogs_data.get(stream, {}).get(month, 0)
-                for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]
-                for month in year_months
-            )
-            year_gp = year_revenue - year_cogs
-            chart_data[str(year)] = (year_gp / year_revenue * 100) if year_revenue > 0 else 0
+    chart_series = gross_profit_span((0, len(months)))
+    chart_labels = horizon_years(months)
+    chart_revenue = rollup(chart_series["revenue"], months)["yearly"]
+    chart_cogs = rollup(chart_series["cogs"], months)["yearly"]
+    chart_hosting = rollup(chart_series["hosting"], months)["yearly"]
     
     if selected_chart == "GP Margin by Year":
-        chart_title = "Gross Profit Margin by Year (2025-2030)"
+        chart_title = f"Gross Profit Margin by Year ({months[0].split(' ')[1]}-{months[-1].split(' ')[1]})"
     else:
         chart_title = f"{selected_chart} by Year"
     x_label = "Year"
@@ -1457,79 +1323,47 @@ else:
     # For specific year or current, show monthly data
     if selected_period == "Current":
         # Show first year as sample
-        chart_months = months[:12]
-        chart_title = f"{selected_chart} - 2025 Sample"
+        chart_start, chart_stop = 0, min(12, len(months))
+        chart_years = horizon_years(months[chart_start:chart_stop])
+        year_label = chart_years[0] if len(chart_years) == 1 else f"{chart_years[0]}-{chart_years[-1]}"
+        chart_title = f"{selected_chart} - {year_label} Sample"
     else:
         # Show specific year
-        chart_months = [f"{month_name} {selected_period}" for month_name in 
-                       ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]]
+        chart_start, chart_stop = period_span(months, selected_period)
         chart_title = f"{selected_chart} - {selected_period}"
     
-    chart_data = {}
-    month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", 
-                   "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-    
-    for i, month_name in enumerate(month_names):
-        if i < len(chart_months):
-            month = chart_months[i]
-            if selected_chart == "Total Revenue":
-                chart_data[month_name] = sum(
-                    revenue_data.get(stream, {}).get(month, 0)
-                    for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]
-                )
-            elif selected_chart == "Total COGS":
-                chart_data[month_name] = sum(
-                    cogs_data.get(stream, {}).get(month, 0)
-                    for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]
-                )
-            elif selected_chart == "Gross Profit":
-                month_revenue = sum(
-                    revenue_data.get(stream, {}).get(month, 0)
-                    for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]
-                )
-                month_cogs = sum(
-                    cogs_data.get(stream, {}).get(month, 0)
-                    for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]
-                )
-                chart_data[month_name] = month_revenue - month_cogs
-            elif selected_chart == "GP Margin":
-                month_revenue = sum(
-                    revenue_data.get(stream, {}).get(month, 0)
-                    for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]
-                )
-                month_cogs = sum(
-                    cogs_data.get(stream, {}).get(month, 0)
-                    for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]
-                )
-                month_gp = month_revenue - month_cogs
-                chart_data[month_name] = (month_gp / month_revenue * 100) if month_revenue > 0 else 0
-            elif selected_chart == "Stream Breakdown":
-                if month_name not in chart_data:
-                    chart_data[month_name] = {}
-                for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]:
-                    chart_data[month_name][stream] = revenue_data.get(stream, {}).get(month, 0)
-            elif selected_chart == "Hosting Costs":
-                chart_data[month_name] = hosting_costs.get(month, 0)
-            elif selected_chart == "GP Margin by Year":
-                # For GP Margin by Year, we'll show the same data as GP Margin when viewing specific periods
-                month_revenue = sum(
-                    revenue_data.get(stream, {}).get(month, 0)
-                    for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]
-                )
-                month_cogs = sum(
-                    cogs_data.get(stream, {}).get(month, 0)
-                    for stream in ["Subscription", "Transactional", "Implementation", "Maintenance"]
-                )
-                month_gp = month_revenue - month_cogs
-                chart_data[month_name] = (month_gp / month_revenue * 100) if month_revenue > 0 else 0
-        else:
-            if selected_chart == "Stream Breakdown":
-                chart_data[month_name] = {"Subscription": 0, "Transactional": 0, "Implementation": 0, "Maintenance": 0}
-            else:
-                chart_data[month_name] = 0
-    
+    chart_series = gross_profit_span((chart_start, chart_stop))
+    chart_labels = [month.split(" ")[0] for month in months[chart_start:chart_stop]]
+    chart_revenue = chart_series["revenue"]
+    chart_cogs = chart_series["cogs"]
+    chart_hosting = chart_series["hosting"]
     x_label = "Month"
 
+if "revenue" not in st.session_state.model_data:
+    chart_cogs = np.zeros_like(chart_revenue)
+
+column_revenue = chart_revenue.sum(axis=0)
+column_gross_profit = column_revenue - chart_cogs.sum(axis=0)
+if selected_chart == "Stream Breakdown":
+    chart_streams = ["Subscription", "Transactional", "Implementation", "Maintenance"]
+    chart_data = {
+        label: {stream: float(chart_revenue[i, column]) for i, stream in enumerate(chart_streams)}
+        for column, label in enumerate(chart_labels)
+    }
+else:
+    if selected_chart == "Total Revenue":
+        chart_values = column_revenue
+    elif selected_chart == "Total COGS":
+        chart_values = chart_cogs.sum(axis=0)
+    elif selected_chart == "Gross Profit":
+        chart_values = column_gross_profit
+    elif selected_chart == "Hosting Costs":
+        chart_values = chart_hosting
+    else:
+        # GP Margin and GP Margin by Year
+        chart_values = np.divide(column_gross_profit * 100, column_revenue, out=np.zeros(len(chart_labels)), where=column_revenue > 0)
+    chart_data = dict(zip(chart_labels, chart_values.tolist()))
+
 # Display the chart
 if chart_data:
     fig = go.Figure()
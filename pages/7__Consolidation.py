@@ -0,0 +1,359 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+import numpy as np
+from database import (
+    load_data_from_source,
+    get_planning_months,
+    get_entity_name,
+    load_entity_snapshots_from_database,
+    save_entity_snapshot_to_database,
+    delete_entity_snapshot_from_database,
+    load_intercompany_eliminations_from_database,
+    save_intercompany_eliminations_to_database,
+)
+from planning_horizon import horizon_years
+from consolidation import REVENUE_STREAMS, consolidate, entity_snapshot
+
+# Configure page
+st.set_page_config(
+    page_title="Consolidation",
+    page_icon="🏢",
+    layout="wide"
+)
+
+# Check authentication
+if "password_correct" not in st.session_state or not st.session_state.get("password_correct", False):
+    st.error("🔒 Please login from the Home page first.")
+    st.stop()
+
+# Add logout functionality to sidebar
+with st.sidebar:
+    st.markdown("---")
+    if st.button("🚪 Logout", key="logout_button"):
+        # Clear all session state variables
+        for key in list(st.session_state.keys()):
+            del st.session_state[key]
+        st.rerun()
+
+# Custom CSS for SHAED branding (matching other dashboards)
+st.markdown("""
+<style>
+    /* Main background and colors */
+    .main {
+        background-color: #f8f9fa;
+    }
+    
+    /* Header styling */
+    .main-header {
+        background: linear-gradient(90deg, #00D084 0%, #00B574 100%);
+        padding: 1.5rem;
+        border-radius: 10px;
+        margin-bottom: 2rem;
+        text-align: center;
+        color: white;
+        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+    }
+    
+    .main-header h1 {
+        margin: 0;
+        font-size: 2.5rem;
+        font-weight: 700;
+    }
+    
+    .main-header h2 {
+        margin: 0.5rem 0 0 0;
+        font-size: 1.5rem;
+        font-weight: 400;
+    }
+    
+    /* Section headers */
+    .section-header {
+        background-color: #00D084;
+        color: white;
+        padding: 0.75rem 1rem;
+        border-radius: 5px;
+        margin: 1.5rem 0 1rem 0;
+        font-size: 1.2rem;
+        font-weight: 600;
+    }
+    
+
+    
+    /* Metric containers */
+    .metric-container {
+        background: white;
+        padding: 1.5rem;
+        border-radius: 10px;
+        box-shadow: 0 2px 4px rgba(0, 0, 0, 0.05);
+        border: 1px solid #e0e0e0;
+        height: 100%;
+    }
+    
+    .metric-container h4 {
+        color: #00D084;
+        margin: 0 0 0.5rem 0;
+        font-size: 0.9rem;
+        text-transform: uppercase;
+        letter-spacing: 0.5px;
+    }
+    
+    .metric-container h2 {
+        margin: 0;
+        font-size: 2rem;
+        color: #1a1a1a;
+    }
+    
+    /* Custom table styling */
+    .custom-table-container {
+        background: white;
+        border-radius: 10px;
+        padding: 1rem;
+        box-shadow: 0 2px 4px rgba(0, 0, 0, 0.05);
+        margin-bottom: 1.5rem;
+        overflow-x: auto;
+    }
+    
+    .table-title {
+        font-size: 1.1rem;
+        font-weight: 600;
+        color: #00D084;
+        margin-bottom: 1rem;
+        padding-left: 0.5rem;
+    }
+    
+    /* Streamlit native element styling */
+    .stButton > button {
+        background-color: #00D084;
+        color: white;
+        border: none;
+        padding: 0.5rem 1rem;
+        font-weight: 600;
+        border-radius: 5px;
+        transition: all 0.3s ease;
+    }
+    
+    .stButton > button:hover {
+        background-color: #00B574;
+        transform: translateY(-1px);
+        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
+    }
+    
+</style>
+""", unsafe_allow_html=True)
+
+if 'model_data' not in st.session_state:
+    st.session_state.model_data = load_data_from_source()
+
+# Months of the configured planning horizon
+months = get_planning_months()
+years = horizon_years(months)
+year_of_month = np.array([month.split(" ")[1] for month in months])
+
+# Header
+st.markdown("""
+<div class="main-header">
+    <h1>🏢 Consolidation</h1>
+    <h2>Group income statement and liquidity across legal entities</h2>
+</div>
+""", unsafe_allow_html=True)
+
+
+def yearly_totals(values):
+    """Sum a months array into the horizon's years"""
+    return [float(values[year_of_month == year].sum()) for year in years]
+
+
+def statement_rows(lines, label_prefix=""):
+    """Table rows (line, one column per year) for a {line: months array} section"""
+    return [{"Line Item": f"{label_prefix}{line}", **dict(zip(years, yearly_totals(values)))} for line, values in lines.items()]
+
+
+# ENTITIES SECTION
+st.markdown('<div class="section-header">🏢 Entities</div>', unsafe_allow_html=True)
+st.info("🎯 Each deployment publishes its model here; the group view sums the published entities plus this deployment's live model.")
+
+current_entity = get_entity_name()
+published = load_entity_snapshots_from_database()
+
+entity_col1, entity_col2 = st.columns([3, 1])
+with entity_col1:
+    if published:
+        st.dataframe(
+            pd.DataFrame([
+                {"Entity": name, "Published": entry.get("published_at", "")}
+                for name, entry in published.items()
+            ]),
+            use_container_width=True,
+            hide_index=True
+        )
+    else:
+        st.caption("No entities have been published yet.")
+with entity_col2:
+    if st.button(f"📤 Publish {current_entity}", type="primary", use_container_width=True):
+        if save_entity_snapshot_to_database(current_entity, entity_snapshot(st.session_state.model_data)):
+            st.success(f"✅ {current_entity} published")
+            published = load_entity_snapshots_from_database()
+        else:
+            st.error("❌ Failed to publish entity")
+    remove_entity = st.selectbox("Remove entity", [""] + [name for name in published if name != current_entity])
+    if remove_entity and st.button("🗑️ Remove", use_container_width=True):
+        if delete_entity_snapshot_from_database(remove_entity):
+            published.pop(remove_entity, None)
+
+# This deployment always contributes its live model rather than its last published copy
+entity_models = {name: entry.get("snapshot", {}) for name, entry in published.items()}
+entity_models[current_entity] = entity_snapshot(st.session_state.model_data)
+selected_entities = st.multiselect("Entities to consolidate", list(entity_models.keys()), default=list(entity_models.keys()))
+
+# INTERCOMPANY ELIMINATIONS SECTION
+st.markdown('<div class="section-header">🔁 Intercompany Eliminations</div>', unsafe_allow_html=True)
+st.info("🎯 A share of the seller's revenue stream is matched against the buyer's expense line; the smaller of the two is removed from the group income statement and from group cash.")
+
+if "intercompany_eliminations" not in st.session_state:
+    st.session_state.intercompany_eliminations = load_intercompany_eliminations_from_database()
+
+expense_lines = sorted({
+    category
+    for snapshot in entity_models.values()
+    for category in (snapshot.get("liquidity_data", {}) or {}).get("category_order", [])
+})
+elimination_df = pd.DataFrame(
+    [
+        {
+            "Seller": rule.get("seller", ""),
+            "Buyer": rule.get("buyer", ""),
+            "Revenue Stream": rule.get("revenue_stream", "Subscription"),
+            "Expense Line": rule.get("expense_category", ""),
+            "Share %": float(rule.get("share_pct", 100.0)),
+        }
+        for rule in st.session_state.intercompany_eliminations
+    ],
+    columns=["Seller", "Buyer", "Revenue Stream", "Expense Line", "Share %"]
+)
+edited_elimination_df = st.data_editor(
+    elimination_df,
+    num_rows="dynamic",
+    use_container_width=True,
+    hide_index=True,
+    key="intercompany_editor",
+    column_config={
+        "Seller": st.column_config.SelectboxColumn("Seller", options=list(entity_models.keys()), required=True),
+        "Buyer": st.column_config.SelectboxColumn("Buyer", options=list(entity_models.keys()), required=True),
+        "Revenue Stream": st.column_config.SelectboxColumn("Revenue Stream", options=REVENUE_STREAMS, required=True),
+        "Expense Line": st.column_config.SelectboxColumn("Expense Line", options=expense_lines, required=True),
+        "Share %": st.column_config.NumberColumn("Share %", min_value=0.0, max_value=100.0, step=5.0, format="%.0f%%"),
+    }
+)
+edited_rules = [
+    {
+        "seller": row["Seller"],
+        "buyer": row["Buyer"],
+        "revenue_stream": row["Revenue Stream"],
+        "expense_category": row["Expense Line"],
+        "share_pct": float(row["Share %"]) if pd.notna(row["Share %"]) else 100.0,
+    }
+    for row in edited_elimination_df.to_dict("records")
+    if row.get("Seller") and row.get("Buyer")
+]
+if edited_rules != st.session_state.intercompany_eliminations:
+    st.session_state.intercompany_eliminations = edited_rules
+    save_intercompany_eliminations_to_database(edited_rules)
+
+if not selected_entities:
+    st.warning("⚠️ Select at least one entity to consolidate.")
+    st.stop()
+
+# Each entity's published statements are converted to cents arrays and summed line by line
+group = consolidate({name: entity_models[name] for name in selected_entities}, months, edited_rules)
+consolidated = group["consolidated"]
+
+# CONSOLIDATED INCOME STATEMENT SECTION
+st.markdown('<div class="section-header">📊 Consolidated Income Statement</div>', unsafe_allow_html=True)
+
+income_rows = statement_rows(consolidated["revenue"])
+income_rows.append({"Line Item": "Total Revenue", **dict(zip(years, yearly_totals(consolidated["total_revenue"])))})
+income_rows.append({"Line Item": "Gross Profit", **dict(zip(years, yearly_totals(consolidated["gross_profit"])))})
+income_rows.extend(statement_rows(consolidated["sga"]))
+income_rows.append({"Line Item": "Total Operating Expenses", **dict(zip(years, yearly_totals(consolidated["total_sga"])))})
+income_rows.append({"Line Item": "Net Income", **dict(zip(years, yearly_totals(consolidated["net_income"])))})
+st.dataframe(
+    pd.DataFrame(income_rows).style.format({year: "${:,.0f}" for year in years}),
+    use_container_width=True,
+    hide_index=True
+)
+
+# Contribution of each entity and of the eliminations to group net income
+contribution_rows = [
+    {"Entity": name, **dict(zip(years, yearly_totals(group["by_entity"][name]["net_income"])))}
+    for name in group["entities"]
+]
+contribution_rows.append({"Entity": "Group", **dict(zip(years, yearly_totals(consolidated["net_income"])))})
+with st.expander("Net income by entity"):
+    st.dataframe(
+        pd.DataFrame(contribution_rows).style.format({year: "${:,.0f}" for year in years}),
+        use_container_width=True,
+        hide_index=True
+    )
+
+if group["eliminations"]:
+    with st.expander("Eliminated intercompany amounts"):
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    "Seller": rule["seller"],
+                    "Buyer": rule["buyer"],
+                    "Line": f'{rule["revenue_stream"]} / {rule["expense_category"]}',
+                    "Income Statement": float(rule["income_statement"].sum()),
+                    "Cash": float(rule["cash"].sum()),
+                }
+                for rule in group["eliminations"]
+            ]).style.format({"Income Statement": "${:,.0f}", "Cash": "${:,.0f}"}),
+            use_container_width=True,
+            hide_index=True
+        )
+
+# CONSOLIDATED LIQUIDITY SECTION
+st.markdown('<div class="section-header">💧 Consolidated Liquidity</div>', unsafe_allow_html=True)
+
+year_end = [int(np.nonzero(year_of_month == year)[0][-1]) for year in years]
+liquidity_rows = statement_rows(
+    {line.replace("_", " ").title(): values for line, values in consolidated["cash_inflows"].items()}
+)
+liquidity_rows.extend(statement_rows(consolidated["cash_outflows"]))
+liquidity_rows.append({"Line Item": "Net Cash Flow", **dict(zip(years, yearly_totals(consolidated["net_cash_flow"])))})
+liquidity_rows.append({"Line Item": "Ending Cash Balance", **dict(zip(years, consolidated["balance"][year_end].tolist()))})
+st.dataframe(
+    pd.DataFrame(liquidity_rows).style.format({year: "${:,.0f}" for year in years}),
+    use_container_width=True,
+    hide_index=True
+)
+
+fig = go.Figure()
+for name in group["entities"]:
+    fig.add_trace(go.Scatter(
+        x=months,
+        y=group["by_entity"][name]["balance"],
+        mode='lines',
+        name=name,
+        hovertemplate='<b>%{fullData.name}</b><br>$%{y:,.0f}<extra></extra>'
+    ))
+fig.add_trace(go.Scatter(
+    x=months,
+    y=consolidated["balance"],
+    mode='lines',
+    name='Group',
+    line=dict(color='#00D084', width=4),
+    hovertemplate='<b>Group</b><br>$%{y:,.0f}<extra></extra>'
+))
+fig.update_layout(
+    title=dict(text='Cash Balance by Entity', font=dict(size=18, color='#262730')),
+    yaxis=dict(title='Amount ($)', showgrid=True, gridcolor='rgba(128,128,128,0.2)', tickformat='$,.0f'),
+    hovermode='x unified',
+    plot_bgcolor='white',
+    paper_bgcolor='white',
+    font=dict(family="Arial, sans-serif", size=12),
+    height=400,
+    margin=dict(l=50, r=50, t=80, b=50)
+)
+st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,38 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List
+
+
+def process_map(func: Callable, *iterables, max_workers: int = None) -> List[Any]:
+    """Map func over the iterables in worker processes, in order.
+
+    func must be a module-level function and its arguments picklable. Falls back
+    to evaluating in-process when there is only one task or CPU, or when a
+    process pool cannot be started (some hosting environments disallow it).
+    Errors raised by func itself propagate.
+    """
+    tasks = list(zip(*iterables))
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(func, *zip(*tasks)))
+        except (OSError, BrokenProcessPool):
+            pass
+    return [func(*args) for args in tasks]
+
+
+def thread_map(func: Callable, *iterables, max_workers: int = None) -> List[Any]:
+    """Map func over the iterables on a thread pool, in order.
+
+    For NumPy-heavy work that releases the GIL and for functions that should
+    share this process's caches; func may be any callable. Single tasks run
+    in-process.
+    """
+    tasks = list(zip(*iterables))
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(func, *zip(*tasks)))
+    return [func(*args) for args in tasks]
@@ -0,0 +1,327 @@
+import numpy as np
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
+
+from model_cache import memoize_by_content
+
+# Departments that always appear in payroll breakdowns (matches the Headcount page)
+DEFAULT_DEPARTMENTS = ["Product Development", "Sales and Marketing", "Opex"]
+
+# Pay constants used by the payroll model
+SALARY_PAY_PERIODS_PER_YEAR = 26
+WEEKS_PER_MONTH = 4.33
+
+
+def _number(value, default):
+    """Coerce a numeric field, treating None as missing"""
+    if value is None:
+        return float(default)
+    return float(value)
+
+
+def _employee_key(employees: Dict[str, Any]) -> Tuple:
+    """Hashable snapshot of the employee fields that drive the activity matrix and pay rates"""
+    return tuple(
+        (
+            str(emp_id),
+            emp_data.get("hire_date"),
+            emp_data.get("termination_date"),
+            bool(emp_data.get("active", True)),
+            emp_data.get("department", "Opex"),
+            emp_data.get("pay_type", "Salary"),
+            emp_data.get("annual_salary", 0),
+            emp_data.get("hourly_rate", 0),
+            emp_data.get("weekly_hours", 40.0),
+            emp_data.get("name", ""),
+        )
+        for emp_id, emp_data in employees.items()
+    )
+
+
+@lru_cache(maxsize=32)
+def month_starts(months: Tuple[str, ...]) -> np.ndarray:
+    """First day of each "Mon YYYY" label as datetime64[D]"""
+    return np.array(
+        [datetime.strptime(month, "%b %Y").strftime("%Y-%m-%d") for month in months],
+        dtype="datetime64[D]",
+    )
+
+
+def _parse_date(value):
+    """Parse a YYYY-MM-DD string to datetime64[D]; missing values become NaT"""
+    if not value:
+        return np.datetime64("NaT")
+    return np.datetime64(datetime.strptime(value, "%Y-%m-%d").date(), "D")
+
+
+def parse_date_ranges(date_ranges: List[Tuple[Any, Any]]):
+    """Start/end dates as datetime64[D] arrays (NaT when missing) plus invalid-date flags"""
+    count = len(date_ranges)
+    starts = np.full(count, np.datetime64("NaT"), dtype="datetime64[D]")
+    ends = np.full(count, np.datetime64("NaT"), dtype="datetime64[D]")
+    bad_start = np.zeros(count, dtype=bool)
+    bad_end = np.zeros(count, dtype=bool)
+
+    for row, (start_str, end_str) in enumerate(date_ranges):
+        try:
+            starts[row] = _parse_date(start_str)
+        except (ValueError, TypeError):
+            bad_start[row] = True
+            continue
+        try:
+            ends[row] = _parse_date(end_str)
+        except (ValueError, TypeError):
+            bad_end[row] = True
+
+    return starts, ends, bad_start, bad_end
+
+
+def build_activity_matrix(date_ranges: List[Tuple[Any, Any]], months: Tuple[str, ...], fallback_active: List[bool], through_end_of_month: bool = False) -> np.ndarray:
+    """Boolean rows x months matrix of whether each [start, end) range covers the month start.
+
+    Mirrors is_employee_active_for_month: active when hired on or before the first
+    of the month and not terminated on or before it. With through_end_of_month
+    the end date counts until the month after it (the KPI page's headcount rule).
+    An unparseable date falls back to the row's active flag from the point where
+    the per-month check would have hit it.
+    """
+    starts_of_month = month_starts(tuple(months))
+    hire, termination, bad_hire, bad_termination = parse_date_ranges(date_ranges)
+
+    if through_end_of_month:
+        termination = (termination.astype("datetime64[M]") + 1).astype("datetime64[D]")
+
+    # NaT compares False, so missing dates never exclude a month
+    hired = ~(starts_of_month[None, :] < hire[:, None])
+    active = hired & ~(starts_of_month[None, :] >= termination[:, None])
+
+    if bad_hire.any() or bad_termination.any():
+        fallback = np.asarray(fallback_active, dtype=bool)[:, None]
+        active = np.where(bad_hire[:, None], fallback, active)
+        active = np.where(bad_termination[:, None], hired & fallback, active)
+
+    return active
+
+
+@lru_cache(maxsize=8)
+def _build_roster(employee_key: Tuple, months: Tuple[str, ...]) -> Dict[str, Any]:
+    employee_ids = [row[0] for row in employee_key]
+    date_ranges = [(row[1], row[2]) for row in employee_key]
+    active = build_activity_matrix(date_ranges, months, [row[3] for row in employee_key])
+
+    departments = [row[4] for row in employee_key]
+    department_names = list(DEFAULT_DEPARTMENTS)
+    for department in departments:
+        if department not in department_names:
+            department_names.append(department)
+    department_index = np.array([department_names.index(d) for d in departments], dtype=np.intp)
+
+    # Salaried employees are paid per pay period; hourly employees per average month
+    is_salary = np.array([row[5] == "Salary" for row in employee_key], dtype=bool)
+    salary_per_period = np.array([_number(row[6], 0) for row in employee_key], dtype=float) / SALARY_PAY_PERIODS_PER_YEAR
+    weekly_hours = np.array([_number(row[8], 40.0) for row in employee_key], dtype=float)
+    hourly_monthly = np.array([_number(row[7], 0) for row in employee_key], dtype=float) * weekly_hours * WEEKS_PER_MONTH
+
+    # Bonuses reference employees by name, so keep every row that carries each name
+    rows_by_name = {}
+    for i, row in enumerate(employee_key):
+        rows_by_name.setdefault(row[9], []).append(i)
+
+    roster = {
+        "employee_ids": employee_ids,
+        "index": {emp_id: i for i, emp_id in enumerate(employee_ids)},
+        "months": list(months),
+        "active": active,
+        "hire_dates": parse_date_ranges(date_ranges)[0],
+        "department_names": department_names,
+        "department_index": department_index,
+        "salary_per_period": np.where(is_salary, salary_per_period, 0.0),
+        "hourly_monthly": np.where(is_salary, 0.0, hourly_monthly),
+        "is_salary": is_salary,
+        "weekly_hours": weekly_hours,
+        "names": [row[9] for row in employee_key],
+        "rows_by_name": rows_by_name,
+    }
+    for value in roster.values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+    return roster
+
+
+def build_employee_roster(employees: Dict[str, Any], months: List[str]) -> Dict[str, Any]:
+    """Activity matrix and pay-rate vectors for all employees, cached per roster and horizon"""
+    return _build_roster(_employee_key(employees), tuple(months))
+
+
+def pay_period_vector(pay_periods: Dict[str, Any], months: List[str]) -> np.ndarray:
+    """Pay periods per month (defaults to 2 when a month is missing)"""
+    return np.array([_number(pay_periods.get(month, 2), 2) for month in months], dtype=float)
+
+
+def calculate_employee_pay_matrix(roster: Dict[str, Any], pay_periods: Dict[str, Any]) -> np.ndarray:
+    """Employees x months base pay, zero where the employee is inactive"""
+    periods = pay_period_vector(pay_periods, roster["months"])
+    rates = roster["salary_per_period"][:, None] * periods[None, :] + roster["hourly_monthly"][:, None]
+    return np.where(roster["active"], rates, 0.0)
+
+
+def department_matrix(roster: Dict[str, Any]) -> np.ndarray:
+    """Departments x employees one-hot membership matrix"""
+    membership = np.zeros((len(roster["department_names"]), len(roster["employee_ids"])))
+    membership[roster["department_index"], np.arange(len(roster["employee_ids"]))] = 1.0
+    return membership
+
+
+def calculate_contractor_cost_matrix(contractors: Dict[str, Any], months: List[str]):
+    """Contractors x months cost matrix plus each contractor's department.
+
+    Monthly cost is resources * hourly rate * 40 hours * 4 weeks while the
+    contractor is active; unparseable dates count as active.
+    """
+    contractor_list = list(contractors.values())
+    active = build_activity_matrix(
+        [(con.get("start_date"), con.get("end_date")) for con in contractor_list],
+        tuple(months),
+        [True] * len(contractor_list),
+    )
+    monthly_cost = np.array(
+        [_number(con.get("resources", 0), 0) * _number(con.get("hourly_rate", 0), 0) * 40 * 4 for con in contractor_list],
+        dtype=float,
+    )
+    departments = [con.get("department", "Product Development") for con in contractor_list]
+    return np.where(active, monthly_cost[:, None], 0.0), departments
+
+
+def series_to_dict(values, months: List[str]) -> Dict[str, float]:
+    """Convert a per-month array back to the {month: value} dicts used by the pages"""
+    return dict(zip(months, np.asarray(values, dtype=float).tolist()))
+
+
+def calculate_payroll_by_department(payroll_data: Dict[str, Any], months: List[str]):
+    """Monthly base payroll by department and in total.
+
+    Returns (payroll_by_dept, total_payroll) in the same dict-of-months shape
+    the pages have always used.
+    """
+    roster = build_employee_roster(payroll_data.get("employees", {}), months)
+    pay_matrix = calculate_employee_pay_matrix(roster, payroll_data.get("pay_periods", {}))
+    by_department = department_matrix(roster) @ pay_matrix
+
+    payroll_by_dept = {
+        department: series_to_dict(by_department[i], months)
+        for i, department in enumerate(roster["department_names"])
+    }
+    total_payroll = series_to_dict(by_department.sum(axis=0), months)
+    return payroll_by_dept, total_payroll
+
+
+def _shares(by_department: np.ndarray, totals: np.ndarray) -> np.ndarray:
+    """Each department's share of a months total (zero where the total is not positive)"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(totals > 0, by_department / totals, 0.0)
+
+
+@memoize_by_content(maxsize=8)
+def calculate_department_shares(payroll_data: Dict[str, Any], months: List[str]) -> Dict[str, np.ndarray]:
+    """DEFAULT_DEPARTMENTS x months shares of theoretical payroll and contractor cost.
+
+    Totals include every department, so costs booked to departments outside the
+    defaults reduce the default shares rather than being reassigned. Used to
+    allocate actual cash disbursements; treat the arrays as read-only.
+    """
+    count = len(DEFAULT_DEPARTMENTS)
+    roster = build_employee_roster(payroll_data.get("employees", {}), months)
+    pay_matrix = calculate_employee_pay_matrix(roster, payroll_data.get("pay_periods", {}))
+    payroll = department_matrix(roster) @ pay_matrix
+
+    contractor_costs, departments = calculate_contractor_cost_matrix(payroll_data.get("contractors", {}), months)
+    # One-hot rows for the default departments; other departments only count in the total
+    membership = np.array([[department == name for department in departments] for name in DEFAULT_DEPARTMENTS], dtype=float).reshape(count, len(departments))
+
+    shares = {
+        "payroll": _shares(payroll[:count], payroll.sum(axis=0)),
+        "contractors": _shares(membership @ contractor_costs, contractor_costs.sum(axis=0)),
+    }
+    for value in shares.values():
+        value.flags.writeable = False
+    return shares
+
+
+def build_bonus_index(employee_bonuses: Dict[str, Any]) -> Dict[Tuple[str, str], float]:
+    """Group bonus entries into an (employee name, month) -> total amount index"""
+    index = {}
+    for bonus_data in employee_bonuses.values():
+        key = (bonus_data.get("employee_name", ""), bonus_data.get("month", ""))
+        index[key] = index.get(key, 0) + bonus_data.get("bonus_amount", 0)
+    return index
+
+
+def calculate_bonus_matrix(roster: Dict[str, Any], employee_bonuses: Dict[str, Any]) -> np.ndarray:
+    """Employees x months bonus amounts aligned with the activity matrix"""
+    month_index = {month: i for i, month in enumerate(roster["months"])}
+    bonus_matrix = np.zeros((len(roster["employee_ids"]), len(roster["months"])))
+    for (employee_name, month), amount in build_bonus_index(employee_bonuses).items():
+        column = month_index.get(month)
+        rows = roster["rows_by_name"].get(employee_name)
+        if column is None or not rows:
+            continue
+        bonus_matrix[rows, column] += amount
+    return bonus_matrix
+
+
+def calculate_employee_cost_matrices(payroll_data: Dict[str, Any], months: List[str]):
+    """Roster plus per-employee base pay and bonus matrices for the payroll_costs table"""
+    roster = build_employee_roster(payroll_data.get("employees", {}), months)
+    base_pay = calculate_employee_pay_matrix(roster, payroll_data.get("pay_periods", {}))
+    bonus_pay = calculate_bonus_matrix(roster, payroll_data.get("employee_bonuses", {}))
+    return roster, base_pay, bonus_pay
+
+
+@memoize_by_content(maxsize=8)
+def calculate_personnel_costs(payroll_data: Dict[str, Any], months: List[str], default_tax_percentage: float = 10.0) -> Dict[str, Any]:
+    """Monthly base payroll, bonuses, payroll taxes, contractor costs and total payroll cost.
+
+    Payroll taxes apply to base payroll plus bonuses at the configured payroll tax
+    percentage. Contractor costs are also split by department. Computed once per
+    payroll version; the arrays are shared, so treat them as read-only.
+    """
+    roster = build_employee_roster(payroll_data.get("employees", {}), months)
+    base_payroll = calculate_employee_pay_matrix(roster, payroll_data.get("pay_periods", {})).sum(axis=0)
+
+    # Bonuses count in their month regardless of which employee they belong to
+    month_index = {month: i for i, month in enumerate(months)}
+    bonuses = np.zeros(len(months))
+    for bonus_data in payroll_data.get("employee_bonuses", {}).values():
+        column = month_index.get(bonus_data.get("month", ""))
+        if column is not None:
+            bonuses[column] += _number(bonus_data.get("bonus_amount", 0), 0)
+
+    config = payroll_data.get("payroll_config", {})
+    tax_rate = _number(config.get("payroll_tax_percentage", default_tax_percentage), default_tax_percentage) / 100.0
+    payroll_taxes = (base_payroll + bonuses) * tax_rate
+
+    contractor_costs, departments = calculate_contractor_cost_matrix(payroll_data.get("contractors", {}), months)
+    contractor_departments = list(DEFAULT_DEPARTMENTS) + [d for d in dict.fromkeys(departments) if d not in DEFAULT_DEPARTMENTS]
+    membership = np.zeros((len(contractor_departments), len(departments)))
+    membership[[contractor_departments.index(d) for d in departments], np.arange(len(departments))] = 1.0
+
+    costs = {
+        "base_payroll": base_payroll,
+        "bonuses": bonuses,
+        "payroll_taxes": payroll_taxes,
+        "total_payroll_cost": base_payroll + bonuses + payroll_taxes,
+        "contractors": contractor_costs.sum(axis=0),
+        "contractor_departments": contractor_departments,
+        "contractors_by_department": membership @ contractor_costs,
+    }
+    for value in costs.values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+    return costs
+
+
+def active_cells(mask: np.ndarray):
+    """(month index, employee index) pairs of a mask in month-major order"""
+    month_idx, emp_idx = np.nonzero(mask.T)
+    return zip(month_idx.tolist(), emp_idx.tolist())
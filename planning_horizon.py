@@ -0,0 +1,60 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
+
+# Horizon used until a different one is saved in model_settings
+DEFAULT_PLANNING_HORIZON = {"start_month": "Jan 2025", "years": 6}
+MAX_HORIZON_YEARS = 30
+
+
+def normalize_horizon(horizon: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Valid {"start_month", "years"} settings; invalid values fall back to the defaults"""
+    horizon = horizon or {}
+    start_month = horizon.get("start_month", DEFAULT_PLANNING_HORIZON["start_month"])
+    try:
+        start_month = datetime.strptime(str(start_month), "%b %Y").strftime("%b %Y")
+    except ValueError:
+        start_month = DEFAULT_PLANNING_HORIZON["start_month"]
+    try:
+        years = int(horizon.get("years", DEFAULT_PLANNING_HORIZON["years"]))
+    except (TypeError, ValueError):
+        years = DEFAULT_PLANNING_HORIZON["years"]
+    return {"start_month": start_month, "years": min(max(years, 1), MAX_HORIZON_YEARS)}
+
+
+@lru_cache(maxsize=16)
+def _month_labels(start_month: str, month_count: int) -> Tuple[str, ...]:
+    start = datetime.strptime(start_month, "%b %Y")
+    labels = []
+    for offset in range(month_count):
+        year, month = divmod(start.month - 1 + offset, 12)
+        labels.append(datetime(start.year + year, month + 1, 1).strftime("%b %Y"))
+    return tuple(labels)
+
+
+def horizon_months(horizon: Dict[str, Any] = None) -> List[str]:
+    """Month labels ("Jan 2025") covering the planning horizon"""
+    horizon = normalize_horizon(horizon)
+    return list(_month_labels(horizon["start_month"], horizon["years"] * 12))
+
+
+def horizon_years(months: List[str]) -> List[str]:
+    """Years touched by a list of month labels, in order"""
+    years = []
+    for month in months:
+        year = month.split(" ")[1]
+        if not years or years[-1] != year:
+            years.append(year)
+    return years
+
+
+def horizon_date_range(months: List[str]) -> Tuple[str, str]:
+    """First and last year_month dates (YYYY-MM-01) of the horizon, for database filters"""
+    first = datetime.strptime(months[0], "%b %Y").strftime("%Y-%m-%d")
+    last = datetime.strptime(months[-1], "%b %Y").strftime("%Y-%m-%d")
+    return first, last
+
+
+def beyond_horizon_label(months: List[str]) -> str:
+    """Runway label used when cash lasts past the final month"""
+    return f"Beyond {months[-1].split(' ')[1]}" if months else "Beyond Horizon"
@@ -0,0 +1,122 @@
+import threading
+import numpy as np
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+# Kinds of names the registry interns
+SEGMENTS = "segment"
+TRANSACTIONAL = "transactional"
+EXPENSES = "expense"
+
+# Legacy names still found in older rows and sessions, mapped to their current name
+ALIASES = {
+    SEGMENTS: {
+        "Charging Hardware": "Charging OEM",
+        "Finance Partner": "Traditional Finance Provider",
+        "Grants": "Grant Administrator",
+        "Insurance Company": "Insurance Provider",
+        "Technology Partner": "Technology Solutions",
+        "Upfitter/Distributor": "Upfitter",
+        "Utility/Energy Company": "Utility Provider",
+    },
+    # Segments that held transactional volume before the "Transactional-" rows existed
+    TRANSACTIONAL: {
+        "Charging as a Service": "Charging",
+        "Charging Hardware": "Charging",
+        "Corporate": "Charging",
+        "Dealership": "Vehicle",
+        "Equipment Manufacturer": "Vehicle",
+        "Finance Partner": "Financing",
+    },
+    # The liquidity page stores these without slashes
+    EXPENSES: {
+        "Legal / Professional Fees": "Legal Professional Fees",
+        "Permitting/Fees/Licensing": "Permitting Fees Licensing",
+        "Consultants/Audit/Tax": "Consultants Audit Tax",
+    },
+}
+
+# Per kind: id -> display name, and match key -> id. Ids are positions in registration order, so they
+# are stable only within one process: after a restart the defaults get the same ids, but any other
+# name gets whatever id its first use gives it. Never persist an id; database rows are joined by
+# name (business_segments ids and expense category names) and resolved through the registry on load.
+_names: Dict[str, List[str]] = {}
+_ids: Dict[str, Dict[str, int]] = {}
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=4096)
+def canonical_name(name: str) -> str:
+    """A name with surrounding and repeated whitespace removed"""
+    return " ".join(str(name).split())
+
+
+@lru_cache(maxsize=4096)
+def _current_name(kind: str, name: str) -> str:
+    """A name with its kind's aliases applied (matched case-insensitively)"""
+    name = canonical_name(name)
+    for alias, target in ALIASES.get(kind, {}).items():
+        if alias.casefold() == name.casefold():
+            return target
+    return name
+
+
+def intern(kind: str, name: str) -> int:
+    """Integer id of a name for this process, registering it on first sight.
+
+    Aliases, spacing and letter case all resolve to the same id; the first
+    spelling registered is the display name. Ids index in-memory arrays only
+    and are not stable across restarts, so never store them.
+    """
+    current = _current_name(kind, name)
+    key = current.casefold()
+    ids = _ids.get(kind, {})
+    if key in ids:
+        return ids[key]
+    with _lock:
+        names, ids = _names.setdefault(kind, []), _ids.setdefault(kind, {})
+        if key not in ids:
+            ids[key] = len(names)
+            names.append(current)
+        return ids[key]
+
+
+def register(kind: str, names: List[str]) -> List[int]:
+    """Intern names in order (for default lists, so they get the lowest ids)"""
+    return [intern(kind, name) for name in names]
+
+
+def lookup(kind: str, name: str) -> Optional[int]:
+    """Id of a known name or alias, or None without registering it"""
+    return _ids.get(kind, {}).get(_current_name(kind, name).casefold())
+
+
+def name_of(kind: str, name_id: int) -> str:
+    """Display name of an id"""
+    return _names[kind][name_id]
+
+
+def resolve(kind: str, name: str) -> str:
+    """The registered display name a name or alias refers to"""
+    return name_of(kind, intern(kind, name))
+
+
+def unique_names(kind: str, names: List[str]) -> List[str]:
+    """Names resolved and de-duplicated by id, keeping first-seen order"""
+    seen = {}
+    for name in names:
+        seen.setdefault(intern(kind, name), None)
+    return [name_of(kind, name_id) for name_id in seen]
+
+
+def id_array(kind: str, names: List[str]) -> np.ndarray:
+    """Ids of a list of names, for indexing id-aligned arrays"""
+    return np.array([intern(kind, name) for name in names], dtype=np.intp)
+
+
+def align(kind: str, source: List[str], target: List[str]) -> np.ndarray:
+    """Row of each ``target`` name in ``source`` (-1 when missing), joined by id"""
+    source_ids, target_ids = id_array(kind, source), id_array(kind, target)
+    positions = np.full(len(_names.get(kind, [])), -1, dtype=np.intp)
+    positions[source_ids[::-1]] = np.arange(len(source))[::-1]
+    return positions[target_ids]
@@ -0,0 +1,85 @@
+import numpy as np
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
+
+from model_cache import memoize_by_content
+
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+@lru_cache(maxsize=16)
+def calendar_layout(months: Tuple[str, ...]) -> Dict[str, Any]:
+    """How a horizon's months line up with calendar quarters and years.
+
+    ``lead`` and ``trail`` are the months of padding that extend the horizon to
+    whole calendar years, so any (..., months) array reshapes to (..., years, 12).
+    """
+    lead = MONTH_NAMES.index(months[0].split(" ")[0]) if months else 0
+    trail = -(lead + len(months)) % 12
+    year_months = {}
+    for month in months:
+        year_months.setdefault(month.split(" ")[1], []).append(month)
+    years = list(year_months)
+    # Position of each year's last horizon month (its year-end value for balances)
+    year_end_index = np.cumsum([len(year_months[year]) for year in years]) - 1
+    return {
+        "lead": lead,
+        "trail": trail,
+        "years": years,
+        "quarters": [f"Q{quarter} {year}" for year in years for quarter in range(1, 5)],
+        "year_months": {year: tuple(year_months[year]) for year in years},
+        "months_per_year": np.array([len(year_months[year]) for year in years]),
+        "year_end_index": year_end_index,
+    }
+
+
+def group_months_by_year(months: List[str]) -> Dict[str, List[str]]:
+    """Group months by year and return dict"""
+    return {year: list(year_months) for year, year_months in calendar_layout(tuple(months))["year_months"].items()}
+
+
+def rollup(values: np.ndarray, months: List[str]) -> Dict[str, np.ndarray]:
+    """Monthly, quarterly, yearly and trailing-twelve-month aggregates of a (..., months) array.
+
+    Quarters and years are calendar periods (labelled by calendar_layout's
+    ``quarters`` and ``years``), each a single reshape-and-sum of the horizon
+    padded to whole years. ``yearly_mean`` averages over the months of the year
+    inside the horizon (for percentages and rates), ``year_end`` is the last
+    value of each year (for balances and running totals) and ``ttm`` is a
+    prefix-sum difference, NaN until twelve months of history exist.
+    """
+    layout = calendar_layout(tuple(months))
+    values = np.asarray(values, dtype=float)
+    padding = [(0, 0)] * (values.ndim - 1) + [(layout["lead"], layout["trail"])]
+    padded = np.pad(values, padding)
+    batch = values.shape[:-1]
+
+    yearly = padded.reshape(batch + (-1, 12)).sum(axis=-1)
+    prefix = np.concatenate([np.zeros(batch + (1,)), np.cumsum(values, axis=-1)], axis=-1)
+    ttm = np.full(values.shape, np.nan)
+    ttm[..., 11:] = prefix[..., 12:] - prefix[..., :-12]
+
+    return {
+        "monthly": values,
+        "quarterly": padded.reshape(batch + (-1, 3)).sum(axis=-1),
+        "yearly": yearly,
+        "yearly_mean": yearly / np.maximum(layout["months_per_year"], 1),
+        "year_end": values[..., layout["year_end_index"]] if len(months) else yearly,
+        "ttm": ttm,
+    }
+
+
+@memoize_by_content(maxsize=512)
+def series_rollup(series: Dict[str, Any], months: List[str]) -> Dict[str, np.ndarray]:
+    """Rollups of a {month: value} dict, cached per content so table builders can just read them"""
+    series = series if isinstance(series, dict) else {}
+    result = rollup(np.array([float(series.get(month, 0) or 0) for month in months]), months)
+    for values in result.values():
+        values.flags.writeable = False
+    return result
+
+
+def yearly_by_label(series: Dict[str, Any], months: List[str], kind: str = "yearly") -> Dict[str, float]:
+    """{year: value} of one yearly rollup ("yearly", "yearly_mean" or "year_end") of a {month: value} dict"""
+    values = series_rollup(series, months)[kind]
+    return dict(zip(calendar_layout(tuple(months))["years"], values.tolist()))
@@ -0,0 +1,370 @@
+import numpy as np
+from datetime import date
+from typing import Dict, Any, List
+
+from cash_engine import find_runway_months
+from model_cache import memoize_by_content
+from payroll_engine import (
+    build_employee_roster,
+    calculate_bonus_matrix,
+    calculate_contractor_cost_matrix,
+    calculate_employee_pay_matrix,
+    pay_period_vector,
+)
+from segment_store import product_month_totals, sparse_from_nested, to_dense
+
+REVENUE_STREAMS = ["Subscription", "Transactional", "Implementation", "Maintenance"]
+NON_SUBSCRIPTION_STREAMS = ["Transactional", "Implementation", "Maintenance"]
+PERSONNEL_CATEGORIES = ["Payroll", "Contractors"]
+
+# Model sections the base inputs are extracted from
+MODEL_INPUT_KEYS = [
+    "subscription_new_customers", "subscription_churn_rates", "subscription_pricing",
+    "implementation_new_customers", "implementation_pricing",
+    "maintenance_new_customers", "maintenance_pricing",
+    "transactional_volume", "transactional_price", "transactional_referral_fee",
+    "gross_profit_data", "payroll_data", "liquidity_data", "revenue", "cogs", "sga_expenses",
+]
+
+# Assumption overrides a scenario can set; percentages are relative changes to the base plan
+SCENARIO_FIELDS = {
+    "new_customers_pct": 0.0,        # Growth: new subscription customers per month
+    "churn_pct": 0.0,                # Subscription churn rates
+    "price_pct": 0.0,                # Subscription pricing
+    "hiring_delay_months": 0,        # Shift planned hires (hire date after today) later
+    "investment_delay_months": 0,    # Shift investment receipts later
+    "expense_pct": 0.0,              # Non-personnel cash disbursements
+    "referral_fee_pct": 0.0,         # Transactional referral fee rates
+    "hosting_fixed_pct": 0.0,        # Fixed monthly hosting costs
+    "hosting_variable_pct": 0.0,     # Hosting cost per active customer
+    "payroll_tax_pct": 0.0,          # Payroll tax percentage
+    "contractor_rate_pct": 0.0,      # Contractor hourly rates
+}
+
+DEFAULT_SCENARIOS = [
+    {"name": "Base"},
+    {"name": "Upside", "new_customers_pct": 20.0, "churn_pct": -20.0, "price_pct": 10.0},
+    {"name": "Downside", "new_customers_pct": -25.0, "churn_pct": 25.0, "price_pct": -10.0,
+     "hiring_delay_months": 3, "investment_delay_months": 3},
+]
+
+
+# Editor column labels for each override field
+SCENARIO_COLUMNS = {
+    "name": "Scenario",
+    "new_customers_pct": "New Customers %",
+    "churn_pct": "Churn %",
+    "price_pct": "Price %",
+    "hiring_delay_months": "Hiring Delay (months)",
+    "investment_delay_months": "Investment Delay (months)",
+    "expense_pct": "Other Expenses %",
+}
+
+
+def scenarios_to_rows(scenarios: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Scenario override dicts as editor rows with display labels"""
+    return [
+        {label: scenario.get(field, SCENARIO_FIELDS.get(field, "")) for field, label in SCENARIO_COLUMNS.items()}
+        for scenario in scenarios
+    ]
+
+
+def rows_to_scenarios(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Editor rows back to scenario override dicts, skipping unnamed rows"""
+    scenarios = []
+    for row in rows:
+        name = str(row.get("Scenario") or "").strip()
+        if not name:
+            continue
+        scenario = {"name": name}
+        for field, label in SCENARIO_COLUMNS.items():
+            if field != "name":
+                value = row.get(label)
+                scenario[field] = float(value) if value not in (None, "") and value == value else SCENARIO_FIELDS[field]
+        scenarios.append(scenario)
+    return scenarios
+
+
+def normalize_scenarios(scenarios: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Scenarios as the editor stores them (every editable field filled in), so stored and edited lists compare equal"""
+    return rows_to_scenarios(scenarios_to_rows(scenarios))
+
+
+def _matrix(source: Dict[str, Any], keys: List[str], months: List[str], default: float = 0.0) -> np.ndarray:
+    """keys x months array from a {key: {month: value}} dict"""
+    rows = []
+    for key in keys:
+        series = source.get(key, {}) if isinstance(source, dict) else {}
+        if not isinstance(series, dict):
+            series = {}
+        rows.append([float(series.get(month, default) or 0) for month in months])
+    return np.array(rows, dtype=float).reshape(len(keys), len(months))
+
+
+def _row(source: Dict[str, Any], months: List[str], default: float = 0.0) -> np.ndarray:
+    """Single {month: value} dict as a months array"""
+    return _matrix({"row": source if isinstance(source, dict) else {}}, ["row"], months, default)[0]
+
+
+def _keys(*sources: Dict[str, Any]) -> List[str]:
+    """Union of the keys of several {segment: {month: value}} dicts, in first-seen order"""
+    keys = {}
+    for source in sources:
+        keys.update(dict.fromkeys(source or {}))
+    return list(keys)
+
+
+def shift_months(series: np.ndarray, delays: np.ndarray) -> np.ndarray:
+    """Scenarios x months array of a months series delayed by each scenario's month count.
+
+    Values shifted past the end of the horizon drop off; the first months of a
+    delayed series are zero.
+    """
+    month_count = series.shape[-1]
+    source = np.arange(month_count)[None, :] - np.asarray(delays, dtype=int)[:, None]
+    valid = (source >= 0) & (source < month_count)
+    return np.where(valid, series[..., np.clip(source, 0, month_count - 1)], 0.0)
+
+
+@memoize_by_content(maxsize=8)
+def extract_model_inputs(model_data: Dict[str, Any], months: List[str], as_of: date) -> Dict[str, Any]:
+    """Base-plan assumption arrays the scenario engine perturbs, built once per model version and as-of date.
+
+    Hires after ``as_of`` are the planned hires a hiring delay moves; the date is
+    an argument so it is part of the cache key.
+    """
+    model_data = model_data or {}
+    new_customers = model_data.get("subscription_new_customers", {})
+    churn_rates = model_data.get("subscription_churn_rates", {})
+    pricing = model_data.get("subscription_pricing", {})
+    # Only segments with new customers can ever have subscribers
+    segments = list(new_customers or {})
+
+    implementation = _keys(model_data.get("implementation_new_customers", {}), model_data.get("implementation_pricing", {}))
+    maintenance = _keys(model_data.get("maintenance_new_customers", {}), model_data.get("maintenance_pricing", {}))
+    transactional = _keys(model_data.get("transactional_volume", {}), model_data.get("transactional_price", {}), model_data.get("transactional_referral_fee", {}))
+
+    gp_data = model_data.get("gross_profit_data", {})
+    hosting = gp_data.get("saas_hosting_structure", {})
+    go_live_month = hosting.get("go_live_month", "Jan 2025")
+
+    payroll_data = model_data.get("payroll_data", {})
+    roster = build_employee_roster(payroll_data.get("employees", {}), months)
+    pay_matrix = calculate_employee_pay_matrix(roster, payroll_data.get("pay_periods", {}))
+    # Planned hires are the ones a hiring-delay override moves
+    planned = roster["hire_dates"] > np.datetime64(as_of, "D")
+    contractor_costs, _ = calculate_contractor_cost_matrix(payroll_data.get("contractors", {}), months)
+
+    liquidity = model_data.get("liquidity_data", {})
+    category_order = liquidity.get("category_order", [])
+    expenses = liquidity.get("expenses", {})
+    other_categories = [cat for cat in category_order if cat not in PERSONNEL_CATEGORIES]
+    sga_categories = category_order or list(model_data.get("sga_expenses", {}).keys())
+
+    return {
+        "months": list(months),
+        "segments": segments,
+        "new_customers": to_dense(sparse_from_nested(new_customers, months, segments)),
+        "churn": to_dense(sparse_from_nested(churn_rates, months, segments)),
+        "price": to_dense(sparse_from_nested(pricing, months, segments)),
+        "implementation_revenue": product_month_totals(
+            sparse_from_nested(model_data.get("implementation_new_customers", {}), months, implementation),
+            sparse_from_nested(model_data.get("implementation_pricing", {}), months, implementation),
+        ),
+        "maintenance_revenue": product_month_totals(
+            sparse_from_nested(model_data.get("maintenance_new_customers", {}), months, maintenance),
+            sparse_from_nested(model_data.get("maintenance_pricing", {}), months, maintenance),
+        ),
+        "transactional_volume": _matrix(model_data.get("transactional_volume", {}), transactional, months),
+        "transactional_price": _matrix(model_data.get("transactional_price", {}), transactional, months),
+        "transactional_fee": _matrix(model_data.get("transactional_referral_fee", {}), transactional, months),
+        "hosting_fixed": _row(hosting.get("monthly_fixed_costs", {}), months, hosting.get("fixed_monthly_cost", 15400.0)),
+        "hosting_variable": _row(hosting.get("monthly_variable_costs", {}), months, hosting.get("cost_per_customer", 5.0)),
+        "go_live_index": months.index(go_live_month) if go_live_month in months else 0,
+        "capitalize_before_go_live": bool(hosting.get("capitalize_before_go_live", True)),
+        "direct_subscription": _row(gp_data.get("direct_costs", {}).get("Subscription", {}), months),
+        "gp_percentages": _matrix(gp_data.get("gross_profit_percentages", {}), NON_SUBSCRIPTION_STREAMS, months, 70.0),
+        "existing_pay": pay_matrix[~planned].sum(axis=0),
+        "planned_salary_active": (roster["salary_per_period"][planned, None] * roster["active"][planned]).sum(axis=0),
+        "planned_hourly_active": (roster["hourly_monthly"][planned, None] * roster["active"][planned]).sum(axis=0),
+        "pay_periods": pay_period_vector(payroll_data.get("pay_periods", {}), months),
+        "bonuses": calculate_bonus_matrix(roster, payroll_data.get("employee_bonuses", {})).sum(axis=0),
+        "payroll_tax_rate": float(payroll_data.get("payroll_config", {}).get("payroll_tax_percentage", 10.0)) / 100.0,
+        "contractor_costs": contractor_costs.sum(axis=0),
+        "starting_balance": float(liquidity.get("starting_balance", 0) or 0),
+        "cash_revenue": _row(liquidity.get("revenue", {}), months),
+        "other_cash_receipts": _row(liquidity.get("other_cash_receipts", {}), months),
+        "investment": _row(liquidity.get("investment", {}), months),
+        "payroll_expense": _row(expenses.get("Payroll", {}), months),
+        "contractor_expense": _row(expenses.get("Contractors", {}), months),
+        "other_expenses": _matrix(expenses, other_categories, months).sum(axis=0),
+        "model_revenue": _matrix(model_data.get("revenue", {}), REVENUE_STREAMS, months).sum(axis=0),
+        "model_cogs": _matrix(model_data.get("cogs", {}), REVENUE_STREAMS, months).sum(axis=0),
+        "model_sga": _matrix(model_data.get("sga_expenses", {}), sga_categories, months).sum(axis=0),
+    }
+
+
+def stack_overrides(scenarios: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """One (scenarios,) array per override field, missing fields at their neutral value"""
+    return {
+        field: np.array([float(scenario.get(field, default) or 0) for scenario in scenarios], dtype=float)
+        for field, default in SCENARIO_FIELDS.items()
+    }
+
+
+def subscription_running_totals(new_customers: np.ndarray, churn_pct: np.ndarray) -> np.ndarray:
+    """Active customers after churn for stacked (..., segments, months) assumption arrays.
+
+    Same recurrence as the Revenue Assumptions page - previous * (1 - churn) + new -
+    evaluated for every scenario and segment at once, with stored totals rounded
+    to cents as the page does.
+    """
+    retention = 1 - churn_pct / 100.0
+    totals = np.empty(np.broadcast_shapes(new_customers.shape, retention.shape))
+    running = np.zeros(totals.shape[:-1])
+    for month in range(totals.shape[-1]):
+        running = running * retention[..., month] + new_customers[..., month]
+        totals[..., month] = running
+    return np.round(totals, 2)
+
+
+def _evaluate(inputs: Dict[str, Any], overrides: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Engine-level revenue, COGS, payroll and expense arrays for stacked overrides"""
+    growth = 1 + overrides["new_customers_pct"][:, None, None] / 100.0
+    churn_change = 1 + overrides["churn_pct"][:, None, None] / 100.0
+    price_change = 1 + overrides["price_pct"][:, None, None] / 100.0
+
+    # Revenue
+    totals = subscription_running_totals(
+        inputs["new_customers"][None] * growth,
+        np.clip(inputs["churn"][None] * churn_change, 0.0, 100.0),
+    )
+    subscription = (totals * inputs["price"][None] * price_change).sum(axis=1)
+    fee_change = 1 + overrides["referral_fee_pct"][:, None] / 100.0
+    transactional = (
+        inputs["transactional_volume"] * inputs["transactional_price"] * inputs["transactional_fee"] / 100
+    ).sum(axis=0)[None] * fee_change
+    scenario_count = subscription.shape[0]
+    other_revenue = np.stack([
+        np.broadcast_to(transactional, subscription.shape),
+        np.broadcast_to(inputs["implementation_revenue"], subscription.shape),
+        np.broadcast_to(inputs["maintenance_revenue"], subscription.shape),
+    ], axis=1)
+    revenue = subscription + other_revenue.sum(axis=1)
+
+    # COGS: hosting on active subscribers for Subscription, gross profit % elsewhere
+    hosting = (
+        inputs["hosting_fixed"][None] * (1 + overrides["hosting_fixed_pct"][:, None] / 100.0)
+        + inputs["hosting_variable"][None] * (1 + overrides["hosting_variable_pct"][:, None] / 100.0) * totals.sum(axis=1)
+    )
+    if inputs["capitalize_before_go_live"]:
+        hosting[:, :inputs["go_live_index"]] = 0.0
+    cogs = (
+        hosting + inputs["direct_subscription"][None]
+        + (other_revenue * (1 - inputs["gp_percentages"][None] / 100)).sum(axis=1)
+    )
+
+    # Payroll: planned hires shifted by the hiring delay, then bonuses and taxes
+    delays = overrides["hiring_delay_months"].astype(int)
+    planned_pay = (
+        shift_months(inputs["planned_salary_active"], delays) * inputs["pay_periods"][None]
+        + shift_months(inputs["planned_hourly_active"], delays)
+    )
+    tax_rate = inputs["payroll_tax_rate"] * (1 + overrides["payroll_tax_pct"][:, None] / 100.0)
+    payroll = (inputs["existing_pay"][None] + planned_pay + inputs["bonuses"][None]) * (1 + tax_rate)
+    contractors = inputs["contractor_costs"][None] * (1 + overrides["contractor_rate_pct"][:, None] / 100.0)
+
+    return {
+        "revenue": revenue,
+        "cogs": cogs,
+        "payroll": payroll,
+        "contractors": contractors,
+        "other_expenses": inputs["other_expenses"][None] * (1 + overrides["expense_pct"][:, None] / 100.0),
+        "investment": shift_months(inputs["investment"], overrides["investment_delay_months"].astype(int)),
+        "active_customers": totals.sum(axis=1),
+    }
+
+
+def evaluate_overrides(inputs: Dict[str, Any], overrides: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Evaluate stacked override arrays (one entry per row) in one vectorized pass.
+
+    Each row's series are the current model's series plus the engine's
+    difference from the unmodified plan, so a row with no overrides matches
+    the Income Statement and Liquidity pages exactly (including manual edits).
+    Returns rows x months arrays.
+    """
+    neutral = stack_overrides([{}])
+    engine = _evaluate(inputs, {
+        field: np.concatenate([neutral[field], np.asarray(values, dtype=float)])
+        for field, values in overrides.items()
+    })
+    base = {key: values[0] for key, values in engine.items()}
+    scenario = {key: values[1:] for key, values in engine.items()}
+
+    revenue_delta = scenario["revenue"] - base["revenue"]
+    revenue = inputs["model_revenue"][None] + revenue_delta
+    cogs = inputs["model_cogs"][None] + scenario["cogs"] - base["cogs"]
+    payroll_expense = inputs["payroll_expense"][None] + scenario["payroll"] - base["payroll"]
+    contractor_expense = inputs["contractor_expense"][None] + scenario["contractors"] - base["contractors"]
+    expenses = payroll_expense + contractor_expense + scenario["other_expenses"]
+    base_expenses = inputs["payroll_expense"] + inputs["contractor_expense"] + inputs["other_expenses"]
+
+    net_cash_flow = (
+        inputs["cash_revenue"][None] + revenue_delta + inputs["other_cash_receipts"][None]
+        + scenario["investment"] - expenses
+    )
+    balance = inputs["starting_balance"] + np.cumsum(net_cash_flow, axis=1)
+
+    return {
+        "revenue": revenue,
+        "cogs": cogs,
+        "gross_profit": revenue - cogs,
+        "payroll": payroll_expense,
+        "expenses": expenses,
+        "net_income": revenue - (inputs["model_sga"][None] + expenses - base_expenses[None]),
+        "net_cash_flow": net_cash_flow,
+        "balance": balance,
+        "active_customers": scenario["active_customers"],
+    }
+
+
+def evaluate_scenarios(inputs: Dict[str, Any], scenarios: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Evaluate all scenarios together; adds names, months and runway labels"""
+    results = evaluate_overrides(inputs, stack_overrides(scenarios))
+    results.update({
+        "names": [s.get("name", f"Scenario {i + 1}") for i, s in enumerate(scenarios)],
+        "months": inputs["months"],
+        "runway": find_runway_months(results["balance"], -results["net_cash_flow"], inputs["months"]),
+    })
+    return results
+
+
+def model_inputs(model_data: Dict[str, Any], months: List[str], as_of: date = None) -> Dict[str, Any]:
+    """Cached base inputs, keyed only on the model sections the engine reads and the as-of date (today by default)"""
+    relevant = {key: model_data.get(key) for key in MODEL_INPUT_KEYS if key in model_data}
+    return extract_model_inputs(relevant, months, as_of or date.today())
+
+
+def run_scenarios(model_data: Dict[str, Any], months: List[str], scenarios: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Extract (cached) base inputs from the model and evaluate the scenarios"""
+    return evaluate_scenarios(model_inputs(model_data, months), scenarios)
+
+
+def scenario_summary(results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """One row per scenario: runway, cash and yearly net income, ready for a DataFrame"""
+    months = results["months"]
+    years = sorted({month.split(" ")[1] for month in months})
+    year_of_month = np.array([month.split(" ")[1] for month in months])
+
+    rows = []
+    for i, name in enumerate(results["names"]):
+        row = {
+            "Scenario": name,
+            "Cash Runway": results["runway"][i],
+            "Minimum Cash": float(results["balance"][i].min()) if months else 0.0,
+            "Ending Cash": float(results["balance"][i][-1]) if months else 0.0,
+        }
+        for year in years:
+            row[f"{year} Net Income"] = float(results["net_income"][i][year_of_month == year].sum())
+        rows.append(row)
+    return rows
@@ -0,0 +1,190 @@
+import numpy as np
+from typing import Dict, Any, List
+
+from model_cache import memoize_by_content
+from registry import SEGMENTS, TRANSACTIONAL, lookup, register, resolve, unique_names
+
+# Segments every model starts with; more can be added as business_segments rows
+DEFAULT_SEGMENTS = [
+    "Dealership", "End User", "Equipment Manufacturer", "Upfitter",
+    "Depot", "Fleet Management Company", "Logistics", "OEM",
+    "Traditional Finance Provider", "Channel Partner", "Charging OEM", "Insurance Provider",
+    "Maintenance Provider", "Charging as a Service", "EPC", "Government Agency",
+    "Grant Administrator", "Operating and Maintenance Provider", "Remarketing Specialists", "Technology Solutions",
+    "Utility Provider"
+]
+
+TRANSACTIONAL_CATEGORIES = ["Charging", "Vehicle", "Financing", "Other Revenue"]
+
+# business_segments rows holding transactional categories use this name prefix
+TRANSACTIONAL_PREFIX = "Transactional-"
+
+# Per-segment revenue assumptions ({segment: {month: value}}, non-zero cells only)
+SEGMENT_DATA_KEYS = [
+    "subscription_new_customers", "subscription_pricing", "subscription_churn_rates",
+    "implementation_new_customers", "implementation_pricing",
+    "maintenance_new_customers", "maintenance_pricing",
+]
+TRANSACTIONAL_DATA_KEYS = ["transactional_volume", "transactional_price", "transactional_referral_fee"]
+
+# Everything the revenue streams are calculated from
+REVENUE_INPUT_KEYS = SEGMENT_DATA_KEYS + TRANSACTIONAL_DATA_KEYS
+
+# Defaults take the lowest registry ids, in display order
+register(SEGMENTS, DEFAULT_SEGMENTS)
+register(TRANSACTIONAL, TRANSACTIONAL_CATEGORIES)
+
+
+def segment_names(model_data: Dict[str, Any]) -> List[str]:
+    """Revenue segments of a model: the registered list plus any segment that has data (one name per registry id)"""
+    names = list(model_data.get("revenue_segments") or DEFAULT_SEGMENTS)
+    for data_key in SEGMENT_DATA_KEYS:
+        names.extend(model_data.get(data_key, {}) or {})
+    return unique_names(SEGMENTS, names)
+
+
+def transactional_category(segment_name: str) -> str:
+    """Transactional category a business_segments row holds: the suffix of a
+    "Transactional-" row, or the category a legacy segment's volume belonged to"""
+    if segment_name.startswith(TRANSACTIONAL_PREFIX):
+        return resolve(TRANSACTIONAL, segment_name[len(TRANSACTIONAL_PREFIX):])
+    if lookup(TRANSACTIONAL, segment_name) is None:
+        return "Other Revenue"
+    return resolve(TRANSACTIONAL, segment_name)
+
+
+def sparse_from_nested(nested: Dict[str, Dict[str, Any]], months: List[str], segments: List[str] = None) -> Dict[str, Any]:
+    """Coordinate (segment, month, value) arrays for the non-zero cells of a {segment: {month: value}} dict.
+
+    Cost is proportional to the stored cells, not to segments x months. Cells for
+    months outside the horizon or segments outside ``segments`` are skipped.
+    """
+    month_index = {month: i for i, month in enumerate(months)}
+    segments = list(segments) if segments is not None else list((nested or {}).keys())
+    segment_index = {segment: i for i, segment in enumerate(segments)}
+
+    rows, cols, values = [], [], []
+    for segment, series in (nested or {}).items():
+        row = segment_index.get(segment)
+        if row is None or not isinstance(series, dict):
+            continue
+        for month, value in series.items():
+            col = month_index.get(month)
+            if col is not None and value:
+                rows.append(row)
+                cols.append(col)
+                values.append(float(value))
+
+    return {
+        "segments": segments,
+        "months": list(months),
+        "row": np.array(rows, dtype=np.int32),
+        "col": np.array(cols, dtype=np.int16),
+        "value": np.array(values, dtype=float),
+    }
+
+
+def sparse_to_nested(store: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """The {segment: {month: value}} dict of a sparse store (stored cells only)"""
+    nested = {}
+    for row, col, value in zip(store["row"].tolist(), store["col"].tolist(), store["value"].tolist()):
+        nested.setdefault(store["segments"][row], {})[store["months"][col]] = value
+    return nested
+
+
+def to_dense(store: Dict[str, Any]) -> np.ndarray:
+    """Segments x months array of a sparse store"""
+    shape = (len(store["segments"]), len(store["months"]))
+    flat = store["row"].astype(np.int64) * shape[1] + store["col"]
+    return np.bincount(flat, weights=store["value"], minlength=shape[0] * shape[1]).reshape(shape)
+
+
+def month_totals(store: Dict[str, Any]) -> np.ndarray:
+    """Sum over all segments for each month"""
+    return np.bincount(store["col"], weights=store["value"], minlength=len(store["months"]))
+
+
+def segment_totals(store: Dict[str, Any]) -> np.ndarray:
+    """Sum over all months for each segment"""
+    return np.bincount(store["row"], weights=store["value"], minlength=len(store["segments"]))
+
+
+def product_month_totals(left: Dict[str, Any], right: Dict[str, Any]) -> np.ndarray:
+    """Per-month sum of left x right over the cells both stores hold (e.g. volume x price).
+
+    Both stores must share segments and months; cells missing on either side are zero.
+    """
+    month_count = len(left["months"])
+    left_key = left["row"].astype(np.int64) * month_count + left["col"]
+    right_key = right["row"].astype(np.int64) * month_count + right["col"]
+    _, left_at, right_at = np.intersect1d(left_key, right_key, assume_unique=True, return_indices=True)
+    return np.bincount(
+        left["col"][left_at], weights=left["value"][left_at] * right["value"][right_at], minlength=month_count
+    )
+
+
+def _store(model_data: Dict[str, Any], data_key: str, months: List[str], segments: List[str]) -> Dict[str, Any]:
+    return sparse_from_nested(model_data.get(data_key, {}) or {}, months, segments)
+
+
+def subscription_running_totals(model_data: Dict[str, Any], months: List[str]) -> Dict[str, Dict[str, float]]:
+    """Active subscribers per segment: previous x (1 - churn) + new, rounded to cents.
+
+    Only segments with new subscriptions can have subscribers, so only those are returned.
+    """
+    segments = list(model_data.get("subscription_new_customers", {}) or {})
+    new_customers = to_dense(_store(model_data, "subscription_new_customers", months, segments))
+    # Churn rates are percentages
+    retention = 1 - to_dense(_store(model_data, "subscription_churn_rates", months, segments)) / 100.0
+
+    totals = np.zeros_like(new_customers)
+    running = np.zeros(len(segments))
+    for i in range(len(months)):
+        running = running * retention[:, i] + new_customers[:, i]
+        totals[:, i] = running
+    totals = np.round(totals, 2)
+    return {segment: dict(zip(months, totals[row].tolist())) for row, segment in enumerate(segments) if totals[row].any()}
+
+
+def revenue_streams(model_data: Dict[str, Any], months: List[str], running_totals: Dict[str, Dict[str, float]]) -> Dict[str, np.ndarray]:
+    """Monthly revenue per stream from the sparse segment assumptions"""
+    model_data = {**model_data, "subscription_running_totals": running_totals}
+    streams = {}
+    # Subscription: active customers x monthly price
+    subscribers = list(running_totals)
+    streams["Subscription"] = product_month_totals(
+        _store(model_data, "subscription_running_totals", months, subscribers),
+        _store(model_data, "subscription_pricing", months, subscribers),
+    )
+    # Transactional: volume x price x referral fee %
+    categories = list(model_data.get("transactional_volume", {}) or {})
+    volume, price, fee = (to_dense(_store(model_data, key, months, categories)) for key in TRANSACTIONAL_DATA_KEYS)
+    streams["Transactional"] = (volume * price * fee / 100).sum(axis=0)
+    # Implementation and Maintenance: one-time fee per new customer
+    for stream in ["Implementation", "Maintenance"]:
+        prefix = stream.lower()
+        segments = list(model_data.get(f"{prefix}_new_customers", {}) or {})
+        streams[stream] = product_month_totals(
+            _store(model_data, f"{prefix}_new_customers", months, segments),
+            _store(model_data, f"{prefix}_pricing", months, segments),
+        )
+    return streams
+
+
+def revenue_inputs(model_data: Dict[str, Any]) -> Dict[str, Any]:
+    """The part of the model the revenue streams depend on"""
+    return {key: model_data.get(key, {}) or {} for key in REVENUE_INPUT_KEYS}
+
+
+@memoize_by_content(maxsize=8)
+def build_revenue_model(inputs: Dict[str, Any], months: List[str]) -> Dict[str, Any]:
+    """Subscription running totals and monthly revenue per stream, computed once per assumptions version.
+
+    ``inputs`` comes from revenue_inputs. The result is shared between callers,
+    so copy the running totals before storing them in the model.
+    """
+    running_totals = subscription_running_totals(inputs, months)
+    streams = revenue_streams(inputs, months, running_totals)
+    for values in streams.values():
+        values.flags.writeable = False
+    return {"subscription_running_totals": running_totals, "streams": streams}
@@ -0,0 +1,63 @@
+import numpy as np
+from typing import Dict, Any, List
+
+from scenario_engine import evaluate_overrides, model_inputs, stack_overrides
+
+# Assumption families perturbed by the sensitivity analysis (label -> scenario override field)
+SENSITIVITY_DRIVERS = {
+    "Subscription Pricing": "price_pct",
+    "Churn Rates": "churn_pct",
+    "Transactional Referral Fee": "referral_fee_pct",
+    "Hosting Fixed Costs": "hosting_fixed_pct",
+    "Hosting Variable Costs": "hosting_variable_pct",
+    "Payroll Tax %": "payroll_tax_pct",
+    "Contractor Rates": "contractor_rate_pct",
+}
+
+# Outputs the tornado chart can show
+SENSITIVITY_METRICS = ["Net Income", "Minimum Cash", "Gross Profit"]
+
+
+def _metric_values(results: Dict[str, np.ndarray], months: List[str], year: str) -> Dict[str, np.ndarray]:
+    """Per-row value of every sensitivity metric"""
+    in_year = np.array([month.endswith(f" {year}") for month in months], dtype=bool)
+    return {
+        "Net Income": results["net_income"][:, in_year].sum(axis=1),
+        "Minimum Cash": results["balance"].min(axis=1) if months else np.zeros(len(results["balance"])),
+        "Gross Profit": results["gross_profit"][:, in_year].sum(axis=1),
+    }
+
+
+def run_sensitivity(model_data: Dict[str, Any], months: List[str], change_pct: float = 10.0, year: str = None) -> Dict[str, Any]:
+    """Move each driver down and up by change_pct and measure the effect on every metric.
+
+    The base plan plus the low and high case of every driver are evaluated as
+    one batched model run. Drivers are returned sorted by the size of their
+    Net Income swing (largest first). The year defaults to the last horizon year.
+    """
+    year = year or (months[-1].split(" ")[1] if months else "")
+    drivers = list(SENSITIVITY_DRIVERS.items())
+    scenarios = [{}]
+    for _, field in drivers:
+        scenarios.append({field: -change_pct})
+        scenarios.append({field: change_pct})
+
+    results = evaluate_overrides(model_inputs(model_data, months), stack_overrides(scenarios))
+    values = _metric_values(results, months, str(year))
+
+    rows = []
+    for i, (label, _) in enumerate(drivers):
+        low, high = 1 + 2 * i, 2 + 2 * i
+        row = {"Driver": label}
+        for metric in SENSITIVITY_METRICS:
+            row[f"{metric} Low"] = float(values[metric][low] - values[metric][0])
+            row[f"{metric} High"] = float(values[metric][high] - values[metric][0])
+        rows.append(row)
+    rows.sort(key=lambda row: abs(row["Net Income High"] - row["Net Income Low"]), reverse=True)
+
+    return {
+        "change_pct": change_pct,
+        "year": str(year),
+        "base": {metric: float(values[metric][0]) for metric in SENSITIVITY_METRICS},
+        "rows": rows,
+    }
@@ -0,0 +1,105 @@
+import numpy as np
+from typing import Dict, Any, List, Tuple
+
+from forecasting import budget_lines
+from model_cache import memoize_by_content
+from money import cents_matrix, from_cents
+from rollups import calendar_layout
+
+# Comparison periods ending at the selected month; FY is the selected month's whole calendar year
+BUDGET_PERIODS = ["MTD", "QTD", "YTD", "FY"]
+
+# Budget line key of each revenue stream
+REVENUE_LINES = {
+    "subscription_revenue": "Subscription",
+    "transactional_revenue": "Transactional",
+    "implementation_revenue": "Implementation",
+    "maintenance_revenue": "Maintenance",
+}
+
+TOTAL_ITEMS = {"Cash Receipts": "Total Receipts", "Cash Payments": "Total Payments", "Net Position": "Net Cash Flow"}
+
+
+def budget_line_key(category_name: str) -> str:
+    """Budget line key of an expense category name"""
+    return category_name.lower().replace(" ", "_").replace("&", "and").replace("/", "_")
+
+
+def variance_inputs(model_data: Dict[str, Any], months: List[str], expense_categories: List[str]) -> Tuple[List[Dict[str, str]], np.ndarray, np.ndarray]:
+    """Line definitions plus lines x months budget and actual cents arrays.
+
+    Receipts are the revenue streams, payments the liquidity disbursement
+    categories (actuals mirror the cash_flow table); budgets come from the
+    monthly budget_data lines.
+    """
+    lines = [{"section": "Cash Receipts", "item": f"{stream} Revenue", "key": key} for key, stream in REVENUE_LINES.items()]
+    lines += [{"section": "Cash Payments", "item": category, "key": budget_line_key(category)} for category in dict.fromkeys(expense_categories)]
+
+    budgets = budget_lines(model_data.get("budget_data"), months)
+    budget = cents_matrix(budgets, [line["key"] for line in lines], months)
+    actual = np.vstack([
+        cents_matrix(model_data.get("revenue", {}), list(REVENUE_LINES.values()), months),
+        cents_matrix((model_data.get("liquidity_data", {}) or {}).get("expenses", {}), [line["item"] for line in lines[len(REVENUE_LINES):]], months),
+    ])
+    return lines, budget, actual
+
+
+def period_bounds(months: List[str]) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """[start, stop) horizon positions of each period ending at every month"""
+    layout = calendar_layout(tuple(months))
+    position = np.arange(len(months))
+    calendar = position + layout["lead"]
+    quarter_start = np.maximum(calendar - calendar % 3 - layout["lead"], 0)
+    year_start = np.maximum(calendar - calendar % 12 - layout["lead"], 0)
+    year_stop = np.minimum(calendar - calendar % 12 + 12 - layout["lead"], len(months))
+    return {
+        "MTD": (position, position + 1),
+        "QTD": (quarter_start, position + 1),
+        "YTD": (year_start, position + 1),
+        "FY": (year_start, year_stop),
+    }
+
+
+@memoize_by_content(maxsize=8)
+def build_variance(lines: List[Dict[str, str]], budget: np.ndarray, actual: np.ndarray, months: List[str]) -> Dict[str, Any]:
+    """Budget, actual, variance and variance % of every line for every period and month in one pass.
+
+    Section totals and net cash flow are appended as extra lines, then each
+    period total is a difference of prefix sums, so ``result[period]["variance"][:, m]``
+    is the whole comparison for the period ending at months[m]. Sums are in exact
+    cents; returned amounts are dollars and read-only.
+    """
+    sections = np.array([line["section"] for line in lines])
+    receipts = budget[sections == "Cash Receipts"].sum(axis=0), actual[sections == "Cash Receipts"].sum(axis=0)
+    payments = budget[sections == "Cash Payments"].sum(axis=0), actual[sections == "Cash Payments"].sum(axis=0)
+    budget = np.vstack([budget, receipts[0], payments[0], receipts[0] - payments[0]])
+    actual = np.vstack([actual, receipts[1], payments[1], receipts[1] - payments[1]])
+    all_lines = list(lines) + [{"section": section, "item": item, "key": ""} for section, item in TOTAL_ITEMS.items()]
+
+    zero = np.zeros((budget.shape[0], 1), dtype=np.int64)
+    budget_prefix = np.hstack([zero, np.cumsum(budget, axis=1)])
+    actual_prefix = np.hstack([zero, np.cumsum(actual, axis=1)])
+
+    result = {"lines": all_lines}
+    for period, (start, stop) in period_bounds(months).items():
+        period_budget = budget_prefix[:, stop] - budget_prefix[:, start]
+        variance = actual_prefix[:, stop] - actual_prefix[:, start] - period_budget
+        result[period] = {
+            "budget": from_cents(period_budget),
+            "actual": from_cents(period_budget + variance),
+            "variance": from_cents(variance),
+            "variance_pct": np.divide(variance * 100.0, np.abs(period_budget), out=np.zeros(variance.shape), where=period_budget != 0),
+        }
+        for values in result[period].values():
+            values.flags.writeable = False
+    return result
+
+
+def comparison_rows(variance: Dict[str, Any], period: str, month_index: int) -> List[Dict[str, Any]]:
+    """Budget vs actual rows of the period ending at one month (all zero outside the horizon)"""
+    arrays = variance[period]
+    rows = []
+    for row, line in enumerate(variance["lines"]):
+        values = [float(arrays[field][row, month_index]) if month_index is not None else 0.0 for field in ("budget", "actual", "variance", "variance_pct")]
+        rows.append({"Category": line["section"], "Item": line["item"], "Budget": values[0], "Actual": values[1], "Variance": values[2], "Variance %": values[3]})
+    return rows
@@ -0,0 +1,63 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Tuple
+
+from model_cache import content_fingerprint
+
+# Period selections that show the whole planning horizon
+WHOLE_HORIZON_PERIODS = ["All Years", "Current"]
+
+# Evaluated prefixes kept per name and input version (least recently used dropped first)
+MAX_WINDOWED_SERIES = 32
+
+_prefixes = OrderedDict()
+_lock = threading.Lock()
+
+
+def period_span(months: List[str], period: str) -> Tuple[int, int]:
+    """[start, stop) positions of the months a period selection displays.
+
+    "All Years" and "Current" cover the horizon, a year such as "2026" covers its
+    horizon months and a month such as "Mar 2026" covers just that month;
+    periods outside the horizon give an empty span.
+    """
+    if not period or period in WHOLE_HORIZON_PERIODS:
+        return 0, len(months)
+    positions = [i for i, month in enumerate(months) if month == period or month.split(" ")[-1] == period]
+    if not positions:
+        return 0, 0
+    return positions[0], positions[-1] + 1
+
+
+def prefix_window(name: str, inputs: Any, months: List[str], span: Tuple[int, int], extend: Callable[[Optional[np.ndarray], int, int], np.ndarray]) -> np.ndarray:
+    """A (..., months) series evaluated only up to the end of ``span``, returned for the months in it.
+
+    ``extend(prefix, start, stop)`` returns the series for months[start:stop]
+    given ``prefix``, the months before ``start`` already evaluated (None when
+    ``start`` is 0), so running values can carry on from the last evaluated
+    month. It must depend on nothing but ``inputs``. The evaluated prefix is
+    kept per input version: widening the window from one year to the whole
+    horizon only evaluates the months past it. The result is read-only.
+    """
+    start, stop = span
+    key = (name, content_fingerprint(inputs, list(months)))
+    with _lock:
+        values = _prefixes.get(key)
+        if values is not None:
+            _prefixes.move_to_end(key)
+
+    done = 0 if values is None else values.shape[-1]
+    if values is None or stop > done:
+        block = np.asarray(extend(values, done, stop), dtype=float)
+        values = block if values is None else np.concatenate([values, block], axis=-1)
+        values.flags.writeable = False
+        with _lock:
+            # Keep whichever evaluation reached furthest if two sessions extended at once
+            current = _prefixes.get(key)
+            if current is None or current.shape[-1] < values.shape[-1]:
+                _prefixes[key] = values
+            _prefixes.move_to_end(key)
+            if len(_prefixes) > MAX_WINDOWED_SERIES:
+                _prefixes.popitem(last=False)
+    return values[..., start:stop]